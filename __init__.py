@@ -10,6 +10,15 @@ This package wires together:
 - graph (LangGraph state machine)
 """
 
-from .graph import build_graph
-
 __all__ = ["build_graph"]
+
+
+def __getattr__(name):
+    # Imported lazily: graph.py builds the checkpointer and (through the
+    # tools) loads the embedding model, which submodules such as benchmarks
+    # and tool CLIs should not pay for just by being imported.
+    if name == "build_graph":
+        from .graph import build_graph
+
+        return build_graph
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
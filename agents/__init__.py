@@ -3,6 +3,10 @@
 from agents.master import master_agent, master_response_agent
 from agents.specialists import activities_agent, logistics_agent
 from agents.history import update_history_summary
+from agents.speculation import speculate, speculation_stats
+from agents.response_templates import response_stats
+from agents.plan_cache import plan_cache_stats
+from agents.early_routing import early_routing_stats
 
 __all__ = [
     "master_agent",
@@ -10,4 +14,9 @@ __all__ = [
     "activities_agent",
     "logistics_agent",
     "update_history_summary",
+    "speculate",
+    "speculation_stats",
+    "response_stats",
+    "plan_cache_stats",
+    "early_routing_stats",
 ]
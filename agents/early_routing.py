@@ -0,0 +1,371 @@
+# src/agents/early_routing.py
+
+"""
+Early routing from the master's streamed JSON.
+
+The master LLM answers {"intent", "needs_specialist", "trip_info_updates",
+"preferences_updates", "assistant_message"} in that order, and the free-text
+assistant_message is most of the output. master_agent streams the reply
+through an EarlyRouter, which parses it incrementally (llm.partial_json):
+
+- as soon as `intent` is complete, the routed specialists' tool lookups are
+  started (speculation.prefetch_routed);
+- once trip_info_updates and preferences_updates are complete too, each
+  routed specialist is run in the background on a copy of the state with
+  those updates merged in (both at once for plan_full).
+
+The graph still goes master -> specialist node; activities_agent /
+logistics_agent call take_dispatched(), which waits for the background run
+and copies its results into the state, provided the final master plan
+routed to it with the same trip_info / preferences. Otherwise the run is
+discarded and the specialist runs as usual.
+
+Runs live in a process-local registry keyed by metadata["early_dispatch_id"]
+(turn-scoped), like the speculative lookups.
+
+Configured via environment:
+
+- EARLY_ROUTING:         "1" (default) or "0" to wait for the full master reply
+- EARLY_ROUTING_WORKERS: specialists run in the background at once (default 4)
+- EARLY_ROUTING_WAIT_S:  how long a specialist node waits for its background run (default 15)
+"""
+
+import contextvars
+import copy
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.deadline import mark_degraded, stage_budget_s
+from src.llm.admission import set_turn_class, should_shed
+from src.llm.partial_json import PartialJSONObject
+from src.states import TravelChatBotState
+from src.tracing import span
+
+from .speculation import discard_unrouted, prefetch_routed
+
+logger = logging.getLogger(__name__)
+
+EARLY_ROUTING = os.getenv("EARLY_ROUTING", "1") == "1"
+EARLY_ROUTING_WORKERS = int(os.getenv("EARLY_ROUTING_WORKERS", "4"))
+EARLY_ROUTING_WAIT_S = float(os.getenv("EARLY_ROUTING_WAIT_S", "15"))
+
+_STALE_AFTER_S = 600.0
+_UPDATE_FIELDS = ("trip_info_updates", "preferences_updates")
+
+
+def specialist_targets(intent: str) -> List[str]:
+    """Specialists to run this turn for a specialist-needing `intent`, in order."""
+    if intent == "logistics_q":
+        return ["logistics"]
+    if intent == "plan_full":
+        return ["activities", "logistics"]
+    # default to activities when we need a specialist but it's
+    # not explicitly logistics-only or full-plan
+    return ["activities"]
+
+
+SHED_MARK = "shed_plan_full"
+
+
+def turn_targets(state: TravelChatBotState, intent: str) -> List[str]:
+    """
+    specialist_targets(intent), unless LLM requests are queueing too long
+    (llm.admission.should_shed): a plan_full turn then runs its first
+    specialist only and gets a templated reply. The decision is kept on the
+    turn (metadata["degraded"]), so the early router and master_agent agree.
+    """
+    targets = specialist_targets(intent)
+    if len(targets) < 2:
+        return targets
+    if SHED_MARK in ((state.get("metadata") or {}).get("degraded") or []):
+        return targets[:1]
+    if should_shed(intent):
+        mark_degraded(state, SHED_MARK)
+        return targets[:1]
+    return targets
+
+
+def _inputs(state: TravelChatBotState) -> Dict[str, Any]:
+    return {"trip_info": dict(state.get("trip_info") or {}), "preferences": dict(state.get("preferences") or {})}
+
+
+@dataclass
+class _Dispatch:
+    target: str
+    inputs: Dict[str, Any]
+    base_tool_ms: float
+    base_degraded: int
+    started: float
+    future: Optional["Future[TravelChatBotState]"] = None
+    finished: Optional[float] = None
+
+    def run(self, state: TravelChatBotState) -> TravelChatBotState:
+        try:
+            with span(f"specialist.{self.target}", {"early_routed": True}):
+                return _run_specialist(self.target, state)
+        finally:
+            self.finished = time.perf_counter()
+
+
+class _Registry:
+    def __init__(self, max_workers: int) -> None:
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="early_route")
+        self._lock = threading.Lock()
+        self._turns: Dict[str, Dict[str, _Dispatch]] = {}
+        self._created: Dict[str, float] = {}
+        self._stats: Dict[str, float] = {
+            "streams": 0,
+            "routed_early": 0,
+            "dispatched": 0,
+            "adopted": 0,
+            "discarded": 0,
+            "route_ms": 0.0,
+            "dispatch_ms": 0.0,
+            "complete_ms": 0.0,
+            "saved_ms": 0.0,
+        }
+
+    def submit(self, spec_id: str, dispatch: _Dispatch, state: TravelChatBotState) -> None:
+        self._sweep()
+        dispatch.future = self._pool.submit(contextvars.copy_context().run, dispatch.run, state)
+        with self._lock:
+            self._turns.setdefault(spec_id, {})[dispatch.target] = dispatch
+            self._created.setdefault(spec_id, time.monotonic())
+            self._stats["dispatched"] += 1
+
+    def pop(self, spec_id: str, target: str) -> Optional[_Dispatch]:
+        with self._lock:
+            entries = self._turns.get(spec_id)
+            dispatch = entries.pop(target, None) if entries is not None else None
+            if entries is not None and not entries:
+                self._turns.pop(spec_id, None)
+                self._created.pop(spec_id, None)
+        return dispatch
+
+    def targets(self, spec_id: str) -> List[str]:
+        with self._lock:
+            return list(self._turns.get(spec_id, {}))
+
+    def count(self, **values: float) -> None:
+        with self._lock:
+            for key, value in values.items():
+                self._stats[key] += value
+
+    def _sweep(self) -> None:
+        cutoff = time.monotonic() - _STALE_AFTER_S
+        with self._lock:
+            stale = [k for k, created in self._created.items() if created < cutoff]
+            for k in stale:
+                for dispatch in self._turns.pop(k, {}).values():
+                    _cancel(dispatch)
+                    self._stats["discarded"] += 1
+                self._created.pop(k, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["in_flight_turns"] = len(self._turns)
+        streams, routed = stats["streams"], stats["routed_early"]
+        for key, count in (("route_ms", routed), ("dispatch_ms", routed), ("complete_ms", streams)):
+            total = stats.pop(key)
+            stats[f"{key}_mean"] = round(total / count, 1) if count else None
+        stats["saved_ms"] = round(stats["saved_ms"], 1)
+        return stats
+
+
+_registry = _Registry(EARLY_ROUTING_WORKERS)
+
+
+def _cancel(dispatch: _Dispatch) -> None:
+    if dispatch.future is not None:
+        dispatch.future.cancel()
+
+
+def _run_specialist(target: str, state: TravelChatBotState) -> TravelChatBotState:
+    from .specialists import run_specialist  # specialists imports this module
+
+    return run_specialist(target, state)
+
+
+class EarlyRouter:
+    """
+    on_text callback for the master's streamed reply: routes and dispatches
+    specialists as soon as the fields they need have arrived.
+    """
+
+    def __init__(self, state: TravelChatBotState) -> None:
+        self.state = state
+        self.parser = PartialJSONObject()
+        self.started = time.perf_counter()
+        self.route_ms: Optional[float] = None
+        self.dispatch_ms: Optional[float] = None
+        self.targets: List[str] = []
+
+    def __call__(self, delta: str) -> None:
+        completed = self.parser.feed(delta)
+        if not completed:
+            return
+        fields = self.parser.fields
+        if "intent" in completed:
+            self._route(fields)
+        if self.targets and self.dispatch_ms is None and all(f in fields for f in _UPDATE_FIELDS):
+            self._dispatch(fields)
+
+    def _route(self, fields: Dict[str, Any]) -> None:
+        intent = fields.get("intent")
+        if intent not in ("activities_q", "logistics_q", "plan_full"):
+            return
+        self.route_ms = (time.perf_counter() - self.started) * 1000.0
+        set_turn_class(intent)
+        self.targets = turn_targets(self.state, intent)
+        prefetch_routed(self.state, self.targets)
+        logger.info("early_routing: intent=%s after %.0f ms, targets=%s", intent, self.route_ms, self.targets)
+
+    def _dispatch(self, fields: Dict[str, Any]) -> None:
+        updates = {f: fields.get(f) if isinstance(fields.get(f), dict) else {} for f in _UPDATE_FIELDS}
+        turn = copy.deepcopy(self.state)
+        turn["trip_info"] = {**(turn.get("trip_info") or {}), **updates["trip_info_updates"]}  # type: ignore[typeddict-item]
+        turn["preferences"] = {  # type: ignore[typeddict-item]
+            **(turn.get("preferences") or {}),
+            **updates["preferences_updates"],
+        }
+        turn["intent"] = fields.get("intent")
+        # Lookups made for the trip as it was before these updates are useless now.
+        discard_unrouted(turn, self.targets)
+
+        metadata = self.state.get("metadata") or {}
+        spec_id = metadata.get("early_dispatch_id") or uuid.uuid4().hex
+        metadata["early_dispatch_id"] = spec_id
+        self.state["metadata"] = metadata
+        turn_metadata = turn.get("metadata") or {}
+        for target in self.targets:
+            dispatch = _Dispatch(
+                target,
+                inputs=_inputs(turn),
+                base_tool_ms=float(turn_metadata.get("tool_ms") or 0.0),
+                base_degraded=len(turn_metadata.get("degraded") or []),
+                started=time.perf_counter(),
+            )
+            _registry.submit(spec_id, dispatch, copy.deepcopy(turn))
+        self.dispatch_ms = (time.perf_counter() - self.started) * 1000.0
+        logger.info("early_routing: dispatched %s after %.0f ms", self.targets, self.dispatch_ms)
+
+    def finish(self) -> None:
+        """Call once the master call has returned (streamed or not)."""
+        complete_ms = (time.perf_counter() - self.started) * 1000.0
+        stats: Dict[str, float] = {"streams": 1, "complete_ms": complete_ms}
+        if self.route_ms is not None:
+            stats.update(routed_early=1, route_ms=self.route_ms, dispatch_ms=self.dispatch_ms or complete_ms)
+        _registry.count(**stats)
+        metadata = self.state.get("metadata") or {}
+        metadata["early_routing"] = {
+            "route_ms": None if self.route_ms is None else round(self.route_ms, 1),
+            "dispatch_ms": None if self.dispatch_ms is None else round(self.dispatch_ms, 1),
+            "complete_ms": round(complete_ms, 1),
+        }
+        self.state["metadata"] = metadata
+
+
+def start_router(state: TravelChatBotState) -> Optional[EarlyRouter]:
+    """An EarlyRouter for this turn's master call, or None if EARLY_ROUTING is off."""
+    return EarlyRouter(state) if EARLY_ROUTING else None
+
+
+def discard_undispatched(state: TravelChatBotState, targets: Iterable[str]) -> None:
+    """Drop background runs for specialists the final master plan does not route to."""
+    spec_id = (state.get("metadata") or {}).get("early_dispatch_id")
+    if not spec_id:
+        return
+    keep = set(targets)
+    for target in _registry.targets(spec_id):
+        if target in keep:
+            continue
+        dispatch = _registry.pop(spec_id, target)
+        if dispatch is not None:
+            _cancel(dispatch)
+            _registry.count(discarded=1)
+            logger.info("early_routing: %s run discarded (not routed)", target)
+
+
+def _adopt(state: TravelChatBotState, result: TravelChatBotState, dispatch: _Dispatch) -> None:
+    """Copy what the specialist wrote in the background run into `state`."""
+    target = dispatch.target
+    for key in (f"{target}_plan", f"{target}_tools_results"):
+        state[key] = result.get(key)  # type: ignore[literal-required]
+    plan_inputs = (result.get("plan_inputs") or {}).get(target)
+    if plan_inputs is not None:
+        state["plan_inputs"] = {**(state.get("plan_inputs") or {}), target: plan_inputs}
+
+    metadata = state.get("metadata") or {}
+    done = result.get("metadata") or {}
+    metadata[f"{target}_needs_tools"] = done.get(f"{target}_needs_tools")
+    if target in (done.get("replan") or {}):
+        metadata["replan"] = {**(metadata.get("replan") or {}), target: done["replan"][target]}
+    if target in (done.get("plan_cache_hits") or []):
+        metadata["plan_cache_hits"] = list(metadata.get("plan_cache_hits") or []) + [target]
+    new_degraded = (done.get("degraded") or [])[dispatch.base_degraded :]
+    if new_degraded:
+        metadata["degraded"] = list(metadata.get("degraded") or []) + list(new_degraded)
+    tool_ms = float(done.get("tool_ms") or 0.0) - dispatch.base_tool_ms
+    if tool_ms > 0:
+        metadata["tool_ms"] = metadata.get("tool_ms", 0.0) + tool_ms
+    state["metadata"] = metadata
+
+
+def take_dispatched(state: TravelChatBotState, target: str) -> bool:
+    """
+    Adopt `target`'s background run for this turn into `state`. False if
+    there was none, its inputs no longer match, it failed or it did not
+    finish within EARLY_ROUTING_WAIT_S (or the specialist's share of the
+    turn deadline, if sooner): the specialist then runs as usual.
+    """
+    spec_id = (state.get("metadata") or {}).get("early_dispatch_id")
+    dispatch = _registry.pop(spec_id, target) if spec_id else None
+    if dispatch is None:
+        return False
+    if dispatch.inputs != _inputs(state):
+        _cancel(dispatch)
+        _registry.count(discarded=1)
+        logger.info("early_routing: %s run discarded (trip_info / preferences changed)", target)
+        return False
+
+    wait_s = EARLY_ROUTING_WAIT_S
+    stage_budget = stage_budget_s(state, "specialist")
+    if stage_budget is not None:
+        wait_s = min(wait_s, stage_budget)
+
+    asked = time.perf_counter()
+    try:
+        result = dispatch.future.result(timeout=wait_s)
+    except FutureTimeout:
+        _cancel(dispatch)
+        _registry.count(discarded=1)
+        logger.info("early_routing: %s run not done after %.1f s, running it inline", target, wait_s)
+        return False
+    except Exception as e:
+        logger.warning("early_routing: %s run failed: %s", target, e)
+        _registry.count(discarded=1)
+        return False
+
+    _adopt(state, result, dispatch)
+    # Specialist time that overlapped the rest of the master call (and, for plan_full, each other).
+    saved_ms = max(0.0, (min(asked, dispatch.finished or asked) - dispatch.started) * 1000.0)
+    _registry.count(adopted=1, saved_ms=saved_ms)
+    logger.info("early_routing: %s run adopted (%.0f ms overlapped)", target, saved_ms)
+    return True
+
+
+def early_routing_stats() -> Dict[str, Any]:
+    """
+    Counters since process start: streamed master calls, how many routed
+    early, mean time to the route decision / the dispatch / the full reply,
+    background runs adopted or discarded, and specialist time overlapped.
+    """
+    return _registry.stats()
@@ -1,56 +1,132 @@
 # src/agents/history.py
 
-import json
+"""
+Conversation memory: a window of recent exchanges plus a running summary.
+
+update_history_summary used to call the summarizer LLM after every turn to
+fold one exchange into history_summary. Now each turn appends the exchange
+(user message, assistant reply) verbatim to state["recent_exchanges"], and
+the summarizer runs only when the window overflows: more than
+HISTORY_WINDOW_TURNS exchanges or more than HISTORY_WINDOW_TOKENS tokens.
+It then folds the oldest exchanges, all in one call, until at most
+HISTORY_KEEP_TURNS remain, so it runs about once every
+HISTORY_WINDOW_TURNS - HISTORY_KEEP_TURNS + 1 turns.
+
+master_agent gets both: history_summary for the long run and the verbatim
+window (recent_exchanges_payload) for "the second one", "that flight".
+
+Configured via environment:
+
+- HISTORY_WINDOW_TURNS:     exchanges kept verbatim before summarizing (default 6; 0 = every turn)
+- HISTORY_KEEP_TURNS:       exchanges left in the window after summarizing (default 2; at most HISTORY_WINDOW_TURNS)
+- HISTORY_WINDOW_TOKENS:    token budget of the window (default 800)
+- HISTORY_MAX_REPLY_CHARS:  assistant replies are stored cut to this length (default 400)
+"""
+
 import logging
-from typing import cast
+import os
+from typing import Any, Dict, List, cast
 
+from src.deadline import mark_degraded, should_degrade, stage_budget_s
 from src.llm.bedrock_client import call_llm
+from src.llm.payload import build_payload, dumps, estimate_tokens
 from src.states import TravelChatBotState
 
 logger = logging.getLogger(__name__)
 
+HISTORY_WINDOW_TURNS = int(os.getenv("HISTORY_WINDOW_TURNS", "6"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "2"))
+HISTORY_WINDOW_TOKENS = int(os.getenv("HISTORY_WINDOW_TOKENS", "800"))
+HISTORY_MAX_REPLY_CHARS = int(os.getenv("HISTORY_MAX_REPLY_CHARS", "400"))
+
+SUMMARY_PROMPT = """
+You are a summarizer.
+
+Given:
+- previous_summary (may be empty)
+- exchanges: the turns that followed it, oldest first
+  ({"user": ..., "assistant": ...})
+
+Produce a single updated summary of the conversation so far
+in 30–60 words, focusing on trip details and user preferences.
+Respond with plain text only.
+""".strip()
+
+
+def _cut(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit].rstrip() + "…"
+
+
+def window_tokens(exchanges: List[Dict[str, str]]) -> int:
+    return sum(estimate_tokens(dumps(exchange)) for exchange in exchanges)
+
+
+def _overflows(exchanges: List[Dict[str, str]]) -> bool:
+    return len(exchanges) > HISTORY_WINDOW_TURNS or window_tokens(exchanges) > HISTORY_WINDOW_TOKENS
+
+
+def _split_window(exchanges: List[Dict[str, str]]) -> int:
+    """How many of the oldest exchanges to fold so the rest fits HISTORY_KEEP_TURNS and the token budget."""
+    keep = min(HISTORY_KEEP_TURNS, HISTORY_WINDOW_TURNS)
+    fold = max(0, len(exchanges) - keep)
+    while fold < len(exchanges) and window_tokens(exchanges[fold:]) > HISTORY_WINDOW_TOKENS:
+        fold += 1
+    return fold
+
+
+def recent_exchanges_payload(state: TravelChatBotState) -> List[Dict[str, str]]:
+    """The verbatim window for prompts, newest first (payload trimming keeps the first entries)."""
+    return list(reversed(state.get("recent_exchanges") or []))
+
 
 def update_history_summary(state: TravelChatBotState) -> TravelChatBotState:
     """
-    Compress the last exchange (user_input + master response)
-    into a short 30–50 word history_summary and store it on state.
+    Append this turn's exchange to recent_exchanges and, if the window
+    overflows, fold its oldest exchanges into history_summary with one
+    summarizer call.
+
+    Past the turn deadline (see deadline.py), or if the call fails, the
+    exchanges stay in the window and are folded on a later turn.
     """
-    previous_summary = (state.get("history_summary") or "").strip()
     user_input = (state.get("user_input") or "").strip()
     master_plan = cast(dict, state.get("master_plan") or {})
-    master_message = (
-        master_plan.get("assistant_message", "")
-        or state.get("master_message", "")
-        or ""
-    )
+    reply = state.get("master_message") or master_plan.get("assistant_message") or ""
 
-    summary_payload = {
-        "previous_summary": previous_summary,
-        "last_user_message": user_input,
-        "last_assistant_message": master_message,
-    }
+    exchanges: List[Dict[str, Any]] = list(state.get("recent_exchanges") or [])
+    if user_input or reply:
+        exchanges.append({"user": user_input, "assistant": _cut(reply.strip(), HISTORY_MAX_REPLY_CHARS)})
+    state["recent_exchanges"] = exchanges
 
-    summary_prompt = """
-You are a summarizer.
+    if not _overflows(exchanges):
+        return state
+    fold = _split_window(exchanges)
+    if fold == 0:
+        return state
 
-Given:
-- previous_summary (may be empty)
-- last_user_message
-- last_assistant_message
+    previous_summary = (state.get("history_summary") or "").strip()
+    if should_degrade(state, "history"):
+        mark_degraded(state, "skip_history")
+        logger.info("update_history_summary: turn deadline reached, summarizing on a later turn")
+        return state
 
-Produce a single updated summary of the conversation so far
-in 30–50 words, focusing on trip details and user preferences.
-Respond with plain text only.
-    """.strip()
+    summary_payload = {
+        "previous_summary": previous_summary,
+        "exchanges": exchanges[:fold],
+    }
 
-    logger.debug("update_history_summary: calling LLM summarizer")
+    logger.debug("update_history_summary: folding %d exchange(s) into the summary", fold)
     new_summary = call_llm(
-        system_prompt=summary_prompt,
-        user_prompt=json.dumps(summary_payload),
+        system_prompt=SUMMARY_PROMPT,
+        user_prompt=build_payload("history", summary_payload),
         temperature=0.0,
-        max_tokens=150,
+        max_tokens=200,
+        timeout_s=stage_budget_s(state, "history"),
+        agent="history",
     ).strip()
 
-    state["history_summary"] = new_summary
+    # A failed or timed-out call returns "": keep what we had, fold next turn.
+    if new_summary:
+        state["history_summary"] = new_summary
+        state["recent_exchanges"] = exchanges[fold:]
     logger.debug("update_history_summary: new summary=%s", new_summary)
     return state
@@ -0,0 +1,341 @@
+# src/agents/intent_classifier.py
+
+"""
+Fast-path intent classifier in front of the master agent's LLM call.
+
+Two local stages, tried in order:
+
+1. Keyword rules: small talk ("hi", "thanks", "bye") and messages whose
+   wording is unambiguous (itinerary / transport / events vocabulary).
+2. Nearest-centroid over the MiniLM embeddings already loaded by rag/:
+   the message is compared with the mean embedding of a few labelled
+   examples per intent. Accepted only above a similarity and margin
+   threshold, and only for specialist intents (a generic question still
+   needs the LLM to write the answer).
+
+Anything else, and any message that carries trip facts we cannot extract
+reliably (new places, dates, budget, diet...), defers to the LLM, which
+also fills trip_info_updates / preferences_updates. The fast path only
+extracts num_days ("3-day") and travel_month ("in March").
+
+Configured via environment:
+
+- INTENT_FAST_PATH:        "rules+embedding" (default), "rules" or "off"
+- INTENT_EMBED_MIN_SIM:    minimum cosine similarity to the best centroid (default 0.45)
+- INTENT_EMBED_MIN_MARGIN: minimum gap to the second-best centroid (default 0.08)
+"""
+
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INTENT_FAST_PATH = os.getenv("INTENT_FAST_PATH", "rules+embedding")
+INTENT_EMBED_MIN_SIM = float(os.getenv("INTENT_EMBED_MIN_SIM", "0.45"))
+INTENT_EMBED_MIN_MARGIN = float(os.getenv("INTENT_EMBED_MIN_MARGIN", "0.08"))
+
+SPECIALIST_INTENTS = ("activities_q", "logistics_q", "plan_full")
+
+# ---- rules ----
+
+_SMALL_TALK = [
+    (
+        re.compile(r"^(hi|hii+|hello|hey|hey there|hi there|hello there|good (morning|afternoon|evening))[\s!.]*$"),
+        "Hi! Where are you thinking of travelling, and when?",
+    ),
+    (
+        re.compile(r"^(thanks|thank you|thx|ty|thanks a lot|thank you so much|great,? thanks|cool,? thanks)[\s!.]*$"),
+        "You're welcome! Let me know if you'd like to adjust anything else in your plans.",
+    ),
+    (
+        re.compile(r"^(bye|goodbye|see you|see ya|that's all|that is all)[\s!.]*$"),
+        "Goodbye! Safe travels ✈️",
+    ),
+]
+
+_PLAN_RE = re.compile(
+    r"\b(itinerary|itineraries|day[- ]by[- ]day|day[- ]wise|daily plan|\d+[- ]?days? (trip |travel )?(plan|schedule)"
+    r"|plan (out )?(my|the|a|our) (whole |full |entire )?(trip|days|stay|holiday|vacation)|trip plan|full plan)\b"
+)
+_LOGISTICS_RE = re.compile(
+    r"\b(flights?|fly|flying|airlines?|airports?|trains?|rail|bus(es)?|on[- ]time|delays?|delayed"
+    r"|layovers?|direct route|get there|getting there|commute|transfer|taxi|cab)\b"
+)
+# Bare "show" / "tour" are ordinary English ("show me hotels", "tour guide"); only qualified forms count.
+_ACTIVITIES_RE = re.compile(
+    r"\b(events?|concerts?|festivals?|(live|comedy|theatre|theater|dance|music|light) shows?|gigs?|things to do"
+    r"|what to do|attractions?|sights?|sightseeing|museums?|places to (visit|see)|must[- ]see|nightlife"
+    r"|(food|guided|walking|city|heritage|boat) tours?|street food|activities)\b"
+)
+
+_MONTHS = (
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december",
+)
+_MONTH_RE = re.compile(r"\b(in|during|this|next|for)\s+(" + "|".join(_MONTHS) + r")\b")
+_NUM_DAYS_RE = re.compile(r"\b(\d{1,2})[- ]?(day|days|night|nights)\b")
+
+# Facts the master LLM would normally extract; their presence means "defer".
+_PREFERENCE_RE = re.compile(
+    r"\b(budget|cheap|luxury|vegetarian|vegan|halal|kosher|kids?|children|family|hostel|hotel|airbnb"
+    r"|slow pace|relaxed|packed|tomorrow|tonight|weekend|next week|\d{4}-\d{2}-\d{2})\b"
+)
+# The word after a place preposition, matched on the lower-cased message: users
+# often type "from delhi to goa". Anything but a known place, a month or one
+# of _NOT_PLACES could be a new city, so the LLM gets the message.
+_PLACE_RE = re.compile(r"\b(?:from|to|in|at|near|around|for|visit|visiting)\s+([a-z][a-z'-]*)")
+_NOT_PLACES = frozenset(
+    """
+    a an the my our your his her their its this that these those there here it them me us you
+    each every all some any one two few other another same different more less most much many
+    what which where when how who whom whose and or but not
+    do see get go eat stay visit travel fly book take know find be have make plan check try explore look
+    reach spend start arrive leave return come head move shop buy
+    day days night nights evening evenings morning mornings afternoon afternoons week weeks weekend
+    weekends time times dinner lunch breakfast food drinks street shopping sightseeing
+    town city centre center downtown airport station hotel hostel beach beaches advance total general
+    case mind order particular least once instead
+    """.split()
+)
+
+# ---- embedding examples (labels as the master prompt defines them) ----
+
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    "activities_q": [
+        "what are some must-see places there?",
+        "any big events or concerts while I'm there?",
+        "what can I do in the evenings?",
+        "are there any festivals that month?",
+        "recommend some things to do for a foodie",
+        "what about museums and art galleries?",
+        "any good nightlife spots?",
+        "where can I go for street food?",
+    ],
+    "logistics_q": [
+        "what about trains instead?",
+        "how do I get there from the airport?",
+        "which airline is most reliable on that route?",
+        "are flights usually delayed in the evening?",
+        "is it faster to take the bus or the train?",
+        "how long is the flight?",
+        "what's the best way to get around the city?",
+        "should I book a direct flight?",
+    ],
+    "plan_full": [
+        "make me an itinerary",
+        "give me a day by day plan",
+        "can you plan the whole trip?",
+        "put together a full schedule for my stay",
+        "plan out each day for me",
+        "create a complete trip plan with transport and activities",
+    ],
+    "generic_chat": [
+        "what's the weather like there?",
+        "when is the best time to visit?",
+        "what currency do they use?",
+        "is it safe for solo travellers?",
+        "what language do people speak there?",
+        "can you help me plan travel?",
+    ],
+}
+
+
+@dataclass
+class FastIntent:
+    """A confident local classification, shaped like the master LLM output."""
+
+    intent: str
+    source: str  # "rules" | "embedding"
+    confidence: float
+    assistant_message: str
+    trip_info_updates: Dict[str, Any] = field(default_factory=dict)
+
+    def as_master_plan(self) -> Dict[str, Any]:
+        return {
+            "intent": self.intent,
+            "needs_specialist": self.intent in SPECIALIST_INTENTS,
+            "assistant_message": self.assistant_message,
+            "trip_info_updates": self.trip_info_updates,
+            "preferences_updates": {},
+        }
+
+
+_SPECIALIST_ACK = {
+    "activities_q": "Let me look up some things to do for you.",
+    "logistics_q": "Let me check the travel options for you.",
+    "plan_full": "Let me put a plan together for you.",
+}
+
+
+def _extract_trip_facts(text: str, lowered: str, trip_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    The trip_info updates the fast path can make on its own, or None if the
+    message carries facts that need the LLM.
+    """
+    if _PREFERENCE_RE.search(lowered):
+        return None
+
+    known = {word for k in ("destination", "origin", "country") for word in str(trip_info.get(k) or "").lower().split()}
+    for match in _PLACE_RE.finditer(lowered):
+        word = match.group(1)
+        if word not in known and word not in _MONTHS and word not in _NOT_PLACES:
+            return None
+
+    updates: Dict[str, Any] = {}
+    month = _MONTH_RE.search(lowered)
+    if month:
+        updates["travel_month"] = month.group(2).capitalize()
+    days = _NUM_DAYS_RE.search(lowered)
+    if days:
+        updates["num_days"] = int(days.group(1))
+
+    # Any other number (dates, prices, group size) is for the LLM.
+    leftover = _NUM_DAYS_RE.sub("", lowered)
+    if re.search(r"\d", leftover):
+        return None
+    return updates
+
+
+def classify_by_rules(text: str) -> Optional[Tuple[str, float, Optional[str]]]:
+    """(intent, confidence, canned reply or None) from keyword rules."""
+    lowered = text.strip().lower()
+    for pattern, reply in _SMALL_TALK:
+        if pattern.match(lowered):
+            return "generic_chat", 1.0, reply
+
+    if _PLAN_RE.search(lowered):
+        return "plan_full", 0.95, None
+    logistics = bool(_LOGISTICS_RE.search(lowered))
+    activities = bool(_ACTIVITIES_RE.search(lowered))
+    if logistics and not activities:
+        return "logistics_q", 0.9, None
+    if activities and not logistics:
+        return "activities_q", 0.9, None
+    return None
+
+
+def asks_for_itinerary(text: str) -> bool:
+    """True if the message asks for an itinerary / day-by-day plan."""
+    return bool(_PLAN_RE.search(text.lower()))
+
+
+def mentions_logistics(text: str) -> bool:
+    """True if the message uses transport vocabulary (flights, trains, delays...)."""
+    return bool(_LOGISTICS_RE.search(text.lower()))
+
+
+class CentroidClassifier:
+    """
+    Nearest-centroid classifier over sentence embeddings.
+
+    `embeddings` is any LangChain Embeddings (embed_query / embed_documents).
+    Centroids are computed on first use from INTENT_EXAMPLES.
+    """
+
+    def __init__(self, embeddings: Any, examples: Optional[Dict[str, List[str]]] = None) -> None:
+        self.embeddings = embeddings
+        self.examples = examples or INTENT_EXAMPLES
+        self._labels: List[str] = []
+        self._centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(m: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(m, axis=-1, keepdims=True)
+        return m / np.maximum(norms, 1e-12)
+
+    def _fit(self) -> None:
+        with self._lock:
+            if self._centroids is not None:
+                return
+            labels, rows = [], []
+            for label, texts in self.examples.items():
+                vectors = self._normalize(np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32))
+                labels.append(label)
+                rows.append(vectors.mean(axis=0))
+            self._labels = labels
+            self._centroids = self._normalize(np.vstack(rows))
+
+    def scores(self, text: str) -> List[Tuple[str, float]]:
+        """(label, cosine similarity) for every intent, best first."""
+        self._fit()
+        q = self._normalize(np.asarray(self.embeddings.embed_query(text), dtype=np.float32))
+        sims = self._centroids @ q
+        return sorted(zip(self._labels, sims.tolist()), key=lambda kv: kv[1], reverse=True)
+
+
+_embeddings: Any = None
+_embeddings_unavailable = False
+_centroid_classifier: Optional[CentroidClassifier] = None
+
+
+def get_embeddings() -> Any:
+    """rag.embeddings (shared with the flight index), or None if rag/ cannot be loaded."""
+    global _embeddings, _embeddings_unavailable
+    if _embeddings is None and not _embeddings_unavailable:
+        try:
+            from rag import embeddings  # same instance the flight index uses
+        except Exception as e:  # rag/ not importable (e.g. no model files)
+            logger.warning("intent_classifier: embeddings unavailable (%s)", e)
+            embeddings = None
+        _embeddings = embeddings
+        _embeddings_unavailable = embeddings is None
+    return _embeddings
+
+
+def get_centroid_classifier() -> Optional[CentroidClassifier]:
+    """Shared classifier over rag.embeddings, or None if they are not available."""
+    global _centroid_classifier
+    if _centroid_classifier is None:
+        embeddings = get_embeddings()
+        if embeddings is None:
+            return None
+        _centroid_classifier = CentroidClassifier(embeddings)
+    return _centroid_classifier
+
+
+def classify_fast(
+    user_input: str,
+    trip_info: Optional[Dict[str, Any]] = None,
+    mode: Optional[str] = None,
+    min_sim: float = INTENT_EMBED_MIN_SIM,
+    min_margin: float = INTENT_EMBED_MIN_MARGIN,
+    classifier: Optional[CentroidClassifier] = None,
+) -> Optional[FastIntent]:
+    """
+    Classify `user_input` locally, or return None to defer to the LLM.
+    """
+    mode = mode or INTENT_FAST_PATH
+    text = (user_input or "").strip()
+    if mode == "off" or not text:
+        return None
+
+    rule = classify_by_rules(text)
+    if rule is not None and rule[2] is not None:  # small talk: no facts to extract
+        return FastIntent(intent=rule[0], source="rules", confidence=rule[1], assistant_message=rule[2])
+
+    facts = _extract_trip_facts(text, text.lower(), trip_info or {})
+    if facts is None:
+        return None
+
+    if rule is not None:
+        intent, confidence, _ = rule
+        return FastIntent(intent, "rules", confidence, _SPECIALIST_ACK[intent], facts)
+
+    if mode != "rules+embedding":
+        return None
+    classifier = classifier or get_centroid_classifier()
+    if classifier is None:
+        return None
+
+    ranked = classifier.scores(text)
+    (best, sim), (_, second) = ranked[0], ranked[1]
+    if best not in SPECIALIST_INTENTS or sim < min_sim or sim - second < min_margin:
+        return None
+    return FastIntent(best, "embedding", round(sim, 3), _SPECIALIST_ACK[best], facts)
@@ -0,0 +1,526 @@
+# src/agents/itinerary.py
+
+"""
+Deterministic post-processing for activities_plan.
+
+The ACTIVITIES LLM is good at picking *what* to do, but the "day" and
+"time_of_day" fields it invents are geographically scattered. This module
+rewrites them:
+
+1. Items with lat/lon are clustered into `num_days` groups with a
+   capacity-constrained k-means, so each day stays in one part of town.
+   Events with a fixed date are pinned to their day (relative to
+   trip_info.start_date) and seed that day's cluster.
+2. Each day is ordered with a nearest-neighbour tour improved by 2-opt.
+   Items with a start_time are kept in chronological order.
+3. "day" and "time_of_day" are rewritten from the final ordering.
+
+Everything is pure Python: a few ms for a typical plan and a few tens of ms
+for several hundred candidate items (see benchmarks/bench_itinerary.py).
+"""
+
+import logging
+import math
+from collections import Counter
+from datetime import date as _date
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+TIME_SLOTS = ("morning", "afternoon", "evening")
+
+# Hard cap on the number of days we will spread items over.
+MAX_DAYS = 30
+
+KMEANS_MAX_ITER = 15
+# Capacity constraints make k-means jitter near convergence; stop once fewer
+# than this share of points change day between iterations.
+KMEANS_MIN_CHANGE_SHARE = 0.02
+TWO_OPT_MAX_PASSES = 8
+
+
+def _coords(item: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """Return (lat, lon) for an item, or None if missing/invalid."""
+    try:
+        lat = item.get("lat")
+        lon = item.get("lon")
+        if lat is None or lon is None:
+            return None
+        lat_f, lon_f = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (-90.0 <= lat_f <= 90.0 and -180.0 <= lon_f <= 180.0):
+        return None
+    return lat_f, lon_f
+
+
+def _project(points: Sequence[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """
+    Equirectangular projection to planar km. Accurate enough at city scale
+    and lets us use plain Euclidean distances everywhere.
+    """
+    if not points:
+        return []
+    mean_lat = math.radians(sum(p[0] for p in points) / len(points))
+    kx = 111.32 * math.cos(mean_lat)
+    ky = 110.57
+    return [(p[1] * kx, p[0] * ky) for p in points]
+
+
+def _dist(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def _parse_date(value: Any) -> Optional[_date]:
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return _date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def _start_minutes(item: Dict[str, Any]) -> Optional[int]:
+    """Parse start_time ("19:30" / "19:30:00") into minutes after midnight."""
+    value = item.get("start_time")
+    if not value or not isinstance(value, str):
+        return None
+    parts = value.strip().split(":")
+    try:
+        hours = int(parts[0])
+        minutes = int(parts[1]) if len(parts) > 1 else 0
+    except ValueError:
+        return None
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        return None
+    return hours * 60 + minutes
+
+
+def _slot_for_minutes(minutes: int) -> int:
+    if minutes < 12 * 60:
+        return 0
+    if minutes < 17 * 60:
+        return 1
+    return 2
+
+
+def resolve_num_days(trip_info: Dict[str, Any], items: Sequence[Dict[str, Any]]) -> int:
+    """
+    Work out how many days to spread the plan over.
+
+    Preference order: trip_info.num_days, start/end dates, the largest "day"
+    the LLM used, and finally a single day.
+    """
+    num_days = trip_info.get("num_days")
+    try:
+        if num_days and int(num_days) > 0:
+            return min(int(num_days), MAX_DAYS)
+    except (TypeError, ValueError):
+        pass
+
+    start = _parse_date(trip_info.get("start_date"))
+    end = _parse_date(trip_info.get("end_date"))
+    if start and end and end >= start:
+        return min((end - start).days + 1, MAX_DAYS)
+
+    llm_days = [
+        it.get("day") for it in items if isinstance(it.get("day"), int) and it.get("day") > 0
+    ]
+    if llm_days:
+        return min(max(llm_days), MAX_DAYS)
+    return 1
+
+
+def _pinned_day(item: Dict[str, Any], start: Optional[_date], num_days: int) -> Optional[int]:
+    """0-based day index for items with a fixed date inside the trip window."""
+    if start is None:
+        return None
+    item_date = _parse_date(item.get("date"))
+    if item_date is None:
+        return None
+    offset = (item_date - start).days
+    if 0 <= offset < num_days:
+        return offset
+    return None
+
+
+def _init_centroids(
+    points: List[Tuple[float, float]],
+    k: int,
+    pinned: Dict[int, int],
+) -> List[Tuple[float, float]]:
+    """
+    Deterministic farthest-point initialisation.
+
+    Days with pinned events start at the mean of their pinned items; the
+    remaining centroids are placed greedily as far as possible from the
+    already chosen ones.
+    """
+    centroids: List[Optional[Tuple[float, float]]] = [None] * k
+
+    by_day: Dict[int, List[Tuple[float, float]]] = {}
+    for idx, day in pinned.items():
+        by_day.setdefault(day, []).append(points[idx])
+    for day, pts in by_day.items():
+        centroids[day] = (
+            sum(p[0] for p in pts) / len(pts),
+            sum(p[1] for p in pts) / len(pts),
+        )
+
+    chosen = [c for c in centroids if c is not None]
+    if not chosen:
+        cx = sum(p[0] for p in points) / len(points)
+        cy = sum(p[1] for p in points) / len(points)
+        # Start from the point farthest from the overall mean.
+        first = max(points, key=lambda p: _dist(p, (cx, cy)))
+        chosen.append(first)
+        centroids[centroids.index(None)] = first
+
+    min_d = [min(_dist(p, c) for c in chosen) for p in points]
+    for day in range(k):
+        if centroids[day] is not None:
+            continue
+        far = max(range(len(points)), key=lambda i: min_d[i])
+        centroids[day] = points[far]
+        for i, p in enumerate(points):
+            d = _dist(p, points[far])
+            if d < min_d[i]:
+                min_d[i] = d
+
+    return [c for c in centroids if c is not None]
+
+
+def _assign_capacitated(
+    points: List[Tuple[float, float]],
+    centroids: List[Tuple[float, float]],
+    capacity: int,
+    pinned: Dict[int, int],
+) -> List[int]:
+    """
+    Greedy capacity-constrained assignment.
+
+    Points are processed in order of "regret" (how much worse their second
+    best cluster is than their best), so points with a clear home are placed
+    first and the flexible ones absorb overflow.
+    """
+    k = len(centroids)
+    labels = [-1] * len(points)
+    load = [0] * k
+
+    for idx, day in pinned.items():
+        labels[idx] = day
+        load[day] += 1
+
+    free = [i for i in range(len(points)) if labels[i] < 0]
+    ranked: List[Tuple[float, int, List[int]]] = []
+    hypot = math.hypot
+    for i in free:
+        px, py = points[i]
+        dists = [hypot(px - cx, py - cy) for cx, cy in centroids]
+        order = sorted(range(k), key=dists.__getitem__)
+        regret = dists[order[1]] - dists[order[0]] if k > 1 else 0.0
+        ranked.append((regret, i, order))
+    ranked.sort(key=lambda r: (-r[0], r[1]))
+
+    for _, i, order in ranked:
+        for day in order:
+            if load[day] < capacity:
+                labels[i] = day
+                load[day] += 1
+                break
+        else:
+            # Pinned items can push a day over capacity; fall back to nearest.
+            labels[i] = order[0]
+            load[order[0]] += 1
+
+    return labels
+
+
+def cluster_by_location(
+    points: List[Tuple[float, float]],
+    k: int,
+    pinned: Optional[Dict[int, int]] = None,
+) -> List[int]:
+    """
+    Capacity-constrained k-means over planar points.
+
+    Returns a 0-based cluster label per point. `pinned` maps point index to
+    a fixed cluster that the point must stay in.
+    """
+    pinned = pinned or {}
+    n = len(points)
+    if n == 0:
+        return []
+    k = max(1, k)
+    pinned = {i: d for i, d in pinned.items() if d < k}
+    # Fewer points than clusters: drop the spare ones, but never one a point is pinned to.
+    k = min(k, max(n, max(pinned.values(), default=-1) + 1))
+    capacity = math.ceil(n / k)
+
+    centroids = _init_centroids(points, k, pinned)
+    min_changes = max(1, int(n * KMEANS_MIN_CHANGE_SHARE))
+    labels: List[int] = []
+    for _ in range(KMEANS_MAX_ITER):
+        new_labels = _assign_capacitated(points, centroids, capacity, pinned)
+        if labels and sum(a != b for a, b in zip(new_labels, labels)) < min_changes:
+            labels = new_labels
+            break
+        labels = new_labels
+
+        sums = [[0.0, 0.0, 0] for _ in range(k)]
+        for p, lab in zip(points, labels):
+            s = sums[lab]
+            s[0] += p[0]
+            s[1] += p[1]
+            s[2] += 1
+        centroids = [
+            (s[0] / s[2], s[1] / s[2]) if s[2] else centroids[day]
+            for day, s in enumerate(sums)
+        ]
+
+    return labels
+
+
+def _tour_respects_times(tour: Sequence[int], times: Dict[int, int]) -> bool:
+    last = -1
+    for node in tour:
+        t = times.get(node)
+        if t is None:
+            continue
+        if t < last:
+            return False
+        last = t
+    return True
+
+
+def order_route(
+    points: List[Tuple[float, float]],
+    times: Optional[Dict[int, int]] = None,
+) -> List[int]:
+    """
+    Order points into an open path: nearest neighbour + 2-opt.
+
+    `times` maps point index to a fixed start time (minutes); those points
+    are kept in chronological order relative to each other.
+    """
+    times = times or {}
+    n = len(points)
+    if n <= 2:
+        return sorted(range(n), key=lambda i: times.get(i, -1))
+
+    timed = sorted(times, key=lambda i: (times[i], i))
+    # Day-sized inputs (tens of points) make a full matrix the cheapest option.
+    dm = [[_dist(p, q) for q in points] for p in points]
+
+    # Start from the earliest timed item if it is the earliest stop anyway,
+    # otherwise from the point farthest west-south (deterministic corner).
+    remaining = set(range(n))
+    current = min(range(n), key=lambda i: (points[i][0] + points[i][1], i))
+    if timed and current in times and current != timed[0]:
+        current = timed[0]
+    tour = [current]
+    remaining.discard(current)
+    next_timed = 0
+    while next_timed < len(timed) and timed[next_timed] not in remaining:
+        next_timed += 1
+
+    while remaining:
+        # A timed point is only eligible once every earlier timed point is visited.
+        row = dm[current]
+        nxt = min(
+            (
+                i for i in remaining
+                if i not in times or (next_timed < len(timed) and i == timed[next_timed])
+            ),
+            key=lambda i: (row[i], i),
+        )
+        tour.append(nxt)
+        remaining.discard(nxt)
+        current = nxt
+        while next_timed < len(timed) and timed[next_timed] not in remaining:
+            next_timed += 1
+
+    # 2-opt for an open path; reject moves that break chronological order.
+    for _ in range(TWO_OPT_MAX_PASSES):
+        improved = False
+        for i in range(n - 2):
+            a, b = tour[i], tour[i + 1]
+            row_a = dm[a]
+            # Reversing a segment only reorders timed stops if it holds two or more.
+            timed_in_segment = 1 if b in times else 0
+            for j in range(i + 2, n):
+                c = tour[j]
+                if c in times:
+                    timed_in_segment += 1
+                d_old = row_a[b]
+                d_new = row_a[c]
+                if j + 1 < n:
+                    d = tour[j + 1]
+                    d_old += dm[c][d]
+                    d_new += dm[b][d]
+                if d_new + 1e-9 < d_old:
+                    candidate = tour[: i + 1] + tour[i + 1 : j + 1][::-1] + tour[j + 1 :]
+                    if timed_in_segment > 1 and not _tour_respects_times(candidate, times):
+                        continue
+                    tour = candidate
+                    b = tour[i + 1]
+                    timed_in_segment = sum(1 for x in tour[i + 1 : j + 1] if x in times)
+                    improved = True
+        if not improved:
+            break
+
+    return tour
+
+
+def _assign_slots(day_items: List[Dict[str, Any]]) -> List[str]:
+    """
+    Pick time_of_day for an ordered day.
+
+    Untimed items are spread evenly over the slots, then clamped so that the
+    sequence never goes backwards in time relative to timed items.
+    """
+    n = len(day_items)
+    fixed = [
+        _slot_for_minutes(m) if (m := _start_minutes(it)) is not None else None
+        for it in day_items
+    ]
+    slots = [
+        fixed[i] if fixed[i] is not None else min(len(TIME_SLOTS) - 1, i * len(TIME_SLOTS) // n)
+        for i in range(n)
+    ]
+
+    # Forward pass: never earlier than the previous item.
+    for i in range(1, n):
+        if fixed[i] is None and slots[i] < slots[i - 1]:
+            slots[i] = slots[i - 1]
+    # Backward pass: never later than the next timed item.
+    for i in range(n - 2, -1, -1):
+        if fixed[i] is None and slots[i] > slots[i + 1]:
+            slots[i] = slots[i + 1]
+
+    return [TIME_SLOTS[s] for s in slots]
+
+
+def _llm_day(item: Dict[str, Any], num_days: int) -> Optional[int]:
+    """0-based day index the LLM gave the item, if it is inside the trip."""
+    day = item.get("day")
+    if isinstance(day, int) and 1 <= day <= num_days:
+        return day - 1
+    return None
+
+
+def _match_llm_days(
+    labels: List[int],
+    llm_days: List[Optional[int]],
+    fixed: Set[int],
+    num_days: int,
+) -> List[int]:
+    """
+    Renumber clusters so each lands on the day most of its items had from
+    the LLM (clusters holding date-pinned items keep their day). Items
+    without coordinates keep their LLM day, so they stay with the same
+    stops. The clusters themselves are unchanged.
+    """
+    votes: Counter = Counter((lab, d) for lab, d in zip(labels, llm_days) if d is not None)
+    mapping = {lab: lab for lab in fixed}
+    taken = set(fixed)
+    for (lab, day), _ in sorted(votes.items(), key=lambda kv: (-kv[1], kv[0])):
+        if lab not in mapping and day not in taken:
+            mapping[lab] = day
+            taken.add(day)
+    free = iter(d for d in range(num_days) if d not in taken)
+    for lab in sorted(set(labels)):
+        if lab not in mapping:
+            mapping[lab] = next(free)
+    return [mapping[lab] for lab in labels]
+
+
+def optimize_activities_plan(
+    activities_plan: Optional[Dict[str, Any]],
+    trip_info: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Rewrite `day` and `time_of_day` of activities_plan.items so that each day
+    is geographically compact and walks a short route.
+
+    Items without coordinates keep their pinned date or the `day` the LLM
+    gave them (else go to the least loaded day) and are placed among that
+    day's stops by start_time. Without any coordinates the plan is returned
+    as it is. Returns a new plan dict; the input is not mutated.
+    """
+    plan = dict(activities_plan or {})
+    items = [dict(it) for it in (plan.get("items") or []) if isinstance(it, dict)]
+    if not items:
+        return plan
+
+    trip_info = trip_info or {}
+    num_days = resolve_num_days(trip_info, items)
+    start = _parse_date(trip_info.get("start_date"))
+
+    located = [i for i, it in enumerate(items) if _coords(it) is not None]
+    unlocated = [i for i, it in enumerate(items) if _coords(it) is None]
+    if not located:
+        return plan
+
+    points = _project([_coords(items[i]) for i in located])  # type: ignore[misc]
+    pinned_local: Dict[int, int] = {}
+    for local, i in enumerate(located):
+        day = _pinned_day(items[i], start, num_days)
+        if day is not None:
+            pinned_local[local] = day
+
+    labels = cluster_by_location(points, num_days, pinned_local)
+    llm_days = [_llm_day(items[i], num_days) for i in located]
+    labels = _match_llm_days(labels, llm_days, set(pinned_local.values()), num_days)
+
+    days: List[List[int]] = [[] for _ in range(num_days)]
+    for local, lab in enumerate(labels):
+        days[lab].append(local)
+
+    # Order each day's located items.
+    ordered: List[List[int]] = []
+    for members in days:
+        sub_points = [points[m] for m in members]
+        sub_times = {
+            pos: t for pos, m in enumerate(members)
+            if (t := _start_minutes(items[located[m]])) is not None
+        }
+        route = order_route(sub_points, sub_times)
+        ordered.append([located[members[pos]] for pos in route])
+
+    # Items without coordinates: honour pinned dates, then the LLM's day, otherwise fill light days.
+    for i in unlocated:
+        day = _pinned_day(items[i], start, num_days)
+        if day is None:
+            day = _llm_day(items[i], num_days)
+        if day is None:
+            day = min(range(num_days), key=lambda d: (len(ordered[d]), d))
+        members = ordered[day]
+        minutes = _start_minutes(items[i])
+        pos = len(members)
+        if minutes is not None:
+            # Before the first stop that starts later, so the day stays chronological.
+            pos = next(
+                (p for p, m in enumerate(members) if (t := _start_minutes(items[m])) is not None and t > minutes),
+                pos,
+            )
+        members.insert(pos, i)
+
+    new_items: List[Dict[str, Any]] = []
+    for day_idx, members in enumerate(ordered):
+        if not members:
+            continue
+        day_items = [items[i] for i in members]
+        for it, slot in zip(day_items, _assign_slots(day_items)):
+            it["day"] = day_idx + 1
+            it["time_of_day"] = slot
+            new_items.append(it)
+
+    plan["items"] = new_items
+    logger.debug(
+        "optimize_activities_plan: %d items (%d without coords) over %d days",
+        len(new_items),
+        len(unlocated),
+        num_days,
+    )
+    return plan
@@ -2,57 +2,56 @@
 
 import json
 import logging
-from typing import cast
+import time
+from typing import Callable, cast
 
+from src.deadline import mark_degraded, scaled_max_tokens, should_degrade, stage_budget_s
+from src.llm.admission import set_turn_class
 from src.llm.bedrock_client import call_llm
+from src.llm.payload import build_payload
 from src.prompts import MASTER_SYSTEM_PROMPT, MASTER_RESPONSE_SYSTEM_PROMPT
 from src.states import TravelChatBotState
 
-logger = logging.getLogger(__name__)
+from .early_routing import SHED_MARK, discard_undispatched, start_router, turn_targets
+from .history import recent_exchanges_payload
+from .intent_classifier import classify_fast
+from .response_templates import record_response, render_reply, should_render
+from .speculation import discard_unrouted
 
+logger = logging.getLogger(__name__)
 
-def master_agent(state: TravelChatBotState) -> TravelChatBotState:
+FALLBACK_ASSISTANT_MESSAGE = "Here is a simple high-level answer based on your question."
+DEGRADED_ASSISTANT_MESSAGE = (
+    "Sorry, I'm a bit slow to respond right now. Could you tell me a little more about "
+    "what you'd like to know about your trip?"
+)
+
+
+def _master_plan_from_llm(
+    user_input: str,
+    trip_info: dict,
+    preferences: dict,
+    history_summary: str,
+    recent_exchanges: list | None = None,
+    max_tokens: int = 400,
+    timeout_s: float | None = None,
+    on_text: Callable[[str], None] | None = None,
+) -> dict:
     """
-    Top-level MASTER agent.
+    Ask the master LLM for intent, routing hints and trip/preference updates.
 
-    - Classifies the user's intent.
-    - Updates trip_info / preferences.
-    - Decides whether to call specialists (activities/logistics) or answer directly.
-    - Sets master_route: "activities", "logistics", or "master_response".
+    With `on_text`, the reply is streamed to it as it is generated.
     """
-    logger.debug("master_agent: entered")
-
-    user_input = (state.get("user_input") or "").strip()
-    history_summary = (state.get("history_summary") or "").strip()
-
-    # No user message: simple greeting + direct route to master_response
-    if not user_input:
-        msg = "Hi! Tell me what kind of trip or question you have in mind."
-        state["master_message"] = msg
-        state["master_plan"] = {
-            "intent": "generic_chat",
-            "needs_specialist": False,
-            "assistant_message": msg,
-            "trip_info_updates": {},
-            "preferences_updates": {},
-        }
-        state["master_route"] = "master_response"
-        logger.info("master_agent: no user_input, routing -> master_response")
-        return state
-
-    # Previous knowledge
-    trip_info = cast(dict, state.get("trip_info") or {})
-    preferences = cast(dict, state.get("preferences") or {})
-
-    # Build compact JSON input for LLM
+    # Build compact JSON input for LLM (see llm.payload)
     llm_input = {
         "user_query": user_input,
         "trip_info": trip_info,
         "preferences": preferences,
         "history_summary": history_summary,
+        "recent_exchanges": recent_exchanges,
     }
 
-    llm_user_prompt = json.dumps(llm_input)
+    llm_user_prompt = build_payload("master", llm_input)
     logger.debug(
         "master_agent: calling LLM with trip_info=%s, preferences=%s",
         trip_info,
@@ -62,8 +61,12 @@ def master_agent(state: TravelChatBotState) -> TravelChatBotState:
     raw = call_llm(
         system_prompt=MASTER_SYSTEM_PROMPT,
         user_prompt=llm_user_prompt,
-        max_tokens=400,
+        max_tokens=max_tokens,
         temperature=0.3,
+        timeout_s=timeout_s,
+        agent="master",
+        json_output=True,
+        on_text=on_text,
     )
 
     logger.debug("master_agent: raw LLM output: %s", raw)
@@ -72,7 +75,7 @@ def master_agent(state: TravelChatBotState) -> TravelChatBotState:
     fallback = {
         "intent": "generic_chat",
         "needs_specialist": False,
-        "assistant_message": "Here is a simple high-level answer based on your question.",
+        "assistant_message": FALLBACK_ASSISTANT_MESSAGE,
         "trip_info_updates": {},
         "preferences_updates": {},
     }
@@ -83,11 +86,87 @@ def master_agent(state: TravelChatBotState) -> TravelChatBotState:
         logger.exception("master_agent: failed to parse JSON: %s", e)
         parsed = fallback
 
+    return parsed
+
+
+def master_agent(state: TravelChatBotState) -> TravelChatBotState:
+    """
+    Top-level MASTER agent.
+
+    - Classifies the user's intent.
+    - Updates trip_info / preferences.
+    - Decides whether to call specialists (activities/logistics) or answer directly
+      (plan_full runs one specialist when shed under load, see llm.admission).
+    - Sets master_route: "activities", "logistics", or "master_response".
+    """
+    logger.debug("master_agent: entered")
+
+    user_input = (state.get("user_input") or "").strip()
+    history_summary = (state.get("history_summary") or "").strip()
+
+    # No user message: simple greeting + direct route to master_response
+    if not user_input:
+        msg = "Hi! Tell me what kind of trip or question you have in mind."
+        state["master_message"] = msg
+        state["master_plan"] = {
+            "intent": "generic_chat",
+            "needs_specialist": False,
+            "assistant_message": msg,
+            "trip_info_updates": {},
+            "preferences_updates": {},
+        }
+        state["master_route"] = "master_response"
+        logger.info("master_agent: no user_input, routing -> master_response")
+        return state
+
+    # LLM requests are scheduled as a new turn's until the intent is known (llm.admission).
+    set_turn_class(None)
+
+    # Previous knowledge
+    trip_info = cast(dict, state.get("trip_info") or {})
+    preferences = cast(dict, state.get("preferences") or {})
+
+    # Small talk and unambiguous messages are classified locally; the
+    # rest (or anything carrying new trip facts) goes to the LLM.
+    fast = classify_fast(user_input, trip_info)
+    if fast is None and should_degrade(state, "master"):
+        # Out of time for the LLM: accept any embedding match, else ask the user.
+        fast = classify_fast(user_input, trip_info, min_sim=0.0, min_margin=0.0)
+        mark_degraded(state, "master_fast_path")
+    if fast is not None:
+        parsed = fast.as_master_plan()
+        intent_source = fast.source
+        logger.info(
+            "master_agent: fast-path intent=%s (source=%s, confidence=%.2f), LLM skipped",
+            fast.intent,
+            fast.source,
+            fast.confidence,
+        )
+    elif should_degrade(state, "master"):
+        parsed = {"intent": "generic_chat", "needs_specialist": False, "assistant_message": DEGRADED_ASSISTANT_MESSAGE}
+        intent_source = "degraded"
+    else:
+        # Specialists can start before the full reply is in (see agents.early_routing).
+        router = start_router(state)
+        parsed = _master_plan_from_llm(
+            user_input,
+            trip_info,
+            preferences,
+            history_summary,
+            recent_exchanges_payload(state),
+            max_tokens=scaled_max_tokens(state, "master", 400),
+            timeout_s=stage_budget_s(state, "master"),
+            on_text=router,
+        )
+        if router is not None:
+            router.finish()
+        intent_source = "llm"
+
     intent = parsed.get("intent", "generic_chat")
     needs_specialist = bool(parsed.get("needs_specialist", False))
     trip_updates = parsed.get("trip_info_updates") or {}
     pref_updates = parsed.get("preferences_updates") or {}
-    assistant_message = parsed.get("assistant_message") or fallback["assistant_message"]
+    assistant_message = parsed.get("assistant_message") or FALLBACK_ASSISTANT_MESSAGE
 
     # Merge updates into state
     trip_info.update(trip_updates)
@@ -95,6 +174,7 @@ def master_agent(state: TravelChatBotState) -> TravelChatBotState:
     state["trip_info"] = trip_info
     state["preferences"] = preferences
     state["intent"] = intent
+    set_turn_class(intent)
 
     # Save full master plan
     state["master_plan"] = parsed
@@ -107,17 +187,11 @@ def master_agent(state: TravelChatBotState) -> TravelChatBotState:
         parsed["needs_specialist"] = True
 
     metadata = state.get("metadata") or {}
+    metadata["intent_source"] = intent_source
 
     if needs_specialist:
         # Decide which specialists we want THIS TURN
-        if intent == "logistics_q":
-            targets = ["logistics"]
-        elif intent == "plan_full":
-            targets = ["activities", "logistics"]
-        else:
-            # default to activities when we need a specialist but it's
-            # not explicitly logistics-only or full-plan
-            targets = ["activities"]
+        targets = turn_targets(state, intent)
 
         metadata["specialist_targets"] = targets
         metadata["specialist_index"] = 0
@@ -130,6 +204,10 @@ def master_agent(state: TravelChatBotState) -> TravelChatBotState:
         state["master_message"] = assistant_message
         state["master_route"] = "master_response"
 
+    # Routing is known: stop speculative lookups / early runs no specialist will use.
+    discard_unrouted(state, metadata.get("specialist_targets") if needs_specialist else ())
+    discard_undispatched(state, metadata.get("specialist_targets") if needs_specialist else ())
+
     logger.info(
         "master_agent: intent=%s, needs_specialist=%s, targets=%s, route=%s",
         intent,
@@ -169,6 +247,8 @@ def master_response_agent(state: TravelChatBotState) -> TravelChatBotState:
         "yes" if has_logistics else "no",
     )
 
+    metadata = state.get("metadata") or {}
+
     # If there are no specialist outputs, just reuse master_message/assistant_message
     if not has_activities and not has_logistics:
         msg = (
@@ -177,6 +257,31 @@ def master_response_agent(state: TravelChatBotState) -> TravelChatBotState:
             or "Here is a simple high-level answer based on your question."
         )
         state["master_message"] = msg
+        metadata["response_source"] = "master"
+        state["metadata"] = metadata
+        record_response("master")
+        return state
+
+    # List-shaped activities/logistics answers are formatted without the LLM,
+    # and so is any answer once the turn is out of time for a synthesis call
+    # or was shed under load.
+    # A follow-up answered from a kept plan ("what time does it start?") needs
+    # the LLM to pick out the answer, not the whole list again.
+    degraded = should_degrade(state, "response")
+    shed = SHED_MARK in (metadata.get("degraded") or [])
+    follow_up = "keep" in (metadata.get("replan") or {}).values()
+    if degraded or shed or (
+        not follow_up and should_render(intent, user_query, trip_info, activities_plan, logistics_plan)
+    ):
+        if degraded:
+            mark_degraded(state, "response_template")
+            metadata = state.get("metadata") or {}
+        started = time.perf_counter()
+        state["master_message"] = render_reply(cast(str, intent), trip_info, activities_plan, logistics_plan)
+        metadata["response_source"] = "template"
+        state["metadata"] = metadata
+        record_response("template", (time.perf_counter() - started) * 1000.0)
+        logger.info("master_response_agent: rendered %s reply from template, LLM skipped", intent)
         return state
 
     # We DO have activities and/or logistics: synthesize everything
@@ -185,29 +290,33 @@ def master_response_agent(state: TravelChatBotState) -> TravelChatBotState:
         "intent": intent,
         "trip_info": trip_info,
         "preferences": preferences,
-        "master_plan": master_plan,
+        # Only the master's short answer is used here, not its full JSON again.
+        "master_plan": {"assistant_message": master_plan.get("assistant_message")},
         "activities_plan": activities_plan,
         "logistics_plan": logistics_plan,
     }
 
-    llm_user_prompt = json.dumps(llm_input)
+    llm_user_prompt = build_payload("master_response", llm_input)
 
+    started = time.perf_counter()
     reply = call_llm(
         system_prompt=MASTER_RESPONSE_SYSTEM_PROMPT,
         user_prompt=llm_user_prompt,
-        max_tokens=700,
+        max_tokens=scaled_max_tokens(state, "response", 700),
         temperature=0.5,
+        timeout_s=stage_budget_s(state, "response"),
+        agent="master_response",
     )
+    metadata["response_source"] = "llm"
+    state["metadata"] = metadata
+    record_response("llm", (time.perf_counter() - started) * 1000.0)
 
     if not reply:
-        logger.warning(
-            "master_response_agent: empty reply from LLM, falling back to master_message/master_plan"
-        )
-        reply = (
-            state.get("master_message")
-            or master_plan.get("assistant_message")
-            or "Here is a simple summary of your trip based on the information I have."
-        )
+        # Timed out or failed: list the specialists' plans rather than drop them.
+        logger.warning("master_response_agent: empty reply from LLM, rendering the plans from templates")
+        mark_degraded(state, "response_template")
+        reply = render_reply(cast(str, intent), trip_info, activities_plan, logistics_plan)
+        metadata["response_source"] = "template"
 
     state["master_message"] = reply.strip()
     logger.debug("master_response_agent: finished, reply ready for user")
@@ -0,0 +1,242 @@
+# src/agents/plan_cache.py
+
+"""
+Cross-session semantic cache of specialist plans.
+
+Different users ask the same thing in different words ("things to do in
+Mumbai in March", "what can I do in Mumbai during March?"). When the trip
+context matches exactly, a previous activities_plan / logistics_plan is
+reused and the specialist's LLM and tool calls are skipped.
+
+- Partition: the target plus a canonical subset of trip_info / preferences
+  (destination, dates or month, num_days, origin for logistics, interests,
+  diet, budget, pace, with_kids) and a fingerprint of the plan the session
+  already had. Only entries in the same partition are compared.
+- Lookup: cosine similarity between user_input embeddings (rag.embeddings,
+  the MiniLM model the flight index already loads), accepted at or above
+  PLAN_CACHE_MIN_SIM.
+- Entries expire after PLAN_CACHE_TTL_S and the least recently used are
+  evicted beyond PLAN_CACHE_MAX_ENTRIES.
+
+Only plans produced by a successful LLM call are stored (not fallbacks or
+degraded turns). Without embeddings the cache is off.
+
+Configured via environment:
+
+- PLAN_CACHE:              "1" (default) or "0" to disable
+- PLAN_CACHE_MIN_SIM:      minimum cosine similarity for a hit (default 0.9)
+- PLAN_CACHE_TTL_S:        entry lifetime in seconds (default 21600; events change)
+- PLAN_CACHE_MAX_ENTRIES:  entries kept across all partitions (default 2000)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .intent_classifier import get_embeddings
+
+logger = logging.getLogger(__name__)
+
+PLAN_CACHE = os.getenv("PLAN_CACHE", "1") == "1"
+PLAN_CACHE_MIN_SIM = float(os.getenv("PLAN_CACHE_MIN_SIM", "0.9"))
+PLAN_CACHE_TTL_S = float(os.getenv("PLAN_CACHE_TTL_S", "21600"))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "2000"))
+
+# Context that changes the answer. origin only matters for logistics.
+_TRIP_KEYS = {
+    "activities": ("destination", "start_date", "end_date", "travel_month", "num_days"),
+    "logistics": ("origin", "destination", "start_date", "end_date", "travel_month", "num_days"),
+}
+_PREFERENCE_KEYS = {
+    "activities": ("interests", "diet", "budget_level", "pace", "with_kids"),
+    "logistics": ("budget_level", "transport_preference", "with_kids"),
+}
+
+
+@dataclass
+class CacheEntry:
+    partition: str
+    query: str
+    vector: np.ndarray
+    plan: Dict[str, Any]
+    created: float
+    hits: int = 0
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, (list, tuple)):
+        return sorted(str(_canonical(v)) for v in value)
+    return value
+
+
+def trip_context(target: str, trip_info: Dict[str, Any], preferences: Dict[str, Any]) -> Dict[str, Any]:
+    """The trip_info / preferences fields `target`'s plan depends on, canonicalized."""
+    return {
+        "trip": {k: _canonical(trip_info.get(k)) for k in _TRIP_KEYS[target] if trip_info.get(k)},
+        "prefs": {k: _canonical(preferences.get(k)) for k in _PREFERENCE_KEYS[target] if preferences.get(k)},
+    }
+
+
+def partition_key(
+    target: str,
+    trip_info: Dict[str, Any],
+    preferences: Dict[str, Any],
+    existing_plan: Optional[Dict[str, Any]],
+) -> str:
+    """Exact-match part of the cache key for `target`."""
+    context = {
+        "target": target,
+        **trip_context(target, trip_info, preferences),
+        # An update to an existing plan depends on that plan.
+        "plan": hashlib.sha1(json.dumps(existing_plan or {}, sort_keys=True).encode("utf-8")).hexdigest()[:12],
+    }
+    return json.dumps(context, sort_keys=True, separators=(",", ":"))
+
+
+class PlanCache:
+    """
+    Size-bounded, TTL'd nearest-neighbour cache of plans, one small matrix
+    of normalized query embeddings per partition.
+    """
+
+    def __init__(
+        self,
+        embeddings: Any,
+        min_sim: float = PLAN_CACHE_MIN_SIM,
+        ttl_s: float = PLAN_CACHE_TTL_S,
+        max_entries: int = PLAN_CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.embeddings = embeddings
+        self.min_sim = min_sim
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()  # LRU order
+        self._partitions: Dict[str, List[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "stores": 0, "expired": 0, "evicted": 0}
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(" ".join(text.lower().split())), dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        ids = self._partitions[entry.partition]
+        ids.remove(entry_id)
+        if not ids:
+            del self._partitions[entry.partition]
+
+    def lookup(self, partition: str, query: str) -> Optional[Tuple[CacheEntry, float]]:
+        """Best live entry in `partition` for `query` and its similarity, if above min_sim."""
+        vector = self.embed(query)
+        now = time.time()
+        with self._lock:
+            self._stats["lookups"] += 1
+            ids = list(self._partitions.get(partition, ()))
+            for entry_id in ids:
+                if now - self._entries[entry_id].created > self.ttl_s:
+                    self._remove(entry_id)
+                    self._stats["expired"] += 1
+            ids = self._partitions.get(partition, [])
+            if not ids:
+                return None
+            sims = np.vstack([self._entries[i].vector for i in ids]) @ vector
+            best = int(np.argmax(sims))
+            sim = float(sims[best])
+            if sim < self.min_sim:
+                return None
+            entry = self._entries[ids[best]]
+            self._entries.move_to_end(ids[best])
+            entry.hits += 1
+            self._stats["hits"] += 1
+            return entry, sim
+
+    def store(self, partition: str, query: str, plan: Dict[str, Any]) -> None:
+        vector = self.embed(query)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = CacheEntry(partition, query, vector, plan, time.time())
+            self._partitions.setdefault(partition, []).append(entry_id)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evicted"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["partitions"] = len(self._partitions)
+        stats["hit_rate"] = round(stats["hits"] / stats["lookups"], 3) if stats["lookups"] else None
+        return stats
+
+
+_cache: Optional[PlanCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_plan_cache() -> Optional[PlanCache]:
+    """The process-wide cache, or None if disabled or embeddings are not available."""
+    global _cache
+    if not PLAN_CACHE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            embeddings = get_embeddings()
+            if embeddings is None:
+                return None
+            _cache = PlanCache(embeddings)
+    return _cache
+
+
+def cached_plan(
+    target: str,
+    user_query: str,
+    trip_info: Dict[str, Any],
+    preferences: Dict[str, Any],
+    existing_plan: Optional[Dict[str, Any]],
+) -> Optional[Dict[str, Any]]:
+    """A cached `target` plan for this query and context, or None."""
+    cache = get_plan_cache()
+    if cache is None or not user_query or not trip_info.get("destination"):
+        return None
+    found = cache.lookup(partition_key(target, trip_info, preferences, existing_plan), user_query)
+    if found is None:
+        return None
+    entry, sim = found
+    logger.info("plan_cache: %s hit (sim=%.3f) for %r, cached from %r", target, sim, user_query, entry.query)
+    return json.loads(json.dumps(entry.plan))  # callers may mutate it
+
+
+def store_plan(
+    target: str,
+    user_query: str,
+    trip_info: Dict[str, Any],
+    preferences: Dict[str, Any],
+    existing_plan: Optional[Dict[str, Any]],
+    plan: Dict[str, Any],
+) -> None:
+    """Remember `plan` as the answer to `user_query` in this context."""
+    cache = get_plan_cache()
+    if cache is None or not user_query or not trip_info.get("destination") or not plan:
+        return
+    partition = partition_key(target, trip_info, preferences, existing_plan)
+    cache.store(partition, user_query, json.loads(json.dumps(plan)))  # state may be edited later
+
+
+def plan_cache_stats() -> Dict[str, Any]:
+    """Lookups, hits, hit rate, stores, expirations and evictions since process start."""
+    cache = _cache
+    return cache.stats() if cache is not None else {"enabled": False}
@@ -0,0 +1,151 @@
+# src/agents/replanning.py
+
+"""
+Incremental re-planning for the specialists.
+
+activities_agent / logistics_agent used to regenerate their whole plan on
+every routed turn. Each stored plan now carries a fingerprint of the inputs
+it was made from (state["plan_inputs"][target]: the trip_info / preferences
+fields that target depends on, see plan_cache.trip_context), and
+decide_replan() picks one of:
+
+- "keep": inputs unchanged and the user asks about the plan they already
+  have ("what time does that start?", "where is the second one?"). The
+  specialist is skipped; master_response answers from the existing plan.
+- "edit": the user wants something added or changed, or only preferences /
+  num_days changed. The LLM gets the existing plan (entries numbered), the
+  changed fields and the question, and returns plan_edits (remove / update
+  / add) instead of the whole plan; apply_plan_edits() merges them.
+- "full": no previous plan or fingerprint, the trip itself changed
+  (destination, origin, dates, month) or an itinerary is requested.
+
+Configured via environment:
+
+- REPLANNING: "1" (default) or "0" to always regenerate the full plan
+"""
+
+import copy
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .intent_classifier import asks_for_itinerary
+from .plan_cache import trip_context
+
+REPLANNING = os.getenv("REPLANNING", "1") == "1"
+
+LIST_KEYS = {"activities": "items", "logistics": "legs"}
+
+# A change to any of these makes the old plan irrelevant.
+_ANCHOR_KEYS = ("origin", "destination", "start_date", "end_date", "travel_month")
+
+# Questions about entries the user has already been shown.
+_FOLLOW_UP_RE = re.compile(
+    r"\b(what time|when (does|do|is|are)|where (is|are)|how (long|much|far)|what('s| is) the"
+    r" (address|price|cost|venue)|(does|is|do|are) (it|that|this|they|those)|tell me more|more (details|info)"
+    r"|which (one|of (these|them|those))|the (first|second|third|last|other) one|that one|this one)\b"
+)
+# Asks for something the plan does not have yet.
+_WANTS_NEW_RE = re.compile(
+    r"\b(other|others|else|another|instead|add|replace|swap|remove|drop|different|change|also|what about"
+    r"|how about|alternatives?|options?|more(?! (details|info|about)))\b"
+)
+
+
+@dataclass
+class ReplanDecision:
+    mode: str  # "keep" | "edit" | "full"
+    inputs: Dict[str, Any]
+    changes: Dict[str, Any] = field(default_factory=dict)
+    reason: str = ""
+
+
+def fingerprint(inputs: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def _changes(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields (trip and preferences, flattened) whose value differs, with their new value."""
+    changed: Dict[str, Any] = {}
+    for section in ("trip", "prefs"):
+        old, new = previous.get(section) or {}, current.get(section) or {}
+        for key in set(old) | set(new):
+            if old.get(key) != new.get(key):
+                changed[key] = new.get(key)
+    return changed
+
+
+def is_follow_up(user_query: str) -> bool:
+    """True if the message asks about the current plan rather than for new or different entries."""
+    lowered = (user_query or "").lower()
+    return bool(_FOLLOW_UP_RE.search(lowered)) and not _WANTS_NEW_RE.search(lowered)
+
+
+def decide_replan(
+    target: str,
+    user_query: str,
+    trip_info: Dict[str, Any],
+    preferences: Dict[str, Any],
+    existing_plan: Optional[Dict[str, Any]],
+    plan_inputs: Optional[Dict[str, Any]],
+) -> ReplanDecision:
+    """How `target` should treat its existing plan this turn (see module docstring)."""
+    inputs = trip_context(target, trip_info, preferences)
+    inputs["fingerprint"] = fingerprint(inputs)
+    previous = (plan_inputs or {}).get(target)
+    entries = (existing_plan or {}).get(LIST_KEYS[target]) or []
+
+    if not REPLANNING:
+        return ReplanDecision("full", inputs, reason="disabled")
+    if not entries or not previous:
+        return ReplanDecision("full", inputs, reason="no previous plan")
+    if target == "activities" and asks_for_itinerary(user_query):
+        return ReplanDecision("full", inputs, reason="itinerary requested")
+
+    changes = {} if previous.get("fingerprint") == inputs["fingerprint"] else _changes(previous, inputs)
+    if any(key in changes for key in _ANCHOR_KEYS):
+        return ReplanDecision("full", inputs, changes, reason="trip changed")
+    if not changes and is_follow_up(user_query):
+        return ReplanDecision("keep", inputs, reason="follow-up on unchanged plan")
+    return ReplanDecision("edit", inputs, changes, reason="preferences changed" if changes else "new request")
+
+
+def numbered_plan(plan: Dict[str, Any], target: str) -> Dict[str, Any]:
+    """Copy of `plan` with a 1-based "index" on each entry, for edit-mode prompts."""
+    key = LIST_KEYS[target]
+    entries = [e for e in plan.get(key) or [] if isinstance(e, dict)]
+    return {**plan, key: [{"index": i, **entry} for i, entry in enumerate(entries, 1)]}
+
+
+def apply_plan_edits(plan: Dict[str, Any], target: str, edits: Dict[str, Any]) -> Dict[str, Any]:
+    """`plan` with `edits` (remove / update by 1-based index, then add) applied."""
+    key = LIST_KEYS[target]
+    entries: List[Any] = copy.deepcopy([e for e in plan.get(key) or [] if isinstance(e, dict)])
+
+    for update in edits.get("update") or []:
+        if not isinstance(update, dict):
+            continue
+        index = update.get("index")
+        if isinstance(index, int) and 1 <= index <= len(entries):
+            entries[index - 1].update({k: v for k, v in update.items() if k != "index"})
+
+    removed = {i for i in edits.get("remove") or [] if isinstance(i, int)}
+    entries = [entry for i, entry in enumerate(entries, 1) if i not in removed]
+    entries += [
+        {k: v for k, v in entry.items() if k != "index"} for entry in edits.get("add") or [] if isinstance(entry, dict)
+    ]
+    return {**plan, key: entries}
+
+
+def plan_from_response(
+    parsed: Dict[str, Any],
+    target: str,
+    existing_plan: Dict[str, Any],
+) -> Dict[str, Any]:
+    """The new plan from a specialist response: plan_edits applied to existing_plan, or the full plan."""
+    if isinstance(parsed.get("plan_edits"), dict):
+        return apply_plan_edits(existing_plan, target, parsed["plan_edits"])
+    return parsed.get(f"{target}_plan") or {}
@@ -0,0 +1,191 @@
+# src/agents/response_templates.py
+
+"""
+Deterministic replies for list-shaped specialist results.
+
+For activities_q / logistics_q turns where the user just wants options, the
+MASTER_RESPONSE LLM call only re-states activities_plan.items or
+logistics_plan.legs as bullets. render_reply() formats those structures
+directly (title, category, address, date/time; mode, route, carrier,
+duration), and master_response_agent uses it when should_render() says the
+turn is list-shaped. Itineraries, plan_full, comparisons and "why" questions
+still go to the LLM, unless the turn is out of time for it (deadline.py) or
+the call fails, in which case every section is listed.
+
+Configured via environment:
+
+- RESPONSE_TEMPLATES:      "1" (default) or "0" to always synthesize with the LLM
+- RESPONSE_TEMPLATE_MAX:   most entries a templated list may show (default 8)
+"""
+
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from .intent_classifier import asks_for_itinerary
+
+RESPONSE_TEMPLATES = os.getenv("RESPONSE_TEMPLATES", "1") == "1"
+RESPONSE_TEMPLATE_MAX = int(os.getenv("RESPONSE_TEMPLATE_MAX", "8"))
+
+# Questions that want judgement, not a list.
+_NEEDS_PROSE_RE = re.compile(
+    r"\b(why|compare|comparison|versus|vs\.?|better|best|worth|should i|which (one|is)|difference"
+    r"|recommend (one|a single)|explain|pros|cons|cheapest|fastest)\b"
+)
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, float] = {"template": 0, "llm": 0, "master": 0, "template_ms": 0.0, "llm_ms": 0.0}
+
+
+def _plan_entries(plan: Optional[Dict[str, Any]], key: str) -> List[Dict[str, Any]]:
+    entries = (plan or {}).get(key) or []
+    return [e for e in entries if isinstance(e, dict)]
+
+
+def should_render(
+    intent: Optional[str],
+    user_query: str,
+    trip_info: Dict[str, Any],
+    activities_plan: Optional[Dict[str, Any]],
+    logistics_plan: Optional[Dict[str, Any]],
+) -> bool:
+    """True if this turn's reply can be a templated list instead of an LLM synthesis."""
+    if not RESPONSE_TEMPLATES or intent not in ("activities_q", "logistics_q"):
+        return False
+    lowered = (user_query or "").lower()
+    if asks_for_itinerary(lowered) or _NEEDS_PROSE_RE.search(lowered):
+        return False
+    # Missing trip details: the LLM asks the follow-up questions.
+    if not trip_info.get("destination"):
+        return False
+    if intent == "activities_q":
+        return bool(_plan_entries(activities_plan, "items"))
+    return bool(_plan_entries(logistics_plan, "legs"))
+
+
+def _join(parts: List[Optional[str]], sep: str = ", ") -> str:
+    return sep.join(p for p in parts if p)
+
+
+def _hours(value: Any) -> Optional[str]:
+    try:
+        hours = float(value)
+    except (TypeError, ValueError):
+        return None
+    if hours < 1:
+        return f"about {round(hours * 60)} min"
+    return f"about {hours:g} h"
+
+
+def _when(date: Any, start_time: Any, time_of_day: Any) -> Optional[str]:
+    if date and start_time:
+        return f"on {date} at {str(start_time)[:5]}"
+    if date:
+        return f"on {date}"
+    if start_time:
+        return f"at {str(start_time)[:5]}"
+    return f"in the {time_of_day}" if time_of_day else None
+
+
+def render_activity(item: Dict[str, Any]) -> str:
+    title = item.get("title") or "Untitled"
+    head = f"**{title}**" + (f" ({item['category']})" if item.get("category") else "")
+    details = _join([item.get("address"), _when(item.get("date"), item.get("start_time"), item.get("time_of_day"))])
+    line = f"- {head}" + (f" — {details}" if details else "")
+    if item.get("notes"):
+        line += f". {str(item['notes']).strip().rstrip('.')}."
+    return line
+
+
+def render_leg(leg: Dict[str, Any]) -> str:
+    mode = str(leg.get("mode") or "Travel").capitalize()
+    route = _join([leg.get("from_place"), leg.get("to_place")], " → ")
+    carrier = f"with {leg['carrier']}" if leg.get("carrier") else None
+    price = None
+    if isinstance(leg.get("price"), (int, float)):
+        price = f"{leg['price']:g} {leg.get('currency') or ''}".strip()
+    departs = f"departs {leg['departure_time']}" if leg.get("departure_time") else None
+    details = _join([carrier, _hours(leg.get("duration_hours")), departs, price])
+    line = f"- **{mode}**" + (f" {route}" if route else "") + (f" — {details}" if details else "")
+    if leg.get("notes"):
+        line += f". {str(leg['notes']).strip().rstrip('.')}."
+    return line
+
+
+def _activities_section(destination: Any, month: Any, entries: List[Dict[str, Any]]) -> List[str]:
+    intro = f"Here are some things to do in {destination}" + (f" in {month}" if month else "") + ":"
+    return [intro, *_capped([render_activity(item) for item in entries])]
+
+
+def _logistics_section(origin: Any, destination: Any, entries: List[Dict[str, Any]]) -> List[str]:
+    intro = "Here are your travel options" + (f" from {origin}" if origin else "") + f" to {destination}:"
+    return [intro, *_capped([render_leg(leg) for leg in entries])]
+
+
+def _capped(lines: List[str]) -> List[str]:
+    if len(lines) > RESPONSE_TEMPLATE_MAX:
+        return lines[:RESPONSE_TEMPLATE_MAX] + [f"- …and {len(lines) - RESPONSE_TEMPLATE_MAX} more."]
+    return lines
+
+
+def render_reply(
+    intent: str,
+    trip_info: Dict[str, Any],
+    activities_plan: Optional[Dict[str, Any]],
+    logistics_plan: Optional[Dict[str, Any]],
+) -> str:
+    """
+    Chat reply listing the activities (activities_q), the travel legs
+    (logistics_q), or both (any other intent, used when the turn has no time
+    left for the synthesis call).
+    """
+    destination = trip_info.get("destination") or "your destination"
+    activities = _plan_entries(activities_plan, "items")
+    legs = _plan_entries(logistics_plan, "legs")
+    if intent == "activities_q":
+        lines = _activities_section(destination, trip_info.get("travel_month"), activities)
+        outro = "Want me to turn these into a day-by-day plan?"
+    elif intent == "logistics_q":
+        lines = _logistics_section(trip_info.get("origin"), destination, legs)
+        outro = "Let me know if you'd like me to check other routes or times."
+    else:
+        lines = []
+        if legs:
+            lines += _logistics_section(trip_info.get("origin"), destination, legs)
+        if activities:
+            lines += ([""] if lines else []) + _activities_section(destination, trip_info.get("travel_month"), activities)
+        if not lines:
+            lines = [f"I'm still working out the details for {destination}."]
+        outro = "Tell me what you'd like to change or explore next."
+    return "\n".join([*lines, "", outro])
+
+
+def record_response(source: str, elapsed_ms: float = 0.0) -> None:
+    """Count how a reply was produced: "template", "llm" (synthesis call) or "master"."""
+    with _stats_lock:
+        _stats[source] += 1
+        if source in ("template", "llm"):
+            _stats[f"{source}_ms"] += elapsed_ms
+
+
+def response_stats() -> Dict[str, Any]:
+    """
+    Replies by source since process start, the share of specialist turns
+    answered without the synthesis call, and the latency that saved
+    (templated replies x mean synthesis time).
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    specialist_turns = stats["template"] + stats["llm"]
+    mean_llm_ms = stats["llm_ms"] / stats["llm"] if stats["llm"] else None
+    mean_template_ms = stats["template_ms"] / stats["template"] if stats["template"] else 0.0
+    return {
+        "template": int(stats["template"]),
+        "llm": int(stats["llm"]),
+        "master": int(stats["master"]),
+        "template_share": round(stats["template"] / specialist_turns, 3) if specialist_turns else None,
+        "synthesis_ms_mean": round(mean_llm_ms, 1) if mean_llm_ms is not None else None,
+        "template_ms_mean": round(mean_template_ms, 3),
+        "saved_ms_est": round(stats["template"] * (mean_llm_ms - mean_template_ms), 1) if mean_llm_ms else None,
+    }
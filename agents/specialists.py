@@ -2,16 +2,207 @@
 
 import json
 import logging
-from typing import cast
+from typing import Any, Dict, List, Tuple, cast
 
+from src.deadline import mark_degraded, scaled_max_tokens, should_degrade, stage_budget_s
 from src.llm.bedrock_client import call_llm
+from src.llm.payload import build_payload, tool_results_payload
+from src.llm.tool_runner import TOOL_BUDGET_S, ToolRun, execute_tool_calls, tool_wall_ms
 from src.prompts import ACTIVITIES_SYSTEM_PROMPT, LOGISTICS_SYSTEM_PROMPT
+from src.state_policy import cap_tool_results
 from src.states import TravelChatBotState
 from src.tools import ACTIVITIES_TOOLS, LOGISTICS_TOOLS
+from src.tracing import get_current_span
+
+from .early_routing import take_dispatched
+from .itinerary import optimize_activities_plan
+from .plan_cache import cached_plan, store_plan
+from .replanning import decide_replan, numbered_plan, plan_from_response
+from .speculation import drop_prefetched, take_prefetched
 
 logger = logging.getLogger(__name__)
 
 
+def _record_tool_runs(state: TravelChatBotState, target: str, runs: List[ToolRun]) -> None:
+    """Store executed tool calls in <target>_tools_results and charge their time to the turn."""
+    executed = [run for run in runs if run.status != "skipped"]
+    if not executed:
+        return
+    key = f"{target}_tools_results"
+    results = (state.get(key) or []) + [run.as_tool_result() for run in executed]  # type: ignore[literal-required]
+    state[key] = cap_tool_results(results)  # type: ignore[literal-required]
+    metadata = state.get("metadata") or {}
+    metadata["tool_ms"] = metadata.get("tool_ms", 0.0) + tool_wall_ms(executed)
+    state["metadata"] = metadata
+
+
+def _tool_budget_s(state: TravelChatBotState) -> float:
+    """
+    Tool time left this turn: both specialists share LLM_TOOL_BUDGET_S, and
+    neither may run tools past its share of the turn deadline.
+    """
+    budget = TOOL_BUDGET_S - (state.get("metadata") or {}).get("tool_ms", 0.0) / 1000.0
+    stage_budget = stage_budget_s(state, "specialist")
+    return budget if stage_budget is None else min(budget, stage_budget)
+
+
+def _plan_from_cache(
+    state: TravelChatBotState,
+    target: str,
+    user_query: str,
+    trip_info: dict,
+    preferences: dict,
+    existing_plan: dict,
+) -> Dict[str, Any] | None:
+    """A plan cached for a near-identical query in the same trip context (see agents.plan_cache)."""
+    plan = cached_plan(target, user_query, trip_info, preferences, existing_plan)
+    if plan is None:
+        return None
+    drop_prefetched(state, target, "plan cache hit")
+    get_current_span().set_attribute("plan_cache.hit", True)
+    metadata = state.get("metadata") or {}
+    metadata["plan_cache_hits"] = list(metadata.get("plan_cache_hits") or []) + [target]
+    state["metadata"] = metadata
+    return plan
+
+
+def _call_specialist_llm(
+    state: TravelChatBotState,
+    target: str,
+    system_prompt: str,
+    tools: list,
+    llm_input: Dict[str, Any],
+    fallback: Dict[str, Any],
+    max_tokens: int = 500,
+) -> Dict[str, Any]:
+    """
+    One specialist LLM call with `tools` bound; returns the parsed JSON.
+
+    Tool calls the model makes are executed inside call_llm (concurrently,
+    see llm.tool_runner) and kept in <target>_tools_results. If the model
+    answers needs_tools=true without having called any, every bound tool is
+    run on the user query and the model is asked once more with the results.
+
+    Near the turn deadline the call is skipped and `fallback` (the plan kept
+    from earlier turns) is returned as is.
+    """
+    for attempt in range(2):
+        if should_degrade(state, "specialist"):
+            if attempt:  # no time for the needs_tools retry: keep the first answer
+                mark_degraded(state, f"{target}_no_retry")
+                return parsed
+            mark_degraded(state, f"skip_{target}")
+            logger.info("%s_agent: turn deadline close, keeping the previous plan", target)
+            return fallback
+        runs: List[ToolRun] = []
+        raw = call_llm(
+            system_prompt=system_prompt,
+            user_prompt=build_payload(target, llm_input),
+            max_tokens=scaled_max_tokens(state, "specialist", max_tokens),
+            temperature=0.4,
+            tools=tools,
+            tool_budget_s=_tool_budget_s(state),
+            tool_log=runs,
+            timeout_s=stage_budget_s(state, "specialist"),
+            agent=target,
+            json_output=True,
+        )
+        _record_tool_runs(state, target, runs)
+        logger.debug("%s_agent: raw LLM output: %s", target, raw)
+
+        try:
+            parsed = json.loads(raw) if raw else fallback
+        except Exception as e:
+            logger.exception("%s_agent: failed to parse JSON: %s", target, e)
+            parsed = fallback
+
+        if attempt or runs or not parsed.get("needs_tools") or _tool_budget_s(state) <= 0:
+            return parsed
+
+        query = llm_input.get("user_query") or ""
+        calls = [{"name": t.name, "args": {"query": query}, "id": f"needs_tools_{i}"} for i, t in enumerate(tools)]
+        _record_tool_runs(state, target, execute_tool_calls(calls, tools, _tool_budget_s(state)))
+        results = cap_tool_results(state.get(f"{target}_tools_results"))  # type: ignore[misc]
+        llm_input = {**llm_input, "tool_results": tool_results_payload(results)}  # type: ignore[arg-type]
+        logger.info("%s_agent: needs_tools without tool calls, ran %d tool(s) and asking again", target, len(calls))
+    return parsed
+
+
+def _specialist_plan(
+    state: TravelChatBotState,
+    target: str,
+    system_prompt: str,
+    tools: list,
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    This turn's plan for `target` and its needs_tools flag.
+
+    In order: keep the existing plan (follow-up question, inputs unchanged),
+    reuse a cached plan, or call the LLM -- in edit mode when only a delta
+    is needed (see agents.replanning). state["plan_inputs"][target] records
+    the inputs each new plan was made from.
+    """
+    user_query = (state.get("user_input") or "").strip()
+    trip_info = cast(dict, state.get("trip_info") or {})
+    preferences = cast(dict, state.get("preferences") or {})
+    existing_plan = cast(dict, state.get(f"{target}_plan") or {})  # type: ignore[misc]
+
+    decision = decide_replan(target, user_query, trip_info, preferences, existing_plan, state.get("plan_inputs"))
+    metadata = state.get("metadata") or {}
+    metadata["replan"] = {**(metadata.get("replan") or {}), target: decision.mode}
+    state["metadata"] = metadata
+    logger.info("%s_agent: replan=%s (%s)", target, decision.mode, decision.reason)
+
+    if decision.mode == "keep":
+        drop_prefetched(state, target, "plan kept")
+        return existing_plan, False
+
+    cached = _plan_from_cache(state, target, user_query, trip_info, preferences, existing_plan)
+    if cached is not None:
+        plan_inputs = dict(state.get("plan_inputs") or {})
+        plan_inputs[target] = decision.inputs
+        state["plan_inputs"] = plan_inputs
+        return cached, False
+
+    # Lookups started by the speculate node while the master was running.
+    prefetched = take_prefetched(state, target)
+    if prefetched:
+        results = (state.get(f"{target}_tools_results") or []) + prefetched  # type: ignore[misc]
+        state[f"{target}_tools_results"] = cap_tool_results(results)  # type: ignore[literal-required]
+    tool_results = tool_results_payload(cap_tool_results(state.get(f"{target}_tools_results")))  # type: ignore[misc]
+
+    if decision.mode == "edit":
+        llm_input: Dict[str, Any] = {
+            "mode": "edit",
+            "user_query": user_query,
+            "changes": decision.changes,
+            "existing_plan": numbered_plan(existing_plan, target),
+            "tool_results": tool_results,
+        }
+        max_tokens = 300
+    else:
+        llm_input = {
+            "user_query": user_query,
+            "trip_info": trip_info,
+            "preferences": preferences,
+            "existing_plan": existing_plan,
+            "tool_results": tool_results,
+        }
+        max_tokens = 500
+
+    fallback = {f"{target}_plan": existing_plan, "needs_tools": False}
+    parsed = _call_specialist_llm(state, target, system_prompt, tools, llm_input, fallback, max_tokens)
+    plan = plan_from_response(parsed, target, existing_plan)
+    needs_tools = bool(parsed.get("needs_tools", False))
+
+    if parsed is not fallback and not needs_tools:
+        plan_inputs = dict(state.get("plan_inputs") or {})
+        plan_inputs[target] = decision.inputs
+        state["plan_inputs"] = plan_inputs
+        store_plan(target, user_query, trip_info, preferences, existing_plan, plan)
+    return plan, needs_tools
+
+
 def activities_agent(state: TravelChatBotState) -> TravelChatBotState:
     """
     ACTIVITIES specialist.
@@ -23,55 +214,31 @@ def activities_agent(state: TravelChatBotState) -> TravelChatBotState:
       - user_input
       - trip_info
       - preferences
-      - existing activities_plan
+      - existing activities_plan (+ plan_inputs['activities'])
       - activities_tools_results
 
     Writes:
-      - activities_plan
-      - metadata['activities_needs_tools'] (bool)
+      - activities_plan (day / time_of_day re-ordered by agents.itinerary)
+      - plan_inputs['activities'] (inputs the plan was made from)
+      - activities_tools_results (prefetched lookups + tool calls executed this turn)
+      - metadata['activities_needs_tools'] (bool), metadata['tool_ms'],
+        metadata['replan'], metadata['plan_cache_hits']
+
+    If the master's streamed reply already started this specialist (see
+    agents.early_routing), that run's results are used instead.
     """
     logger.debug("activities_agent: entered")
+    if take_dispatched(state, "activities"):
+        return state
+    return _plan_activities(state)
 
-    user_query = (state.get("user_input") or "").strip()
-    trip_info = cast(dict, state.get("trip_info") or {})
-    preferences = cast(dict, state.get("preferences") or {})
-    existing_plan = state.get("activities_plan") or {}
-    tool_results = state.get("activities_tools_results") or []
-
-    llm_input = {
-        "user_query": user_query,
-        "trip_info": trip_info,
-        "preferences": preferences,
-        "existing_plan": existing_plan,
-        "tool_results": tool_results,
-    }
-
-    llm_user_prompt = json.dumps(llm_input)
-
-    raw = call_llm(
-        system_prompt=ACTIVITIES_SYSTEM_PROMPT,
-        user_prompt=llm_user_prompt,
-        max_tokens=500,
-        temperature=0.4,
-        tools=ACTIVITIES_TOOLS,
-    )
-
-    logger.debug("activities_agent: raw LLM output: %s", raw)
-
-    # Fallback if parsing fails
-    fallback = {
-        "activities_plan": existing_plan,
-        "needs_tools": False,
-    }
 
-    try:
-        parsed = json.loads(raw) if raw else fallback
-    except Exception as e:
-        logger.exception("activities_agent: failed to parse JSON: %s", e)
-        parsed = fallback
+def _plan_activities(state: TravelChatBotState) -> TravelChatBotState:
+    trip_info = cast(dict, state.get("trip_info") or {})
+    activities_plan, needs_tools = _specialist_plan(state, "activities", ACTIVITIES_SYSTEM_PROMPT, ACTIVITIES_TOOLS)
 
-    activities_plan = parsed.get("activities_plan") or {}
-    needs_tools = bool(parsed.get("needs_tools", False))
+    # Re-derive day / time_of_day from locations instead of trusting the LLM.
+    activities_plan = optimize_activities_plan(activities_plan, trip_info)
 
     state["activities_plan"] = activities_plan
 
@@ -99,54 +266,27 @@ def logistics_agent(state: TravelChatBotState) -> TravelChatBotState:
       - user_input
       - trip_info
       - preferences
-      - existing logistics_plan
+      - existing logistics_plan (+ plan_inputs['logistics'])
       - logistics_tools_results
 
     Writes:
       - logistics_plan
-      - metadata['logistics_needs_tools'] (bool)
+      - plan_inputs['logistics'] (inputs the plan was made from)
+      - logistics_tools_results (prefetched lookups + tool calls executed this turn)
+      - metadata['logistics_needs_tools'] (bool), metadata['tool_ms'],
+        metadata['replan'], metadata['plan_cache_hits']
+
+    If the master's streamed reply already started this specialist (see
+    agents.early_routing), that run's results are used instead.
     """
     logger.debug("logistics_agent: entered")
+    if take_dispatched(state, "logistics"):
+        return state
+    return _plan_logistics(state)
 
-    user_query = (state.get("user_input") or "").strip()
-    trip_info = cast(dict, state.get("trip_info") or {})
-    preferences = cast(dict, state.get("preferences") or {})
-    existing_plan = state.get("logistics_plan") or {}
-    tool_results = state.get("logistics_tools_results") or []
-
-    llm_input = {
-        "user_query": user_query,
-        "trip_info": trip_info,
-        "preferences": preferences,
-        "existing_plan": existing_plan,
-        "tool_results": tool_results,
-    }
-
-    llm_user_prompt = json.dumps(llm_input)
-
-    raw = call_llm(
-        system_prompt=LOGISTICS_SYSTEM_PROMPT,
-        user_prompt=llm_user_prompt,
-        max_tokens=500,
-        temperature=0.4,
-        tools=LOGISTICS_TOOLS,
-    )
-
-    logger.debug("logistics_agent: raw LLM output: %s", raw)
 
-    fallback = {
-        "logistics_plan": existing_plan,
-        "needs_tools": False,
-    }
-
-    try:
-        parsed = json.loads(raw) if raw else fallback
-    except Exception as e:
-        logger.exception("logistics_agent: failed to parse JSON: %s", e)
-        parsed = fallback
-
-    logistics_plan = parsed.get("logistics_plan") or {}
-    needs_tools = bool(parsed.get("needs_tools", False))
+def _plan_logistics(state: TravelChatBotState) -> TravelChatBotState:
+    logistics_plan, needs_tools = _specialist_plan(state, "logistics", LOGISTICS_SYSTEM_PROMPT, LOGISTICS_TOOLS)
 
     state["logistics_plan"] = logistics_plan
 
@@ -161,3 +301,8 @@ def logistics_agent(state: TravelChatBotState) -> TravelChatBotState:
         len(legs),
     )
     return state
+
+
+def run_specialist(target: str, state: TravelChatBotState) -> TravelChatBotState:
+    """Run `target`'s specialist on `state` (agents.early_routing's background runs)."""
+    return _plan_activities(state) if target == "activities" else _plan_logistics(state)
@@ -0,0 +1,325 @@
+# src/agents/speculation.py
+
+"""
+Speculative tool prefetch, overlapped with the master agent's LLM call.
+
+The specialists' external lookups (Ticketmaster search, flight RAG
+retrieval) only start once master_agent has answered and routing is done,
+so their latency stacks on top of the master call. The `speculate` node runs
+between start_turn and master: it guesses which lookups the turn will need,
+submits them to a small thread pool and returns at once.
+
+- master_agent calls discard_unrouted() as soon as routing is known:
+  lookups for specialists that will not run (or made for a destination /
+  month the master just changed) are cancelled if not started, or dropped.
+- When the master's streamed reply names its intent first (see
+  agents.early_routing), prefetch_routed() starts the lookups for the
+  routed specialists that were not guessed.
+- activities_agent / logistics_agent call take_prefetched(), which waits up
+  to SPECULATION_WAIT_S for their lookup and returns it as ToolResults for
+  activities_tools_results / logistics_tools_results.
+
+Futures live in a process-local registry keyed by metadata["speculation_id"]
+(turn-scoped); nothing but that id goes into the checkpointed state.
+
+Configured via environment:
+
+- SPECULATIVE_PREFETCH: "1" (default) or "0"
+- SPECULATION_WORKERS:  lookups run at once (default 4)
+- SPECULATION_WAIT_S:   how long a specialist waits for a running lookup (default 5)
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.deadline import stage_budget_s
+from src.llm.tool_runner import to_tool_result
+from src.states import ToolResult, TravelChatBotState
+from src.tools import activities_events_tool, logistics_rag_tool
+from src.tracing import KIND_CLIENT, span
+
+from .intent_classifier import classify_by_rules, mentions_logistics
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE_PREFETCH = os.getenv("SPECULATIVE_PREFETCH", "1") == "1"
+SPECULATION_WORKERS = int(os.getenv("SPECULATION_WORKERS", "4"))
+SPECULATION_WAIT_S = float(os.getenv("SPECULATION_WAIT_S", "5"))
+
+# Lookups nobody claimed (e.g. the turn failed) are dropped after this long.
+_STALE_AFTER_S = 600.0
+
+_TOOLS = {
+    "activities": activities_events_tool,
+    "logistics": logistics_rag_tool,
+}
+
+
+@dataclass
+class _Lookup:
+    target: str
+    query: str
+    context: Dict[str, Any]  # trip_info fields the query was built from
+    future: Optional["Future[str]"] = None
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+    def run(self) -> str:
+        self.started = time.perf_counter()
+        tool = _TOOLS[self.target]
+        try:
+            with span(f"tool.{tool.name}", {"tool.name": tool.name, "tool.speculative": True}, kind=KIND_CLIENT):
+                return tool.invoke({"query": self.query})
+        finally:
+            self.finished = time.perf_counter()
+
+    def work_ms(self) -> float:
+        if self.started is None:
+            return 0.0
+        return ((self.finished or time.perf_counter()) - self.started) * 1000.0
+
+
+def predict_lookups(user_input: str, trip_info: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Lookups worth starting for this message: {target: {"query", "context"}}.
+
+    Uses the fast-path keyword rules as a routing hint. Small talk gets
+    nothing; an event search needs a destination from an earlier turn.
+    """
+    text = (user_input or "").strip()
+    if not text:
+        return {}
+    hint = classify_by_rules(text)
+    if hint is not None and hint[2] is not None:  # small talk
+        return {}
+    intent = hint[0] if hint is not None else None
+
+    targets = []
+    if intent in (None, "activities_q", "plan_full"):
+        targets.append("activities")
+    if intent in ("logistics_q", "plan_full") or (intent is None and mentions_logistics(text)):
+        targets.append("logistics")
+    return lookups_for(targets, text, trip_info)
+
+
+def lookups_for(targets: Iterable[str], user_input: str, trip_info: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """The lookup each of `targets` would start with; an event search needs a destination."""
+    lookups: Dict[str, Dict[str, Any]] = {}
+    destination = trip_info.get("destination")
+    month = trip_info.get("travel_month")
+    if "activities" in targets and destination:
+        query = f"events in {destination}" + (f" in {month}" if month else "")
+        lookups["activities"] = {
+            "query": query,
+            "context": {"destination": destination, "travel_month": month},
+        }
+    if "logistics" in targets and user_input:
+        lookups["logistics"] = {"query": user_input, "context": {}}
+    return lookups
+
+
+class _Registry:
+    def __init__(self, max_workers: int) -> None:
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculate")
+        self._lock = threading.Lock()
+        self._turns: Dict[str, Dict[str, _Lookup]] = {}
+        self._created: Dict[str, float] = {}
+        self._stats = {
+            "turns": 0,
+            "submitted": 0,
+            "hits": 0,
+            "late": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "wasted": 0,
+            "saved_ms": 0.0,
+            "wasted_ms": 0.0,
+        }
+
+    def submit(self, lookups: Dict[str, Dict[str, Any]], spec_id: Optional[str] = None) -> str:
+        """Start `lookups` under `spec_id` (a new id if None); returns the id."""
+        self._sweep()
+        new_turn = spec_id is None
+        spec_id = spec_id or uuid.uuid4().hex
+        entries: Dict[str, _Lookup] = {}
+        for target, spec in lookups.items():
+            lookup = _Lookup(target, spec["query"], spec["context"])
+            # copy_context: tool recording and tracing read the turn's thread id / span from contextvars.
+            lookup.future = self._pool.submit(contextvars.copy_context().run, lookup.run)
+            entries[target] = lookup
+        with self._lock:
+            self._turns.setdefault(spec_id, {}).update(entries)
+            self._created.setdefault(spec_id, time.monotonic())
+            self._stats["turns"] += int(new_turn)
+            self._stats["submitted"] += len(entries)
+        return spec_id
+
+    def peek(self, spec_id: str, target: str) -> Optional[_Lookup]:
+        with self._lock:
+            return self._turns.get(spec_id, {}).get(target)
+
+    def pop(self, spec_id: str, target: str) -> Optional[_Lookup]:
+        with self._lock:
+            entries = self._turns.get(spec_id)
+            lookup = entries.pop(target, None) if entries is not None else None
+            if entries is not None and not entries:
+                self._turns.pop(spec_id, None)
+                self._created.pop(spec_id, None)
+        return lookup
+
+    def discard(self, lookup: _Lookup, reason: str) -> None:
+        cancelled = lookup.future.cancel()
+        with self._lock:
+            if cancelled:
+                self._stats["cancelled"] += 1
+            else:
+                self._stats["wasted"] += 1
+                self._stats["wasted_ms"] += lookup.work_ms()
+        logger.debug("speculation: discarded %s lookup (%s, cancelled=%s)", lookup.target, reason, cancelled)
+
+    def count(self, key: str, saved_ms: float = 0.0) -> None:
+        with self._lock:
+            self._stats[key] += 1
+            self._stats["saved_ms"] += saved_ms
+
+    def _sweep(self) -> None:
+        cutoff = time.monotonic() - _STALE_AFTER_S
+        with self._lock:
+            stale = [k for k, created in self._created.items() if created < cutoff]
+            leftovers = [lookup for k in stale for lookup in self._turns.pop(k, {}).values()]
+            for k in stale:
+                self._created.pop(k, None)
+        for lookup in leftovers:
+            self.discard(lookup, "stale")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight_turns"] = len(self._turns)
+        stats["hit_rate"] = round(stats["hits"] / stats["submitted"], 3) if stats["submitted"] else None
+        stats["saved_ms"] = round(stats["saved_ms"], 1)
+        stats["wasted_ms"] = round(stats["wasted_ms"], 1)
+        return stats
+
+
+_registry = _Registry(SPECULATION_WORKERS)
+
+
+def speculate(state: TravelChatBotState) -> TravelChatBotState:
+    """
+    Graph node between start_turn and master: start likely tool lookups in
+    the background and remember them under metadata["speculation_id"].
+    """
+    if not SPECULATIVE_PREFETCH:
+        return state
+
+    user_input = state.get("user_input") or ""
+    trip_info = dict(state.get("trip_info") or {})
+    lookups = predict_lookups(user_input, trip_info)
+    if not lookups:
+        return state
+
+    metadata = state.get("metadata") or {}
+    metadata["speculation_id"] = _registry.submit(lookups)
+    state["metadata"] = metadata
+    logger.info("speculation: started %s", {t: spec["query"] for t, spec in lookups.items()})
+    return state
+
+
+def prefetch_routed(state: TravelChatBotState, targets: Iterable[str]) -> None:
+    """
+    Start lookups for routed `targets` the speculate node did not guess
+    (called by the master as soon as its streamed intent is known).
+    """
+    if not SPECULATIVE_PREFETCH:
+        return
+    metadata = state.get("metadata") or {}
+    spec_id = metadata.get("speculation_id")
+    missing = [t for t in targets if not spec_id or _registry.peek(spec_id, t) is None]
+    lookups = lookups_for(missing, state.get("user_input") or "", dict(state.get("trip_info") or {}))
+    if not lookups:
+        return
+    metadata["speculation_id"] = _registry.submit(lookups, spec_id)
+    state["metadata"] = metadata
+    logger.info("speculation: started %s after early routing", {t: spec["query"] for t, spec in lookups.items()})
+
+
+def discard_unrouted(state: TravelChatBotState, targets: Iterable[str]) -> None:
+    """
+    Drop this turn's lookups for specialists not in `targets`, or whose
+    context no longer matches trip_info after the master's updates.
+    """
+    spec_id = (state.get("metadata") or {}).get("speculation_id")
+    if not spec_id:
+        return
+    keep = set(targets)
+    trip_info = state.get("trip_info") or {}
+    for target in _TOOLS:
+        lookup = _registry.peek(spec_id, target)
+        if lookup is None:
+            continue
+        if target not in keep:
+            reason = "not routed"
+        elif any(trip_info.get(k) != v for k, v in lookup.context.items()):
+            reason = "trip_info changed"
+        else:
+            continue
+        if _registry.pop(spec_id, target) is not None:
+            _registry.discard(lookup, reason)
+
+
+def drop_prefetched(state: TravelChatBotState, target: str, reason: str) -> None:
+    """Discard `target`'s lookup this turn (the specialist will not need it)."""
+    spec_id = (state.get("metadata") or {}).get("speculation_id")
+    lookup = _registry.pop(spec_id, target) if spec_id else None
+    if lookup is not None:
+        _registry.discard(lookup, reason)
+
+
+def take_prefetched(state: TravelChatBotState, target: str) -> List[ToolResult]:
+    """
+    ToolResults for `target`'s speculative lookup this turn, or [] if there
+    was none, it failed, or it did not finish within SPECULATION_WAIT_S (or
+    the specialist's share of the turn deadline, if sooner).
+    """
+    spec_id = (state.get("metadata") or {}).get("speculation_id")
+    lookup = _registry.pop(spec_id, target) if spec_id else None
+    if lookup is None:
+        return []
+
+    wait_s = SPECULATION_WAIT_S
+    stage_budget = stage_budget_s(state, "specialist")
+    if stage_budget is not None:
+        wait_s = min(wait_s, stage_budget)
+
+    asked = time.perf_counter()
+    try:
+        raw = lookup.future.result(timeout=wait_s)
+    except FutureTimeout:
+        _registry.discard(lookup, "late")
+        _registry.count("late")
+        return []
+    except Exception as e:
+        logger.warning("speculation: %s lookup failed: %s", target, e)
+        _registry.count("failed")
+        return []
+
+    # Time the lookup had already run before the specialist needed it.
+    saved_ms = max(0.0, (min(asked, lookup.finished or asked) - (lookup.started or asked)) * 1000.0)
+    _registry.count("hits", saved_ms)
+
+    logger.info("speculation: %s lookup used (%.0f ms overlapped)", target, saved_ms)
+    return [to_tool_result(_TOOLS[target].name, raw)]  # type: ignore[list-item]
+
+
+def speculation_stats() -> Dict[str, Any]:
+    """Counters since process start: hit rate, late / wasted lookups, time saved."""
+    return _registry.stats()
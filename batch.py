@@ -0,0 +1,324 @@
+# src/batch.py
+
+"""
+Offline batch runner: scripted conversations through build_graph().
+
+For evaluations and nightly regression runs. Reads conversations from a
+JSONL file, runs them concurrently (one conversation per worker at a time,
+its turns in order on its own thread_id), and appends one JSON line per
+turn to the output file: the reply plus per-turn metrics (latency, intent,
+specialists, response source, tool time, degradations, plan cache hits,
+replanning).
+
+Input lines are either a whole conversation or a single turn:
+
+    {"id": "conv-1", "turns": ["Plan 3 days in Mumbai in March", {"user": "Any concerts?"}]}
+    {"thread_id": "conv-2", "message": "How do I get there from Chennai?"}
+
+Lines with the same id / thread_id form one conversation, in file order.
+
+A conversation's records are written together when it finishes, so the
+output only ever holds whole conversations (plus, after a crash, possibly one
+torn line). --resume drops incomplete conversations from the output and runs
+everything not yet in it; each conversation starts on a fresh thread, so
+checkpoints left by an interrupted run never leak in. Conversations that
+failed are kept unless --retry-failed.
+
+--llm stub runs against benchmarks.stubs (StubChatModel behind the real
+call_llm, stub tools and retriever) instead of Bedrock. Throughput grows with
+--workers until the LLM calls queue: on Bedrock's concurrency limits, and
+in-process on LLM_TIMEOUT_WORKERS (calls with a deadline run on that pool).
+
+    python -m src.batch conversations.jsonl --output results.jsonl --workers 16
+    python -m src.batch conversations.jsonl --output results.jsonl --resume
+    python -m src.batch conversations.jsonl --output results.jsonl --llm stub --stub-latency lognormal:900:0.4
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# metadata keys copied into each turn record.
+TURN_METRICS = (
+    "intent_source",
+    "specialist_targets",
+    "response_source",
+    "tool_ms",
+    "degraded",
+    "plan_cache_hits",
+    "replan",
+)
+
+
+@dataclass
+class Conversation:
+    id: str
+    turns: List[str] = field(default_factory=list)
+
+
+def load_conversations(path: str) -> List[Conversation]:
+    """Conversations in `path`, in order of first appearance; turns of repeated ids are appended."""
+    conversations: Dict[str, Conversation] = {}
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            conv_id = str(row.get("id") or row.get("thread_id") or f"line-{line_no}")
+            turns = row.get("turns")
+            if turns is None:
+                turns = [row.get("message") or row.get("user_input") or ""]
+            conversation = conversations.setdefault(conv_id, Conversation(conv_id))
+            for turn in turns:
+                conversation.turns.append(str(turn.get("user") or "") if isinstance(turn, dict) else str(turn))
+    return list(conversations.values())
+
+
+def completed_conversations(path: str, retry_failed: bool = False) -> Set[str]:
+    """
+    Ids of the conversations fully recorded in the output at `path`. Lines
+    of the others (interrupted, torn, or failed with `retry_failed`) are
+    removed from the file so they can be run again.
+    """
+    if not os.path.exists(path):
+        return set()
+    kept: Dict[str, List[str]] = {}
+    records: Dict[str, List[Dict[str, Any]]] = {}
+    dropped = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                conv_id = str(record["conversation_id"])
+            except (ValueError, KeyError, TypeError):
+                dropped += 1
+                continue
+            kept.setdefault(conv_id, []).append(line if line.endswith("\n") else line + "\n")
+            records.setdefault(conv_id, []).append(record)
+
+    done = set()
+    for conv_id, recs in records.items():
+        whole = {r.get("turn") for r in recs} == set(range(recs[0].get("turns_total", 0)))
+        if whole and not (retry_failed and any(not r.get("ok") for r in recs)):
+            done.add(conv_id)
+        else:
+            dropped += len(recs)
+
+    if dropped:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for conv_id in done:
+                f.writelines(kept[conv_id])
+        os.replace(tmp, path)
+        logger.info("batch: dropped %d record(s) of incomplete conversations from %s", dropped, path)
+    return done
+
+
+def turn_record(conversation: Conversation, turn: int, state: Dict[str, Any], ms: float) -> Dict[str, Any]:
+    metadata = state.get("metadata") or {}
+    return {
+        "conversation_id": conversation.id,
+        "turn": turn,
+        "turns_total": len(conversation.turns),
+        "user_input": conversation.turns[turn],
+        "ok": True,
+        "reply": state.get("master_message") or "",
+        "intent": state.get("intent"),
+        "ms": round(ms, 1),
+        **{key: metadata.get(key) for key in TURN_METRICS},
+    }
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+class BatchRunner:
+    """
+    Runs conversations on a shared compiled graph with `workers` threads and
+    appends their turn records to `output`.
+
+    Parameters
+    ----------
+    app : compiled LangGraph app
+    output : str
+        JSONL file the records are appended to.
+    workers : int
+        Conversations run at once.
+    thread_prefix : str
+        Prepended to conversation ids to form thread_ids.
+    keep_state : bool
+        Keep each conversation's checkpoints after it finishes (default:
+        delete them, so a long run does not grow the checkpointer).
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        output: str,
+        workers: int = 8,
+        thread_prefix: str = "batch-",
+        keep_state: bool = False,
+    ) -> None:
+        self.app = app
+        self.output = output
+        self.workers = max(1, workers)
+        self.thread_prefix = thread_prefix
+        self.keep_state = keep_state
+        self._lock = threading.Lock()
+        self._latencies: List[float] = []
+        self._conversations = 0
+        self._failed = 0
+        self._turns = 0
+
+    def run(self, conversations: List[Conversation], skip: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """Run every conversation not in `skip`; returns a summary of this run."""
+        todo = [c for c in conversations if c.id not in (skip or set())]
+        logger.info("batch: %d conversation(s) to run, %d already done", len(todo), len(conversations) - len(todo))
+        started = time.perf_counter()
+        with open(self.output, "a", encoding="utf-8") as out, ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="batch"
+        ) as pool:
+            list(pool.map(lambda c: self._write(out, self._run_conversation(c)), todo))
+        wall = time.perf_counter() - started
+        return {
+            "conversations": len(conversations),
+            "skipped": len(conversations) - len(todo),
+            "run": self._conversations,
+            "failed": self._failed,
+            "turns": self._turns,
+            "workers": self.workers,
+            "wall_seconds": round(wall, 2),
+            "turns_per_s": round(self._turns / wall, 2) if wall > 0 else None,
+            "turn_ms_p50": _percentile(self._latencies, 0.50),
+            "turn_ms_p95": _percentile(self._latencies, 0.95),
+        }
+
+    def _run_conversation(self, conversation: Conversation) -> List[Dict[str, Any]]:
+        thread_id = f"{self.thread_prefix}{conversation.id}"
+        config = {"configurable": {"thread_id": thread_id}}
+        self._delete_thread(thread_id)  # start clean, e.g. after an interrupted run
+        records: List[Dict[str, Any]] = []
+        error: Optional[str] = None
+        for turn, user_input in enumerate(conversation.turns):
+            if error is not None:
+                records.append(self._failed_record(conversation, turn, "skipped: an earlier turn failed"))
+                continue
+            started = time.perf_counter()
+            try:
+                state = self.app.invoke({"user_input": user_input}, config=config)
+            except Exception as exc:
+                logger.exception("batch: %s turn %d failed", conversation.id, turn)
+                error = f"{type(exc).__name__}: {exc}"
+                records.append(self._failed_record(conversation, turn, error))
+                continue
+            ms = (time.perf_counter() - started) * 1000.0
+            records.append(turn_record(conversation, turn, state, ms))
+        if not self.keep_state:
+            self._delete_thread(thread_id)
+        with self._lock:
+            self._conversations += 1
+            self._failed += int(error is not None)
+            self._turns += len(conversation.turns)
+            self._latencies += [r["ms"] for r in records if r["ok"]]
+        return records
+
+    @staticmethod
+    def _failed_record(conversation: Conversation, turn: int, error: str) -> Dict[str, Any]:
+        return {
+            "conversation_id": conversation.id,
+            "turn": turn,
+            "turns_total": len(conversation.turns),
+            "user_input": conversation.turns[turn],
+            "ok": False,
+            "error": error,
+        }
+
+    def _delete_thread(self, thread_id: str) -> None:
+        checkpointer = getattr(self.app, "checkpointer", None)
+        if checkpointer is not None:
+            checkpointer.delete_thread(thread_id)
+
+    def _write(self, out: Any, records: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with self._lock:
+            out.write(lines)
+            out.flush()
+            done = self._conversations
+        if done % 100 == 0:
+            logger.info("batch: %d conversation(s) done, %d turn(s)", done, self._turns)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("conversations", help="Input JSONL (see above).")
+    parser.add_argument("--output", required=True, help="Turn records (JSONL), appended to.")
+    parser.add_argument("--workers", type=int, default=8, help="Conversations run at once.")
+    parser.add_argument("--resume", action="store_true", help="Skip conversations already in --output.")
+    parser.add_argument("--retry-failed", action="store_true", help="With --resume, run failed ones again.")
+    parser.add_argument("--llm", choices=["bedrock", "stub"], default="bedrock")
+    parser.add_argument("--stub-latency", default="lognormal:900:0.4", help="LLM latency with --llm stub.")
+    parser.add_argument("--stub-tool-latency", default="lognormal:200:0.4")
+    parser.add_argument("--checkpoint-backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--keep-state", action="store_true", help="Keep checkpoints of finished conversations.")
+    parser.add_argument("--thread-prefix", default="batch-")
+    parser.add_argument("--summary", default=None, help="Also write the run summary (JSON) here.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    if os.path.exists(args.output) and not args.resume:
+        sys.exit(f"{args.output} exists: pass --resume to continue it, or remove it")
+    os.environ["CHECKPOINT_BACKEND"] = args.checkpoint_backend
+
+    conversations = load_conversations(args.conversations)
+    done = completed_conversations(args.output, retry_failed=args.retry_failed) if args.resume else set()
+
+    with ExitStack() as stack:
+        if args.llm == "stub":
+            from src.benchmarks.stubs import LatencyModel, StubChatModel, StubLLM, install_stubs
+
+            stack.enter_context(
+                install_stubs(
+                    tool_latency=args.stub_tool_latency,
+                    retriever_latency=args.stub_tool_latency,
+                    chat_model=StubChatModel(StubLLM(LatencyModel(args.stub_latency))),
+                )
+            )
+
+        from src.graph import build_graph
+        from src.llm.models import model_stats
+        from src.profiling import profile_from_env
+        from src.recording import record_from_env
+        from src.tracing import trace_from_env
+
+        runner = BatchRunner(
+            trace_from_env(profile_from_env(record_from_env(build_graph()))),
+            args.output,
+            workers=args.workers,
+            thread_prefix=args.thread_prefix,
+            keep_state=args.keep_state,
+        )
+        summary = runner.run(conversations, skip=done)
+        summary = {**summary, "output": args.output, "llm": args.llm, "models": model_stats()}
+
+    print(json.dumps(summary, indent=2))
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
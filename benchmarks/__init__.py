@@ -0,0 +1,9 @@
+# src/benchmarks/__init__.py
+"""
+Offline benchmarks for the travel assistant.
+
+Each module is runnable on its own, from the directory that contains the
+package, e.g.:
+
+    python -m src.benchmarks.bench_itinerary
+"""
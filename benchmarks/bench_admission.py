@@ -0,0 +1,214 @@
+# src/benchmarks/bench_admission.py
+
+"""
+Goodput and tail latency per priority class under overload, with and
+without LLM admission control (llm/admission.py).
+
+Open-loop load: conversations from bench_graph's scripts arrive as a Poisson
+process (--rate per second for --duration seconds), each running its turns
+in order with --think-ms between them. Every turn's LLM requests go through
+the real call_llm to one benchmarks.stubs.StubChatModel that serves at most
+--backend-capacity requests at once (a throttled Bedrock endpoint), so
+offered load above capacity queues. The local intent fast path is off, so
+every turn starts with a master LLM call.
+
+Modes:
+
+- fifo:      admission control off; requests queue at the backend in arrival order
+- priority:  admission control with --backend-capacity slots, class weights, no shedding
+- shed:      priority, plus plan_full shed to one specialist above --shed-ms of queue delay
+
+Reported per mode and class (chat = generic_chat, plan = activities_q /
+logistics_q, plan_full): turns, goodput (turns per second answered within
+the class's --slo), latency p50 / p95 / p99, turns shed and other
+degradations, plus llm.admission.admission_stats().
+
+    python -m src.benchmarks.bench_admission --rate 3 --duration 20 --backend-capacity 8 \
+        --llm-latency lognormal:800:0.3 --slo chat=3,plan=8,plan_full=12
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+CLASSES = {"generic_chat": "chat", "activities_q": "plan", "logistics_q": "plan", "plan_full": "plan_full"}
+
+
+def set_admission(capacity: int, shed_ms: float) -> None:
+    # llm.admission may be loaded under two names (llm.* / src.llm.*).
+    for module in list(sys.modules.values()):
+        if module is not None and getattr(module, "__name__", "").endswith("llm.admission"):
+            module.configure(capacity, shed_ms=shed_ms)
+
+
+def admission_stats() -> Dict[str, Any]:
+    from src.llm.admission import admission_stats as stats  # the same instance call_llm uses
+
+    return stats()
+
+
+def run_session(
+    app: Any, thread_id: str, script: List[Tuple[str, str]], think_s: float, budget_s: float
+) -> List[Dict[str, Any]]:
+    config = {"configurable": {"thread_id": thread_id, "turn_budget_s": budget_s}}
+    turns = []
+    for i, (user_input, intent) in enumerate(script):
+        if i:
+            time.sleep(think_s)
+        started = time.perf_counter()
+        try:
+            final = app.invoke({"user_input": user_input}, config=config)
+            degraded = list((final.get("metadata") or {}).get("degraded") or [])
+            ok = True
+        except Exception:
+            degraded, ok = [], False
+        turns.append(
+            {
+                "cls": CLASSES[intent],
+                "ms": (time.perf_counter() - started) * 1000.0,
+                "ok": ok,
+                "degraded": degraded,
+            }
+        )
+    return turns
+
+
+def arrivals(rate: float, duration: float, seed: int) -> List[float]:
+    rng = random.Random(seed)
+    times, t = [], rng.expovariate(rate)
+    while t < duration:
+        times.append(t)
+        t += rng.expovariate(rate)
+    return times
+
+
+def parse_pairs(spec: str) -> Dict[str, float]:
+    return {k.strip(): float(v) for k, v in (pair.split("=", 1) for pair in spec.split(",") if "=" in pair)}
+
+
+def summarize(turns: List[Dict[str, Any]], slo_s: float, wall: float) -> Dict[str, Any]:
+    from src.benchmarks.bench_graph import percentile
+
+    latencies = [t["ms"] for t in turns]
+    good = [t for t in turns if t["ok"] and t["ms"] <= slo_s * 1000.0]
+    degraded = Counter(what for t in turns for what in t["degraded"])
+    shed = degraded.pop("shed_plan_full", 0)
+    return {
+        "turns": len(turns),
+        "failed": sum(not t["ok"] for t in turns),
+        "goodput_per_s": round(len(good) / wall, 2) if wall else None,
+        "within_slo": round(len(good) / len(turns), 3) if turns else None,
+        "ms_p50": round(percentile(latencies, 0.50), 1),
+        "ms_p95": round(percentile(latencies, 0.95), 1),
+        "ms_p99": round(percentile(latencies, 0.99), 1),
+        "shed": shed,
+        "degraded": dict(degraded.most_common()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=3.0, help="New conversations per second.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of arrivals.")
+    parser.add_argument("--mix", default="generic_chat=4,activities_q=2,logistics_q=2,plan_full=2")
+    parser.add_argument("--think-ms", type=float, default=500.0)
+    parser.add_argument("--backend-capacity", type=int, default=8)
+    parser.add_argument("--llm-latency", default="lognormal:800:0.3")
+    parser.add_argument("--tool-latency", default="lognormal:200:0.3")
+    parser.add_argument("--tool-calls", type=int, default=2, help="Tool calls per specialist response.")
+    parser.add_argument("--turn-budget-s", type=float, default=20.0)
+    parser.add_argument("--slo", default="chat=3,plan=8,plan_full=12", help="Seconds per class for goodput.")
+    parser.add_argument("--shed-ms", type=float, default=1500.0)
+    parser.add_argument("--modes", nargs="+", choices=["fifo", "priority", "shed"], default=["fifo", "priority", "shed"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_admission_")
+    os.environ["CHECKPOINT_BACKEND"] = "memory"
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tmpdir, "checkpoints.sqlite3")
+    os.environ["INTENT_FAST_PATH"] = "off"
+    os.environ["PLAN_CACHE"] = "0"
+    # Background specialist runs must not queue in early routing's own small pool ahead of the LLM scheduler.
+    os.environ.setdefault("EARLY_ROUTING_WORKERS", "64")
+
+    from src.benchmarks.bench_graph import SCRIPTS
+    from src.benchmarks.stubs import LatencyModel, StubChatModel, StubLLM, install_stubs
+
+    intents = {line: intent for script in SCRIPTS.values() for line, intent in script}
+    mix = parse_pairs(args.mix)
+    slo = parse_pairs(args.slo)
+    names = list(mix)
+    start_times = arrivals(args.rate, args.duration, args.seed)
+    rng = random.Random(args.seed)
+    picks = [rng.choices(names, weights=[mix[n] for n in names])[0] for _ in start_times]
+    results: Dict[str, Any] = {}
+
+    for mode in args.modes:
+        text = StubLLM(LatencyModel(args.llm_latency, seed=args.seed), intents=intents)
+        chat_model = StubChatModel(text, tool_calls=args.tool_calls, capacity=args.backend_capacity)
+        with install_stubs(tool_latency=args.tool_latency, seed=args.seed, chat_model=chat_model):
+            from src.graph import build_graph
+
+            set_admission(0 if mode == "fifo" else args.backend_capacity, args.shed_ms if mode == "shed" else 0.0)
+            app = build_graph()
+            sessions: List[Optional[List[Dict[str, Any]]]] = [None] * len(start_times)
+            lock = threading.Lock()
+
+            def run(i: int) -> None:
+                turns = run_session(
+                    app,
+                    f"admission-{mode}-{int(time.time())}-{i}",
+                    SCRIPTS[picks[i]],
+                    args.think_ms / 1000.0,
+                    args.turn_budget_s,
+                )
+                with lock:
+                    sessions[i] = turns
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max(1, len(start_times))) as pool:
+                for i, at in enumerate(start_times):
+                    time.sleep(max(0.0, at - (time.perf_counter() - started)))
+                    pool.submit(run, i)
+            wall = time.perf_counter() - started
+            stats = admission_stats()
+            set_admission(0, 0.0)
+
+        turns = [t for session in sessions for t in (session or [])]
+        results[mode] = {
+            "wall_seconds": round(wall, 2),
+            "all": summarize(turns, max(slo.values()), wall),
+            "classes": {
+                cls: summarize([t for t in turns if t["cls"] == cls], slo.get(cls, max(slo.values())), wall)
+                for cls in ("chat", "plan", "plan_full")
+            },
+            "admission": stats,
+        }
+
+    report = {
+        "benchmark": "admission",
+        "config": {
+            "rate": args.rate,
+            "duration": args.duration,
+            "conversations": len(start_times),
+            "mix": mix,
+            "backend_capacity": args.backend_capacity,
+            "llm_latency": args.llm_latency,
+            "slo_s": slo,
+            "shed_ms": args.shed_ms,
+        },
+        "modes": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
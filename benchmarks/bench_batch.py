@@ -0,0 +1,82 @@
+# src/benchmarks/bench_batch.py
+
+"""
+Throughput of the offline batch runner (batch.py) by worker count.
+
+Runs bench_graph's scripted conversations through batch.BatchRunner against
+the local stand-in (benchmarks.stubs.StubChatModel behind the real call_llm,
+stub tools and retriever) once per --workers value, and reports turns per
+second, turn latency p50 / p95 and the scaling efficiency relative to one
+worker (turns_per_s / (workers * turns_per_s at 1 worker)). With LLM latency
+dominating a turn, efficiency should stay near 1 until the LLM calls queue.
+
+    python -m src.benchmarks.bench_batch --workers 1 2 4 8 16 --conversations-per-worker 4
+"""
+
+import argparse
+import json
+import os
+import tempfile
+from typing import Any, Dict
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--conversations-per-worker", type=int, default=4)
+    parser.add_argument("--llm-latency", default="lognormal:300:0.3")
+    parser.add_argument("--tool-latency", default="lognormal:100:0.3")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_batch_")
+    os.environ["CHECKPOINT_BACKEND"] = "memory"
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tmpdir, "checkpoints.sqlite3")
+
+    from src.benchmarks.bench_graph import SCRIPTS
+    from src.benchmarks.stubs import LatencyModel, StubChatModel, StubLLM, install_stubs
+
+    intents = {line: intent for script in SCRIPTS.values() for line, intent in script}
+    names = list(SCRIPTS)
+    chat_model = StubChatModel(StubLLM(LatencyModel(args.llm_latency, seed=args.seed), intents=intents))
+    results: Dict[str, Any] = {}
+
+    with install_stubs(
+        tool_latency=args.tool_latency, retriever_latency=args.tool_latency, seed=args.seed, chat_model=chat_model
+    ):
+        from src.batch import BatchRunner, Conversation
+        from src.graph import build_graph
+
+        app = build_graph()
+        base = None
+        for workers in args.workers:
+            conversations = [
+                Conversation(f"w{workers}-{i}", [line for line, _ in SCRIPTS[names[i % len(names)]]])
+                for i in range(workers * args.conversations_per_worker)
+            ]
+            output = os.path.join(tmpdir, f"workers-{workers}.jsonl")
+            summary = BatchRunner(app, output, workers=workers).run(conversations)
+            base = base or summary["turns_per_s"] / workers
+            results[str(workers)] = {
+                "turns": summary["turns"],
+                "wall_seconds": summary["wall_seconds"],
+                "turns_per_s": summary["turns_per_s"],
+                "turn_ms_p50": summary["turn_ms_p50"],
+                "turn_ms_p95": summary["turn_ms_p95"],
+                "efficiency": round(summary["turns_per_s"] / (workers * base), 3),
+            }
+
+    report = {
+        "benchmark": "batch",
+        "config": {
+            "conversations_per_worker": args.conversations_per_worker,
+            "llm_latency": args.llm_latency,
+            "tool_latency": args.tool_latency,
+        },
+        "workers": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
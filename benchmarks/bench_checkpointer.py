@@ -0,0 +1,152 @@
+# src/benchmarks/bench_checkpointer.py
+
+"""
+Checkpoint write/read latency and memory under many concurrent threads.
+
+Simulates `--threads` conversations, each writing `--turns` turns of
+`--steps` super-steps (one checkpoint + one pending write per step) with a
+TravelChatBotState-sized payload, from a pool of `--workers` OS threads.
+Reports put/get latency percentiles, total wall time, on-disk size and the
+process memory growth, for the SQLite saver and (optionally) MemorySaver.
+
+    python -m src.benchmarks.bench_checkpointer --threads 10000 --backend both
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from langgraph.checkpoint.base import BaseCheckpointSaver, empty_checkpoint
+from langgraph.checkpoint.memory import MemorySaver
+
+from src.persistence.sqlite_saver import BoundedSqliteSaver
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return float("nan")
+
+
+def fake_state(turn: int, rng: random.Random) -> Dict[str, Any]:
+    items = [
+        {
+            "day": i % 3 + 1,
+            "time_of_day": "evening",
+            "title": f"Event {turn}-{i}",
+            "address": "NSCI Dome, Mumbai, India",
+            "lat": 19.0 + rng.random() / 10,
+            "lon": 72.8 + rng.random() / 10,
+            "notes": "A short note about why this fits the trip.",
+        }
+        for i in range(8)
+    ]
+    return {
+        "user_input": f"message {turn}",
+        "trip_info": {"destination": "Mumbai", "travel_month": "March", "num_days": 3},
+        "preferences": {"budget_level": "medium", "interests": ["food", "music"]},
+        "activities_plan": {"items": items},
+        "history_summary": "User plans a 3-day Mumbai trip in March. " * 3,
+        "master_message": "Here are some ideas for your trip. " * 8,
+    }
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def run(saver: BaseCheckpointSaver, args: argparse.Namespace) -> Dict[str, Any]:
+    put_ms: List[float] = []
+    get_ms: List[float] = []
+    rng = random.Random(0)
+
+    def conversation(thread_idx: int) -> None:
+        thread_id = f"bench-{thread_idx}"
+        parent_id = None
+        versions = 0
+        for turn in range(args.turns):
+            t0 = time.perf_counter()
+            saver.get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}})
+            get_ms.append((time.perf_counter() - t0) * 1000)
+
+            for _ in range(args.steps):
+                versions += 1
+                checkpoint = empty_checkpoint()
+                checkpoint["channel_values"] = fake_state(turn, rng)
+                checkpoint["channel_versions"] = {"__root__": versions}
+                config = {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": "",
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                t0 = time.perf_counter()
+                new_config = saver.put(config, checkpoint, {"source": "loop", "step": versions}, {})
+                saver.put_writes(new_config, [("master_route", "activities")], task_id=str(versions))
+                put_ms.append((time.perf_counter() - t0) * 1000)
+                parent_id = new_config["configurable"]["checkpoint_id"]
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        list(pool.map(conversation, range(args.threads)))
+    if isinstance(saver, BoundedSqliteSaver):
+        saver.flush()
+    wall = time.perf_counter() - started
+
+    return {
+        "wall_s": round(wall, 2),
+        "checkpoints_written": len(put_ms),
+        "put_ms_p50": round(statistics.median(put_ms), 4),
+        "put_ms_p99": round(percentile(put_ms, 99), 4),
+        "get_ms_p50": round(statistics.median(get_ms), 4),
+        "get_ms_p99": round(percentile(get_ms, 99), 4),
+        "rss_growth_mb": round(rss_mb() - rss_before, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--keep-last", type=int, default=5)
+    parser.add_argument("--backend", choices=["sqlite", "memory", "both"], default="sqlite")
+    args = parser.parse_args()
+
+    report: Dict[str, Any] = {"benchmark": "checkpointer", "threads": args.threads,
+                              "turns": args.turns, "steps": args.steps, "workers": args.workers}
+
+    if args.backend in ("sqlite", "both"):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.sqlite3")
+            saver = BoundedSqliteSaver(path, keep_last=args.keep_last)
+            report["sqlite"] = run(saver, args)
+            saver.close()
+            report["sqlite"]["db_mb"] = round(
+                sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)) / 1e6, 1
+            )
+
+    if args.backend in ("memory", "both"):
+        report["memory"] = run(MemorySaver(), args)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# src/benchmarks/bench_deadlines.py
+
+"""
+Turn latency under injected faults, with and without the per-turn deadline
+(deadline.py).
+
+Runs bench_graph's scripted conversations through the real call_llm with
+benchmarks.stubs.StubChatModel in place of Bedrock. LLM calls and tool
+lookups use "faulty" latency specs: mostly log-normal, but a fraction of
+calls stall (throttling, a hung connection). Each mode runs the same
+conversations on the same graph; only the turn budget passed in
+config["configurable"]["turn_budget_s"] changes ("off" passes 0).
+
+Reported per mode: turn latency p50 / p95 / p99 / max, the share of turns
+that finished within --slo-s, and how often each degradation was taken
+(metadata["degraded"] of every finished turn).
+
+    python -m src.benchmarks.bench_deadlines --slo-s 3 \
+        --llm-latency faulty:300:0.4:0.05:8000 --tool-latency faulty:200:0.4:0.05:6000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+
+def run_session(app: Any, thread_id: str, script: List[Tuple[str, str]], budget_s: float) -> List[Dict[str, Any]]:
+    """Run one scripted conversation; return each turn's latency and degradations."""
+    config = {"configurable": {"thread_id": thread_id, "turn_budget_s": budget_s}}
+    turns = []
+    for user_input, intent in script:
+        started = time.perf_counter()
+        final = app.invoke({"user_input": user_input}, config=config)
+        turns.append(
+            {
+                "intent": intent,
+                "ms": (time.perf_counter() - started) * 1000.0,
+                "degraded": list((final.get("metadata") or {}).get("degraded") or []),
+            }
+        )
+    return turns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slo-s", type=float, default=3.0, help="Turn budget for the deadline mode.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--sessions-per-worker", type=int, default=4)
+    parser.add_argument("--tool-calls", type=int, default=2, help="Tool calls per specialist response.")
+    parser.add_argument("--llm-latency", default="faulty:300:0.4:0.05:8000")
+    parser.add_argument("--tool-latency", default="faulty:200:0.4:0.05:6000")
+    parser.add_argument("--retriever-latency", default="lognormal:100:0.4")
+    parser.add_argument("--modes", nargs="+", choices=["off", "deadline"], default=["off", "deadline"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_deadlines_")
+    os.environ["CHECKPOINT_BACKEND"] = "memory"
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tmpdir, "checkpoints.sqlite3")
+
+    from src.benchmarks.bench_graph import SCRIPTS, percentile
+    from src.benchmarks.stubs import LatencyModel, StubChatModel, StubLLM, install_stubs
+
+    intents = {line: intent for script in SCRIPTS.values() for line, intent in script}
+    names = list(SCRIPTS)
+    results: Dict[str, Any] = {}
+
+    for mode in args.modes:
+        # Same seed per mode: both see the same stalls in the same order.
+        text = StubLLM(LatencyModel(args.llm_latency, seed=args.seed), intents=intents)
+        chat_model = StubChatModel(text, tool_calls=args.tool_calls)
+        budget_s = args.slo_s if mode == "deadline" else 0.0
+        with install_stubs(
+            tool_latency=args.tool_latency,
+            retriever_latency=args.retriever_latency,
+            seed=args.seed,
+            chat_model=chat_model,
+        ):
+            from src.graph import build_graph
+
+            app = build_graph()
+            jobs = [
+                (f"deadline-{mode}-{int(time.time())}-{i}", SCRIPTS[names[i % len(names)]])
+                for i in range(args.concurrency * args.sessions_per_worker)
+            ]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                sessions = list(pool.map(lambda job: run_session(app, *job, budget_s), jobs))
+            wall = time.perf_counter() - started
+
+        turns = [turn for session in sessions for turn in session]
+        latencies = [turn["ms"] for turn in turns]
+        degraded = Counter(what for turn in turns for what in turn["degraded"])
+        results[mode] = {
+            "turn_budget_s": budget_s or None,
+            "turns": len(turns),
+            "wall_seconds": round(wall, 2),
+            "turn_ms": {
+                "p50": round(percentile(latencies, 0.50), 1),
+                "p95": round(percentile(latencies, 0.95), 1),
+                "p99": round(percentile(latencies, 0.99), 1),
+                "max": round(max(latencies), 1),
+            },
+            "within_slo": round(sum(ms <= args.slo_s * 1000.0 for ms in latencies) / len(latencies), 3),
+            "degraded_turns": sum(bool(turn["degraded"]) for turn in turns),
+            "degraded": dict(degraded.most_common()),
+            "llm_calls": dict(sorted(text.calls.items())),
+        }
+
+    report = {
+        "benchmark": "deadlines",
+        "config": {
+            "slo_s": args.slo_s,
+            "concurrency": args.concurrency,
+            "tool_calls": args.tool_calls,
+            "llm_latency": args.llm_latency,
+            "tool_latency": args.tool_latency,
+            "retriever_latency": args.retriever_latency,
+        },
+        "modes": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
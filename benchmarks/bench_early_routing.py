@@ -0,0 +1,141 @@
+# src/benchmarks/bench_early_routing.py
+
+"""
+Route-decision time versus full-completion time of the master call, and turn
+latency, with early routing from the streamed master reply
+(agents/early_routing.py) on and off.
+
+Runs bench_graph's scripted conversations through the real call_llm with
+benchmarks.stubs.StubChatModel streaming its answers: each reply arrives in
+small chunks over one latency sample, the first after --ttft-share of it.
+The local intent fast path and the plan cache are switched off so every
+turn classifies with the master LLM and every specialist turn calls its LLM.
+
+Reported per mode, for specialist turns: when the intent was known, when
+the specialists were dispatched and when the master reply was complete
+(ms after the call started), turn latency, and early-run outcomes.
+
+    python -m src.benchmarks.bench_early_routing --llm-latency lognormal:1500:0.3
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def set_early_routing(enabled: bool) -> None:
+    # early_routing may be loaded under two names (agents.* / src.agents.*).
+    for module in list(sys.modules.values()):
+        if module is not None and getattr(module, "__name__", "").endswith("early_routing"):
+            setattr(module, "EARLY_ROUTING", enabled)
+
+
+def early_routing_stats() -> Dict[str, Any]:
+    from agents import early_routing_stats as stats  # same module instance the graph uses
+
+    return stats()
+
+
+def run_session(app: Any, thread_id: str, script: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    config = {"configurable": {"thread_id": thread_id}}
+    turns = []
+    for user_input, intent in script:
+        started = time.perf_counter()
+        final = app.invoke({"user_input": user_input}, config=config)
+        turns.append(
+            {
+                "intent": intent,
+                "ms": (time.perf_counter() - started) * 1000.0,
+                "master": dict((final.get("metadata") or {}).get("early_routing") or {}),
+            }
+        )
+    return turns
+
+
+def _p50(values: List[Optional[float]]) -> Optional[float]:
+    from src.benchmarks.bench_graph import percentile
+
+    present = [v for v in values if v is not None]
+    return round(percentile(present, 0.50), 1) if present else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--sessions-per-worker", type=int, default=2)
+    parser.add_argument("--llm-latency", default="lognormal:1500:0.3")
+    parser.add_argument("--ttft-share", type=float, default=0.3)
+    parser.add_argument("--tool-latency", default="lognormal:300:0.4")
+    parser.add_argument("--tool-calls", type=int, default=1, help="Tool calls per specialist response.")
+    parser.add_argument("--modes", nargs="+", choices=["off", "early"], default=["off", "early"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_early_routing_")
+    os.environ["CHECKPOINT_BACKEND"] = "memory"
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tmpdir, "checkpoints.sqlite3")
+    os.environ["INTENT_FAST_PATH"] = "off"
+    os.environ["PLAN_CACHE"] = "0"
+
+    from src.benchmarks.bench_graph import SCRIPTS, percentile
+    from src.benchmarks.stubs import LatencyModel, StubChatModel, StubLLM, install_stubs
+
+    intents = {line: intent for script in SCRIPTS.values() for line, intent in script}
+    names = list(SCRIPTS)
+    results: Dict[str, Any] = {}
+
+    for mode in args.modes:
+        text = StubLLM(LatencyModel(args.llm_latency, seed=args.seed), intents=intents)
+        chat_model = StubChatModel(text, tool_calls=args.tool_calls, ttft_share=args.ttft_share)
+        with install_stubs(tool_latency=args.tool_latency, seed=args.seed, chat_model=chat_model):
+            from src.graph import build_graph
+
+            set_early_routing(mode == "early")
+            before = early_routing_stats()
+            app = build_graph()
+            jobs = [
+                (f"early-{mode}-{int(time.time())}-{i}", SCRIPTS[names[i % len(names)]])
+                for i in range(args.concurrency * args.sessions_per_worker)
+            ]
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                sessions = list(pool.map(lambda job: run_session(app, *job), jobs))
+            after = early_routing_stats()
+
+        turns = [turn for session in sessions for turn in session if turn["intent"] != "generic_chat"]
+        latencies = [turn["ms"] for turn in turns]
+        results[mode] = {
+            "specialist_turns": len(turns),
+            "master_ms_p50": {
+                "intent_known": _p50([turn["master"].get("route_ms") for turn in turns]),
+                "specialists_dispatched": _p50([turn["master"].get("dispatch_ms") for turn in turns]),
+                "reply_complete": _p50([turn["master"].get("complete_ms") for turn in turns]),
+            },
+            "turn_ms": {
+                "p50": round(percentile(latencies, 0.50), 1),
+                "p95": round(percentile(latencies, 0.95), 1),
+            },
+            "early_runs": {key: after[key] - before[key] for key in ("dispatched", "adopted", "discarded")},
+            "llm_calls": dict(sorted(text.calls.items())),
+        }
+
+    report = {
+        "benchmark": "early_routing",
+        "config": {
+            "concurrency": args.concurrency,
+            "llm_latency": args.llm_latency,
+            "ttft_share": args.ttft_share,
+            "tool_latency": args.tool_latency,
+            "tool_calls": args.tool_calls,
+        },
+        "modes": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+# src/benchmarks/bench_graph.py
+
+"""
+End-to-end benchmark of the compiled graph with stubbed LLM and tools.
+
+Runs the real build_graph() (nodes, routing, state policy, checkpointer) with
+benchmarks.stubs standing in for Bedrock, Ticketmaster and the flight index,
+so results only move when graph or node code changes (or when the stub
+latencies are changed on purpose).
+
+Scripted conversations cover every intent (generic_chat, activities_q,
+logistics_q, plan_full). For each concurrency level, that many sessions run
+the scripts at once, each on its own thread_id. Reported per level:
+
+- per-node time (mean / p95), measured between streamed node updates
+  (start_turn's time includes loading the session's checkpoint)
+- turn latency p50 / p95 / p99 and turns per second
+- checkpoint size (serialized bytes of each session's latest checkpoint)
+- peak RSS of the process
+
+    python -m src.benchmarks.bench_graph --concurrency 1 10 100
+    python -m src.benchmarks.bench_graph --llm-latency lognormal:800:0.5 \
+        --output bench_graph.jsonl
+
+--output appends one JSON line per run for trend tracking.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+# One script per intent; the stub master agent maps each line to its intent.
+SCRIPTS: Dict[str, List[Tuple[str, str]]] = {
+    "generic_chat": [
+        ("hi there!", "generic_chat"),
+        ("I'm thinking about a trip to Mumbai in March", "generic_chat"),
+        ("thanks, that's helpful", "generic_chat"),
+    ],
+    "activities_q": [
+        ("I'm going to Mumbai in March", "generic_chat"),
+        ("any big concerts or festivals while I'm there?", "activities_q"),
+        ("what about food tours?", "activities_q"),
+    ],
+    "logistics_q": [
+        ("I'm flying from Chennai to Mumbai", "generic_chat"),
+        ("which airline has the fewest delays into BOM?", "logistics_q"),
+        ("is the morning flight more reliable?", "logistics_q"),
+    ],
+    "plan_full": [
+        ("I want to visit Mumbai for 3 days in March", "generic_chat"),
+        ("I love street food and live music", "generic_chat"),
+        ("make me a full 3-day itinerary with flights from Chennai", "plan_full"),
+        ("thanks!", "generic_chat"),
+    ],
+}
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KB on Linux, bytes on macOS.
+    scale = 1e6 if sys.platform == "darwin" else 1e3
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def run_session(app: Any, thread_id: str, script: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Run one scripted conversation; return turn latencies and per-node times (ms)."""
+    config = {"configurable": {"thread_id": thread_id}}
+    turns: List[Tuple[str, float]] = []
+    nodes: Dict[str, List[float]] = defaultdict(list)
+
+    for user_input, intent in script:
+        started = last = time.perf_counter()
+        for update in app.stream({"user_input": user_input}, config=config, stream_mode="updates"):
+            now = time.perf_counter()
+            for node in update:
+                nodes[node].append((now - last) * 1000.0)
+            last = now
+        turns.append((intent, (time.perf_counter() - started) * 1000.0))
+    return {"turns": turns, "nodes": nodes}
+
+
+def checkpoint_bytes(app: Any, thread_ids: List[str]) -> Dict[str, float]:
+    saver = app.checkpointer
+    sizes = []
+    for thread_id in thread_ids:
+        tup = saver.get_tuple({"configurable": {"thread_id": thread_id}})
+        if tup is not None:
+            sizes.append(len(saver.serde.dumps_typed(tup.checkpoint)[1]))
+    return {
+        "mean": round(statistics.mean(sizes), 1) if sizes else 0.0,
+        "max": max(sizes) if sizes else 0,
+    }
+
+
+def run_level(app: Any, concurrency: int, sessions_per_worker: int, tag: str) -> Dict[str, Any]:
+    names = list(SCRIPTS)
+    jobs = [
+        (f"bench-{tag}-{concurrency}-{i}", SCRIPTS[names[i % len(names)]])
+        for i in range(concurrency * sessions_per_worker)
+    ]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda job: run_session(app, *job), jobs))
+    wall = time.perf_counter() - started
+
+    latencies: List[float] = []
+    by_intent: Dict[str, List[float]] = defaultdict(list)
+    nodes: Dict[str, List[float]] = defaultdict(list)
+    for result in results:
+        for intent, ms in result["turns"]:
+            latencies.append(ms)
+            by_intent[intent].append(ms)
+        for node, times in result["nodes"].items():
+            nodes[node].extend(times)
+
+    return {
+        "concurrency": concurrency,
+        "sessions": len(jobs),
+        "turns": len(latencies),
+        "wall_seconds": round(wall, 3),
+        "turns_per_second": round(len(latencies) / wall, 2),
+        "turn_ms": {
+            "p50": round(percentile(latencies, 0.50), 2),
+            "p95": round(percentile(latencies, 0.95), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+        },
+        "turn_ms_p50_by_intent": {k: round(percentile(v, 0.50), 2) for k, v in sorted(by_intent.items())},
+        "node_ms": {
+            node: {"mean": round(statistics.mean(times), 3), "p95": round(percentile(times, 0.95), 3)}
+            for node, times in sorted(nodes.items())
+        },
+        "checkpoint_bytes": checkpoint_bytes(app, [thread_id for thread_id, _ in jobs]),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--sessions-per-worker", type=int, default=2)
+    parser.add_argument("--llm-latency", default="none", help="e.g. none, fixed:50, lognormal:800:0.5")
+    parser.add_argument("--tool-latency", default="none")
+    parser.add_argument("--retriever-latency", default="none")
+    parser.add_argument("--backend", choices=["sqlite", "memory"], default="sqlite")
+    parser.add_argument(
+        "--stub-embeddings",
+        action="store_true",
+        help="Give the stub rag hashed bag-of-words embeddings (enables the plan cache).",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Append the report as one JSON line to this file.")
+    args = parser.parse_args()
+
+    # graph.py builds its checkpointer at import time, so configure it first.
+    tmpdir = tempfile.mkdtemp(prefix="bench_graph_")
+    os.environ["CHECKPOINT_BACKEND"] = args.backend
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tmpdir, "checkpoints.sqlite3")
+
+    from src.benchmarks.stubs import LatencyModel, StubEmbeddings, StubLLM, install_stubs
+
+    intents = {line: intent for script in SCRIPTS.values() for line, intent in script}
+    llm = StubLLM(LatencyModel(args.llm_latency, seed=args.seed), intents=intents)
+
+    embeddings = StubEmbeddings() if args.stub_embeddings else None
+
+    with install_stubs(
+        llm,
+        tool_latency=args.tool_latency,
+        retriever_latency=args.retriever_latency,
+        seed=args.seed,
+        embeddings=embeddings,
+    ):
+        from src.graph import build_graph
+
+        app = build_graph()
+        rss_start = peak_rss_mb()
+        tag = str(int(time.time()))
+        levels = [run_level(app, c, args.sessions_per_worker, tag) for c in args.concurrency]
+
+    from agents import (  # same module instances the graph uses
+        early_routing_stats,
+        plan_cache_stats,
+        response_stats,
+        speculation_stats,
+    )
+    from src.llm.models import model_stats
+    from src.llm.payload import payload_stats  # the agents import it as src.llm.*
+
+    report = {
+        "benchmark": "graph",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "config": {
+            "backend": args.backend,
+            "llm_latency": args.llm_latency,
+            "tool_latency": args.tool_latency,
+            "retriever_latency": args.retriever_latency,
+            "sessions_per_worker": args.sessions_per_worker,
+            "stub_embeddings": args.stub_embeddings,
+        },
+        "llm_calls": dict(sorted(llm.calls.items())),
+        "speculation": speculation_stats(),
+        "responses": response_stats(),
+        "plan_cache": plan_cache_stats(),
+        "early_routing": early_routing_stats(),
+        "prompt_tokens": payload_stats(),
+        "models": model_stats(),
+        "peak_rss_mb_after_build": round(rss_start, 1),
+        "levels": levels,
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# src/benchmarks/bench_history.py
+
+"""
+Summarizer calls and tokens on a long scripted session, summarizing every
+turn versus the windowed, batched history of agents/history.py.
+
+Runs --sessions copies of one long conversation (LONG_SESSION, cycled to
+--turns turns) through the real graph with benchmarks.stubs.StubLLM.
+"per_turn" sets HISTORY_WINDOW_TURNS=0 (the old behaviour: one summarizer
+call per turn, --keep clamped to 0); "windowed" uses --window / --keep.
+
+Reported per mode: summarizer calls and input / output tokens, the master
+prompt size (it now carries the verbatim window) and the window length at
+the end of the session.
+
+    python -m src.benchmarks.bench_history --turns 40 --window 6 --keep 2
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+LONG_SESSION: List[Tuple[str, str]] = [
+    ("hi there", "generic_chat"),
+    ("I want to visit Mumbai for 3 days in March", "generic_chat"),
+    ("I love street food and live music", "generic_chat"),
+    ("any concerts or festivals while I'm there?", "activities_q"),
+    ("where is the second one?", "activities_q"),
+    ("I'm flying from Chennai", "generic_chat"),
+    ("which flights should I look at?", "logistics_q"),
+    ("how long is the flight?", "logistics_q"),
+    ("what about food tours?", "activities_q"),
+    ("we're travelling with kids, by the way", "generic_chat"),
+    ("make me a full 3-day itinerary", "plan_full"),
+    ("thanks, that looks great", "generic_chat"),
+]
+
+
+def set_history_window(window: int, keep: int) -> None:
+    # history may be loaded under two names (agents.* / src.agents.*).
+    for module in list(sys.modules.values()):
+        if module is not None and getattr(module, "__name__", "").endswith("agents.history"):
+            setattr(module, "HISTORY_WINDOW_TURNS", window)
+            setattr(module, "HISTORY_KEEP_TURNS", keep)
+
+
+def prompt_tokens() -> Dict[str, float]:
+    """Total prompt tokens built per agent so far."""
+    from src.llm.payload import payload_stats  # the agents import it as src.llm.*
+
+    return {agent: s["calls"] * s["tokens_mean"] for agent, s in payload_stats().items()}
+
+
+def run_session(app: Any, thread_id: str, turns: int) -> int:
+    config = {"configurable": {"thread_id": thread_id}}
+    final: Dict[str, Any] = {}
+    for i in range(turns):
+        user_input, _ = LONG_SESSION[i % len(LONG_SESSION)]
+        final = app.invoke({"user_input": user_input}, config=config)
+    return len(final.get("recent_exchanges") or [])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=36)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--window", type=int, default=6)
+    parser.add_argument("--keep", type=int, default=2)
+    parser.add_argument("--llm-latency", default="none")
+    parser.add_argument("--modes", nargs="+", choices=["per_turn", "windowed"], default=["per_turn", "windowed"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_history_")
+    os.environ["CHECKPOINT_BACKEND"] = "memory"
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tmpdir, "checkpoints.sqlite3")
+    os.environ["PLAN_CACHE"] = "0"
+
+    from src.benchmarks.stubs import LatencyModel, StubLLM, install_stubs
+
+    intents = {line: intent for line, intent in LONG_SESSION}
+    results: Dict[str, Any] = {}
+
+    for mode in args.modes:
+        llm = StubLLM(LatencyModel(args.llm_latency, seed=args.seed), intents=intents)
+        with install_stubs(llm, seed=args.seed):
+            from src.graph import build_graph
+
+            set_history_window(0 if mode == "per_turn" else args.window, args.keep)
+            app = build_graph()
+            before = prompt_tokens()
+            jobs = [f"history-{mode}-{int(time.time())}-{i}" for i in range(args.sessions)]
+            with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+                windows = list(pool.map(lambda thread_id: run_session(app, thread_id, args.turns), jobs))
+            after = prompt_tokens()
+
+        turns = args.turns * args.sessions
+        master_calls = llm.calls.get("master", 0)
+        sent = {agent: after.get(agent, 0.0) - before.get(agent, 0.0) for agent in after}
+        results[mode] = {
+            "turns": turns,
+            "summarizer_calls": llm.calls.get("history", 0),
+            "summarizer_calls_per_turn": round(llm.calls.get("history", 0) / turns, 3),
+            "summarizer_input_tokens": round(sent.get("history", 0.0)),
+            "summarizer_output_tokens": llm.output_tokens.get("history", 0),
+            "master_llm_calls": master_calls,
+            "master_prompt_tokens_mean": round(sent.get("master", 0.0) / master_calls, 1) if master_calls else None,
+            "final_window_exchanges": windows,
+        }
+
+    if "per_turn" in results and "windowed" in results:
+        old, new = results["per_turn"], results["windowed"]
+        results["summarizer_call_reduction"] = (
+            round(old["summarizer_calls"] / new["summarizer_calls"], 2) if new["summarizer_calls"] else None
+        )
+
+    report = {
+        "benchmark": "history",
+        "config": {
+            "turns": args.turns,
+            "sessions": args.sessions,
+            "window": args.window,
+            "keep": args.keep,
+            "llm_latency": args.llm_latency,
+        },
+        "modes": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# src/benchmarks/bench_itinerary.py
+
+"""
+Benchmark for agents.itinerary.optimize_activities_plan.
+
+Generates random candidate items around a city centre (a share of them
+pinned events with dates and start times) and reports the optimizer's
+latency plus the total walking distance before/after.
+
+    python -m src.benchmarks.bench_itinerary --items 300 --days 5
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from src.agents.itinerary import optimize_activities_plan, _coords, _project, _dist
+
+CITY_CENTRE = (19.0760, 72.8777)  # Mumbai
+
+
+def make_items(n: int, num_days: int, start: date, event_share: float, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    items: List[Dict[str, Any]] = []
+    for i in range(n):
+        item: Dict[str, Any] = {
+            "day": rng.randint(1, num_days),
+            "time_of_day": rng.choice(["morning", "afternoon", "evening"]),
+            "title": f"Activity {i}",
+            "category": "sightseeing",
+            "lat": CITY_CENTRE[0] + rng.gauss(0, 0.08),
+            "lon": CITY_CENTRE[1] + rng.gauss(0, 0.08),
+        }
+        if rng.random() < event_share:
+            item["category"] = "event"
+            item["date"] = (start + timedelta(days=rng.randrange(num_days))).isoformat()
+            item["start_time"] = f"{rng.randint(9, 22):02d}:{rng.choice([0, 30]):02d}"
+        items.append(item)
+    return items
+
+
+def route_km(items: List[Dict[str, Any]]) -> float:
+    """Total distance walked, summed per day in (day, list) order."""
+    by_day: Dict[int, List[Dict[str, Any]]] = {}
+    for it in items:
+        by_day.setdefault(it.get("day") or 0, []).append(it)
+    total = 0.0
+    for day_items in by_day.values():
+        pts = _project([c for it in day_items if (c := _coords(it)) is not None])
+        total += sum(_dist(a, b) for a, b in zip(pts, pts[1:]))
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=300)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--event-share", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    start = date(2025, 3, 10)
+    trip_info = {"num_days": args.days, "start_date": start.isoformat()}
+
+    timings_ms: List[float] = []
+    before_km: List[float] = []
+    after_km: List[float] = []
+    for r in range(args.repeat):
+        items = make_items(args.items, args.days, start, args.event_share, args.seed + r)
+        t0 = time.perf_counter()
+        plan = optimize_activities_plan({"items": items}, trip_info)
+        timings_ms.append((time.perf_counter() - t0) * 1000)
+        before_km.append(route_km(items))
+        after_km.append(route_km(plan["items"]))
+
+    timings_ms.sort()
+    report = {
+        "benchmark": "itinerary",
+        "items": args.items,
+        "days": args.days,
+        "repeat": args.repeat,
+        "latency_ms_p50": round(statistics.median(timings_ms), 3),
+        "latency_ms_max": round(timings_ms[-1], 3),
+        "route_km_before": round(statistics.mean(before_km), 1),
+        "route_km_after": round(statistics.mean(after_km), 1),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
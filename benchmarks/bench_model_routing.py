@@ -0,0 +1,142 @@
+# src/benchmarks/bench_model_routing.py
+
+"""
+Turn latency and per-model usage with every agent on the large model versus
+the per-agent routing of llm/models.py (master and history on the small
+model).
+
+Runs bench_graph's scripted conversations through the real call_llm with one
+benchmarks.stubs.StubChatModel per model profile: the small model answers
+faster (--small-latency) but breaks a fraction of its JSON
+(--small-invalid-json), which call_llm escalates to the large model. The
+local intent fast path is switched off so every turn classifies with the
+master LLM.
+
+Reported per mode: turn latency p50 / p95, master stage latency as seen by
+the turn, and llm.models.model_stats() (calls by agent, latency, tokens and
+escalations per model).
+
+    python -m src.benchmarks.bench_model_routing \
+        --large-latency lognormal:900:0.4 --small-latency lognormal:300:0.4 --small-invalid-json 0.05
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+
+def set_routing(routed: bool) -> None:
+    # llm.models may be loaded under two names (llm.* / src.llm.*).
+    for module in list(sys.modules.values()):
+        if module is not None and getattr(module, "__name__", "").endswith("llm.models"):
+            module.AGENT_MODELS.clear()
+            if routed:
+                module.AGENT_MODELS.update(module.DEFAULT_AGENT_MODELS)
+            else:
+                module.AGENT_MODELS.update({agent: "large" for agent in module.DEFAULT_AGENT_MODELS})
+            module.reset_model_stats()
+
+
+def model_stats() -> Dict[str, Any]:
+    from src.llm.models import model_stats as stats  # the same instance call_llm uses
+
+    return stats()
+
+
+def run_session(app: Any, thread_id: str, script: List[Tuple[str, str]]) -> List[float]:
+    config = {"configurable": {"thread_id": thread_id}}
+    latencies = []
+    for user_input, _ in script:
+        started = time.perf_counter()
+        app.invoke({"user_input": user_input}, config=config)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--sessions-per-worker", type=int, default=3)
+    parser.add_argument("--large-latency", default="lognormal:900:0.4")
+    parser.add_argument("--small-latency", default="lognormal:300:0.4")
+    parser.add_argument("--small-invalid-json", type=float, default=0.05)
+    parser.add_argument("--tool-calls", type=int, default=2, help="Tool calls per specialist response.")
+    parser.add_argument("--tool-latency", default="lognormal:200:0.4")
+    parser.add_argument("--modes", nargs="+", choices=["single", "routed"], default=["single", "routed"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_model_routing_")
+    os.environ["CHECKPOINT_BACKEND"] = "memory"
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tmpdir, "checkpoints.sqlite3")
+    os.environ["INTENT_FAST_PATH"] = "off"
+    os.environ["PLAN_CACHE"] = "0"
+
+    from src.benchmarks.bench_graph import SCRIPTS, percentile
+    from src.benchmarks.stubs import LatencyModel, StubChatModel, StubLLM, install_stubs
+
+    intents = {line: intent for script in SCRIPTS.values() for line, intent in script}
+    names = list(SCRIPTS)
+    results: Dict[str, Any] = {}
+
+    for mode in args.modes:
+        large = StubChatModel(
+            StubLLM(LatencyModel(args.large_latency, seed=args.seed), intents=intents), tool_calls=args.tool_calls
+        )
+        small = StubChatModel(
+            StubLLM(LatencyModel(args.small_latency, seed=args.seed + 1), intents=intents),
+            tool_calls=args.tool_calls,
+            invalid_json=args.small_invalid_json,
+            seed=args.seed,
+        )
+        with install_stubs(
+            tool_latency=args.tool_latency,
+            seed=args.seed,
+            chat_model=large,
+            profile_models={"small": small},
+        ):
+            from src.graph import build_graph
+
+            set_routing(mode == "routed")
+            app = build_graph()
+            jobs = [
+                (f"routing-{mode}-{int(time.time())}-{i}", SCRIPTS[names[i % len(names)]])
+                for i in range(args.concurrency * args.sessions_per_worker)
+            ]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                sessions = list(pool.map(lambda job: run_session(app, *job), jobs))
+            wall = time.perf_counter() - started
+
+        latencies = [ms for session in sessions for ms in session]
+        results[mode] = {
+            "turns": len(latencies),
+            "wall_seconds": round(wall, 2),
+            "turn_ms": {
+                "p50": round(percentile(latencies, 0.50), 1),
+                "p95": round(percentile(latencies, 0.95), 1),
+            },
+            "models": model_stats(),
+        }
+
+    report = {
+        "benchmark": "model_routing",
+        "config": {
+            "concurrency": args.concurrency,
+            "large_latency": args.large_latency,
+            "small_latency": args.small_latency,
+            "small_invalid_json": args.small_invalid_json,
+            "tool_latency": args.tool_latency,
+        },
+        "modes": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
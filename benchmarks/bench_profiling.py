@@ -0,0 +1,148 @@
+# src/benchmarks/bench_profiling.py
+
+"""
+Cost and output of the turn profiler (profiling.py).
+
+Runs bench_graph's scripted conversations through the real graph and
+call_llm, with benchmarks.stubs standing in for Bedrock and the tools, once
+per mode:
+
+- off:        no ProfilingApp
+- sampler:    stacks sampled during every turn, nothing captured (threshold
+              never reached) -- the standing cost of PROFILE_SLOW_MS
+- capture:    every turn captured and written (threshold 0.001 ms)
+- tracemalloc: tracemalloc on, one turn in --sample-n captured with
+              allocation snapshots at its start and end
+
+State sizes are tracked in every mode but "off". Reported per mode: turns
+per second, turn latency p50 / p95, profiles written, and for the capture
+modes the samples per area summed over all profiles, the functions with the
+most self samples in the last profile and, with tracemalloc, its top
+allocation sites. Also the state size stats after the last mode.
+
+    python -m src.benchmarks.bench_profiling --concurrency 4 --sessions-per-worker 5
+"""
+
+import argparse
+import glob
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+MODES = ("off", "sampler", "capture", "tracemalloc")
+
+
+def run_session(app: Any, thread_id: str, script: List[Tuple[str, str]]) -> List[float]:
+    config = {"configurable": {"thread_id": thread_id}}
+    latencies = []
+    for user_input, _ in script:
+        started = time.perf_counter()
+        app.invoke({"user_input": user_input}, config=config)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--sessions-per-worker", type=int, default=5)
+    parser.add_argument("--llm-latency", default="lognormal:30:0.3")
+    parser.add_argument("--tool-latency", default="lognormal:10:0.3")
+    parser.add_argument("--interval-ms", type=float, default=10.0)
+    parser.add_argument("--sample-n", type=int, default=10, help="Turns per captured turn in tracemalloc mode.")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_profiling_")
+    os.environ["CHECKPOINT_BACKEND"] = "memory"
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tmpdir, "checkpoints.sqlite3")
+    os.environ["INTENT_FAST_PATH"] = "off"
+    os.environ["PLAN_CACHE"] = "0"
+
+    from src.benchmarks.bench_graph import SCRIPTS, percentile
+    from src.benchmarks.stubs import LatencyModel, StubChatModel, StubLLM, install_stubs
+    from src.profiling import ProfilingApp, StateSizeTracker, TurnProfiler
+
+    intents = {line: intent for script in SCRIPTS.values() for line, intent in script}
+    names = list(SCRIPTS)
+    chat_model = StubChatModel(StubLLM(LatencyModel(args.llm_latency, seed=args.seed), intents=intents))
+    results: Dict[str, Any] = {}
+    states = StateSizeTracker()
+
+    with install_stubs(tool_latency=args.tool_latency, seed=args.seed, chat_model=chat_model):
+        from src.graph import build_graph
+
+        app = build_graph()
+        for mode in args.modes:
+            directory = os.path.join(tmpdir, mode)
+            profiler = None
+            if mode != "off":
+                profiler = TurnProfiler(
+                    slow_ms={"sampler": 1e9, "capture": 0.001}.get(mode, 0.0),
+                    sample_n=args.sample_n if mode == "tracemalloc" else 0,
+                    directory=directory,
+                    interval_ms=args.interval_ms,
+                    allocations=mode == "tracemalloc",
+                )
+            target = app if profiler is None else ProfilingApp(app, profiler, states)
+            jobs = [
+                (f"profiling-{mode}-{int(time.time())}-{i}", SCRIPTS[names[i % len(names)]])
+                for i in range(args.concurrency * args.sessions_per_worker)
+            ]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                latencies = [ms for session in pool.map(lambda job: run_session(target, *job), jobs) for ms in session]
+            wall = time.perf_counter() - started
+            if profiler is not None:
+                profiler.flush()
+            if mode == "tracemalloc":
+                import tracemalloc
+
+                tracemalloc.stop()
+
+            profiles = sorted(glob.glob(os.path.join(directory, "*.json")), key=os.path.getmtime)
+            result: Dict[str, Any] = {
+                "turns": len(latencies),
+                "turns_per_s": round(len(latencies) / wall, 1),
+                "turn_ms_p50": round(percentile(latencies, 0.50), 1),
+                "turn_ms_p95": round(percentile(latencies, 0.95), 1),
+                "profiles": len(profiles),
+            }
+            if profiles:
+                areas: Counter = Counter()
+                for path in profiles:
+                    with open(path, encoding="utf-8") as f:
+                        for area, value in json.load(f)["cpu"]["areas"].items():
+                            areas[area] += value["samples"]
+                with open(profiles[-1], encoding="utf-8") as f:
+                    last = json.load(f)
+                result["area_samples"] = dict(areas.most_common())
+                result["last_profile"] = {
+                    "turn_id": last["turn_id"],
+                    "ms": last["ms"],
+                    "top_self": last["cpu"]["top_self"][:5],
+                    "top_sites": (last.get("memory") or {}).get("top_sites", [])[:5],
+                }
+            results[mode] = result
+
+    report = {
+        "benchmark": "profiling",
+        "config": {
+            "concurrency": args.concurrency,
+            "sessions": args.concurrency * args.sessions_per_worker,
+            "llm_latency": args.llm_latency,
+            "interval_ms": args.interval_ms,
+        },
+        "modes": results,
+        "state_sizes": states.stats(top=3),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
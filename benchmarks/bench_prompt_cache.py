@@ -0,0 +1,142 @@
+# src/benchmarks/bench_prompt_cache.py
+
+"""
+Input tokens processed per turn with and without prompt caching of the
+static system prompts (see llm/models.py and call_llm).
+
+Runs bench_graph's scripted conversations through the real call_llm with one
+benchmarks.stubs.StubChatModel per model profile, each with its own
+FakePromptCache: a request whose system prompt ends in a cache point reads
+that prefix from the cache if the same prefix was sent within --ttl seconds,
+and writes it otherwise. The local intent fast path is switched off so every
+turn calls the master LLM.
+
+Reported per mode: llm.models.model_stats() tokens per profile (input,
+cache read, cache write, uncached = input - read - write), the fakes'
+hit / write counts, and input cost relative to no caching, with cache reads
+billed at --read-cost and writes at --write-cost of an uncached token.
+
+    python -m src.benchmarks.bench_prompt_cache --concurrency 8 --sessions-per-worker 3
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+
+def set_prompt_cache(enabled: bool) -> None:
+    # llm.models may be loaded under two names (llm.* / src.llm.*).
+    for module in list(sys.modules.values()):
+        if module is not None and getattr(module, "__name__", "").endswith("llm.models"):
+            module.LLM_PROMPT_CACHE = "1" if enabled else "0"
+            module.reset_model_stats()
+
+
+def model_stats() -> Dict[str, Any]:
+    from src.llm.models import model_stats as stats  # the same instance call_llm uses
+
+    return stats()
+
+
+def run_session(app: Any, thread_id: str, script: List[Tuple[str, str]]) -> None:
+    config = {"configurable": {"thread_id": thread_id}}
+    for user_input, _ in script:
+        app.invoke({"user_input": user_input}, config=config)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--sessions-per-worker", type=int, default=3)
+    parser.add_argument("--llm-latency", default="fixed:20")
+    parser.add_argument("--tool-calls", type=int, default=2, help="Tool calls per specialist response.")
+    parser.add_argument("--ttl", type=float, default=300.0, help="Cache entry lifetime since last use (seconds).")
+    parser.add_argument("--min-tokens", type=int, default=0, help="Fake cache's minimum prefix length.")
+    parser.add_argument("--read-cost", type=float, default=0.1)
+    parser.add_argument("--write-cost", type=float, default=1.25)
+    parser.add_argument("--modes", nargs="+", choices=["off", "on"], default=["off", "on"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_prompt_cache_")
+    os.environ["CHECKPOINT_BACKEND"] = "memory"
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tmpdir, "checkpoints.sqlite3")
+    os.environ["INTENT_FAST_PATH"] = "off"
+    os.environ["PLAN_CACHE"] = "0"
+
+    from src.benchmarks.bench_graph import SCRIPTS
+    from src.benchmarks.stubs import FakePromptCache, LatencyModel, StubChatModel, StubLLM, install_stubs
+
+    intents = {line: intent for script in SCRIPTS.values() for line, intent in script}
+    names = list(SCRIPTS)
+    results: Dict[str, Any] = {}
+
+    for mode in args.modes:
+        caches = {profile: FakePromptCache(ttl_s=args.ttl, min_tokens=args.min_tokens) for profile in ("large", "small")}
+        models = {
+            profile: StubChatModel(
+                StubLLM(LatencyModel(args.llm_latency, seed=args.seed + i), intents=intents),
+                tool_calls=args.tool_calls,
+                prompt_cache=cache,
+            )
+            for i, (profile, cache) in enumerate(caches.items())
+        }
+        with install_stubs(seed=args.seed, chat_model=models["large"], profile_models=models):
+            from src.graph import build_graph
+
+            set_prompt_cache(mode == "on")
+            app = build_graph()
+            jobs = [
+                (f"prompt-cache-{mode}-{int(time.time())}-{i}", SCRIPTS[names[i % len(names)]])
+                for i in range(args.concurrency * args.sessions_per_worker)
+            ]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                list(pool.map(lambda job: run_session(app, *job), jobs))
+            wall = time.perf_counter() - started
+            stats = model_stats()
+
+        tokens: Dict[str, Any] = {}
+        for profile, s in stats["profiles"].items():
+            read, write = s["cache_read_tokens"], s["cache_write_tokens"]
+            uncached = s["input_tokens"] - read - write
+            tokens[profile] = {
+                "calls": s["calls"],
+                "input_tokens": s["input_tokens"],
+                "cache_read_tokens": read,
+                "cache_write_tokens": write,
+                "uncached_tokens": uncached,
+                "cache_read_share": s["cache_read_share"],
+                "relative_input_cost": (
+                    round((uncached + args.read_cost * read + args.write_cost * write) / s["input_tokens"], 3)
+                    if s["input_tokens"]
+                    else None
+                ),
+            }
+        results[mode] = {
+            "wall_seconds": round(wall, 2),
+            "tokens": tokens,
+            "fake_cache": {profile: cache.stats() for profile, cache in caches.items()},
+        }
+
+    report = {
+        "benchmark": "prompt_cache",
+        "config": {
+            "concurrency": args.concurrency,
+            "sessions": args.concurrency * args.sessions_per_worker,
+            "ttl": args.ttl,
+            "read_cost": args.read_cost,
+            "write_cost": args.write_cost,
+        },
+        "modes": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
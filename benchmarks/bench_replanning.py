@@ -0,0 +1,152 @@
+# src/benchmarks/bench_replanning.py
+
+"""
+Specialist LLM calls and output tokens with incremental re-planning
+(agents/replanning.py) on and off.
+
+Runs scripted multi-turn conversations in which users follow up on plans
+they were already shown ("what time does the first one start?") or ask for
+one more thing ("what about food tours?"), through the real graph with
+benchmarks.stubs.StubLLM. The stub master maps every line to the scripted
+intent (the local intent fast path is switched off so routing is the same
+in both modes). Reported per mode: LLM calls and estimated output tokens per
+agent, turn latency, and how often each re-planning decision was taken.
+
+    python -m src.benchmarks.bench_replanning --llm-latency lognormal:800:0.4
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+SCRIPTS: Dict[str, List[Tuple[str, str]]] = {
+    "activities_follow_ups": [
+        ("I'm going to Mumbai in March", "generic_chat"),
+        ("any concerts or festivals while I'm there?", "activities_q"),
+        ("what time does the first one start?", "activities_q"),
+        ("where is the second one?", "activities_q"),
+        ("what about food tours?", "activities_q"),
+        ("how long is that one?", "activities_q"),
+    ],
+    "logistics_follow_ups": [
+        ("I'm flying from Chennai to Mumbai in March", "generic_chat"),
+        ("which flights should I look at?", "logistics_q"),
+        ("how long is the flight?", "logistics_q"),
+        ("is there a train option too?", "logistics_q"),
+        ("how much does it cost?", "logistics_q"),
+    ],
+    "plan_then_questions": [
+        ("I want to visit Mumbai for 3 days in March", "generic_chat"),
+        ("make me a full 3-day itinerary with flights from Chennai", "plan_full"),
+        ("what time does the first one start?", "activities_q"),
+        ("can you add a museum?", "activities_q"),
+        ("which one is the fastest?", "logistics_q"),
+    ],
+}
+
+
+def set_replanning(enabled: bool) -> None:
+    # replanning may be loaded under two names (agents.* / src.agents.*).
+    for module in list(sys.modules.values()):
+        if module is not None and getattr(module, "__name__", "").endswith("replanning"):
+            setattr(module, "REPLANNING", enabled)
+
+
+def run_session(app: Any, thread_id: str, script: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    config = {"configurable": {"thread_id": thread_id}}
+    turns = []
+    for user_input, intent in script:
+        started = time.perf_counter()
+        final = app.invoke({"user_input": user_input}, config=config)
+        turns.append(
+            {
+                "intent": intent,
+                "ms": (time.perf_counter() - started) * 1000.0,
+                "replan": dict((final.get("metadata") or {}).get("replan") or {}),
+            }
+        )
+    return turns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--sessions-per-worker", type=int, default=3)
+    parser.add_argument("--llm-latency", default="lognormal:300:0.4")
+    parser.add_argument("--tool-latency", default="fixed:100")
+    parser.add_argument("--modes", nargs="+", choices=["full", "incremental"], default=["full", "incremental"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_replanning_")
+    os.environ["CHECKPOINT_BACKEND"] = "memory"
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tmpdir, "checkpoints.sqlite3")
+    os.environ["INTENT_FAST_PATH"] = "off"
+    os.environ["PLAN_CACHE"] = "0"
+
+    from src.benchmarks.bench_graph import percentile
+    from src.benchmarks.stubs import LatencyModel, StubLLM, install_stubs
+
+    intents = {line: intent for script in SCRIPTS.values() for line, intent in script}
+    names = list(SCRIPTS)
+    results: Dict[str, Any] = {}
+
+    for mode in args.modes:
+        llm = StubLLM(LatencyModel(args.llm_latency, seed=args.seed), intents=intents)
+        with install_stubs(llm, tool_latency=args.tool_latency, seed=args.seed):
+            from src.graph import build_graph
+
+            set_replanning(mode == "incremental")
+            app = build_graph()
+            jobs = [
+                (f"replan-{mode}-{int(time.time())}-{i}", SCRIPTS[names[i % len(names)]])
+                for i in range(args.concurrency * args.sessions_per_worker)
+            ]
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                sessions = list(pool.map(lambda job: run_session(app, *job), jobs))
+
+        turns = [turn for session in sessions for turn in session]
+        latencies = [turn["ms"] for turn in turns if turn["intent"] != "generic_chat"]
+        specialist_calls = sum(llm.calls.get(agent, 0) for agent in ("activities", "logistics"))
+        specialist_tokens = sum(llm.output_tokens.get(agent, 0) for agent in ("activities", "logistics"))
+        results[mode] = {
+            "turns": len(turns),
+            "llm_calls": dict(sorted(llm.calls.items())),
+            "output_tokens": dict(sorted(llm.output_tokens.items())),
+            "specialist_calls": specialist_calls,
+            "specialist_output_tokens": specialist_tokens,
+            "specialist_turn_ms": {
+                "p50": round(percentile(latencies, 0.50), 1),
+                "p95": round(percentile(latencies, 0.95), 1),
+            },
+            "replan_decisions": dict(Counter(d for turn in turns for d in turn["replan"].values())),
+        }
+
+    if "full" in results and "incremental" in results:
+        full, inc = results["full"], results["incremental"]
+        results["saved"] = {
+            "specialist_calls": full["specialist_calls"] - inc["specialist_calls"],
+            "specialist_output_tokens": full["specialist_output_tokens"] - inc["specialist_output_tokens"],
+        }
+
+    report = {
+        "benchmark": "replanning",
+        "config": {
+            "concurrency": args.concurrency,
+            "sessions": args.concurrency * args.sessions_per_worker,
+            "llm_latency": args.llm_latency,
+            "tool_latency": args.tool_latency,
+        },
+        "modes": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
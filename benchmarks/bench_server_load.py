@@ -0,0 +1,202 @@
+# src/benchmarks/bench_server_load.py
+
+"""
+Load-test client for serving/server.py.
+
+Drives `--sessions` simulated users against a running server. Each session
+has its own session_id and sends `--turns` messages one after another (as a
+real user would), while all sessions run concurrently. With --burst N a
+session fires N messages at once, to exercise per-session ordering and
+coalescing. Reports turn latency percentiles, time to first streamed event
+(sse / ws modes), throughput, errors, and the server's own /metrics.
+
+    python -m src.serving.server --port 8000 &
+    python -m src.benchmarks.bench_server_load --url http://localhost:8000 \
+        --sessions 50 --turns 4 --mode sse
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+SCRIPT = [
+    "hi, I'm planning a trip to Mumbai in March",
+    "any concerts or big events while I'm there?",
+    "how reliable are flights from Chennai to Mumbai?",
+    "make me a 3-day itinerary",
+    "thanks!",
+]
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.first_event: List[float] = []
+        self.errors: Dict[str, int] = {}
+
+    def error(self, kind: str) -> None:
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            resp = await client.get("/readyz")
+            if resp.status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"server not ready after {timeout:.0f}s")
+
+
+async def http_turn(client: httpx.AsyncClient, session_id: str, message: str, rec: Recorder) -> None:
+    started = time.perf_counter()
+    resp = await client.post("/v1/chat", json={"session_id": session_id, "message": message})
+    if resp.status_code != 200:
+        rec.error(f"http_{resp.status_code}")
+        return
+    rec.latencies.append((time.perf_counter() - started) * 1000.0)
+
+
+async def sse_turn(client: httpx.AsyncClient, session_id: str, message: str, rec: Recorder) -> None:
+    started = time.perf_counter()
+    first: Optional[float] = None
+    body = {"session_id": session_id, "message": message}
+    async with client.stream("POST", "/v1/chat/stream", json=body) as resp:
+        if resp.status_code != 200:
+            rec.error(f"http_{resp.status_code}")
+            return
+        async for line in resp.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            if first is None:
+                first = time.perf_counter()
+            event = json.loads(line[6:])
+            if event.get("event") == "error":
+                rec.error("turn")
+                return
+            if event.get("event") == "reply":
+                break
+    rec.latencies.append((time.perf_counter() - started) * 1000.0)
+    if first is not None:
+        rec.first_event.append((first - started) * 1000.0)
+
+
+async def run_session_ws(url: str, turns: int, rec: Recorder) -> None:
+    import websockets  # only needed for --mode ws
+
+    ws_url = url.replace("http", "ws", 1) + f"/v1/ws?session_id=load-{uuid.uuid4().hex[:12]}"
+    async with websockets.connect(ws_url) as ws:
+        json.loads(await ws.recv())  # {"event": "session", ...}
+        for i in range(turns):
+            started = time.perf_counter()
+            first: Optional[float] = None
+            await ws.send(json.dumps({"message": SCRIPT[i % len(SCRIPT)]}))
+            while True:
+                event = json.loads(await ws.recv())
+                if first is None:
+                    first = time.perf_counter()
+                if event.get("event") == "error":
+                    rec.error("turn")
+                    break
+                if event.get("event") == "reply":
+                    rec.latencies.append((time.perf_counter() - started) * 1000.0)
+                    rec.first_event.append((first - started) * 1000.0)
+                    break
+
+
+async def run_session(client: httpx.AsyncClient, mode: str, turns: int, burst: int, rec: Recorder) -> None:
+    session_id = f"load-{uuid.uuid4().hex[:12]}"
+    turn = http_turn if mode == "http" else sse_turn
+
+    async def one(i: int) -> None:
+        try:
+            await turn(client, session_id, SCRIPT[i % len(SCRIPT)], rec)
+        except httpx.HTTPError as exc:
+            rec.error(type(exc).__name__)
+
+    for i in range(0, turns, burst):
+        await asyncio.gather(*(one(j) for j in range(i, min(i + burst, turns))))
+
+
+def percentiles(values: List[float]) -> Dict[str, Any]:
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pct(p: float) -> float:
+        return round(values[min(len(values) - 1, int(p * len(values)))], 1)
+
+    return {
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "max": round(values[-1], 1),
+        "mean": round(statistics.mean(values), 1),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rec = Recorder()
+    connections = args.sessions * max(1, args.burst)
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        await wait_ready(client, args.ready_timeout)
+
+        started = time.perf_counter()
+        if args.mode == "ws":
+            sessions = [run_session_ws(args.url, args.turns, rec) for _ in range(args.sessions)]
+        else:
+            sessions = [
+                run_session(client, args.mode, args.turns, args.burst, rec) for _ in range(args.sessions)
+            ]
+        await asyncio.gather(*sessions)
+        wall = time.perf_counter() - started
+
+        server_metrics = (await client.get("/metrics")).json()
+
+    return {
+        "benchmark": "server_load",
+        "mode": args.mode,
+        "sessions": args.sessions,
+        "turns_per_session": args.turns,
+        "burst": args.burst,
+        "completed_turns": len(rec.latencies),
+        "errors": rec.errors,
+        "wall_seconds": round(wall, 2),
+        "turns_per_second": round(len(rec.latencies) / wall, 2) if wall else None,
+        "turn_latency_ms": percentiles(rec.latencies),
+        "first_event_ms": percentiles(rec.first_event),
+        "server": server_metrics,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--mode", choices=["http", "sse", "ws"], default="http")
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=1,
+        help="Messages a session sends at once without waiting for replies (http/sse).",
+    )
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout (s).")
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# src/benchmarks/bench_state_lifecycle.py
+
+"""
+Bytes per checkpoint and specialist prompt size, with and without the
+state lifecycle policy (state_policy.py + compressed checkpoint blobs).
+
+Replays a scripted 30-turn conversation without any LLM: each turn writes
+what the agents would write (plans, tool results, summaries, metadata).
+
+- "before": keys accumulate across turns, as with the original graph once
+  tools write their results; blobs are plain JsonPlusSerializer output.
+- "after":  begin_turn() runs at the start of every turn, tool results are
+  capped, and blobs go through CompressedSerializer.
+
+Prompt tokens are estimated as len(json) / 4 for the specialist payload
+(user_query, trip_info, preferences, existing_plan, tool_results).
+
+    python -m src.benchmarks.bench_state_lifecycle --turns 30
+"""
+
+import argparse
+import copy
+import json
+import random
+import statistics
+from typing import Any, Dict, List
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.persistence.serde import CompressedSerializer
+from src.state_policy import begin_turn, cap_tool_results
+
+SCRIPT = [
+    ("hi there", "generic_chat"),
+    ("I'm going to Mumbai in March", "generic_chat"),
+    ("any big events in Mumbai in March?", "activities_q"),
+    ("what about food tours?", "activities_q"),
+    ("how do I get there from Chennai?", "logistics_q"),
+    ("make me a 3-day itinerary", "plan_full"),
+    ("thanks!", "generic_chat"),
+]
+
+
+def fake_events(turn: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [
+        {
+            "name": f"Event {turn}-{i}",
+            "venue": "NSCI Dome",
+            "city": "Mumbai",
+            "country": "India",
+            "date": f"2025-03-{rng.randint(1, 28):02d}",
+            "time": "19:30:00",
+            "lat": 19.0 + rng.random() / 10,
+            "lon": 72.8 + rng.random() / 10,
+        }
+        for i in range(10)
+    ]
+
+
+def simulate_turn(state: Dict[str, Any], turn: int, rng: random.Random, accumulate: bool) -> Dict[str, Any]:
+    """Write what master / specialists / history would write for one turn."""
+    user_input, intent = SCRIPT[turn % len(SCRIPT)]
+    state["user_input"] = user_input
+    state["intent"] = intent
+    state["trip_info"] = {"destination": "Mumbai", "travel_month": "March", "num_days": 3, "origin": "Chennai"}
+    state["preferences"] = {"budget_level": "medium", "interests": ["food", "music"]}
+    state["master_plan"] = {
+        "intent": intent,
+        "needs_specialist": intent != "generic_chat",
+        "assistant_message": "Sure, here is what I found for your trip. " * 2,
+        "trip_info_updates": {},
+        "preferences_updates": {},
+    }
+    metadata = state.setdefault("metadata", {}) or {}
+    metadata["specialist_targets"] = ["activities", "logistics"]
+    metadata["specialist_index"] = 2
+    state["metadata"] = metadata
+
+    if intent in ("activities_q", "plan_full"):
+        events = fake_events(turn, rng)
+        result = {
+            "tool_name": "activities_events_tool",
+            "raw_output": json.dumps({"tool": "activities_events_tool", "results": events}),
+            "parsed": {"results": events},
+        }
+        prev = state.get("activities_tools_results") or []
+        state["activities_tools_results"] = (prev if accumulate else []) + [result]
+        items = (state.get("activities_plan") or {}).get("items", [])
+        items = items + [
+            {"day": 1, "time_of_day": "evening", "title": e["name"], "address": "NSCI Dome, Mumbai",
+             "lat": e["lat"], "lon": e["lon"], "date": e["date"], "notes": "Good fit for music lovers."}
+            for e in events[:6]
+        ]
+        state["activities_plan"] = {"items": items}
+
+    if intent in ("logistics_q", "plan_full"):
+        rag_text = "IndiGo (6E) at Mumbai (BOM) in 2024-01: 4200 arriving flights, 610 delayed 15+ minutes.\n\n" * 5
+        prev = state.get("logistics_tools_results") or []
+        state["logistics_tools_results"] = (prev if accumulate else []) + [
+            {"tool_name": "logistics_rag_tool", "raw_output": rag_text}
+        ]
+        legs = (state.get("logistics_plan") or {}).get("legs", [])
+        state["logistics_plan"] = {"legs": legs + [
+            {"day": 1, "mode": "flight", "from_place": "Chennai (MAA)", "to_place": "Mumbai (BOM)",
+             "duration_hours": 2.0, "carrier": "IndiGo", "notes": "Nonstop morning flight."}
+        ]}
+
+    state["master_message"] = "Here are some ideas for your trip in Mumbai. " * 10
+    summaries = state.get("history_summaries") or []
+    state["history_summaries"] = summaries + ["User plans a 3-day Mumbai trip in March with food and music."]
+    state["history_summary"] = state["history_summaries"][-1]
+    return state
+
+
+def specialist_prompt_tokens(state: Dict[str, Any], plan_key: str, results_key: str, capped: bool) -> int:
+    results = state.get(results_key) or []
+    payload = {
+        "user_query": state.get("user_input"),
+        "trip_info": state.get("trip_info"),
+        "preferences": state.get("preferences"),
+        "existing_plan": state.get(plan_key) or {},
+        "tool_results": cap_tool_results(results) if capped else results,
+    }
+    return len(json.dumps(payload)) // 4
+
+
+def run(turns: int, with_policy: bool) -> Dict[str, Any]:
+    rng = random.Random(0)
+    serde = CompressedSerializer() if with_policy else JsonPlusSerializer()
+    state: Dict[str, Any] = {}
+    checkpoint_bytes: List[int] = []
+    prompt_tokens: List[int] = []
+
+    for turn in range(turns):
+        if with_policy:
+            state = dict(begin_turn(copy.deepcopy(state)))  # type: ignore[arg-type]
+        state = simulate_turn(state, turn, rng, accumulate=not with_policy)
+        checkpoint_bytes.append(len(serde.dumps_typed(state)[1]))
+        intent = state["intent"]
+        tokens = 0
+        if intent in ("activities_q", "plan_full"):
+            tokens += specialist_prompt_tokens(state, "activities_plan", "activities_tools_results", with_policy)
+        if intent in ("logistics_q", "plan_full"):
+            tokens += specialist_prompt_tokens(state, "logistics_plan", "logistics_tools_results", with_policy)
+        prompt_tokens.append(tokens)
+
+    specialist_turns = [t for t in prompt_tokens if t]
+    return {
+        "bytes_per_checkpoint_mean": int(statistics.mean(checkpoint_bytes)),
+        "bytes_per_checkpoint_last": checkpoint_bytes[-1],
+        "specialist_prompt_tokens_mean": int(statistics.mean(specialist_turns)) if specialist_turns else 0,
+        "specialist_prompt_tokens_last": specialist_turns[-1] if specialist_turns else 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=30)
+    args = parser.parse_args()
+
+    report = {
+        "benchmark": "state_lifecycle",
+        "turns": args.turns,
+        "before": run(args.turns, with_policy=False),
+        "after": run(args.turns, with_policy=True),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# src/benchmarks/bench_ticketmaster_parse.py
+
+"""
+CPU time and peak memory of Ticketmaster response parsing.
+
+Compares:
+- baseline:    json.loads + _simplify_ticketmaster_events (what resp.json() did)
+- fast:        parse_ticketmaster_response (orjson when installed)
+- low_memory:  parse_ticketmaster_response(low_memory=True)
+
+Uses a recorded response if --fixture is given, otherwise a synthetic page
+shaped like a real Discovery API page (images, classifications, sales,
+promoters, attractions...).
+
+    python -m src.benchmarks.bench_ticketmaster_parse --events 200 --repeat 30
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from src.tools.events import (
+    _simplify_ticketmaster_events,
+    orjson,
+    parse_ticketmaster_response,
+)
+
+
+def synthetic_event(i: int) -> Dict[str, Any]:
+    image = {
+        "ratio": "16_9",
+        "url": f"https://s1.ticketm.net/dam/a/{i:06d}/" + "b" * 60 + ".jpg",
+        "width": 2048,
+        "height": 1152,
+        "fallback": False,
+    }
+    return {
+        "name": f"Event {i}",
+        "type": "event",
+        "id": f"Z7r9jZ1A{i:08d}",
+        "url": "https://www.ticketmaster.in/event/" + "a" * 60,
+        "locale": "en-us",
+        "images": [image] * 10,
+        "sales": {
+            "public": {"startDateTime": "2025-01-01T00:00:00Z", "endDateTime": "2025-03-10T14:00:00Z"},
+            "presales": [{"name": "Presale " * 4, "startDateTime": "2024-12-01T00:00:00Z"}] * 3,
+        },
+        "dates": {
+            "start": {"localDate": "2025-03-10", "localTime": "19:30:00", "dateTime": "2025-03-10T14:00:00Z"},
+            "timezone": "Asia/Kolkata",
+            "status": {"code": "onsale"},
+        },
+        "classifications": [
+            {
+                "primary": True,
+                "segment": {"id": "KZFzniwnSyZfZ7v7nJ", "name": "Music"},
+                "genre": {"id": "KnvZfZ7vAeA", "name": "Rock"},
+                "subGenre": {"id": "KZazBEonSMnZfZ7v6F1", "name": "Pop"},
+            }
+        ],
+        "promoter": {"id": "494", "name": "PROMOTED BY VENUE", "description": "PROMOTED BY VENUE / NTL / IN"},
+        "priceRanges": [{"type": "standard", "currency": "INR", "min": 999.0, "max": 19999.0}],
+        "info": "Lorem ipsum dolor sit amet. " * 15,
+        "pleaseNote": "Please note. " * 20,
+        "_links": {"self": {"href": f"/discovery/v2/events/{i}"}},
+        "_embedded": {
+            "venues": [
+                {
+                    "name": "NSCI Dome",
+                    "id": "KovZ917A",
+                    "images": [image],
+                    "postalCode": "400018",
+                    "timezone": "Asia/Kolkata",
+                    "city": {"name": "Mumbai"},
+                    "state": {"name": "Maharashtra"},
+                    "country": {"name": "India", "countryCode": "IN"},
+                    "address": {"line1": "Worli"},
+                    "location": {"longitude": "72.8170", "latitude": "19.0008"},
+                    "upcomingEvents": {"_total": 12, "ticketmaster": 12},
+                }
+            ],
+            "attractions": [
+                {"name": f"Artist {i}", "images": [image] * 10, "classifications": [{"segment": {"name": "Music"}}]}
+            ],
+        },
+    }
+
+
+def synthetic_page(n: int) -> bytes:
+    data = {
+        "_embedded": {"events": [synthetic_event(i) for i in range(n)]},
+        "page": {"size": n, "totalElements": n * 5, "totalPages": 5, "number": 0},
+    }
+    return json.dumps(data).encode("utf-8")
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    fn()  # warm-up
+    t0 = time.process_time()
+    for _ in range(repeat):
+        fn()
+    cpu_ms = (time.process_time() - t0) / repeat * 1000
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"cpu_ms": round(cpu_ms, 3), "peak_mb": round(peak / 1e6, 3)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fixture", default=None, help="Recorded Discovery API response (JSON).")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    if args.fixture:
+        with open(args.fixture, "rb") as f:
+            raw = f.read()
+    else:
+        raw = synthetic_page(args.events)
+
+    baseline = _simplify_ticketmaster_events(json.loads(raw))
+    variants: Dict[str, Callable[[], List[Dict[str, Any]]]] = {
+        "baseline": lambda: _simplify_ticketmaster_events(json.loads(raw)),
+        "fast": lambda: parse_ticketmaster_response(raw)[0],
+        "low_memory": lambda: parse_ticketmaster_response(raw, low_memory=True)[0],
+    }
+
+    report: Dict[str, Any] = {
+        "benchmark": "ticketmaster_parse",
+        "response_mb": round(len(raw) / 1e6, 3),
+        "events": len(baseline),
+        "orjson": orjson is not None,
+    }
+    for name, fn in variants.items():
+        if fn() != baseline:
+            raise AssertionError(f"{name} produced different events than the baseline")
+        report[name] = measure(fn, args.repeat)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# src/benchmarks/bench_tool_calls.py
+
+"""
+Turn latency with the specialists' tool calls executed in parallel vs one
+by one.
+
+Runs bench_graph's scripted conversations through the real call_llm (tool
+loop included) with benchmarks.stubs.StubChatModel in place of Bedrock: each
+activities / logistics call first asks for --tool-calls searches, which are
+executed by llm.tool_runner against the stubbed events tool / retriever and
+fed back in one follow-up call. Every mode runs on the same graph; only
+tool_runner.TOOL_PARALLEL changes.
+
+Speculative prefetch (agents/speculation.py) is switched off so specialist
+turns only pay for the model's own tool calls.
+
+    python -m src.benchmarks.bench_tool_calls --tool-calls 3 --tool-latency fixed:300
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+
+def set_parallel(parallel: bool) -> None:
+    # tool_runner may be loaded under two names (llm.* / src.llm.*).
+    for module in list(sys.modules.values()):
+        if module is not None and getattr(module, "__name__", "").endswith("tool_runner"):
+            setattr(module, "TOOL_PARALLEL", parallel)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tool-calls", type=int, default=3, help="Tool calls per specialist response.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--sessions-per-worker", type=int, default=2)
+    parser.add_argument("--llm-latency", default="fixed:50")
+    parser.add_argument("--tool-latency", default="lognormal:300:0.4")
+    parser.add_argument("--retriever-latency", default="lognormal:150:0.4")
+    parser.add_argument("--modes", nargs="+", choices=["parallel", "sequential"], default=["sequential", "parallel"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_tools_")
+    os.environ["CHECKPOINT_BACKEND"] = "memory"
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tmpdir, "checkpoints.sqlite3")
+    os.environ["SPECULATIVE_PREFETCH"] = "0"
+
+    from src.benchmarks.bench_graph import SCRIPTS, run_level
+    from src.benchmarks.stubs import LatencyModel, StubChatModel, StubLLM, install_stubs
+
+    intents = {line: intent for script in SCRIPTS.values() for line, intent in script}
+    text = StubLLM(LatencyModel(args.llm_latency, seed=args.seed), intents=intents)
+    chat_model = StubChatModel(text, tool_calls=args.tool_calls)
+
+    results: Dict[str, Any] = {}
+    with install_stubs(
+        tool_latency=args.tool_latency,
+        retriever_latency=args.retriever_latency,
+        seed=args.seed,
+        chat_model=chat_model,
+    ):
+        from src.graph import build_graph
+        from src.llm.tool_runner import tool_stats
+
+        app = build_graph()
+        for mode in args.modes:
+            set_parallel(mode == "parallel")
+            before = tool_stats()
+            level = run_level(app, args.concurrency, args.sessions_per_worker, f"{mode}-{int(time.time())}")
+            after = tool_stats()
+            results[mode] = {
+                "turn_ms": level["turn_ms"],
+                "turn_ms_p50_by_intent": level["turn_ms_p50_by_intent"],
+                "turns_per_second": level["turns_per_second"],
+                "specialist_ms_mean": {
+                    node: level["node_ms"][node]["mean"] for node in ("activities", "logistics") if node in level["node_ms"]
+                },
+                "tools": {k: round(after[k] - before[k], 1) for k in ("rounds", "calls", "timeouts", "tool_ms", "wall_ms")},
+            }
+
+    report = {
+        "benchmark": "tool_calls",
+        "config": {
+            "tool_calls": args.tool_calls,
+            "concurrency": args.concurrency,
+            "llm_latency": args.llm_latency,
+            "tool_latency": args.tool_latency,
+            "retriever_latency": args.retriever_latency,
+        },
+        "llm_calls": dict(sorted(text.calls.items())),
+        "modes": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# src/benchmarks/bench_tracing.py
+
+"""
+Cost of span tracing (tracing.py), off and on.
+
+Two measurements:
+
+- per span: time to open and close one span() -- the no-op span when
+  tracing is off, a real one (ids, attributes, collection, export to
+  os.devnull) when on;
+- per turn: bench_graph's scripted conversations through the real graph and
+  call_llm with benchmarks.stubs standing in for Bedrock and the tools, at
+  --llm-latency (default 0, so the graph's own overhead is what is measured),
+  with tracing off and then on, writing OTLP JSON to a temporary file.
+
+Reported per mode: turns per second, turn latency p50 / p95, spans per turn
+and, with tracing on, trace file bytes per turn.
+
+    python -m src.benchmarks.bench_tracing --concurrency 4 --sessions-per-worker 10
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+
+def tracing_module() -> Any:
+    # The instance graph.py, call_llm and the tools report to.
+    from src import tracing
+
+    return tracing
+
+
+def span_cost_ns(number: int, per_trace: int = 50) -> float:
+    """Mean ns per span, in traces of `per_trace` child spans (export included when tracing is on)."""
+    tracing = tracing_module()
+
+    def one_trace() -> None:
+        with tracing.span("bench.root"):
+            for _ in range(per_trace):
+                with tracing.span("bench", {"k": 1}):
+                    pass
+
+    traces = max(1, number // per_trace)
+    return timeit.timeit(one_trace, number=traces) / (traces * (per_trace + 1)) * 1e9
+
+
+def run_session(app: Any, thread_id: str, script: List[Tuple[str, str]]) -> List[float]:
+    config = {"configurable": {"thread_id": thread_id}}
+    latencies = []
+    for user_input, _ in script:
+        started = time.perf_counter()
+        app.invoke({"user_input": user_input}, config=config)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--sessions-per-worker", type=int, default=10)
+    parser.add_argument("--llm-latency", default="fixed:0")
+    parser.add_argument("--tool-latency", default="fixed:0")
+    parser.add_argument("--span-iterations", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_tracing_")
+    os.environ["CHECKPOINT_BACKEND"] = "memory"
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tmpdir, "checkpoints.sqlite3")
+    os.environ["INTENT_FAST_PATH"] = "off"
+    os.environ["PLAN_CACHE"] = "0"
+
+    from src.benchmarks.bench_graph import SCRIPTS, percentile
+    from src.benchmarks.stubs import LatencyModel, StubChatModel, StubLLM, install_stubs
+
+    intents = {line: intent for script in SCRIPTS.values() for line, intent in script}
+    names = list(SCRIPTS)
+    chat_model = StubChatModel(StubLLM(LatencyModel(args.llm_latency, seed=args.seed), intents=intents))
+    tracing = tracing_module()
+    results: Dict[str, Any] = {}
+
+    with install_stubs(tool_latency=args.tool_latency, seed=args.seed, chat_model=chat_model):
+        from src.graph import build_graph
+
+        app = build_graph()
+        for mode in ("off", "on"):
+            tracing.configure(os.devnull if mode == "on" else "")
+            span_ns = span_cost_ns(args.span_iterations)
+            path = os.path.join(tmpdir, "traces.jsonl")
+            tracing.configure(path if mode == "on" else "")
+            traced = tracing.TracingApp(app)
+            jobs = [
+                (f"tracing-{mode}-{int(time.time())}-{i}", SCRIPTS[names[i % len(names)]])
+                for i in range(args.concurrency * args.sessions_per_worker)
+            ]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                latencies = [ms for session in pool.map(lambda job: run_session(traced, *job), jobs) for ms in session]
+            wall = time.perf_counter() - started
+            stats = tracing.tracing_stats()
+            tracing.configure("")
+
+            turns = len(latencies)
+            results[mode] = {
+                "span_ns": round(span_ns, 1),
+                "turns": turns,
+                "turns_per_s": round(turns / wall, 1),
+                "turn_ms_p50": round(percentile(latencies, 0.50), 2),
+                "turn_ms_p95": round(percentile(latencies, 0.95), 2),
+                "spans_per_turn": round(stats.get("spans", 0) / turns, 1) if mode == "on" else 0,
+                "trace_bytes_per_turn": round(os.path.getsize(path) / turns) if mode == "on" else 0,
+            }
+
+    off, on = results["off"], results["on"]
+    report = {
+        "benchmark": "tracing",
+        "config": {
+            "concurrency": args.concurrency,
+            "sessions": args.concurrency * args.sessions_per_worker,
+            "llm_latency": args.llm_latency,
+            "python": sys.version.split()[0],
+        },
+        "modes": results,
+        "turn_p50_overhead_ms": round(on["turn_ms_p50"] - off["turn_ms_p50"], 2),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# src/benchmarks/eval_intent_classifier.py
+
+"""
+Offline evaluation of the fast-path intent classifier against LLM labels.
+
+Labels come from a traffic file recorded with TRAFFIC_RECORD_PATH (every
+master-agent LLM call: user_query, trip_info, the intent the LLM returned and
+how long it took), or, without one, from the built-in EVAL_SET of utterances
+labelled the way the master prompt defines intents.
+
+Reports, for the configured thresholds (and optionally a sweep):
+
+- coverage: share of turns answered locally, by source (rules / embedding)
+- accuracy of those local answers vs the LLM label, and the confusions
+- classifier latency, and master-LLM time saved per turn
+
+    python -m src.benchmarks.eval_intent_classifier --traffic data/traffic.jsonl
+    python -m src.benchmarks.eval_intent_classifier --mode rules --llm-ms 1500
+    python -m src.benchmarks.eval_intent_classifier --sweep
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.agents.intent_classifier import (
+    INTENT_EMBED_MIN_MARGIN,
+    INTENT_EMBED_MIN_SIM,
+    CentroidClassifier,
+    classify_fast,
+    get_centroid_classifier,
+)
+
+# (user_query, trip_info, LLM intent)
+EVAL_SET: List[Tuple[str, Dict[str, Any], str]] = [
+    ("hi", {}, "generic_chat"),
+    ("hello there!", {}, "generic_chat"),
+    ("thanks!", {"destination": "Mumbai"}, "generic_chat"),
+    ("thank you so much", {"destination": "Mumbai"}, "generic_chat"),
+    ("bye", {}, "generic_chat"),
+    ("I'm going to Mumbai in March", {}, "generic_chat"),
+    ("what's the weather like in March?", {"destination": "Mumbai"}, "generic_chat"),
+    ("is Mumbai safe for solo travellers?", {"destination": "Mumbai"}, "generic_chat"),
+    ("what currency do they use there?", {"destination": "Mumbai"}, "generic_chat"),
+    ("when is the best time to visit Goa?", {}, "generic_chat"),
+    ("I'm vegetarian and on a low budget", {"destination": "Mumbai"}, "generic_chat"),
+    ("any big events in Mumbai in March?", {"destination": "Mumbai"}, "activities_q"),
+    ("any concerts while I'm there?", {"destination": "Mumbai"}, "activities_q"),
+    ("what are some must-see places?", {"destination": "Mumbai"}, "activities_q"),
+    ("what can I do in the evenings?", {"destination": "Mumbai"}, "activities_q"),
+    ("recommend some food tours", {"destination": "Mumbai"}, "activities_q"),
+    ("where should I go for street food?", {"destination": "Mumbai"}, "activities_q"),
+    ("any museums worth visiting?", {"destination": "Mumbai"}, "activities_q"),
+    ("what about nightlife?", {"destination": "Goa"}, "activities_q"),
+    ("are there festivals in Goa in December?", {"destination": "Goa"}, "activities_q"),
+    ("what about trains instead?", {"destination": "Mumbai", "origin": "Chennai"}, "logistics_q"),
+    ("how do I get there from Chennai?", {"destination": "Mumbai"}, "logistics_q"),
+    ("which airline is most reliable into BOM?", {"destination": "Mumbai"}, "logistics_q"),
+    ("are flights to Mumbai usually delayed?", {"destination": "Mumbai"}, "logistics_q"),
+    ("is the bus faster than the train?", {"destination": "Mumbai"}, "logistics_q"),
+    ("how long is the flight from Delhi?", {"destination": "Mumbai"}, "logistics_q"),
+    ("best way to get from the airport to the city?", {"destination": "Mumbai"}, "logistics_q"),
+    ("should I book a direct flight?", {"destination": "Goa"}, "logistics_q"),
+    ("make me a 3-day itinerary", {"destination": "Mumbai"}, "plan_full"),
+    ("give me a day by day plan", {"destination": "Mumbai"}, "plan_full"),
+    ("can you plan my whole trip?", {"destination": "Goa"}, "plan_full"),
+    ("plan a 5 day trip to Goa with flights from Delhi", {}, "plan_full"),
+    ("put together a full itinerary with transport", {"destination": "Mumbai"}, "plan_full"),
+    ("yes, please do that", {"destination": "Mumbai"}, "plan_full"),
+    ("sure", {"destination": "Mumbai"}, "generic_chat"),
+    ("what about Pune instead?", {"destination": "Mumbai"}, "generic_chat"),
+    ("can you find cheaper options?", {"destination": "Mumbai"}, "logistics_q"),
+    ("anything fun to do with kids?", {"destination": "Mumbai"}, "activities_q"),
+    ("how about the second day?", {"destination": "Mumbai"}, "plan_full"),
+    ("what time do the shows start?", {"destination": "Mumbai"}, "activities_q"),
+    ("any comedy shows on Friday night?", {"destination": "Mumbai"}, "activities_q"),
+    ("is there a guided tour of the old town?", {"destination": "Goa"}, "activities_q"),
+    # a new place typed in lower case: trip_info changes, so the LLM must see it
+    ("any flights from delhi to goa?", {"destination": "Mumbai"}, "logistics_q"),
+    ("what about events in pune?", {"destination": "Mumbai"}, "activities_q"),
+    ("make me an itinerary for jaipur", {"destination": "Mumbai"}, "plan_full"),
+    # "show" / "tour" outside activities
+    ("show me a visa checklist", {"destination": "Mumbai"}, "generic_chat"),
+    ("show me cheaper hotels", {"destination": "Mumbai"}, "generic_chat"),
+    ("is a tour guide necessary?", {"destination": "Mumbai"}, "generic_chat"),
+]
+
+
+def load_traffic_labels(path: str) -> List[Tuple[str, Dict[str, Any], str, Optional[float]]]:
+    """(user_query, trip_info, LLM intent, LLM ms) for every recorded master call."""
+    from src.prompts import MASTER_SYSTEM_PROMPT
+    from src.recording import load_records
+
+    prompts, records = load_records(path)
+    master_refs = {h for h, text in prompts.items() if text == MASTER_SYSTEM_PROMPT}
+    rows = []
+    for record in records:
+        if record.get("k") != "llm" or record.get("sys") not in master_refs:
+            continue
+        try:
+            payload = json.loads(record["user"])
+            intent = json.loads(record["out"]).get("intent")
+        except (ValueError, AttributeError):
+            continue
+        if intent:
+            rows.append((payload.get("user_query", ""), payload.get("trip_info") or {}, intent, record.get("ms")))
+    return rows
+
+
+class MemoClassifier(CentroidClassifier):
+    """Caches scores per text, so threshold sweeps embed each message once."""
+
+    def __init__(self, inner: CentroidClassifier) -> None:
+        self.inner = inner
+        self._cache: Dict[str, List[Tuple[str, float]]] = {}
+
+    def scores(self, text: str) -> List[Tuple[str, float]]:
+        if text not in self._cache:
+            self._cache[text] = self.inner.scores(text)
+        return self._cache[text]
+
+
+def evaluate(
+    rows: List[Tuple[str, Dict[str, Any], str, Optional[float]]],
+    mode: str,
+    min_sim: float,
+    min_margin: float,
+    classifier: Optional[CentroidClassifier],
+    llm_ms: float,
+) -> Dict[str, Any]:
+    handled = Counter()
+    correct = Counter()
+    confusions = Counter()
+    latencies: List[float] = []
+    saved_ms = 0.0
+
+    for text, trip_info, label, recorded_ms in rows:
+        started = time.perf_counter()
+        fast = classify_fast(
+            text,
+            trip_info,
+            mode=mode,
+            min_sim=min_sim,
+            min_margin=min_margin,
+            classifier=classifier,
+        )
+        elapsed = (time.perf_counter() - started) * 1000.0
+        latencies.append(elapsed)
+        saved_ms -= elapsed
+        if fast is None:
+            continue
+        handled[fast.source] += 1
+        saved_ms += recorded_ms if recorded_ms else llm_ms
+        if fast.intent == label:
+            correct[fast.source] += 1
+        else:
+            confusions[f"{label} -> {fast.intent}"] += 1
+
+    total = len(rows)
+    n_handled = sum(handled.values())
+    latencies.sort()
+    return {
+        "min_sim": min_sim,
+        "min_margin": min_margin,
+        "turns": total,
+        "coverage": round(n_handled / total, 3) if total else 0.0,
+        "coverage_by_source": {k: round(v / total, 3) for k, v in sorted(handled.items())},
+        "accuracy_when_handled": round(sum(correct.values()) / n_handled, 3) if n_handled else None,
+        "accuracy_by_source": {k: round(correct[k] / v, 3) for k, v in sorted(handled.items())},
+        "confusions": dict(confusions.most_common()),
+        "classifier_ms_p50": round(latencies[len(latencies) // 2], 3) if latencies else 0.0,
+        "classifier_ms_p99": round(latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))], 3)
+        if latencies
+        else 0.0,
+        "llm_ms_saved_per_turn": round(saved_ms / total, 1) if total else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--traffic", default=None, help="Recorded traffic file with master LLM labels.")
+    parser.add_argument("--mode", choices=["rules", "rules+embedding"], default="rules+embedding")
+    parser.add_argument("--min-sim", type=float, default=INTENT_EMBED_MIN_SIM)
+    parser.add_argument("--min-margin", type=float, default=INTENT_EMBED_MIN_MARGIN)
+    parser.add_argument(
+        "--llm-ms",
+        type=float,
+        default=1200.0,
+        help="Master LLM latency assumed for turns without a recorded one.",
+    )
+    parser.add_argument("--sweep", action="store_true", help="Also report a grid of embedding thresholds.")
+    args = parser.parse_args()
+
+    if args.traffic:
+        rows = load_traffic_labels(args.traffic)
+        source = args.traffic
+    else:
+        rows = [(text, trip, label, None) for text, trip, label in EVAL_SET]
+        source = "built-in EVAL_SET"
+
+    classifier = None
+    if args.mode == "rules+embedding":
+        inner = get_centroid_classifier()
+        classifier = MemoClassifier(inner) if inner is not None else None
+    mode = args.mode if classifier is not None else "rules"
+
+    report: Dict[str, Any] = {
+        "benchmark": "intent_classifier",
+        "labels": source,
+        "mode": mode,
+        "label_distribution": dict(Counter(label for _, _, label, _ in rows)),
+        "result": evaluate(rows, mode, args.min_sim, args.min_margin, classifier, args.llm_ms),
+    }
+    if args.sweep and classifier is not None:
+        report["sweep"] = [
+            {k: v for k, v in evaluate(rows, mode, sim, margin, classifier, args.llm_ms).items() if k != "confusions"}
+            for sim in (0.35, 0.45, 0.55, 0.65)
+            for margin in (0.04, 0.08, 0.12)
+        ]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
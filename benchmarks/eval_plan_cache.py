@@ -0,0 +1,203 @@
+# src/benchmarks/eval_plan_cache.py
+
+"""
+Offline evaluation of the specialist plan cache (agents/plan_cache.py) on a
+replayed query log.
+
+The log is either a traffic file recorded with TRAFFIC_RECORD_PATH (every
+activities / logistics LLM call, in order: user_query, trip context and the
+plan the LLM returned) or the built-in QUERY_LOG, where each query carries
+a paraphrase group. Queries are replayed in order through a fresh
+PlanCache: a miss stores the query's plan, a hit would have skipped the
+specialist call.
+
+Reported per similarity threshold:
+
+- hit rate, and specialist LLM time saved
+- quality: for the built-in log, the share of hits whose cached query is a
+  paraphrase of the new one; for recorded traffic, the title / leg overlap
+  (Jaccard) between the cached plan and the plan the LLM actually returned
+- a few hit pairs (new query <- cached query) to spot-check by eye
+
+    python -m src.benchmarks.eval_plan_cache
+    python -m src.benchmarks.eval_plan_cache --traffic data/traffic.jsonl --min-sim 0.85 0.9 0.95
+"""
+
+import argparse
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.agents.intent_classifier import get_embeddings
+from src.agents.plan_cache import PLAN_CACHE_MIN_SIM, PlanCache, partition_key
+
+MUMBAI_MARCH = {"destination": "Mumbai", "travel_month": "March"}
+GOA_DEC = {"destination": "Goa", "travel_month": "December", "num_days": 4}
+MAA_BOM = {"origin": "Chennai", "destination": "Mumbai", "travel_month": "March"}
+
+# (paraphrase group, target, user_query, trip_info, preferences)
+QUERY_LOG: List[Tuple[str, str, str, Dict[str, Any], Dict[str, Any]]] = [
+    ("todo", "activities", "things to do in Mumbai in March", MUMBAI_MARCH, {}),
+    ("todo", "activities", "what can I do in Mumbai during March?", MUMBAI_MARCH, {}),
+    ("concerts", "activities", "any concerts in Mumbai in March?", MUMBAI_MARCH, {}),
+    ("todo", "activities", "what is there to do in Mumbai in March", MUMBAI_MARCH, {}),
+    ("food", "activities", "best street food tours in Mumbai", MUMBAI_MARCH, {"interests": ["food"]}),
+    ("concerts", "activities", "are there any concerts happening in Mumbai in March", MUMBAI_MARCH, {}),
+    ("food", "activities", "street food tours in Mumbai?", MUMBAI_MARCH, {"interests": ["food"]}),
+    ("todo", "activities", "things to do in Mumbai in March", MUMBAI_MARCH, {"interests": ["museums"]}),
+    ("beach", "activities", "beach parties in Goa", GOA_DEC, {}),
+    ("beach", "activities", "any beach parties in Goa?", GOA_DEC, {}),
+    ("kids", "activities", "fun things for kids in Goa", GOA_DEC, {"with_kids": True}),
+    ("kids", "activities", "kid friendly things to do in Goa", GOA_DEC, {"with_kids": True}),
+    ("festivals", "activities", "festivals in Mumbai in March", MUMBAI_MARCH, {}),
+    ("festivals", "activities", "which festivals are on in Mumbai in March?", MUMBAI_MARCH, {}),
+    ("todo", "activities", "things to do in Mumbai in march", MUMBAI_MARCH, {}),
+    ("flights", "logistics", "flights from Chennai to Mumbai", MAA_BOM, {}),
+    ("flights", "logistics", "how do I fly from Chennai to Mumbai?", MAA_BOM, {}),
+    ("delays", "logistics", "which airline has the fewest delays into Mumbai", MAA_BOM, {}),
+    ("flights", "logistics", "flights from chennai to mumbai", MAA_BOM, {}),
+    ("delays", "logistics", "which airline is most punctual into Mumbai?", MAA_BOM, {}),
+    ("train", "logistics", "is there a train from Chennai to Mumbai?", MAA_BOM, {}),
+    ("flights", "logistics", "flights from Chennai to Mumbai", {**MAA_BOM, "travel_month": "April"}, {}),
+]
+
+
+def load_traffic_log(path: str) -> List[Dict[str, Any]]:
+    """Specialist LLM calls in a traffic file: query, context, returned plan and latency."""
+    from src.prompts import ACTIVITIES_SYSTEM_PROMPT, LOGISTICS_SYSTEM_PROMPT
+    from src.recording import load_records
+
+    prompts, records = load_records(path)
+    targets = {
+        h: ("activities" if text == ACTIVITIES_SYSTEM_PROMPT else "logistics")
+        for h, text in prompts.items()
+        if text in (ACTIVITIES_SYSTEM_PROMPT, LOGISTICS_SYSTEM_PROMPT)
+    }
+    rows = []
+    for record in records:
+        target = targets.get(record.get("sys", "")) if record.get("k") == "llm" else None
+        if target is None:
+            continue
+        try:
+            payload = json.loads(record["user"])
+            plan = json.loads(record["out"]).get(f"{target}_plan") or {}
+        except (ValueError, AttributeError):
+            continue
+        if not plan:
+            continue
+        rows.append(
+            {
+                "target": target,
+                "query": payload.get("user_query") or "",
+                "trip_info": payload.get("trip_info") or {},
+                "preferences": payload.get("preferences") or {},
+                "existing_plan": payload.get("existing_plan") or {},
+                "plan": plan,
+                "group": None,
+                "ms": record.get("ms"),
+            }
+        )
+    return rows
+
+
+def _plan_keys(plan: Dict[str, Any]) -> set:
+    entries = plan.get("items") or plan.get("legs") or []
+    return {
+        str(e.get("title") or f"{e.get('mode')}:{e.get('from_place')}:{e.get('to_place')}").lower()
+        for e in entries
+        if isinstance(e, dict)
+    }
+
+
+def jaccard(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    ka, kb = _plan_keys(a), _plan_keys(b)
+    return len(ka & kb) / len(ka | kb) if ka | kb else 1.0
+
+
+def replay(rows: List[Dict[str, Any]], embeddings: Any, min_sim: float, llm_ms: float) -> Dict[str, Any]:
+    cache = PlanCache(embeddings, min_sim=min_sim, ttl_s=float("inf"))
+    hits: List[Dict[str, Any]] = []
+    for i, row in enumerate(rows):
+        partition = partition_key(row["target"], row["trip_info"], row["preferences"], row["existing_plan"])
+        found = cache.lookup(partition, row["query"])
+        if found is None:
+            cache.store(partition, row["query"], {"row": i, "plan": row["plan"]})
+            continue
+        entry, sim = found
+        source = rows[entry.plan["row"]]
+        hits.append(
+            {
+                "query": row["query"],
+                "cached_query": source["query"],
+                "sim": round(sim, 3),
+                "same_group": None if row["group"] is None else row["group"] == source["group"],
+                "overlap": round(jaccard(row["plan"], source["plan"]), 3) if row["plan"] else None,
+                "ms": row["ms"] if row["ms"] is not None else llm_ms,
+            }
+        )
+
+    labelled = [h["same_group"] for h in hits if h["same_group"] is not None]
+    overlaps = [h["overlap"] for h in hits if h["overlap"] is not None]
+    return {
+        "min_sim": min_sim,
+        "queries": len(rows),
+        "hits": len(hits),
+        "hit_rate": round(len(hits) / len(rows), 3) if rows else 0.0,
+        "hit_precision": round(sum(labelled) / len(labelled), 3) if labelled else None,
+        "plan_overlap_mean": round(sum(overlaps) / len(overlaps), 3) if overlaps else None,
+        "llm_ms_saved": round(sum(h["ms"] for h in hits), 1),
+        "spot_checks": [f"{h['query']!r} <- {h['cached_query']!r} (sim={h['sim']})" for h in hits[:8]],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--traffic", default=None, help="Recorded traffic file with specialist LLM calls.")
+    parser.add_argument("--min-sim", type=float, nargs="+", default=[PLAN_CACHE_MIN_SIM])
+    parser.add_argument("--llm-ms", type=float, default=2500.0, help="Specialist latency for rows without one.")
+    parser.add_argument(
+        "--stub-embeddings",
+        action="store_true",
+        help="Use benchmarks.stubs.StubEmbeddings instead of rag.embeddings (no model needed).",
+    )
+    args = parser.parse_args()
+
+    if args.stub_embeddings:
+        from src.benchmarks.stubs import StubEmbeddings
+
+        embeddings = StubEmbeddings()
+    else:
+        embeddings = get_embeddings()
+        if embeddings is None:
+            raise SystemExit("eval_plan_cache: rag.embeddings is not available (try --stub-embeddings)")
+
+    source: Optional[str]
+    if args.traffic:
+        rows = load_traffic_log(args.traffic)
+        source = args.traffic
+    else:
+        rows = [
+            {
+                "target": target,
+                "query": query,
+                "trip_info": trip,
+                "preferences": prefs,
+                "existing_plan": {},
+                "plan": None,
+                "group": group,
+                "ms": None,
+            }
+            for group, target, query, trip, prefs in QUERY_LOG
+        ]
+        source = "built-in QUERY_LOG"
+
+    report = {
+        "benchmark": "plan_cache",
+        "log": source,
+        "embeddings": "stub" if args.stub_embeddings else "rag",
+        "results": [replay(rows, embeddings, min_sim, args.llm_ms) for min_sim in args.min_sim],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# src/benchmarks/replay_session.py
+
+"""
+Re-run recorded conversations against the current graph and compare.
+
+Takes a traffic file written with TRAFFIC_RECORD_PATH (see recording.py),
+replays every recorded session turn by turn on a fresh checkpointer with
+LLM and tool responses served from the recording, and compares each turn's
+reply and latency with what was recorded.
+
+- --timing none:      responses return at once; measures graph/node overhead
+- --timing recorded:  each response waits its recorded latency (/ --speed),
+                      so turn times are comparable with production
+
+LLM calls whose prompt changed (new agent code) still get the next recorded
+response for the same agent and session; their count is reported as
+"sequential" hits, unmatched calls as "miss". Sessions recorded mid-way (on
+top of an existing checkpoint) start here from an empty state, so their
+first replies may differ.
+
+    python -m src.benchmarks.replay_session data/traffic.jsonl --timing recorded
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+
+def replay_session(app: Any, thread_id: str, turns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    config = {"configurable": {"thread_id": thread_id}}
+    out = []
+    for turn in turns:
+        started = time.perf_counter()
+        state = app.invoke({"user_input": turn.get("in", "")}, config=config)
+        replay_ms = (time.perf_counter() - started) * 1000.0
+        reply = state.get("master_message") or ""
+        out.append(
+            {
+                "thread_id": thread_id,
+                "user_input": turn.get("in", ""),
+                "same_reply": reply == turn.get("out", ""),
+                "same_intent": state.get("intent") == turn.get("intent"),
+                "recorded_ms": turn.get("ms", 0.0),
+                "replay_ms": round(replay_ms, 2),
+                "recorded_reply": turn.get("out", ""),
+                "replay_reply": reply,
+            }
+        )
+    return out
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+    return {
+        "total": round(sum(values), 1),
+        "p50": round(values[len(values) // 2], 1),
+        "p95": round(values[min(len(values) - 1, int(0.95 * len(values)))], 1),
+        "mean": round(statistics.mean(values), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traffic", help="Traffic file recorded with TRAFFIC_RECORD_PATH.")
+    parser.add_argument("--timing", choices=["none", "recorded"], default="none")
+    parser.add_argument("--speed", type=float, default=1.0, help="Divide recorded latencies by this.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Sessions replayed at once.")
+    parser.add_argument("--thread", action="append", default=None, help="Only replay these thread_ids.")
+    parser.add_argument("--show-diffs", action="store_true", help="Include differing replies in the report.")
+    parser.add_argument("--output", default=None, help="Write the full report (JSON) here.")
+    args = parser.parse_args()
+
+    # Fresh in-memory state: replayed turns must not see the live checkpoints.
+    os.environ["CHECKPOINT_BACKEND"] = "memory"
+
+    from src.benchmarks.stubs import register_stub_rag
+    from src.recording import TrafficReplayer, TurnTrackingApp
+
+    replayer = TrafficReplayer(args.traffic, timing=args.timing, speed=args.speed)
+    register_stub_rag()  # logistics_rag_tool is replayed; never load the real index
+
+    from src.graph import build_graph
+
+    app = TurnTrackingApp(build_graph())
+    replayer.install()
+
+    sessions = replayer.sessions()
+    if args.thread:
+        sessions = {tid: turns for tid, turns in sessions.items() if tid in set(args.thread)}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+        per_session = list(pool.map(lambda item: replay_session(app, *item), sessions.items()))
+    wall = time.perf_counter() - started
+    replayer.uninstall()
+
+    turns = [t for session in per_session for t in session]
+    report: Dict[str, Any] = {
+        "benchmark": "replay_session",
+        "traffic": args.traffic,
+        "timing": args.timing,
+        "speed": args.speed,
+        "sessions": len(sessions),
+        "turns": len(turns),
+        "same_reply": sum(t["same_reply"] for t in turns),
+        "same_intent": sum(t["same_intent"] for t in turns),
+        "responses": replayer.stats(),
+        "recorded_turn_ms": summarize([t["recorded_ms"] for t in turns]),
+        "replay_turn_ms": summarize([t["replay_ms"] for t in turns]),
+        "wall_seconds": round(wall, 2),
+    }
+    if args.show_diffs:
+        report["diffs"] = [t for t in turns if not t["same_reply"]]
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({**report, "turn_details": turns}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,625 @@
+# src/benchmarks/stubs.py
+
+"""
+Deterministic stand-ins for Bedrock, Ticketmaster and the flight RAG index.
+
+install_stubs() swaps them into an already-importable graph so benchmarks can
+run build_graph() end to end without network access or the HuggingFace model:
+
+- call_llm               -> StubLLM (canned JSON per agent, chosen by system prompt)
+                            or, with chat_model=StubChatModel, only the llm.models clients
+                            (the real call_llm, its tool loop and model routing then run)
+- activities_events_tool -> stub_events_tool (synthetic Ticketmaster-shaped payload)
+- flight_retriever       -> StubRetriever (synthetic on-time documents)
+- rag.embeddings         -> None, or StubEmbeddings with embeddings=StubEmbeddings()
+                            (enables the embedding intent fast path and the plan cache)
+
+StubChatModel(prompt_cache=FakePromptCache()) also reports Bedrock-style
+prompt cache reads / writes in its usage metadata.
+
+Each stand-in sleeps for a latency drawn from a LatencyModel, so the same run
+can measure pure orchestration overhead ("none") or realistic tail latency
+("lognormal:900:0.6").
+
+Call install_stubs() BEFORE importing src.graph: if rag/ has not been imported
+yet, a stub `rag` module is registered so the embedding model and FAISS index
+are never loaded.
+"""
+
+import copy
+import json
+import random
+import sys
+import threading
+import time
+import types
+import zlib
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage, convert_to_messages
+
+from src.llm.payload import estimate_tokens
+from src.recording import swap_call_llm, swap_tool_func
+
+# ---- latency models ----
+
+
+class LatencyModel:
+    """
+    Latency distribution, parsed from a short spec string:
+
+    - "none"                      no delay
+    - "fixed:MS"                  constant
+    - "uniform:LO_MS:HI_MS"       uniform between LO and HI
+    - "lognormal:MEDIAN_MS:SIGMA" log-normal (long right tail, like LLM calls)
+    - "faulty:MEDIAN_MS:SIGMA:P:STALL_MS"
+                                  log-normal, but a fraction P of calls stall for STALL_MS
+                                  (fault injection: throttling, a hung connection)
+    """
+
+    def __init__(self, spec: str = "none", seed: int = 0) -> None:
+        self.spec = spec
+        parts = spec.split(":")
+        self.kind = parts[0]
+        self.params = [float(p) for p in parts[1:]]
+        expected = {"none": 0, "fixed": 1, "uniform": 2, "lognormal": 2, "faulty": 4}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"Bad latency spec: {spec!r}")
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        """One delay, in seconds."""
+        if self.kind == "none":
+            return 0.0
+        if self.kind == "fixed":
+            return self.params[0] / 1000.0
+        with self._lock:
+            if self.kind == "uniform":
+                return self._rng.uniform(*self.params) / 1000.0
+            if self.kind == "faulty":
+                median, sigma, p_stall, stall_ms = self.params
+                if self._rng.random() < p_stall:
+                    return stall_ms / 1000.0
+                return self._rng.lognormvariate(0.0, sigma) * median / 1000.0
+            median, sigma = self.params
+            return self._rng.lognormvariate(0.0, sigma) * median / 1000.0
+
+    def wait(self) -> None:
+        delay = self.sample()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# ---- canned responses ----
+
+# Keywords -> intent, for utterances the scripts did not register explicitly.
+_INTENT_KEYWORDS: List[Tuple[str, Tuple[str, ...]]] = [
+    ("plan_full", ("itinerary", "plan my", "plan a", "full plan", "make me a")),
+    ("logistics_q", ("flight", "train", "get there", "airport", "delay")),
+    ("activities_q", ("event", "concert", "things to do", "food tour", "festival")),
+]
+
+_CITY_CENTERS = {
+    "mumbai": (19.076, 72.8777),
+    "delhi": (28.6139, 77.2090),
+    "goa": (15.2993, 74.1240),
+}
+
+
+def _seed(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def _center(trip_info: Dict[str, Any]) -> Tuple[str, Tuple[float, float]]:
+    city = str(trip_info.get("destination") or "Mumbai")
+    return city, _CITY_CENTERS.get(city.lower(), _CITY_CENTERS["mumbai"])
+
+
+class StubLLM:
+    """
+    Callable with call_llm's signature. Picks the agent from the system prompt
+    and returns a deterministic response for that agent's JSON contract.
+
+    Parameters
+    ----------
+    latency : LatencyModel
+        Delay per call.
+    intents : dict[str, str] | None
+        Exact user utterance -> intent, for the master agent.
+    plan_items : int
+        Activities returned per activities call.
+
+    Specialist calls in edit mode (agents/replanning.py) get a one-entry
+    plan_edits. `calls` and `output_tokens` count calls and estimated
+    response tokens per agent.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[LatencyModel] = None,
+        intents: Optional[Dict[str, str]] = None,
+        plan_items: int = 6,
+    ) -> None:
+        from src.prompts import (
+            ACTIVITIES_SYSTEM_PROMPT,
+            LOGISTICS_SYSTEM_PROMPT,
+            MASTER_RESPONSE_SYSTEM_PROMPT,
+            MASTER_SYSTEM_PROMPT,
+        )
+
+        self.latency = latency or LatencyModel("none")
+        self.intents = dict(intents or {})
+        self.plan_items = plan_items
+        self.calls: Dict[str, int] = {}
+        self.output_tokens: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._handlers: Dict[str, Tuple[str, Callable[[Dict[str, Any]], str]]] = {
+            MASTER_SYSTEM_PROMPT: ("master", self._master),
+            ACTIVITIES_SYSTEM_PROMPT: ("activities", self._activities),
+            LOGISTICS_SYSTEM_PROMPT: ("logistics", self._logistics),
+            MASTER_RESPONSE_SYSTEM_PROMPT: ("master_response", self._master_response),
+        }
+
+    def __call__(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 4000,
+        temperature: float = 0.7,
+        tools: list | None = None,
+        **options: Any,
+    ) -> str:
+        self.latency.wait()
+        return self.respond(system_prompt, user_prompt)
+
+    def respond(self, system_prompt: str, user_prompt: str) -> str:
+        """The canned answer, counted, without the latency."""
+        agent, handler = self._handlers.get(system_prompt, ("history", self._history))
+        self.record_call(agent)
+        try:
+            payload = json.loads(user_prompt)
+        except ValueError:
+            payload = {"user_query": user_prompt}
+        out = handler(payload if isinstance(payload, dict) else {})
+        with self._lock:
+            self.output_tokens[agent] = self.output_tokens.get(agent, 0) + estimate_tokens(out)
+        return out
+
+    def agent_for(self, system_prompt: str) -> str:
+        return self._handlers.get(system_prompt, ("history", self._history))[0]
+
+    def record_call(self, agent: str) -> None:
+        with self._lock:
+            self.calls[agent] = self.calls.get(agent, 0) + 1
+
+    def classify(self, query: str) -> str:
+        if query in self.intents:
+            return self.intents[query]
+        lowered = query.lower()
+        for intent, keywords in _INTENT_KEYWORDS:
+            if any(k in lowered for k in keywords):
+                return intent
+        return "generic_chat"
+
+    def _master(self, payload: Dict[str, Any]) -> str:
+        intent = self.classify(str(payload.get("user_query") or ""))
+        return json.dumps(
+            {
+                "intent": intent,
+                "needs_specialist": intent != "generic_chat",
+                "trip_info_updates": {"destination": "Mumbai", "travel_month": "March", "num_days": 3},
+                "preferences_updates": {"interests": ["food", "music"]},
+                "assistant_message": (
+                    "Happy to help with your trip to Mumbai! March is warm and mostly dry, which makes it a "
+                    "good time for street food walks and evening music. Let me look into that for you."
+                ),
+            }
+        )
+
+    def _activities(self, payload: Dict[str, Any]) -> str:
+        rng = random.Random(_seed(str(payload.get("user_query"))))
+        city, (lat, lon) = _center(payload.get("trip_info") or {})
+        if payload.get("mode") == "edit":
+            added = {"title": f"{city} pick for: {str(payload.get('user_query'))[:30]}", "address": city}
+            added.update(lat=round(lat + rng.uniform(-0.08, 0.08), 5), lon=round(lon + rng.uniform(-0.08, 0.08), 5))
+            return json.dumps({"plan_edits": {"add": [added]}, "needs_tools": False})
+        items = [
+            {
+                "day": 1,
+                "time_of_day": "evening",
+                "title": f"{city} highlight {i + 1}",
+                "address": f"{city}",
+                "lat": round(lat + rng.uniform(-0.08, 0.08), 5),
+                "lon": round(lon + rng.uniform(-0.08, 0.08), 5),
+                "notes": "Popular with visitors who like food and music.",
+            }
+            for i in range(self.plan_items)
+        ]
+        return json.dumps({"activities_plan": {"items": items}, "needs_tools": False})
+
+    def _logistics(self, payload: Dict[str, Any]) -> str:
+        city, _ = _center(payload.get("trip_info") or {})
+        if payload.get("mode") == "edit":
+            added = {"mode": "train", "from_place": "Chennai Central", "to_place": city, "duration_hours": 24.0}
+            return json.dumps({"plan_edits": {"add": [added]}, "needs_tools": False})
+        legs = [
+            {
+                "day": 1,
+                "mode": "flight",
+                "from_place": "Chennai (MAA)",
+                "to_place": f"{city}",
+                "duration_hours": 2.0,
+                "carrier": "IndiGo",
+                "notes": "Morning departures have had the fewest delays.",
+            }
+        ]
+        return json.dumps({"logistics_plan": {"legs": legs}, "needs_tools": False})
+
+    def _master_response(self, payload: Dict[str, Any]) -> str:
+        items = ((payload.get("activities_plan") or {}).get("items")) or []
+        legs = ((payload.get("logistics_plan") or {}).get("legs")) or []
+        lines = [f"Here's what I found for your trip ({len(items)} activities, {len(legs)} legs):"]
+        lines += [f"- Day {it.get('day')}: {it.get('title')}" for it in items]
+        return "\n".join(lines)
+
+    def _history(self, payload: Dict[str, Any]) -> str:
+        exchanges = payload.get("exchanges") or [{"user": payload.get("last_user_message")}]
+        last = str(exchanges[-1].get("user") or "")[:80]
+        return f"User is planning a 3-day Mumbai trip in March; likes food and music. Last asked: {last}"
+
+
+class FakePromptCache:
+    """
+    Bedrock prompt cache accounting for StubChatModel.
+
+    A request whose system message contains a cachePoint block has a cacheable
+    prefix: the bound tools' specs plus the system text before the cache
+    point. The first request with a given prefix writes it (cache_creation
+    tokens); later ones within `ttl_s` of its last use read it (cache_read);
+    the rest of the input is uncached. input_tokens includes all three, as in
+    ChatBedrockConverse's usage_metadata. Prefixes under `min_tokens` are not
+    cached, like Bedrock's per-model minimum.
+    """
+
+    def __init__(self, ttl_s: float = 300.0, min_tokens: int = 0) -> None:
+        self.ttl_s = ttl_s
+        self.min_tokens = min_tokens
+        self.hits = 0
+        self.writes = 0
+        self.read_tokens = 0
+        self.write_tokens = 0
+        self._expires: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def account(self, prefix: Optional[str]) -> Dict[str, int]:
+        """input_token_details for a request with cacheable `prefix` (None: no cache point)."""
+        tokens = estimate_tokens(prefix or "")
+        if prefix is None or tokens < self.min_tokens:
+            return {"cache_read": 0, "cache_creation": 0}
+        key = zlib.crc32(prefix.encode("utf-8"))
+        now = time.monotonic()
+        with self._lock:
+            hit = self._expires.get(key, 0.0) > now
+            self._expires[key] = now + self.ttl_s
+            if hit:
+                self.hits += 1
+                self.read_tokens += tokens
+            else:
+                self.writes += 1
+                self.write_tokens += tokens
+        return {"cache_read": tokens if hit else 0, "cache_creation": 0 if hit else tokens}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "prefixes": len(self._expires),
+                "hits": self.hits,
+                "writes": self.writes,
+                "read_tokens": self.read_tokens,
+                "write_tokens": self.write_tokens,
+            }
+
+
+def _content_text(content: Any) -> str:
+    if isinstance(content, list):
+        return "".join(str(block.get("text") or "") if isinstance(block, dict) else str(block) for block in content)
+    return str(content)
+
+
+class StubChatModel:
+    """
+    Stand-in for a ChatBedrockConverse client (see llm.models), so the real
+    call_llm runs, tool loop included.
+
+    Answers come from a StubLLM. With tools bound and no tool results in the
+    conversation yet, activities / logistics calls instead return
+    `tool_calls` calls of the first bound tool (one query each), like a
+    model fanning out several searches at once. A fraction `invalid_json`
+    of master / specialist answers is cut in half, like a small model
+    breaking its JSON.
+
+    stream() yields the same answer in small chunks over one latency sample:
+    the first after `ttft_share` of it (reasoning before any answer text),
+    the rest evenly spread.
+
+    Replies carry usage_metadata (estimated tokens); with `prompt_cache`, its
+    input_token_details report cache reads / writes of the system prompt.
+
+    With `capacity`, at most that many requests are served at once and the
+    rest wait their turn (roughly first come, first served), like a
+    throttled Bedrock endpoint.
+    """
+
+    def __init__(
+        self,
+        text: Optional[StubLLM] = None,
+        tool_calls: int = 3,
+        invalid_json: float = 0.0,
+        seed: int = 0,
+        ttft_share: float = 0.3,
+        chunk_chars: int = 8,
+        prompt_cache: Optional[FakePromptCache] = None,
+        capacity: int = 0,
+    ) -> None:
+        self.text = text or StubLLM()
+        self.prompt_cache = prompt_cache
+        self._capacity = threading.BoundedSemaphore(capacity) if capacity > 0 else None
+        self.tool_calls = tool_calls
+        self.invalid_json = invalid_json
+        self.ttft_share = ttft_share
+        self.chunk_chars = chunk_chars
+        self.tools: List[Any] = []
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def bind(self, **kwargs: Any) -> "StubChatModel":
+        return self
+
+    def bind_tools(self, tools: List[Any], **kwargs: Any) -> "StubChatModel":
+        bound = copy.copy(self)
+        bound.tools = list(tools)
+        return bound
+
+    def invoke(self, messages: Any, *args: Any, **kwargs: Any) -> AIMessage:
+        with self._served():
+            return self._invoke(messages)
+
+    @contextmanager
+    def _served(self) -> Iterator[None]:
+        if self._capacity is None:
+            yield
+            return
+        with self._capacity:
+            yield
+
+    def _invoke(self, messages: Any) -> AIMessage:
+        messages = convert_to_messages(messages)
+        system_prompt, user_prompt = _content_text(messages[0].content), _content_text(messages[1].content)
+        agent = self.text.agent_for(system_prompt)
+        wants_tools = agent in ("activities", "logistics") and self.tools and self.tool_calls > 0
+        if not wants_tools or any(isinstance(m, ToolMessage) for m in messages):
+            out = self._maybe_break(agent, self.text(system_prompt, user_prompt))
+            return AIMessage(content=out, usage_metadata=self._usage(messages, out))
+
+        self.text.latency.wait()
+        self.text.record_call(agent)
+        query = str(json.loads(user_prompt).get("user_query") or "")
+        name = self.tools[0].name
+        calls = [
+            {"name": name, "args": {"query": f"{query} (search {i + 1})"}, "id": f"call_{i}"}
+            for i in range(self.tool_calls)
+        ]
+        return AIMessage(content="", tool_calls=calls, usage_metadata=self._usage(messages, json.dumps(calls)))
+
+
+    def stream(self, messages: Any, *args: Any, **kwargs: Any) -> Iterator[AIMessageChunk]:
+        with self._served():
+            yield from self._stream(messages)
+
+    def _stream(self, messages: Any) -> Iterator[AIMessageChunk]:
+        messages = convert_to_messages(messages)
+        system_prompt, user_prompt = _content_text(messages[0].content), _content_text(messages[1].content)
+        agent = self.text.agent_for(system_prompt)
+        total = self.text.latency.sample()
+        out = self._maybe_break(agent, self.text.respond(system_prompt, user_prompt))
+        chunks = [out[i : i + self.chunk_chars] for i in range(0, len(out), self.chunk_chars)] or [""]
+        usage = self._usage(messages, out)
+        time.sleep(total * self.ttft_share)
+        for i, chunk in enumerate(chunks):
+            # Like Converse, usage arrives with the last chunk.
+            yield AIMessageChunk(content=chunk, usage_metadata=usage if i == len(chunks) - 1 else None)
+            time.sleep(total * (1.0 - self.ttft_share) / len(chunks))
+
+    def _usage(self, messages: List[Any], out: str) -> Dict[str, Any]:
+        input_tokens = estimate_tokens(self._tool_specs())
+        input_tokens += sum(estimate_tokens(_content_text(m.content)) for m in messages)
+        output_tokens = estimate_tokens(out)
+        usage: Dict[str, Any] = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        if self.prompt_cache is not None:
+            usage["input_token_details"] = self.prompt_cache.account(self._cache_prefix(messages[0].content))
+        return usage
+
+    def _tool_specs(self) -> str:
+        if not self.tools:
+            return ""
+        return json.dumps([[getattr(t, "name", ""), getattr(t, "description", "")] for t in self.tools])
+
+    def _cache_prefix(self, system_content: Any) -> Optional[str]:
+        """Tool specs + system text up to the cache point (None: no cache point)."""
+        if not isinstance(system_content, list):
+            return None
+        text = []
+        for block in system_content:
+            if isinstance(block, dict) and "cachePoint" in block:
+                return self._tool_specs() + "".join(text)
+            text.append(_content_text([block]))
+        return None
+
+    def _maybe_break(self, agent: str, out: str) -> str:
+        if agent in ("master", "activities", "logistics") and self.invalid_json > 0:
+            with self._rng_lock:
+                broken = self._rng.random() < self.invalid_json
+            if broken:
+                return out[: len(out) // 2]
+        return out
+
+
+def stub_events_payload(query: str, n: int = 10) -> Dict[str, Any]:
+    """Ticketmaster-shaped activities_events_tool payload for `query`."""
+    rng = random.Random(_seed(query))
+    lat, lon = _CITY_CENTERS["mumbai"]
+    results = [
+        {
+            "name": f"Event {i + 1} for {query[:30]}",
+            "venue": "NSCI Dome",
+            "city": "Mumbai",
+            "country": "India",
+            "date": f"2025-03-{rng.randint(1, 28):02d}",
+            "time": "19:30:00",
+            "lat": round(lat + rng.uniform(-0.05, 0.05), 5),
+            "lon": round(lon + rng.uniform(-0.05, 0.05), 5),
+        }
+        for i in range(n)
+    ]
+    return {"tool": "activities_events_tool", "params_used": {"keyword": query}, "results": results}
+
+
+class StubRetriever:
+    """flight_retriever stand-in: fixed on-time documents after a delay."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None, k: int = 5) -> None:
+        self.latency = latency or LatencyModel("none")
+        self.k = k
+
+    def invoke(self, query: str, *args: Any, **kwargs: Any) -> List[Document]:
+        self.latency.wait()
+        return [
+            Document(
+                page_content=f"{600 + 10 * i} arriving flights, {70 + i} delayed 15+ minutes.",
+                metadata={
+                    "carrier": "6E",
+                    "carrier_name": "IndiGo",
+                    "airport": "BOM",
+                    "airport_name": "Mumbai",
+                    "year": 2024,
+                    "month": i + 1,
+                },
+            )
+            for i in range(self.k)
+        ]
+
+    get_relevant_documents = invoke
+
+
+class StubEmbeddings:
+    """
+    Hashed bag-of-words vectors in place of the MiniLM model: paraphrases
+    sharing most words score high, so similarity-based code paths can run
+    without the model (with lower quality than the real embeddings).
+    """
+
+    def __init__(self, dims: int = 512) -> None:
+        self.dims = dims
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = [0.0] * self.dims
+        for word in "".join(c if c.isalnum() else " " for c in text.lower()).split():
+            vector[zlib.crc32(word.encode("utf-8")) % self.dims] += 1.0
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(t) for t in texts]
+
+
+# ---- installation ----
+
+
+def register_stub_rag(
+    retriever: Optional[StubRetriever] = None,
+    embeddings: Optional[StubEmbeddings] = None,
+) -> List[Callable[[], None]]:
+    """
+    Register a stub `rag` package (under both import names) unless rag/ is
+    already loaded, so importing the tools does not load the embedding model
+    and FAISS index. Returns undo callbacks.
+    """
+    retriever = retriever or StubRetriever()
+    undo: List[Callable[[], None]] = []
+    for name in ("rag", "src.rag"):
+        if name in sys.modules:
+            continue
+        module = types.ModuleType(name)
+        module.__doc__ = "Stub rag package installed by benchmarks.stubs."
+        module.flight_retriever = retriever
+        module.flight_vectorstore = None
+        module.embeddings = embeddings
+        sys.modules[name] = module
+        undo.append(lambda name=name: sys.modules.pop(name, None))
+    return undo
+
+
+@contextmanager
+def install_stubs(
+    llm: Optional[StubLLM] = None,
+    tool_latency: str = "none",
+    retriever_latency: str = "none",
+    seed: int = 0,
+    chat_model: Optional[StubChatModel] = None,
+    embeddings: Optional[StubEmbeddings] = None,
+    profile_models: Optional[Dict[str, StubChatModel]] = None,
+) -> Iterator[StubLLM]:
+    """
+    Replace call_llm, activities_events_tool and flight_retriever everywhere
+    they are referenced, and restore the originals on exit.
+
+    With `chat_model`, call_llm itself is kept and every llm.models profile
+    is served by it instead, or by `profile_models[profile]` where given
+    (`llm` is then unused; chat_model's StubLLM is yielded).
+    `embeddings` becomes the stub rag's embeddings (default None: no
+    embedding-based fast paths).
+
+    Modules can be loaded twice in this tree (e.g. `tools.events` and
+    `src.tools.events`), so every loaded module is scanned (see
+    recording.swap_call_llm / swap_tool_func).
+    """
+    llm = llm or StubLLM()
+    retriever = StubRetriever(LatencyModel(retriever_latency, seed=seed + 1))
+    tool_delay = LatencyModel(tool_latency, seed=seed + 2)
+
+    def events_tool(query: str) -> str:
+        tool_delay.wait()
+        return json.dumps(stub_events_payload(query))
+
+    restore = register_stub_rag(retriever, embeddings)
+    import src.graph  # noqa: F401  (loads every agent / tool module)
+
+    if chat_model is None:
+        restore += swap_call_llm(llm)
+    else:
+        llm = chat_model.text
+        for module in list(sys.modules.values()):
+            if module is not None and getattr(module, "__name__", "").endswith("llm.models"):
+                for profile in module.PROFILES:
+                    model = (profile_models or {}).get(profile, chat_model)
+                    original = module.use_model(profile, model)
+                    restore.append(lambda m=module, p=profile, o=original: m.restore_model(p, o))
+    restore += swap_tool_func("activities_events_tool", lambda _: events_tool)
+    for module in list(sys.modules.values()):
+        attrs = getattr(module, "__dict__", {}) if module is not None else {}
+        if "flight_retriever" in attrs and not isinstance(attrs["flight_retriever"], StubRetriever):
+            original = attrs["flight_retriever"]
+            setattr(module, "flight_retriever", retriever)
+            restore.append(lambda m=module, r=original: setattr(m, "flight_retriever", r))
+
+    try:
+        yield llm
+    finally:
+        for undo in reversed(restore):
+            undo()
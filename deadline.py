@@ -0,0 +1,94 @@
+# src/deadline.py
+"""
+Per-turn latency budget.
+
+begin_turn() stamps every turn with an absolute deadline
+(metadata["deadline"], epoch seconds) from TURN_DEADLINE_S, or from
+config["configurable"]["turn_budget_s"] when the caller passes one. Each
+stage then asks how much of the budget it may spend:
+
+- stage_budget_s(state, stage): time left minus what the stages after it
+  need (RESERVE). LLM calls get this as their timeout, and tool rounds as
+  their tool budget.
+- should_degrade(state, stage): True when the stage budget is below
+  MIN_LLM_S. The stage then takes its cheaper path: the master classifies
+  with the local rules only, a specialist keeps its previous plan, the
+  response is rendered from a template, and the history summary is skipped.
+- scaled_max_tokens(): fewer output tokens when time is short.
+
+Degradations are listed in metadata["degraded"] (turn-scoped), so callers
+and benchmarks can see which turns were answered the cheap way.
+
+Configured via environment:
+
+- TURN_DEADLINE_S: turn budget in seconds (default 20; "0" disables deadlines)
+- TURN_MIN_LLM_S:  smallest stage budget worth starting an LLM call with (default 1.0)
+"""
+
+import os
+import time
+from typing import Any, Dict, Optional
+
+from states import TravelChatBotState
+
+TURN_DEADLINE_S = float(os.getenv("TURN_DEADLINE_S", "20"))
+MIN_LLM_S = float(os.getenv("TURN_MIN_LLM_S", "1.0"))
+
+# Share of the turn budget each stage leaves for the stages after it.
+RESERVE = {
+    "master": 0.5,  # specialists + response still to come
+    "specialist": 0.2,  # response (and, for plan_full, the next specialist's floor)
+    "response": 0.0,
+    "history": 0.0,
+}
+
+
+def start_deadline(state: TravelChatBotState, budget_s: Optional[float] = None) -> None:
+    """Set this turn's deadline (no-op when the budget is 0 / disabled)."""
+    budget_s = TURN_DEADLINE_S if budget_s is None else float(budget_s)
+    metadata = state.get("metadata") or {}
+    if budget_s > 0:
+        metadata["deadline"] = time.time() + budget_s
+        metadata["turn_budget_s"] = budget_s
+    state["metadata"] = metadata
+
+
+def remaining_s(state: TravelChatBotState) -> Optional[float]:
+    """Seconds until the turn's deadline, or None if the turn has none."""
+    deadline = (state.get("metadata") or {}).get("deadline")
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def stage_budget_s(state: TravelChatBotState, stage: str) -> Optional[float]:
+    """Seconds `stage` may spend, keeping RESERVE[stage] of the budget for later stages."""
+    remaining = remaining_s(state)
+    if remaining is None:
+        return None
+    budget = (state.get("metadata") or {}).get("turn_budget_s", TURN_DEADLINE_S)
+    return max(0.0, remaining - RESERVE.get(stage, 0.0) * budget)
+
+
+def should_degrade(state: TravelChatBotState, stage: str) -> bool:
+    """True if `stage` does not have MIN_LLM_S left and should take its cheap path."""
+    budget = stage_budget_s(state, stage)
+    return budget is not None and budget < MIN_LLM_S
+
+
+def scaled_max_tokens(state: TravelChatBotState, stage: str, max_tokens: int, floor: int = 150) -> int:
+    """
+    `max_tokens`, halved when the stage has less than twice MIN_LLM_S left:
+    a shorter answer returns sooner.
+    """
+    budget = stage_budget_s(state, stage)
+    if budget is not None and budget < 2 * MIN_LLM_S:
+        return max(floor, max_tokens // 2)
+    return max_tokens
+
+
+def mark_degraded(state: TravelChatBotState, what: str) -> None:
+    """Record a degradation (e.g. "skip_activities") on the turn."""
+    metadata: Dict[str, Any] = state.get("metadata") or {}
+    metadata["degraded"] = list(metadata.get("degraded") or []) + [what]
+    state["metadata"] = metadata
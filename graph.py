@@ -3,18 +3,22 @@
 from typing import Literal
 
 from langgraph.graph import StateGraph, END, START
-from langgraph.checkpoint.memory import MemorySaver
 
+from persistence import build_checkpointer
+from state_policy import begin_turn
 from states import TravelChatBotState
+from src.tracing import traced_node  # the instance llm/ and tools/ report to
 from agents import (
     master_agent,
     master_response_agent,
     activities_agent,
     logistics_agent,
     update_history_summary,
+    speculate,
 )
 
-checkpointer = MemorySaver()
+# Backend is chosen by CHECKPOINT_BACKEND (SQLite by default, see persistence/).
+checkpointer = build_checkpointer()
 
 
 def route_from_master(
@@ -94,15 +98,20 @@ def build_graph():
     """
     builder = StateGraph(TravelChatBotState)
 
-    # Register nodes
-    builder.add_node("master", master_agent)
-    builder.add_node("activities", activities_agent)
-    builder.add_node("logistics", logistics_agent)
-    builder.add_node("master_response", master_response_agent)
-    builder.add_node("update_history", update_history_summary)
-
-    # Entry point
-    builder.add_edge(START, "master")
+    # Register nodes (each runs in a "node.<name>" span when tracing is on, see tracing.py)
+    builder.add_node("start_turn", traced_node("start_turn", begin_turn))
+    builder.add_node("speculate", traced_node("speculate", speculate))
+    builder.add_node("master", traced_node("master", master_agent))
+    builder.add_node("activities", traced_node("activities", activities_agent))
+    builder.add_node("logistics", traced_node("logistics", logistics_agent))
+    builder.add_node("master_response", traced_node("master_response", master_response_agent))
+    builder.add_node("update_history", traced_node("update_history", update_history_summary))
+
+    # Entry point: reset turn-scoped state, start speculative tool lookups
+    # (they run in the background), then classify with the master
+    builder.add_edge(START, "start_turn")
+    builder.add_edge("start_turn", "speculate")
+    builder.add_edge("speculate", "master")
 
     # After master: route based on master_route
     builder.add_conditional_edges(
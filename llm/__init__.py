@@ -6,8 +6,31 @@ LLM utilities for the travel assistant.
 Currently exposes:
 - base_llm: the shared ChatBedrockConverse instance
 - call_llm: thin convenience wrapper for invoking the LLM
+- admission: priority / fair-queueing admission of model requests, load shedding
+- models: per-agent model profiles (large / small), escalation, prompt caching and usage stats
+- tool_runner: executes the tool calls a response asks for (in parallel)
+- payload: compact, token-budgeted JSON user prompts for the agents
 """
 
+from .admission import admission_stats
 from .bedrock_client import base_llm, call_llm
+from .models import get_model, model_stats, profile_for, prompt_cache_for
+from .payload import build_payload, estimate_tokens, payload_stats
+from .tool_runner import ToolRun, execute_tool_calls, tool_stats, to_tool_result
 
-__all__ = ["base_llm", "call_llm"]
+__all__ = [
+    "admission_stats",
+    "base_llm",
+    "call_llm",
+    "get_model",
+    "model_stats",
+    "profile_for",
+    "prompt_cache_for",
+    "build_payload",
+    "estimate_tokens",
+    "payload_stats",
+    "ToolRun",
+    "execute_tool_calls",
+    "tool_stats",
+    "to_tool_result",
+]
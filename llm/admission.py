@@ -0,0 +1,339 @@
+# src/llm/admission.py
+
+"""
+Admission control for Bedrock requests: priority classes, weighted fair
+queueing across threads, and load shedding.
+
+Under overload every LLM request used to queue first-come first-served (on
+Bedrock, or on call_llm's timeout pool), so a one-call generic_chat turn
+waited behind the four calls of a plan_full turn and timed out. Now every
+model request call_llm makes (tool rounds included) first takes one of
+LLM_MAX_CONCURRENCY slots from the scheduler here. Waiting requests are
+served in weighted fair queueing order (virtual clock):
+
+- each LangGraph thread (conversation) is a flow; a request is stamped
+  max(now, the flow's previous stamp) + ADMISSION_QUANTUM_MS / weight of
+  the turn's class, and the smallest stamp is served first. A light class
+  goes ahead of a heavy one that arrived a little earlier, a thread
+  sending many requests at once falls behind the others, and since stamps
+  follow the clock nothing waits forever behind newer arrivals;
+- the class comes from the turn's intent once master_agent (or the early
+  router) has decided it: "chat" (generic_chat), "plan" (activities_q,
+  logistics_q) or "plan_full". Before that -- the master's own call -- a
+  request weighs like the highest class, so new turns are served in queue
+  position.
+
+Shedding: when the queue delay exceeds ADMISSION_SHED_MS, should_shed()
+tells the router to answer a plan_full turn the short way (one specialist,
+templated reply; see agents.early_routing.turn_targets). The queue delay is
+the larger of a moving average of recent waits, which fades once no slot
+has been granted for a while, and how long the oldest request still queued
+has waited -- so shedding stops soon after load goes away, and not while
+requests are stuck.
+
+A request that cannot get a slot before its deadline gives up like a timed
+out call. A slot is held until the Bedrock request really ends, even if the
+caller stopped waiting for it at its deadline. admission_stats() reports slots in use, queue depth and wait
+percentiles per class, timeouts and sheds.
+
+Configured via environment:
+
+- LLM_MAX_CONCURRENCY: model requests in flight at once (default 24; "0" disables admission control)
+- ADMISSION_WEIGHTS:   class weights (default "chat=4,plan=2,plan_full=1")
+- ADMISSION_QUANTUM_MS: stamp advance of a weight-1 request (default 6000; with the default weights a chat
+                       request goes ahead of plan_full requests queued up to 4.5 s before it)
+- ADMISSION_SHED_MS:   queue delay above which plan_full is shed (default 3000; "0" never sheds)
+"""
+
+import heapq
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "24"))
+ADMISSION_SHED_MS = float(os.getenv("ADMISSION_SHED_MS", "3000"))
+ADMISSION_QUANTUM_MS = float(os.getenv("ADMISSION_QUANTUM_MS", "6000"))
+
+DEFAULT_WEIGHTS = {"chat": 4.0, "plan": 2.0, "plan_full": 1.0}
+
+INTENT_CLASSES = {
+    "generic_chat": "chat",
+    "activities_q": "plan",
+    "logistics_q": "plan",
+    "plan_full": "plan_full",
+}
+
+UNCLASSIFIED = "new"  # turns whose intent is not known yet
+WAIT_WINDOW = 1000  # waits per class kept for percentiles
+_DELAY_ALPHA = 0.1  # weight of the newest wait in the queue delay average
+_DELAY_DECAY_S = 2.0  # the average falls by 1/e per this long without a grant
+_MAX_TRACKED_THREADS = 10000
+
+
+def _load_weights() -> Dict[str, float]:
+    weights = dict(DEFAULT_WEIGHTS)
+    for pair in (os.getenv("ADMISSION_WEIGHTS") or "").split(","):
+        if "=" in pair:
+            name, weight = (part.strip() for part in pair.split("=", 1))
+            weights[name] = float(weight)
+    return weights
+
+
+def class_for_intent(intent: Optional[str]) -> str:
+    return INTENT_CLASSES.get(intent or "", UNCLASSIFIED)
+
+
+def current_thread() -> str:
+    """thread_id of the graph run this code is part of ("other" outside one)."""
+    from langgraph.config import get_config
+
+    try:
+        return str((get_config().get("configurable") or {}).get("thread_id") or "other")
+    except RuntimeError:
+        return "other"
+
+
+class _Waiter:
+    __slots__ = ("cls", "queued", "granted", "cancelled", "event")
+
+    def __init__(self, cls: str) -> None:
+        self.cls = cls
+        self.queued = time.perf_counter()
+        self.granted = False
+        self.cancelled = False
+        self.event = threading.Event()
+
+
+class AdmissionScheduler:
+    """
+    `capacity` slots shared by virtual-clock fair queueing over flows
+    (threads), each request weighted by its class (see the module docstring).
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        weights: Optional[Dict[str, float]] = None,
+        quantum_s: float = ADMISSION_QUANTUM_MS / 1000.0,
+    ) -> None:
+        self.capacity = capacity
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.quantum_s = quantum_s
+        self._lock = threading.Lock()
+        self._running = 0
+        self._heap: List[Any] = []
+        self._seq = itertools.count()
+        self._stamps: Dict[str, float] = {}
+        self._queue_delay_ms = 0.0
+        self._delay_at = time.monotonic()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def _class_stats(self, cls: str) -> Dict[str, Any]:
+        stats = self._stats.get(cls)
+        if stats is None:
+            stats = self._stats[cls] = {
+                "requests": 0,
+                "queued": 0,
+                "waiting": 0,
+                "timeouts": 0,
+                "waits": deque(maxlen=WAIT_WINDOW),
+            }
+        return stats
+
+    def _weight(self, cls: str) -> float:
+        return self.weights.get(cls) or max(self.weights.values(), default=1.0)
+
+    def acquire(self, flow: str, cls: str, timeout: Optional[float] = None) -> bool:
+        """Take a slot for one request of `flow`; False if none was free within `timeout` seconds."""
+        waiter = _Waiter(cls)
+        with self._lock:
+            stats = self._class_stats(cls)
+            stats["requests"] += 1
+            now = time.monotonic()
+            stamp = max(now, self._stamps.get(flow, 0.0)) + self.quantum_s / self._weight(cls)
+            self._stamps[flow] = stamp
+            if len(self._stamps) > _MAX_TRACKED_THREADS:
+                # Stamps already behind the clock would be replaced by it anyway.
+                self._stamps = {f: t for f, t in self._stamps.items() if t > now}
+            if self._running < self.capacity and not self._heap:
+                self._running += 1
+                self._granted(waiter)
+                return True
+            stats["queued"] += 1
+            stats["waiting"] += 1
+            heapq.heappush(self._heap, (stamp, next(self._seq), waiter))
+
+        if waiter.event.wait(timeout):
+            return True
+        with self._lock:
+            if waiter.granted:  # granted just as the wait timed out
+                return True
+            waiter.cancelled = True
+            stats = self._class_stats(cls)
+            stats["waiting"] -= 1
+            stats["timeouts"] += 1
+        return False
+
+    def release(self) -> None:
+        with self._lock:
+            self._running -= 1
+            while self._heap and self._running < self.capacity:
+                _, _, waiter = heapq.heappop(self._heap)
+                if waiter.cancelled:
+                    continue
+                self._running += 1
+                self._class_stats(waiter.cls)["waiting"] -= 1
+                self._granted(waiter)
+
+    def _granted(self, waiter: _Waiter) -> None:
+        # Called with the lock held.
+        waited_ms = (time.perf_counter() - waiter.queued) * 1000.0
+        waiter.granted = True
+        waiter.event.set()
+        self._class_stats(waiter.cls)["waits"].append(waited_ms)
+        now = time.monotonic()
+        average = self._decayed_delay_ms(now)
+        self._queue_delay_ms = average + _DELAY_ALPHA * (waited_ms - average)
+        self._delay_at = now
+
+    def _decayed_delay_ms(self, now: float) -> float:
+        return self._queue_delay_ms * math.exp(-max(0.0, now - self._delay_at) / _DELAY_DECAY_S)
+
+    def queue_delay_ms(self) -> float:
+        """
+        The larger of the moving average of recent waits for a slot (fading
+        while no slot is granted) and the wait so far of the oldest request
+        still queued.
+        """
+        with self._lock:
+            average = self._decayed_delay_ms(time.monotonic())
+            queued = [waiter.queued for _, _, waiter in self._heap if not waiter.cancelled]
+        oldest_ms = (time.perf_counter() - min(queued)) * 1000.0 if queued else 0.0
+        return max(average, oldest_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = {cls: {**s, "waits": list(s["waits"])} for cls, s in self._stats.items()}
+            running = self._running
+        classes = {}
+        for cls, s in sorted(snapshot.items()):
+            waits = sorted(s.pop("waits"))
+            classes[cls] = {
+                **s,
+                "weight": self._weight(cls),
+                "wait_ms_p50": _percentile(waits, 0.50),
+                "wait_ms_p95": _percentile(waits, 0.95),
+            }
+        return {
+            "capacity": self.capacity,
+            "running": running,
+            "queue_delay_ms": round(self.queue_delay_ms(), 1),
+            "classes": classes,
+        }
+
+
+def _percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+class Slot:
+    """One admitted request; release() returns it to the scheduler it came from (once)."""
+
+    __slots__ = ("_scheduler", "_released")
+
+    def __init__(self, scheduler: Optional[AdmissionScheduler]) -> None:
+        self._scheduler = scheduler
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        if self._scheduler is not None:
+            self._scheduler.release()
+
+
+_scheduler: Optional[AdmissionScheduler] = None
+_turn_classes: "OrderedDict[str, str]" = OrderedDict()
+_classes_lock = threading.Lock()
+_shed = 0
+
+
+def configure(
+    capacity: int = LLM_MAX_CONCURRENCY,
+    weights: Optional[Dict[str, float]] = None,
+    shed_ms: Optional[float] = None,
+) -> None:
+    """(Re)build the scheduler: `capacity` 0 turns admission control off. Benchmarks switch modes with it."""
+    global _scheduler, ADMISSION_SHED_MS, _shed
+    _scheduler = AdmissionScheduler(capacity, weights or _load_weights()) if capacity > 0 else None
+    if shed_ms is not None:
+        ADMISSION_SHED_MS = shed_ms
+    _shed = 0
+
+
+configure()
+
+
+def set_turn_class(intent: Optional[str]) -> None:
+    """Class this thread's current turn is scheduled as, from its intent (None: not known yet)."""
+    thread = current_thread()
+    with _classes_lock:
+        _turn_classes[thread] = class_for_intent(intent)
+        _turn_classes.move_to_end(thread)
+        while len(_turn_classes) > _MAX_TRACKED_THREADS:
+            _turn_classes.popitem(last=False)
+
+
+def turn_class(thread: Optional[str] = None) -> str:
+    with _classes_lock:
+        return _turn_classes.get(thread or current_thread(), UNCLASSIFIED)
+
+
+def acquire(timeout: Optional[float] = None) -> Optional[Slot]:
+    """
+    Slot for one model request of the current turn, or None if none was free
+    within `timeout` seconds (a no-op slot at once when admission control is
+    off). Release it on the Slot, so a configure() in between cannot
+    unbalance the new scheduler.
+    """
+    scheduler = _scheduler
+    if scheduler is None:
+        return Slot(None)
+    thread = current_thread()
+    return Slot(scheduler) if scheduler.acquire(thread, turn_class(thread), timeout) else None
+
+
+def should_shed(intent: Optional[str]) -> bool:
+    """True if a turn with `intent` should take its short path because LLM requests are queueing too long."""
+    global _shed
+    scheduler = _scheduler
+    if scheduler is None or ADMISSION_SHED_MS <= 0 or class_for_intent(intent) != "plan_full":
+        return False
+    delay_ms = scheduler.queue_delay_ms()
+    if delay_ms <= ADMISSION_SHED_MS:
+        return False
+    with _classes_lock:
+        _shed += 1
+    logger.info("admission: queue delay %.0f ms, shedding %s turn", delay_ms, intent)
+    return True
+
+
+def admission_stats() -> Dict[str, Any]:
+    """Scheduler state (None when off), shed threshold and turns shed since start."""
+    scheduler = _scheduler
+    return {
+        "enabled": scheduler is not None,
+        "shed_ms": ADMISSION_SHED_MS,
+        "shed": _shed,
+        **(scheduler.stats() if scheduler is not None else {}),
+    }
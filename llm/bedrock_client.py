@@ -1,15 +1,266 @@
 # src/bedrock_client.py  (or src/llm/bedrock_client.py if that’s where you keep it)
+import contextvars
 import json
-from langchain_aws import ChatBedrockConverse
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Iterator
 
-base_llm = ChatBedrockConverse(
-    model_id="openai.gpt-oss-120b-1:0",
-    region_name="us-east-1",
-    max_tokens=10000,
-    temperature=0.7,
+from langchain_core.messages import SystemMessage
+
+from src.tracing import KIND_CLIENT, get_current_span, span, start_span
+
+from . import admission
+from .models import (
+    DEFAULT_PROFILE,
+    PROFILES,
+    PROMPT_CACHE_MIN_TOKENS,
+    disable_prompt_cache,
+    escalation_for,
+    get_model,
+    profile_for,
+    prompt_cache_for,
+    record_call,
+    record_escalation,
+)
+from .payload import estimate_tokens
+from .tool_runner import TOOL_BUDGET_S, ToolRun, run_tool_rounds
+
+# The default ("large") profile's client; per-agent routing goes through llm.models.
+base_llm = get_model(DEFAULT_PROFILE)
+
+# Converse content block ending the cacheable prefix (tool specs + system prompt).
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+# Calls with a timeout run here so the caller can stop waiting at its deadline
+# (the Bedrock request itself finishes in the background).
+_timeout_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_TIMEOUT_WORKERS", "32")),
+    thread_name_prefix="llm",
 )
 
 
+class _DeadlineModel:
+    """
+    Bound model whose invoke() gives up at an absolute deadline
+    (time.monotonic()). `on_done` is called once the request itself has
+    ended, which after a timeout is later than the return to the caller.
+    """
+
+    def __init__(self, llm: Any, deadline: float) -> None:
+        self.llm = llm
+        self.deadline = deadline
+
+    def invoke(self, messages: Any, on_done: Callable[[], None] | None = None) -> Any:
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            if on_done is not None:
+                on_done()
+            raise FutureTimeout()
+        future = _timeout_pool.submit(contextvars.copy_context().run, self.llm.invoke, messages)
+        if on_done is not None:
+            future.add_done_callback(lambda _: on_done())
+        try:
+            return future.result(timeout=remaining)
+        except FutureTimeout:
+            future.cancel()  # only stops it if it has not started
+            raise
+
+    def stream(self, messages: Any, on_done: Callable[[], None] | None = None) -> Iterator[Any]:
+        """Chunks of self.llm.stream(), read from a pool thread; raises FutureTimeout at the deadline."""
+        chunks: "queue.Queue[Any]" = queue.Queue()
+        end = object()
+
+        def produce() -> None:
+            try:
+                for chunk in self.llm.stream(messages):
+                    chunks.put(chunk)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                if on_done is not None:
+                    on_done()
+            chunks.put(end)
+
+        try:
+            _timeout_pool.submit(contextvars.copy_context().run, produce)
+        except BaseException:
+            if on_done is not None:
+                on_done()
+            raise
+        while True:
+            remaining = self.deadline - time.monotonic()
+            if remaining <= 0:
+                raise FutureTimeout()
+            try:
+                item = chunks.get(timeout=remaining)
+            except queue.Empty:
+                raise FutureTimeout() from None
+            if item is end:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+class _AdmittedModel:
+    """
+    Bound model whose requests each wait for an llm.admission slot (until
+    the deadline, if any). Over a _DeadlineModel the slot is held until the
+    Bedrock request ends, not just until the caller stops waiting, so
+    LLM_MAX_CONCURRENCY bounds the requests really in flight.
+    """
+
+    def __init__(self, llm: Any, deadline: float | None) -> None:
+        self.llm = llm
+        self.deadline = deadline
+
+    def _acquire(self) -> admission.Slot:
+        timeout = None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+        started = time.perf_counter()
+        slot = admission.acquire(timeout)
+        get_current_span().add("llm.admission_wait_ms", round((time.perf_counter() - started) * 1000.0, 1))
+        if slot is None:
+            raise FutureTimeout()
+        return slot
+
+    def invoke(self, messages: Any) -> Any:
+        slot = self._acquire()
+        if isinstance(self.llm, _DeadlineModel):
+            return self.llm.invoke(messages, on_done=slot.release)
+        try:
+            return self.llm.invoke(messages)
+        finally:
+            slot.release()
+
+    def stream(self, messages: Any) -> Iterator[Any]:
+        slot = self._acquire()
+        if isinstance(self.llm, _DeadlineModel):
+            yield from self.llm.stream(messages, on_done=slot.release)
+            return
+        try:
+            yield from self.llm.stream(messages)
+        finally:
+            slot.release()
+
+
+class _MeteredModel:
+    """
+    Bound model that records latency, token usage and prompt cache reads /
+    writes of every call under its profile, and traces each call as an
+    "llm.request" span.
+    """
+
+    def __init__(self, llm: Any, profile: str, agent: str | None) -> None:
+        self.llm = llm
+        self.profile = profile
+        self.agent = agent
+
+    def _span(self) -> Any:
+        model_id = PROFILES.get(self.profile, {}).get("model_id")
+        return start_span(
+            "llm.request",
+            {"gen_ai.system": "aws.bedrock", "gen_ai.request.model": model_id, "llm.profile": self.profile},
+            kind=KIND_CLIENT,
+        )
+
+    def invoke(self, messages: Any) -> Any:
+        started = time.perf_counter()
+        request = self._span()
+        try:
+            ai_msg = self.llm.invoke(messages)
+        except Exception as e:
+            self._failed(started, request, e)
+            raise
+        self._record(started, messages, ai_msg, request)
+        return ai_msg
+
+    def stream(self, messages: Any) -> Iterator[Any]:
+        started = time.perf_counter()
+        request = self._span()
+        ai_msg = None
+        try:
+            for chunk in self.llm.stream(messages):
+                ai_msg = chunk if ai_msg is None else ai_msg + chunk
+                yield chunk
+        except Exception as e:
+            self._failed(started, request, e)
+            raise
+        self._record(started, messages, ai_msg, request)
+
+    def _failed(self, started: float, request: Any, error: Exception) -> None:
+        record_call(self.profile, self.agent, (time.perf_counter() - started) * 1000.0, 0, 0, error=True)
+        request.set_error(f"{type(error).__name__}: {error}")
+        request.end()
+
+    def _record(self, started: float, messages: Any, ai_msg: Any, request: Any) -> None:
+        usage = getattr(ai_msg, "usage_metadata", None) or {}
+        details = usage.get("input_token_details") or {}
+        input_tokens = usage.get("input_tokens") or sum(estimate_tokens(_message_text(m)) for m in messages)
+        output_tokens = usage.get("output_tokens") or (estimate_tokens(_message_text(ai_msg)) if ai_msg else 0)
+        cache_read, cache_write = details.get("cache_read") or 0, details.get("cache_creation") or 0
+        record_call(
+            self.profile,
+            self.agent,
+            (time.perf_counter() - started) * 1000.0,
+            input_tokens,
+            output_tokens,
+            cache_read_tokens=cache_read,
+            cache_write_tokens=cache_write,
+        )
+        request.set_attributes(
+            {
+                "gen_ai.usage.input_tokens": input_tokens,
+                "gen_ai.usage.output_tokens": output_tokens,
+                "gen_ai.usage.cache_read_input_tokens": cache_read,
+                "gen_ai.usage.cache_creation_input_tokens": cache_write,
+                "llm.tool_calls": len(getattr(ai_msg, "tool_calls", None) or []),
+            }
+        )
+        request.end()
+
+
+def _message_text(message: Any) -> str:
+    content = message[1] if isinstance(message, tuple) else getattr(message, "content", message)
+    return content if isinstance(content, str) else json.dumps(content, default=str)
+
+
+def _messages(profile: str, system_prompt: str, user_prompt: str) -> list:
+    """
+    System + user messages for one call on `profile`. The system prompts are
+    static (everything per-turn goes in the user payload), so on profiles with
+    prompt caching a long one ends with a cache point and the request prefix
+    up to it is the same on every call.
+    """
+    if prompt_cache_for(profile) and estimate_tokens(system_prompt) >= PROMPT_CACHE_MIN_TOKENS:
+        system: Any = SystemMessage(content=[{"type": "text", "text": system_prompt}, CACHE_POINT])
+    else:
+        system = ("system", system_prompt)
+    return [system, ("user", user_prompt)]
+
+
+def _text_delta(content: Any) -> str:
+    """Answer text in a streamed chunk's content (reasoning and tool-use blocks skipped)."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            block.get("text") or ""
+            for block in content
+            if isinstance(block, dict) and block.get("type") in ("text", "output_text")
+        )
+    return ""
+
+
+def _is_json_object(text: str) -> bool:
+    try:
+        return isinstance(json.loads(text), dict)
+    except ValueError:
+        return False
+
+
 def _extract_json_from_text(raw: str) -> str:
     """
     Given a raw string that might contain reasoning content PLUS a JSON object,
@@ -40,20 +291,79 @@ def call_llm(
     max_tokens: int = 4000,
     temperature: float = 0.7,
     tools: list | None = None,
+    tool_budget_s: float | None = None,
+    tool_log: list[ToolRun] | None = None,
+    timeout_s: float | None = None,
+    agent: str | None = None,
+    json_output: bool = False,
+    on_text: Callable[[str], None] | None = None,
 ) -> str:
     """
     Wrap Bedrock via LangChain ChatBedrockConverse.
 
     IMPORTANT: This returns a STRING that is expected to be valid JSON
     for your agents (master_agent does `json.loads(raw)`).
+
+    `agent` selects the model profile (see llm.models; default: the large
+    model). With `json_output`, a reply that is not a JSON object is asked
+    again of the profile's `escalate_to` model, if it has one.
+
+    With `on_text` (and no tools), the response is streamed and on_text is
+    called with each piece of answer text as it arrives; the full text is
+    still returned. An escalated retry is not streamed.
+
+    With `tools` bound, any tool calls in the response are executed (see
+    llm.tool_runner) and the model is called again with their results, within
+    `tool_budget_s` seconds of tool time. Executed calls are appended to
+    `tool_log` if given.
+
+    With `timeout_s`, the whole call (tool rounds and escalation included)
+    gives up after that many seconds and returns "" -- the agents' usual
+    fallback path. Each model request first waits for an admission slot
+    (llm.admission), which counts against the same timeout.
+
+    The system prompt is sent first and unchanged, marked as a cacheable
+    prefix where the profile supports prompt caching (see llm.models); keep
+    anything that varies per call in `user_prompt`.
+
+    Each call is an "llm.call" span when tracing is on (see tracing.py).
     """
-    messages = [
-        ("system", system_prompt),
-        ("user", user_prompt),
-    ]
+    deadline = None if timeout_s is None else time.monotonic() + timeout_s
+    profile = profile_for(agent)
 
+    prompts = (system_prompt, user_prompt)
+    attributes = {"llm.agent": agent, "llm.profile": profile, "llm.timeout_s": timeout_s, "llm.tools": len(tools or ())}
+    with span("llm.call", attributes) as call:
+        reply, timed_out = _call_model(
+            profile, agent, prompts, max_tokens, temperature, tools, tool_budget_s, tool_log, deadline, on_text
+        )
+        escalate_to = escalation_for(profile) if json_output else None
+        if escalate_to and not timed_out and not _is_json_object(reply):
+            if deadline is None or deadline - time.monotonic() > 0:
+                record_escalation(profile, escalate_to, agent)
+                call.set_attribute("llm.escalated_to", escalate_to)
+                reply, _ = _call_model(
+                    escalate_to, agent, prompts, max_tokens, temperature, tools, tool_budget_s, tool_log, deadline
+                )
+    return reply
+
+
+def _call_model(
+    profile: str,
+    agent: str | None,
+    prompts: tuple[str, str],
+    max_tokens: int,
+    temperature: float,
+    tools: list | None,
+    tool_budget_s: float | None,
+    tool_log: list[ToolRun] | None,
+    deadline: float | None,
+    on_text: Callable[[str], None] | None = None,
+) -> tuple[str, bool]:
+    """One call_llm attempt on `profile`: (reply text or "", timed out)."""
+    messages = _messages(profile, *prompts)
     try:
-        llm = base_llm.bind(
+        llm = get_model(profile).bind(
             max_tokens=max_tokens,
             temperature=temperature,
         )
@@ -61,14 +371,37 @@ def call_llm(
         if tools:
             llm = llm.bind_tools(tools)
 
-        ai_msg = llm.invoke(messages)
+        llm = _MeteredModel(llm, profile, agent)
+
+        if deadline is not None:
+            llm = _DeadlineModel(llm, deadline)
+            remaining = max(0.0, deadline - time.monotonic())
+            tool_budget_s = min(TOOL_BUDGET_S if tool_budget_s is None else tool_budget_s, remaining)
+
+        # Outermost, so requests queue here by priority rather than in the timeout pool.
+        llm = _AdmittedModel(llm, deadline)
+
+        if on_text is not None and not tools:
+            ai_msg = None
+            for chunk in llm.stream(messages):
+                ai_msg = chunk if ai_msg is None else ai_msg + chunk
+                delta = _text_delta(chunk.content)
+                if delta:
+                    on_text(delta)
+            if ai_msg is None:
+                return "", False
+        else:
+            ai_msg = llm.invoke(messages)
+
+        if tools:
+            ai_msg = run_tool_rounds(llm, messages, ai_msg, tools, tool_budget_s, tool_log)
 
         raw_content = ai_msg.content
 
         # If it's already a string, great – just clean off any reasoning preamble.
         if isinstance(raw_content, str):
             cleaned = _extract_json_from_text(raw_content)
-            return cleaned.strip()
+            return cleaned.strip(), False
 
         # If it's a list of blocks (new Converse format), pull out the TEXT blocks,
         # then extract JSON from the joined text.
@@ -90,12 +423,23 @@ def call_llm(
 
             joined = "\n".join(t for t in text_chunks if t)
             cleaned = _extract_json_from_text(joined)
-            return cleaned.strip()
+            return cleaned.strip(), False
 
         # Fallback: stringify and try to strip reasoning/json
         cleaned = _extract_json_from_text(str(raw_content))
-        return cleaned.strip()
+        return cleaned.strip(), False
 
+    except FutureTimeout:
+        print(f"Bedrock LLM call ({profile}) timed out at its deadline")
+        get_current_span().set_error("timed out at its deadline")
+        return "", True
     except Exception as e:
-        print(f"Error calling Bedrock LLM: {e}")
-        return ""
+        if isinstance(messages[0], SystemMessage) and "cach" in str(e).lower():
+            # The model does not take cache points after all: once more without.
+            disable_prompt_cache(profile, str(e))
+            return _call_model(
+                profile, agent, prompts, max_tokens, temperature, tools, tool_budget_s, tool_log, deadline, on_text
+            )
+        print(f"Bedrock LLM call ({profile}) failed: {e}")
+        get_current_span().set_error(f"{type(e).__name__}: {e}")
+        return "", False
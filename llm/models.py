@@ -0,0 +1,282 @@
+# src/llm/models.py
+
+"""
+Model registry: which Bedrock model each agent calls.
+
+Every agent used to share one gpt-oss-120b client. Intent classification
+(master) and conversation summaries (history) are short, structured tasks a
+smaller model handles at a fraction of the latency, so each agent is mapped
+to a model profile:
+
+- "large": openai.gpt-oss-120b-1:0 (activities, logistics, master_response)
+- "small": openai.gpt-oss-20b-1:0  (master, history)
+
+A profile may name an `escalate_to` profile: when call_llm is asked for JSON
+(json_output=True) and the reply does not parse as a JSON object, the same
+request is sent once more to that profile. Clients are built on first use.
+
+Per profile, model_stats() reports calls, errors, latency percentiles,
+input / output tokens (Bedrock usage metadata, else an estimate), the calls
+per agent and escalations, so the routing can be checked against traffic.
+
+Prompt caching: the agents' system prompts are static and several hundred
+tokens each, so call_llm ends them with a Converse cachePoint on profiles
+where prompt_cache_for() is true; Bedrock then reads that prefix (tool specs
+and system prompt) from its cache instead of processing it again. The
+cache-read / cache-write input tokens from the response usage are counted
+per profile. A profile may set "prompt_cache": true / false; otherwise it is
+on for model families whose Converse API takes cache points (Anthropic,
+Amazon Nova). If Bedrock rejects a cache point anyway, the profile stops
+sending them (disable_prompt_cache).
+
+Configured via environment:
+
+- LLM_MODEL_PROFILES: JSON object merged over DEFAULT_PROFILES, e.g.
+  '{"small": {"model_id": "openai.gpt-oss-20b-1:0", "escalate_to": null}}'
+- LLM_AGENT_MODELS:   overrides of AGENT_MODELS, e.g. "master=large,history=small"
+- LLM_ESCALATE:       "1" (default) or "0" to never escalate
+- LLM_PROMPT_CACHE:   "auto" (default: per profile / model family), "1" on unless a profile
+                      sets "prompt_cache": false, "0" off
+- PROMPT_CACHE_MIN_TOKENS: system prompts shorter than this get no cache point (default 512)
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from langchain_aws import ChatBedrockConverse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = "large"
+
+DEFAULT_PROFILES: Dict[str, Dict[str, Any]] = {
+    "large": {
+        "model_id": "openai.gpt-oss-120b-1:0",
+        "region_name": "us-east-1",
+        "max_tokens": 10000,
+        "temperature": 0.7,
+    },
+    "small": {
+        "model_id": "openai.gpt-oss-20b-1:0",
+        "region_name": "us-east-1",
+        "max_tokens": 4000,
+        "temperature": 0.3,
+        "escalate_to": "large",
+    },
+}
+
+DEFAULT_AGENT_MODELS = {
+    "master": "small",
+    "activities": "large",
+    "logistics": "large",
+    "master_response": "large",
+    "history": "small",
+}
+
+LLM_ESCALATE = os.getenv("LLM_ESCALATE", "1") == "1"
+LLM_PROMPT_CACHE = os.getenv("LLM_PROMPT_CACHE", "auto")
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "512"))
+LATENCY_WINDOW = 1000  # calls per profile kept for percentiles
+
+# Model id fragments (regional "us." prefixes included) whose Converse API accepts cachePoint blocks.
+PROMPT_CACHE_FAMILIES = ("anthropic.", "amazon.nova")
+
+# Profile keys that are ours, not ChatBedrockConverse settings.
+_ROUTING_KEYS = ("escalate_to", "prompt_cache")
+
+
+def _load_profiles() -> Dict[str, Dict[str, Any]]:
+    profiles = {name: dict(profile) for name, profile in DEFAULT_PROFILES.items()}
+    overrides = json.loads(os.getenv("LLM_MODEL_PROFILES") or "{}")
+    for name, profile in overrides.items():
+        profiles[name] = {**profiles.get(name, {}), **profile}
+    return profiles
+
+
+def _load_agent_models() -> Dict[str, str]:
+    agent_models = dict(DEFAULT_AGENT_MODELS)
+    for pair in (os.getenv("LLM_AGENT_MODELS") or "").split(","):
+        if "=" in pair:
+            agent, profile = (part.strip() for part in pair.split("=", 1))
+            agent_models[agent] = profile
+    return agent_models
+
+
+PROFILES = _load_profiles()
+AGENT_MODELS = _load_agent_models()
+
+for _agent, _profile in AGENT_MODELS.items():
+    if _profile not in PROFILES:
+        raise ValueError(f"LLM_AGENT_MODELS: unknown model profile {_profile!r} for {_agent}")
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, Any]] = {}
+_cache_rejected: Dict[str, str] = {}
+
+
+def profile_for(agent: Optional[str]) -> str:
+    """Profile `agent` is routed to (DEFAULT_PROFILE for unknown or no agent)."""
+    return AGENT_MODELS.get(agent or "", DEFAULT_PROFILE)
+
+
+def escalation_for(profile: str) -> Optional[str]:
+    """Profile to retry on when `profile`'s JSON does not parse, if any."""
+    target = PROFILES.get(profile, {}).get("escalate_to")
+    return target if LLM_ESCALATE and target in PROFILES and target != profile else None
+
+
+def prompt_cache_for(profile: str) -> bool:
+    """Whether call_llm marks system prompts sent to `profile` as a cacheable prefix."""
+    if LLM_PROMPT_CACHE == "0" or profile in _cache_rejected:
+        return False
+    settings = PROFILES.get(profile, {})
+    if settings.get("prompt_cache") is not None:
+        return bool(settings["prompt_cache"])
+    if LLM_PROMPT_CACHE == "1":
+        return True
+    model_id = str(settings.get("model_id") or "").lower()
+    return any(family in model_id for family in PROMPT_CACHE_FAMILIES)
+
+
+def disable_prompt_cache(profile: str, reason: str) -> None:
+    """Stop sending cache points to `profile` (Bedrock rejected one) for the rest of the process."""
+    logger.warning("llm: prompt caching rejected by %r, sending no more cache points: %s", profile, reason)
+    _cache_rejected[profile] = reason
+
+
+def get_model(profile: str = DEFAULT_PROFILE) -> Any:
+    """The (shared) chat model for `profile`, built on first use."""
+    with _clients_lock:
+        client = _clients.get(profile)
+        if client is None:
+            settings = {k: v for k, v in PROFILES[profile].items() if k not in _ROUTING_KEYS}
+            client = _clients[profile] = ChatBedrockConverse(**settings)
+        return client
+
+
+def use_model(profile: str, client: Any) -> Any:
+    """Serve `profile` with `client` (e.g. a benchmark stub); returns the previous client or None."""
+    with _clients_lock:
+        previous = _clients.get(profile)
+        _clients[profile] = client
+        return previous
+
+
+def restore_model(profile: str, client: Any) -> None:
+    """Undo use_model(): put back `client` (None: build from the profile again)."""
+    with _clients_lock:
+        if client is None:
+            _clients.pop(profile, None)
+        else:
+            _clients[profile] = client
+
+
+def _profile_stats(profile: str) -> Dict[str, Any]:
+    stats = _stats.get(profile)
+    if stats is None:
+        stats = _stats[profile] = {
+            "calls": 0,
+            "errors": 0,
+            "ms_total": 0.0,
+            "latencies": deque(maxlen=LATENCY_WINDOW),
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cache_read_tokens": 0,
+            "cache_write_tokens": 0,
+            "agents": {},
+            "escalated_from": 0,
+            "escalated_to": 0,
+        }
+    return stats
+
+
+def record_call(
+    profile: str,
+    agent: Optional[str],
+    ms: float,
+    input_tokens: int,
+    output_tokens: int,
+    error: bool = False,
+    cache_read_tokens: int = 0,
+    cache_write_tokens: int = 0,
+) -> None:
+    """
+    Account one model invocation (one request to Bedrock; tool rounds count
+    separately). `input_tokens` includes the cache-read and cache-write ones.
+    """
+    with _stats_lock:
+        stats = _profile_stats(profile)
+        stats["calls"] += 1
+        stats["errors"] += int(error)
+        stats["ms_total"] += ms
+        latencies: Deque[float] = stats["latencies"]
+        latencies.append(ms)
+        stats["input_tokens"] += input_tokens
+        stats["output_tokens"] += output_tokens
+        stats["cache_read_tokens"] += cache_read_tokens
+        stats["cache_write_tokens"] += cache_write_tokens
+        agents = stats["agents"]
+        agents[agent or "other"] = agents.get(agent or "other", 0) + 1
+
+
+def record_escalation(source: str, target: str, agent: Optional[str]) -> None:
+    logger.info("llm: %s reply from %r was not valid JSON, escalating to %r", agent or "call", source, target)
+    with _stats_lock:
+        _profile_stats(source)["escalated_from"] += 1
+        _profile_stats(target)["escalated_to"] += 1
+
+
+def reset_model_stats() -> None:
+    """Forget all counters and cache rejections (benchmarks comparing routings in one process)."""
+    with _stats_lock:
+        _stats.clear()
+        _cache_rejected.clear()
+
+
+def _percentile(values: list, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+def model_stats() -> Dict[str, Any]:
+    """
+    Per profile since process start: model id, calls (by agent), errors,
+    latency (mean, p50, p95 over the last LATENCY_WINDOW calls), tokens in
+    and out, prompt cache reads / writes (and the share of input tokens read
+    from the cache), and escalations from / to it. Plus the agent -> profile
+    routing.
+    """
+    with _stats_lock:
+        snapshot = {
+            name: {**s, "agents": dict(s["agents"]), "latencies": list(s["latencies"])} for name, s in _stats.items()
+        }
+    profiles = {}
+    for name, s in sorted(snapshot.items()):
+        calls = s["calls"]
+        profiles[name] = {
+            "model_id": PROFILES.get(name, {}).get("model_id"),
+            "calls": calls,
+            "calls_by_agent": dict(sorted(s["agents"].items())),
+            "errors": s["errors"],
+            "ms_mean": round(s["ms_total"] / calls, 1) if calls else None,
+            "ms_p50": _percentile(s["latencies"], 0.50),
+            "ms_p95": _percentile(s["latencies"], 0.95),
+            "input_tokens": s["input_tokens"],
+            "output_tokens": s["output_tokens"],
+            "output_tokens_mean": round(s["output_tokens"] / calls, 1) if calls else None,
+            "prompt_cache": prompt_cache_for(name),
+            "cache_read_tokens": s["cache_read_tokens"],
+            "cache_write_tokens": s["cache_write_tokens"],
+            "cache_read_share": round(s["cache_read_tokens"] / s["input_tokens"], 3) if s["input_tokens"] else None,
+            "escalated_from": s["escalated_from"],
+            "escalated_to": s["escalated_to"],
+        }
+    return {"routing": dict(AGENT_MODELS), "escalate": LLM_ESCALATE, "profiles": profiles}
@@ -0,0 +1,74 @@
+# src/llm/partial_json.py
+
+"""
+Incremental parsing of one JSON object streamed in pieces.
+
+PartialJSONObject.feed() takes text deltas as they arrive and returns the
+top-level fields whose values became complete, so a caller can act on
+{"intent": ...} while the rest of the object is still being generated.
+Text before the first "{" (e.g. a reasoning preamble) is skipped.
+"""
+
+import json
+from typing import Any, Dict, List
+
+
+class PartialJSONObject:
+    """Top-level fields of a streamed JSON object, each available once its value is complete."""
+
+    def __init__(self) -> None:
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start = -1
+
+    def feed(self, delta: str) -> List[str]:
+        """Append `delta`; return the names of fields completed by it, in order."""
+        completed: List[str] = []
+        if self.done or not delta:
+            return completed
+        self._text += delta
+        text = self._text
+        while self._pos < len(text):
+            ch = text[self._pos]
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._member_start = self._pos + 1
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed += self._member(text[self._member_start : self._pos])
+                    self.done = True
+                    break
+            elif ch == "," and self._depth == 1:
+                completed += self._member(text[self._member_start : self._pos])
+                self._member_start = self._pos + 1
+            self._pos += 1
+        return completed
+
+    def _member(self, text: str) -> List[str]:
+        if not text.strip():
+            return []
+        try:
+            member = json.loads("{" + text + "}")
+        except ValueError:
+            return []
+        new = [key for key in member if key not in self.fields]
+        self.fields.update(member)
+        return new
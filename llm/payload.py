@@ -0,0 +1,185 @@
+# src/llm/payload.py
+
+"""
+Compact JSON payloads for the agents' user prompts.
+
+The agents used to send `json.dumps(llm_input)`: nulls, empty objects, the
+full existing plan and every tool result (both raw text and its parsed
+copy). build_payload() serializes the same sections with:
+
+- null / empty values dropped (False and 0 are kept)
+- compact separators and unescaped unicode
+- tool results sent once (parsed JSON if available, else the raw text)
+- a per-agent token budget: while the payload is over it, the largest
+  list inside it is halved (keeping the first entries; a "<key>_omitted"
+  count is added next to it) or the longest string is cut
+
+Sections should therefore be ordered most-important-entry first. Token
+counts come from tiktoken if installed, else a characters-per-token
+estimate. Each call logs the size of every section at DEBUG level.
+
+Configured via environment:
+
+- PROMPT_BUDGET_<AGENT>: token budget for MASTER, ACTIVITIES, LOGISTICS,
+  MASTER_RESPONSE, HISTORY (defaults in DEFAULT_BUDGETS; "0" = no budget)
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+try:  # optional: exact counts for the o200k family of tokenizers
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on environment
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGETS = {
+    "master": 1200,
+    "activities": 2500,
+    "logistics": 2500,
+    "master_response": 2500,
+    "history": 1000,
+}
+PROMPT_BUDGETS = {
+    agent: int(os.getenv(f"PROMPT_BUDGET_{agent.upper()}", str(default))) for agent, default in DEFAULT_BUDGETS.items()
+}
+
+# JSON averages fewer characters per token than prose.
+CHARS_PER_TOKEN = 3.5
+MIN_STRING_CHARS = 200  # strings shorter than this are never cut
+MAX_SHRINK_STEPS = 64
+
+_encoding = tiktoken.get_encoding("o200k_base") if tiktoken is not None else None
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count of `text` (tiktoken if installed, else an estimate)."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return max(1, round(len(text) / CHARS_PER_TOKEN))
+
+
+def dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def compact(value: Any) -> Any:
+    """`value` without None, "", [] or {} anywhere inside it."""
+    if isinstance(value, dict):
+        out = {k: compact(v) for k, v in value.items()}
+        return {k: v for k, v in out.items() if v is not None and v != "" and v != [] and v != {}}
+    if isinstance(value, (list, tuple)):
+        out = [compact(v) for v in value]
+        return [v for v in out if v is not None and v != "" and v != [] and v != {}]
+    return value
+
+
+def tool_results_payload(results: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """ToolResults as sent to a model: parsed JSON when there is one, otherwise the raw text."""
+    payload = []
+    for result in results or []:
+        if result.get("parsed") is not None:
+            payload.append({"tool_name": result.get("tool_name"), "parsed": result["parsed"]})
+        else:
+            payload.append({"tool_name": result.get("tool_name"), "raw_output": result.get("raw_output")})
+    return payload
+
+
+def _largest(container: Any, best: Optional[Tuple[int, Any, Any]]) -> Optional[Tuple[int, Any, Any]]:
+    """(size, parent, key) of the biggest shrinkable list / string under `container`."""
+    items = container.items() if isinstance(container, dict) else enumerate(container)
+    for key, value in items:
+        if isinstance(value, str):
+            if len(value) >= MIN_STRING_CHARS and (best is None or len(value) > best[0]):
+                best = (len(value), container, key)
+        elif isinstance(value, (dict, list)):
+            value_size = len(dumps(value))
+            if isinstance(value, list) and len(value) > 1 and isinstance(container, dict):
+                if best is None or value_size > best[0]:
+                    best = (value_size, container, key)
+            if best is None or value_size > best[0]:
+                best = _largest(value, best)
+    return best
+
+
+def _shrink(sections: Dict[str, Any]) -> bool:
+    """Halve the biggest list (or cut the longest string) in place; False if nothing is left to cut."""
+    found = _largest(sections, None)
+    if found is None:
+        return False
+    _, parent, key = found
+    value = parent[key]
+    if isinstance(value, str):
+        parent[key] = value[: len(value) // 2] + "…"
+        return True
+    keep = len(value) // 2
+    omitted_key = f"{key}_omitted"
+    parent[omitted_key] = parent.get(omitted_key, 0) + len(value) - keep
+    parent[key] = value[:keep]
+    return True
+
+
+def build_payload(agent: str, sections: Dict[str, Any], budget: Optional[int] = None) -> str:
+    """
+    Compact JSON user prompt for `agent` from `sections` (the top-level
+    keys the agent's system prompt describes), trimmed to `budget` tokens
+    (default PROMPT_BUDGETS[agent]).
+    """
+    budget = PROMPT_BUDGETS.get(agent, 0) if budget is None else budget
+    payload = compact(sections)
+    text = dumps(payload)
+    tokens = before = estimate_tokens(text)
+
+    steps = 0
+    while budget and tokens > budget and steps < MAX_SHRINK_STEPS and _shrink(payload):
+        text = dumps(payload)
+        tokens = estimate_tokens(text)
+        steps += 1
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "payload[%s]: %d tokens (%s)",
+            agent,
+            tokens,
+            ", ".join(f"{k}={estimate_tokens(dumps(v))}" for k, v in payload.items()),
+        )
+    if steps:
+        logger.info("payload[%s]: trimmed from %d to %d tokens (budget %d)", agent, before, tokens, budget)
+
+    naive = estimate_tokens(json.dumps(sections, default=str))
+    with _stats_lock:
+        stats = _stats.setdefault(agent, {"calls": 0, "tokens": 0, "naive_tokens": 0, "trimmed": 0})
+        stats["calls"] += 1
+        stats["tokens"] += tokens
+        stats["naive_tokens"] += naive
+        stats["trimmed"] += bool(steps)
+    return text
+
+
+def payload_stats() -> Dict[str, Any]:
+    """
+    Per agent since process start: prompts built, mean tokens sent, mean
+    tokens plain json.dumps of the same sections would have sent, and how
+    many prompts had to be trimmed to the budget.
+    """
+    with _stats_lock:
+        stats = {agent: dict(s) for agent, s in _stats.items()}
+    return {
+        agent: {
+            "calls": s["calls"],
+            "tokens_mean": round(s["tokens"] / s["calls"], 1),
+            "naive_tokens_mean": round(s["naive_tokens"] / s["calls"], 1),
+            "saved_share": round(1 - s["tokens"] / s["naive_tokens"], 3) if s["naive_tokens"] else None,
+            "trimmed": s["trimmed"],
+            "budget": PROMPT_BUDGETS.get(agent),
+        }
+        for agent, s in sorted(stats.items())
+    }
@@ -0,0 +1,253 @@
+# src/llm/tool_runner.py
+
+"""
+Execution of the tool calls a model emits.
+
+call_llm binds ACTIVITIES_TOOLS / LOGISTICS_TOOLS to the model. When a
+response carries tool_calls, all of them are executed here, concurrently on
+a bounded thread pool, and handed back as ToolMessages for one follow-up
+call. Rounds and total tool time are capped so a model that keeps asking
+for tools cannot stretch a turn indefinitely.
+
+Configured via environment:
+
+- LLM_TOOL_PARALLEL:   "1" (default) runs a response's calls at once, "0" one by one
+- LLM_TOOL_WORKERS:    pool size shared by all turns (default 8)
+- LLM_TOOL_MAX_ROUNDS: tool rounds per call_llm before the model must answer (default 2)
+- LLM_TOOL_BUDGET_S:   tool wall time allowed per turn (default 15)
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from langchain_core.messages import ToolMessage
+
+from src.tracing import KIND_CLIENT, span
+
+logger = logging.getLogger(__name__)
+
+TOOL_PARALLEL = os.getenv("LLM_TOOL_PARALLEL", "1") == "1"
+TOOL_WORKERS = int(os.getenv("LLM_TOOL_WORKERS", "8"))
+TOOL_MAX_ROUNDS = int(os.getenv("LLM_TOOL_MAX_ROUNDS", "2"))
+TOOL_BUDGET_S = float(os.getenv("LLM_TOOL_BUDGET_S", "15"))
+
+_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+_stats_lock = threading.Lock()
+_stats: Dict[str, float] = {
+    "rounds": 0,
+    "calls": 0,
+    "errors": 0,
+    "timeouts": 0,
+    "skipped": 0,
+    "capped": 0,
+    "tool_ms": 0.0,
+    "wall_ms": 0.0,
+}
+
+
+@dataclass
+class ToolRun:
+    """One executed (or skipped) tool call."""
+
+    name: str
+    args: Dict[str, Any]
+    call_id: str
+    output: str = ""
+    status: str = "ok"  # "ok" | "error" | "timeout" | "skipped"
+    elapsed_ms: float = 0.0
+    round: int = 0
+
+    def as_message(self) -> ToolMessage:
+        return ToolMessage(
+            content=self.output,
+            tool_call_id=self.call_id,
+            name=self.name,
+            status="success" if self.status == "ok" else "error",
+        )
+
+    def as_tool_result(self) -> Dict[str, Any]:
+        return to_tool_result(self.name, self.output)
+
+
+def to_tool_result(tool_name: str, raw_output: str) -> Dict[str, Any]:
+    """ToolResult for state (*_tools_results): raw text plus parsed JSON if it is an object."""
+    try:
+        parsed = json.loads(raw_output)
+    except (TypeError, ValueError):
+        parsed = None
+    return {
+        "tool_name": tool_name,
+        "raw_output": raw_output,
+        "parsed": parsed if isinstance(parsed, dict) else None,
+    }
+
+
+def tool_wall_ms(runs: Iterable[ToolRun]) -> float:
+    """Wall time spent on `runs`: the slowest call of each round, summed."""
+    slowest: Dict[int, float] = {}
+    for run in runs:
+        slowest[run.round] = max(slowest.get(run.round, 0.0), run.elapsed_ms)
+    return sum(slowest.values())
+
+
+def _count(**deltas: float) -> None:
+    with _stats_lock:
+        for key, value in deltas.items():
+            _stats[key] += value
+
+
+def _invoke(tool: Any, run: ToolRun) -> ToolRun:
+    started = time.perf_counter()
+    with span(f"tool.{run.name}", {"tool.name": run.name, "tool.round": run.round}, kind=KIND_CLIENT) as traced:
+        try:
+            run.output = str(tool.invoke(run.args))
+        except Exception as e:
+            logger.exception("tool_runner: %s failed", run.name)
+            run.output = f"Tool {run.name} failed: {e}"
+            run.status = "error"
+            traced.set_error(run.output)
+        traced.set_attribute("tool.status", run.status)
+    run.elapsed_ms = round((time.perf_counter() - started) * 1000.0, 2)
+    return run
+
+
+def skip_tool_calls(tool_calls: List[Dict[str, Any]], reason: str, round_index: int = 0) -> List[ToolRun]:
+    """ToolMessages-to-be for calls that will not run (the model must still get a result for each)."""
+    runs = [
+        ToolRun(
+            name=call.get("name", ""),
+            args=call.get("args") or {},
+            call_id=call.get("id") or "",
+            output=f"Not run: {reason}. Answer with the results you already have.",
+            status="skipped",
+            round=round_index,
+        )
+        for call in tool_calls
+    ]
+    _count(skipped=len(runs))
+    return runs
+
+
+def execute_tool_calls(
+    tool_calls: List[Dict[str, Any]],
+    tools: List[Any],
+    budget_s: float,
+    parallel: Optional[bool] = None,
+    round_index: int = 0,
+) -> List[ToolRun]:
+    """
+    Run `tool_calls` against `tools` (matched by name) within `budget_s`
+    seconds of wall time. Results come back in call order; calls that did
+    not finish in time get status "timeout".
+    """
+    parallel = TOOL_PARALLEL if parallel is None else parallel
+    by_name = {getattr(t, "name", ""): t for t in tools}
+    runs = [
+        ToolRun(name=c.get("name", ""), args=c.get("args") or {}, call_id=c.get("id") or "", round=round_index)
+        for c in tool_calls
+    ]
+    for run in runs:
+        if run.name not in by_name:
+            run.output = f"Unknown tool: {run.name}"
+            run.status = "error"
+
+    started = time.perf_counter()
+    deadline = started + max(0.0, budget_s)
+    pending = [run for run in runs if run.status == "ok"]
+
+    def remaining() -> float:
+        return max(0.0, deadline - time.perf_counter())
+
+    if parallel:
+        # copy_context: tool recording and tracing read the turn's thread id / span from contextvars.
+        futures = [
+            (run, _pool.submit(contextvars.copy_context().run, _invoke, by_name[run.name], run)) for run in pending
+        ]
+        for run, future in futures:
+            try:
+                future.result(timeout=remaining())
+            except FutureTimeout:
+                future.cancel()
+                run.status = "timeout"
+                run.output = f"Tool {run.name} timed out."
+                run.elapsed_ms = round((time.perf_counter() - started) * 1000.0, 2)
+    else:
+        for run in pending:
+            if remaining() <= 0:
+                run.status = "timeout"
+                run.output = f"Tool {run.name} not run: time budget used up."
+                continue
+            _invoke(by_name[run.name], run)
+
+    wall_ms = (time.perf_counter() - started) * 1000.0
+    _count(
+        rounds=1,
+        calls=len(runs),
+        errors=sum(r.status == "error" for r in runs),
+        timeouts=sum(r.status == "timeout" for r in runs),
+        tool_ms=sum(r.elapsed_ms for r in runs),
+        wall_ms=wall_ms,
+    )
+    logger.info(
+        "tool_runner: round %d ran %d call(s) %s in %.0f ms (%s)",
+        round_index,
+        len(runs),
+        "in parallel" if parallel else "sequentially",
+        wall_ms,
+        ", ".join(f"{r.name}={r.status}" for r in runs),
+    )
+    return runs
+
+
+def run_tool_rounds(
+    llm: Any,
+    messages: List[Any],
+    ai_msg: Any,
+    tools: List[Any],
+    budget_s: Optional[float] = None,
+    tool_log: Optional[List[ToolRun]] = None,
+) -> Any:
+    """
+    Tool loop for a model with `tools` bound: while the latest response asks
+    for tools, execute them and re-invoke the model with the results. After
+    TOOL_MAX_ROUNDS rounds, or once `budget_s` of tool time is used, pending
+    calls are answered with a "not run" result and the model gets one last
+    call to answer. Returns the final AIMessage.
+    """
+    budget_s = TOOL_BUDGET_S if budget_s is None else budget_s
+    history = list(messages)
+    rounds = 0
+    while getattr(ai_msg, "tool_calls", None):
+        rounds += 1
+        capped = rounds > TOOL_MAX_ROUNDS or budget_s <= 0
+        if capped:
+            runs = skip_tool_calls(ai_msg.tool_calls, "tool budget for this turn is used up", round_index=rounds)
+            _count(capped=1)
+        else:
+            runs = execute_tool_calls(ai_msg.tool_calls, tools, budget_s, round_index=rounds)
+            budget_s -= tool_wall_ms(runs) / 1000.0
+        if tool_log is not None:
+            tool_log.extend(runs)
+        history += [ai_msg, *(run.as_message() for run in runs)]
+        ai_msg = llm.invoke(history)
+        if capped:
+            break
+    return ai_msg
+
+
+def tool_stats() -> Dict[str, Any]:
+    """Counters since process start (rounds, calls, errors, timeouts, time)."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["tool_ms"] = round(stats["tool_ms"], 1)
+    stats["wall_ms"] = round(stats["wall_ms"], 1)
+    stats["parallel"] = TOOL_PARALLEL
+    return stats
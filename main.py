@@ -3,7 +3,10 @@
 import logging
 
 from src.graph import build_graph
+from src.profiling import profile_from_env
+from src.recording import record_from_env
 from src.states import TravelChatBotState
+from src.tracing import TRACE_WATERFALL, trace_from_env
 
 
 def run_cli() -> None:
@@ -12,14 +15,19 @@ def run_cli() -> None:
 
     Uses a single LangGraph app instance with a fixed thread_id so that
     conversation state (history_summary, trip_info, etc.) is preserved
-    across turns via the MemorySaver checkpointer.
+    across turns (and restarts) via the configured checkpointer.
+
+    Set TRAFFIC_RECORD_PATH to record LLM/tool traffic for offline replay,
+    and TRACE_PATH to trace turns (TRACE_WATERFALL=1 also prints each turn's
+    spans as a waterfall; see tracing.py). PROFILE_SLOW_MS / PROFILE_SAMPLE_N
+    save CPU and allocation profiles of slow or sampled turns (profiling.py).
     """
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
     )
 
-    app = build_graph()
+    app = trace_from_env(profile_from_env(record_from_env(build_graph())))
     thread_id = "cli-session"
 
     print("Travel Assistant")
@@ -43,6 +51,8 @@ def run_cli() -> None:
 
         reply = result_state.get("master_message", "") or ""
         print(f"Assistant: {reply}\n")
+        if TRACE_WATERFALL and hasattr(app, "waterfall"):
+            print(app.waterfall() + "\n")
 
 
 if __name__ == "__main__":
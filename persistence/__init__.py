@@ -0,0 +1,19 @@
+# src/persistence/__init__.py
+"""
+Conversation state persistence (LangGraph checkpointers).
+
+Exports:
+- BoundedSqliteSaver
+- CompressedSerializer
+- build_checkpointer
+"""
+
+from persistence.sqlite_saver import BoundedSqliteSaver
+from persistence.serde import CompressedSerializer
+from persistence.checkpointer import build_checkpointer
+
+__all__ = [
+    "BoundedSqliteSaver",
+    "CompressedSerializer",
+    "build_checkpointer",
+]
@@ -0,0 +1,61 @@
+# src/persistence/checkpointer.py
+
+"""
+Checkpointer selection for the LangGraph app.
+
+Configured via environment:
+
+- CHECKPOINT_BACKEND:      "sqlite" (default) or "memory"
+- CHECKPOINT_DB_PATH:      SQLite file (default: data/checkpoints.sqlite3)
+- CHECKPOINT_KEEP_LAST:    checkpoints retained per thread (default: 5)
+- CHECKPOINT_TTL_HOURS:    evict threads idle this long (default: 72, 0 = never)
+- CHECKPOINT_BATCH_SIZE:   buffered rows before a flush (default: 256)
+- CHECKPOINT_FLUSH_MS:     max time a write stays buffered (default: 50)
+- CHECKPOINT_COMPRESSION:  "zstd" (default, zlib if not installed), "zlib" or "none"
+"""
+
+import logging
+import os
+from typing import Optional
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+
+from persistence.serde import CompressedSerializer
+from persistence.sqlite_saver import BoundedSqliteSaver
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "data/checkpoints.sqlite3")
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "5"))
+CHECKPOINT_TTL_HOURS = float(os.getenv("CHECKPOINT_TTL_HOURS", "72"))
+CHECKPOINT_BATCH_SIZE = int(os.getenv("CHECKPOINT_BATCH_SIZE", "256"))
+CHECKPOINT_FLUSH_MS = float(os.getenv("CHECKPOINT_FLUSH_MS", "50"))
+CHECKPOINT_COMPRESSION = os.getenv("CHECKPOINT_COMPRESSION", "zstd")
+
+
+def build_checkpointer(backend: Optional[str] = None) -> BaseCheckpointSaver:
+    """
+    Create the checkpointer for build_graph().
+
+    New backends only need to implement BaseCheckpointSaver and be added here.
+    """
+    backend = (backend or CHECKPOINT_BACKEND).lower()
+
+    if backend == "memory":
+        logger.info("build_checkpointer: using in-process MemorySaver")
+        return MemorySaver()
+
+    if backend == "sqlite":
+        logger.info("build_checkpointer: using SQLite checkpointer at %s", CHECKPOINT_DB_PATH)
+        return BoundedSqliteSaver(
+            CHECKPOINT_DB_PATH,
+            keep_last=CHECKPOINT_KEEP_LAST,
+            ttl_seconds=CHECKPOINT_TTL_HOURS * 3600 if CHECKPOINT_TTL_HOURS > 0 else None,
+            batch_size=CHECKPOINT_BATCH_SIZE,
+            flush_interval=CHECKPOINT_FLUSH_MS / 1000.0,
+            serde=CompressedSerializer(codec=CHECKPOINT_COMPRESSION),
+        )
+
+    raise ValueError(f"Unknown CHECKPOINT_BACKEND: {backend!r}")
@@ -0,0 +1,89 @@
+# src/persistence/serde.py
+
+"""
+Compressed serializer for checkpoint blobs.
+
+Wraps any LangGraph SerializerProtocol (JsonPlusSerializer by default) and
+compresses payloads above `min_size` bytes. The codec is recorded in the
+type tag ("zstd+msgpack", "zlib+json", ...), so blobs written with or without
+compression, or with a different codec, can always be read back.
+"""
+
+import logging
+import threading
+import zlib
+from typing import Any, Optional, Tuple
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+try:  # optional: better ratio and much faster than zlib
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+class CompressedSerializer:
+    """
+    SerializerProtocol implementation that compresses the wrapped serializer's
+    output.
+
+    Parameters
+    ----------
+    inner : SerializerProtocol | None
+        Serializer producing the raw bytes (default: JsonPlusSerializer).
+    codec : str
+        "zstd", "zlib" or "none". "zstd" falls back to "zlib" if the
+        zstandard package is not installed.
+    level : int | None
+        Compression level (codec default if None).
+    min_size : int
+        Payloads smaller than this are stored uncompressed.
+    """
+
+    def __init__(
+        self,
+        inner: Optional[SerializerProtocol] = None,
+        codec: str = "zstd",
+        level: Optional[int] = None,
+        min_size: int = 256,
+    ) -> None:
+        self.inner = inner or JsonPlusSerializer()
+        if codec == "zstd" and zstandard is None:
+            logger.info("CompressedSerializer: zstandard not installed, using zlib")
+            codec = "zlib"
+        if codec not in ("zstd", "zlib", "none"):
+            raise ValueError(f"Unknown compression codec: {codec!r}")
+        self.codec = codec
+        self.min_size = min_size
+        self._level = level if level is not None else (3 if codec == "zstd" else 6)
+        # zstandard (de)compressor objects must not be shared between threads,
+        # and checkpointers are called from many; keep one pair per thread.
+        self._local = threading.local()
+
+    def _zstd(self) -> Tuple[Any, Any]:
+        pair = getattr(self._local, "zstd", None)
+        if pair is None:
+            pair = (zstandard.ZstdCompressor(level=self._level), zstandard.ZstdDecompressor())
+            self._local.zstd = pair
+        return pair
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.inner.dumps_typed(obj)
+        if self.codec == "none" or len(data) < self.min_size:
+            return type_, data
+        if self.codec == "zstd":
+            return f"zstd+{type_}", self._zstd()[0].compress(data)
+        return f"zlib+{type_}", zlib.compress(data, self._level)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, blob = data
+        if type_.startswith("zstd+"):
+            if zstandard is None:
+                raise RuntimeError("Checkpoint is zstd-compressed but zstandard is not installed")
+            return self.inner.loads_typed((type_[5:], self._zstd()[1].decompress(blob)))
+        if type_.startswith("zlib+"):
+            return self.inner.loads_typed((type_[5:], zlib.decompress(blob)))
+        return self.inner.loads_typed((type_, blob))
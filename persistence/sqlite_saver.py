@@ -0,0 +1,582 @@
+# src/persistence/sqlite_saver.py
+
+"""
+Durable, bounded LangGraph checkpointer backed by SQLite.
+
+Compared with the in-process MemorySaver this:
+
+- survives restarts and can be shared by several worker processes on the
+  same host (SQLite in WAL mode: many readers, one writer);
+- batches writes: checkpoints and pending writes are buffered in memory and
+  flushed in one transaction when the buffer is full or every
+  `flush_interval` seconds (reads see buffered data immediately);
+- keeps only the last `keep_last` checkpoints per thread/namespace;
+- evicts threads that have been idle for longer than `ttl_seconds`.
+
+The class only relies on the BaseCheckpointSaver interface, so another
+backend (Postgres, Redis, ...) can be dropped in via
+persistence.checkpointer.build_checkpointer().
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_threads_last_seen ON threads (last_seen);
+
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id     TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_id     TEXT,
+    type          TEXT,
+    checkpoint    BLOB,
+    metadata_type TEXT,
+    metadata      BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id     TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id       TEXT NOT NULL,
+    idx           INTEGER NOT NULL,
+    channel       TEXT NOT NULL,
+    type          TEXT,
+    value         BLOB,
+    task_path     TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+_CheckpointKey = Tuple[str, str, str]               # thread_id, ns, checkpoint_id
+_WriteKey = Tuple[str, str, str, str, int]          # ... + task_id, idx
+
+
+class BoundedSqliteSaver(BaseCheckpointSaver[str]):
+    """
+    SQLite checkpointer with write batching, per-thread retention and TTL eviction.
+
+    Parameters
+    ----------
+    path : str
+        SQLite database file (":memory:" works for tests/benchmarks).
+    keep_last : int
+        Number of checkpoints retained per (thread_id, checkpoint_ns).
+    ttl_seconds : float | None
+        Threads with no new checkpoint for this long are deleted. None disables.
+    batch_size : int
+        Flush the write buffer once it holds this many rows.
+    flush_interval : float
+        Upper bound (seconds) on how long a buffered write may stay in memory.
+        0 disables the background flusher (writes flush on batch_size / close()).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        keep_last: int = 5,
+        ttl_seconds: Optional[float] = None,
+        batch_size: int = 256,
+        flush_interval: float = 0.05,
+        evict_interval: float = 60.0,
+        serde: Optional[SerializerProtocol] = None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.path = path
+        self.keep_last = max(1, keep_last)
+        self.ttl_seconds = ttl_seconds
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.evict_interval = evict_interval
+
+        directory = os.path.dirname(path) if path != ":memory:" else ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # _db_lock serializes use of the writer connection; _lock guards the
+        # write buffers. A flush swaps the buffers under _lock and writes to
+        # disk under _db_lock only, so put() never waits for disk I/O. Reads
+        # use per-thread connections, which WAL lets run during a flush.
+        self._db_lock = threading.RLock()
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._readers = threading.local()
+        self._reader_conns: List[sqlite3.Connection] = []
+
+        # Write buffers. Keys mirror the primary keys of the tables. Rows move
+        # from "pending" to "inflight" while a flush is writing them.
+        self._pending_checkpoints: Dict[_CheckpointKey, tuple] = {}
+        self._pending_writes: Dict[_WriteKey, tuple] = {}
+        self._inflight_checkpoints: Dict[_CheckpointKey, tuple] = {}
+        self._inflight_writes: Dict[_WriteKey, tuple] = {}
+        self._touched_threads: Dict[str, float] = {}
+        self._last_evict = time.time()
+
+        self._closed = threading.Event()
+        self._flush_requested = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(
+                target=self._flush_loop,
+                name="checkpoint-flusher",
+                daemon=True,
+            )
+            self._flusher.start()
+        atexit.register(self.close)
+
+    def _read(self, sql: str, params: Sequence[Any]) -> List[tuple]:
+        """Run a read query on this thread's reader connection."""
+        if self.path == ":memory:":
+            # In-memory databases are private to one connection.
+            with self._db_lock:
+                return [tuple(r) for r in self._conn.execute(sql, params).fetchall()]
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._readers.conn = conn
+            with self._lock:
+                self._reader_conns.append(conn)
+        return [tuple(r) for r in conn.execute(sql, params).fetchall()]
+
+    # ---- lifecycle ----
+
+    def _flush_loop(self) -> None:
+        while not self._closed.is_set():
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            try:
+                self.flush()
+                if self.ttl_seconds and time.time() - self._last_evict >= self.evict_interval:
+                    self.evict_idle_threads()
+            except Exception as e:  # keep the flusher alive
+                logger.exception("BoundedSqliteSaver: background flush failed: %s", e)
+
+    def close(self) -> None:
+        """Flush buffered writes and stop the background flusher."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flush_requested.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+        with self._lock:
+            for conn in self._reader_conns:
+                conn.close()
+            self._reader_conns.clear()
+
+    def _buffered_rows(self) -> int:
+        return len(self._pending_checkpoints) + len(self._pending_writes)
+
+    def _after_buffer_write(self) -> None:
+        """Wake the flusher when a batch is ready; flush inline if it falls behind."""
+        buffered = self._buffered_rows()
+        if buffered < self.batch_size:
+            return
+        if self._flusher is None or buffered >= 8 * self.batch_size:
+            self.flush()
+        else:
+            self._flush_requested.set()
+
+    def flush(self) -> int:
+        """
+        Write all buffered checkpoints and writes in a single transaction,
+        then apply retention to the touched threads. Returns rows written.
+        """
+        with self._db_lock:
+            with self._lock:
+                if not self._pending_checkpoints and not self._pending_writes:
+                    return 0
+                self._inflight_checkpoints, self._pending_checkpoints = self._pending_checkpoints, {}
+                self._inflight_writes, self._pending_writes = self._pending_writes, {}
+                touched, self._touched_threads = self._touched_threads, {}
+                checkpoints = list(self._inflight_checkpoints.values())
+                writes = list(self._inflight_writes.values())
+
+            cur = self._conn.cursor()
+            cur.execute("BEGIN")
+            try:
+                cur.executemany(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    checkpoints,
+                )
+                # Special channels (errors, interrupts; negative idx) overwrite;
+                # regular writes are first-write-wins, as in the reference savers.
+                cur.executemany(
+                    "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [w for w in writes if w[4] < 0],
+                )
+                cur.executemany(
+                    "INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [w for w in writes if w[4] >= 0],
+                )
+                cur.executemany(
+                    "INSERT INTO threads (thread_id, last_seen) VALUES (?, ?) "
+                    "ON CONFLICT (thread_id) DO UPDATE SET last_seen = excluded.last_seen",
+                    list(touched.items()),
+                )
+                for thread_id, checkpoint_ns in {(c[0], c[1]) for c in checkpoints}:
+                    self._apply_retention(cur, thread_id, checkpoint_ns)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                with self._lock:
+                    # Put the rows back so the next flush retries them.
+                    for key, row in self._inflight_checkpoints.items():
+                        self._pending_checkpoints.setdefault(key, row)
+                    for key, row in self._inflight_writes.items():
+                        self._pending_writes.setdefault(key, row)
+                    for thread_id, seen in touched.items():
+                        self._touched_threads.setdefault(thread_id, seen)
+                    self._inflight_checkpoints, self._inflight_writes = {}, {}
+                raise
+
+            with self._lock:
+                self._inflight_checkpoints, self._inflight_writes = {}, {}
+
+        return len(checkpoints) + len(writes)
+
+    def _apply_retention(self, cur: sqlite3.Cursor, thread_id: str, checkpoint_ns: str) -> None:
+        row = cur.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_last - 1),
+        ).fetchone()
+        if row is None:
+            return
+        oldest_kept = row[0]
+        cur.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+            (thread_id, checkpoint_ns, oldest_kept),
+        )
+        cur.execute(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+            (thread_id, checkpoint_ns, oldest_kept),
+        )
+
+    def evict_idle_threads(self, ttl_seconds: Optional[float] = None) -> int:
+        """Delete every thread idle for longer than the TTL. Returns threads evicted."""
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        if not ttl:
+            return 0
+        self._last_evict = time.time()
+        self.flush()
+        cutoff = time.time() - ttl
+        with self._db_lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN")
+            try:
+                idle = [
+                    r[0]
+                    for r in cur.execute(
+                        "SELECT thread_id FROM threads WHERE last_seen < ?", (cutoff,)
+                    ).fetchall()
+                ]
+                with self._lock:
+                    # A thread that wrote since the flush above is not idle.
+                    idle = [t for t in idle if t not in self._touched_threads]
+                for thread_id in idle:
+                    self._delete_thread_rows(cur, thread_id)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        if idle:
+            logger.info("BoundedSqliteSaver: evicted %d idle threads", len(idle))
+        return len(idle)
+
+    @staticmethod
+    def _delete_thread_rows(cur: sqlite3.Cursor, thread_id: str) -> None:
+        cur.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+        cur.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+        cur.execute("DELETE FROM threads WHERE thread_id = ?", (thread_id,))
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.flush()
+        with self._db_lock:
+            with self._lock:
+                for key in [k for k in self._pending_checkpoints if k[0] == thread_id]:
+                    del self._pending_checkpoints[key]
+                for key in [k for k in self._pending_writes if k[0] == thread_id]:
+                    del self._pending_writes[key]
+                self._touched_threads.pop(thread_id, None)
+            cur = self._conn.cursor()
+            cur.execute("BEGIN")
+            self._delete_thread_rows(cur, thread_id)
+            cur.execute("COMMIT")
+
+    # ---- BaseCheckpointSaver: sync API ----
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_id = config["configurable"].get("checkpoint_id")
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        meta_type, meta_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        key = (thread_id, checkpoint_ns, checkpoint["id"])
+        with self._lock:
+            self._pending_checkpoints[key] = (
+                thread_id, checkpoint_ns, checkpoint["id"], parent_id,
+                type_, blob, meta_type, meta_blob,
+            )
+            self._touched_threads[thread_id] = time.time()
+        self._after_buffer_write()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            w_idx = WRITES_IDX_MAP.get(channel, idx)
+            rows.append(
+                (thread_id, checkpoint_ns, checkpoint_id, task_id, w_idx,
+                 channel, type_, blob, task_path)
+            )
+
+        with self._lock:
+            for row in rows:
+                key = row[:5]
+                if row[4] >= 0 and key in self._pending_writes:
+                    continue
+                self._pending_writes[key] = row
+        self._after_buffer_write()
+
+    def _buffered_writes(
+        self, thread_id: str, checkpoint_ns: str, checkpoint_id: str
+    ) -> Dict[_WriteKey, tuple]:
+        prefix = (thread_id, checkpoint_ns, checkpoint_id)
+        with self._lock:
+            found = {k: r for k, r in self._inflight_writes.items() if k[:3] == prefix}
+            for key, row in self._pending_writes.items():
+                if key[:3] == prefix and not (key[4] >= 0 and key in found):
+                    found[key] = row
+        return found
+
+    def _load_writes(
+        self, thread_id: str, checkpoint_ns: str, checkpoint_id: str
+    ) -> List[Tuple[str, str, Any]]:
+        buffered = self._buffered_writes(thread_id, checkpoint_ns, checkpoint_id)
+        rows = {
+            r[:5]: r
+            for r in self._read(
+                "SELECT * FROM writes WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            )
+        }
+        for key, row in buffered.items():
+            if key[4] >= 0 and key in rows:
+                continue
+            rows[key] = row
+        ordered = sorted(rows.values(), key=lambda r: (r[8], r[3], r[4]))
+        return [(r[3], r[5], self.serde.loads_typed((r[6], r[7]))) for r in ordered]
+
+    def _row_to_tuple(self, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, blob, meta_type, meta_blob = row
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((type_, blob)),
+            metadata=self.serde.loads_typed((meta_type, meta_blob)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        # Buffered rows first, then disk: a concurrent flush can only move a
+        # row from the buffer to disk, never lose it.
+        with self._lock:
+            buffered = [
+                r
+                for buf in (self._inflight_checkpoints, self._pending_checkpoints)
+                for k, r in buf.items()
+                if k[0] == thread_id and k[1] == checkpoint_ns
+                and (not checkpoint_id or k[2] == checkpoint_id)
+            ]
+
+        if checkpoint_id:
+            stored = self._read(
+                "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            )
+        else:
+            stored = self._read(
+                "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns),
+            )
+
+        candidates = buffered + stored
+        if not candidates:
+            return None
+        return self._row_to_tuple(max(candidates, key=lambda r: r[2]))
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        self.flush()
+
+        where: List[str] = []
+        params: List[Any] = []
+        if config is not None:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+
+        sql = "SELECT * FROM checkpoints"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY checkpoint_id DESC"
+
+        rows = self._read(sql, params)
+
+        emitted = 0
+        for row in rows:
+            if limit is not None and emitted >= limit:
+                break
+            tup = self._row_to_tuple(tuple(row))
+            if filter and not all(tup.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            emitted += 1
+            yield tup
+
+    # ---- BaseCheckpointSaver: async API (thread offload) ----
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
@@ -0,0 +1,565 @@
+# src/profiling.py
+"""
+On-demand profiling of slow turns, and per-thread state size tracking.
+
+A slow turn's time can be in Bedrock, JSON parsing, embedding, FAISS search
+or LangGraph checkpointing, and logs do not say which. profile_from_env(app)
+wraps the app so that, while a turn runs, a background sampler records the
+Python stack of every busy thread every PROFILE_INTERVAL_MS. Threads waiting
+on a socket are sampled too, so time spent waiting for Bedrock shows up next
+to CPU work; idle pool workers and threads blocked waiting for another
+thread (a future, a queue, an admission slot) are skipped, since that other
+thread is sampled. A turn is captured when
+
+- it took at least PROFILE_SLOW_MS, or
+- it is one of every PROFILE_SAMPLE_N turns (profiled from the start).
+
+A captured turn is saved under PROFILE_DIR as <turn_id>.json (top functions
+by self and total samples, samples per area -- bedrock, json, embedding,
+faiss, checkpoint, langgraph, other -- and, with PROFILE_TRACEMALLOC=1, top
+allocation sites and their growth) plus <turn_id>.folded (collapsed stacks
+for flamegraph.pl or speedscope). The turn id holds the time, thread_id and
+a sequence number; the trace id is included when tracing is on.
+
+The sampler covers the whole process, so with concurrent turns (the server)
+a profile also holds samples of the turns that overlapped it.
+
+tracemalloc slows every allocation down, so it is only started with
+PROFILE_TRACEMALLOC=1. Allocation growth is measured from the start of a
+sampled turn, or for a slow turn since the previous capture.
+
+With PROFILE_STATE_SIZES=1 the serialized size of each thread's state is
+recorded after every turn: profiling_stats() lists the largest threads,
+their growth per turn and the keys that grew most, and a thread passing
+PROFILE_STATE_WARN_KB is logged once. Long sessions whose state keeps
+growing point at a key the state policy (state_policy.py) does not cap.
+
+Configured via environment (profiling is off unless one of the first three is set):
+
+- PROFILE_SLOW_MS:        capture turns at least this slow (default 0: off)
+- PROFILE_SAMPLE_N:       also capture one turn in N (default 0: off)
+- PROFILE_STATE_SIZES:    "1" tracks state size per thread (default off)
+- PROFILE_DIR:            where profiles are written (default "profiles")
+- PROFILE_INTERVAL_MS:    sampling interval (default 10)
+- PROFILE_TRACEMALLOC:    "1" adds allocation snapshots to captured turns (default off)
+- PROFILE_STATE_WARN_KB:  state size per thread that is logged (default 256)
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_SAMPLE_N = int(os.getenv("PROFILE_SAMPLE_N", "0"))
+PROFILE_STATE_SIZES = os.getenv("PROFILE_STATE_SIZES", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+PROFILE_TRACEMALLOC = os.getenv("PROFILE_TRACEMALLOC", "0") == "1"
+PROFILE_STATE_WARN_KB = float(os.getenv("PROFILE_STATE_WARN_KB", "256"))
+
+TOP_N = 25  # functions / allocation sites listed per profile
+MAX_DEPTH = 128  # frames kept per sampled stack
+STATE_WINDOW = 50  # turns per thread kept for growth
+MAX_TRACKED_THREADS = 1000
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Leaf frames of threads that are idle or waiting for another thread.
+_IDLE_LEAVES = {
+    ("thread.py", "_worker"),  # concurrent.futures pool thread waiting for work
+    ("selectors.py", "select"),  # event loop waiting for I/O
+    ("threading.py", "wait"),  # Condition / Event: future results, queues, semaphores
+}
+
+# Where a sample's time goes: the first frame from the leaf up matching a pattern decides.
+AREAS = (
+    ("bedrock", ("botocore/", "urllib3/", "langchain_aws/", "/ssl.py", "/socket.py", "/http/client.py")),
+    ("json", ("/json/", "orjson", "partial_json.py")),
+    ("embedding", ("sentence_transformers/", "transformers/", "torch/", "langchain_huggingface/")),
+    ("faiss", ("faiss/", "flights_index.py")),
+    ("checkpoint", ("langgraph/checkpoint/", "persistence/", "sqlite3/")),
+    ("langgraph", ("langgraph/",)),
+)
+
+Frame = Tuple[str, int, str]  # (file, first line, function)
+
+
+def _short(filename: str) -> str:
+    marker = filename.rfind("site-packages/")
+    if marker >= 0:
+        return filename[marker + len("site-packages/") :]
+    if filename.startswith(_ROOT):
+        return os.path.relpath(filename, _ROOT)
+    return filename.rsplit("/lib/python", 1)[-1] if "/lib/python" in filename else filename
+
+
+def _label(frame: Frame) -> str:
+    return f"{frame[2]} ({_short(frame[0])}:{frame[1]})"
+
+
+def _area(stack: Tuple[Frame, ...]) -> str:
+    for filename, _, _ in reversed(stack):
+        for area, patterns in AREAS:
+            if any(p in filename for p in patterns):
+                return area
+    return "other"
+
+
+class StackSampler:
+    """
+    Background thread that samples the stacks of all busy threads every
+    `interval_s` while at least one bucket (a turn being profiled) is open.
+    """
+
+    def __init__(self, interval_s: float) -> None:
+        self.interval_s = interval_s
+        self._lock = threading.Lock()
+        self._buckets: Dict[int, "Counter[Tuple[Frame, ...]]"] = {}
+        self._next = 0
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.ticks = 0
+
+    def begin(self) -> int:
+        """Open a bucket; samples go into it until end()."""
+        with self._lock:
+            self._next += 1
+            self._buckets[self._next] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+            self._wake.set()
+            return self._next
+
+    def end(self, bucket: int) -> "Counter[Tuple[Frame, ...]]":
+        with self._lock:
+            return self._buckets.pop(bucket, Counter())
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                idle = not self._buckets
+                if idle:
+                    self._wake.clear()
+            if idle:
+                self._wake.wait()
+                continue
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                stack = _stack(frame) if ident != me else ()
+                if stack:
+                    stacks.append(stack)
+            with self._lock:
+                self.ticks += 1
+                for bucket in self._buckets.values():
+                    bucket.update(stacks)
+            time.sleep(self.interval_s)
+
+
+def _stack(frame: Any) -> Tuple[Frame, ...]:
+    """Root-to-leaf frames of a thread, or () if the thread is idle."""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+        return ()
+    frames: List[Frame] = []
+    while frame is not None and len(frames) < MAX_DEPTH:
+        code = frame.f_code
+        frames.append((code.co_filename, code.co_firstlineno, code.co_name))
+        frame = frame.f_back
+    return tuple(reversed(frames))
+
+
+def summarize_samples(samples: "Counter[Tuple[Frame, ...]]", interval_ms: float, top: int = TOP_N) -> Dict[str, Any]:
+    """Top functions by self / total samples and samples per area."""
+    total = sum(samples.values())
+    own: Counter = Counter()
+    inclusive: Counter = Counter()
+    areas: Counter = Counter()
+    for stack, count in samples.items():
+        own[stack[-1]] += count
+        for frame in set(stack):
+            inclusive[frame] += count
+        areas[_area(stack)] += count
+
+    def pct(count: int) -> float:
+        return round(100.0 * count / total, 1) if total else 0.0
+
+    return {
+        "samples": total,
+        "interval_ms": interval_ms,
+        "areas": {area: {"samples": n, "pct": pct(n)} for area, n in areas.most_common()},
+        "top_self": [{"function": _label(f), "samples": n, "pct": pct(n)} for f, n in own.most_common(top)],
+        "top_total": [{"function": _label(f), "samples": n, "pct": pct(n)} for f, n in inclusive.most_common(top)],
+    }
+
+
+def folded_stacks(samples: "Counter[Tuple[Frame, ...]]") -> str:
+    """Collapsed stack lines ("root;...;leaf count"), as flamegraph.pl and speedscope read."""
+    return "".join(
+        ";".join(f"{f[2]} ({_short(f[0])})" for f in stack) + f" {count}\n" for stack, count in samples.most_common()
+    )
+
+
+# ---- allocations ----
+
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+    tracemalloc.Filter(False, __file__),  # the sampler's own stacks
+]
+
+
+def take_snapshot() -> Optional[tracemalloc.Snapshot]:
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+def summarize_allocations(
+    snapshot: tracemalloc.Snapshot, baseline: Optional[tracemalloc.Snapshot], top: int = TOP_N
+) -> Dict[str, Any]:
+    """Top allocation sites by live size, and by growth since `baseline`."""
+
+    def site(trace: Any) -> str:
+        frame = trace.traceback[0]
+        return f"{_short(frame.filename)}:{frame.lineno}"
+
+    stats = snapshot.statistics("lineno")
+    summary: Dict[str, Any] = {
+        "traced_kb": round(sum(s.size for s in stats) / 1024.0, 1),
+        "top_sites": [
+            {"site": site(s), "size_kb": round(s.size / 1024.0, 1), "blocks": s.count} for s in stats[:top]
+        ],
+    }
+    if baseline is not None:
+        diff = sorted(snapshot.compare_to(baseline, "lineno"), key=lambda d: d.size_diff, reverse=True)
+        summary["growth"] = [
+            {"site": site(d), "size_diff_kb": round(d.size_diff / 1024.0, 1), "blocks_diff": d.count_diff}
+            for d in diff[:top]
+            if d.size_diff > 0
+        ]
+    return summary
+
+
+# ---- state sizes ----
+
+
+def state_key_bytes(state: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """Serialized (JSON) size of each top-level key of a state."""
+    sizes = {}
+    for key, value in (state or {}).items():
+        try:
+            sizes[key] = len(json.dumps(value, default=str, ensure_ascii=False))
+        except (TypeError, ValueError):
+            sizes[key] = len(str(value))
+    return sizes
+
+
+class StateSizeTracker:
+    """Serialized state size per thread after each turn, over the last STATE_WINDOW turns."""
+
+    def __init__(self, window: int = STATE_WINDOW, warn_kb: float = PROFILE_STATE_WARN_KB) -> None:
+        self.window = window
+        self.warn_bytes = warn_kb * 1024.0
+        self._lock = threading.Lock()
+        self._threads: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def record(self, thread_id: str, state: Optional[Dict[str, Any]]) -> int:
+        keys = state_key_bytes(state)
+        size = sum(keys.values())
+        with self._lock:
+            entry = self._threads.get(thread_id)
+            if entry is None:
+                entry = self._threads[thread_id] = {
+                    "turns": 0,
+                    "sizes": deque(maxlen=self.window),
+                    "first_keys": keys,
+                    "warned": False,
+                }
+            self._threads.move_to_end(thread_id)
+            while len(self._threads) > MAX_TRACKED_THREADS:
+                self._threads.popitem(last=False)
+            entry["turns"] += 1
+            entry["sizes"].append((entry["turns"], size))
+            entry["last_keys"] = keys
+            warn = size > self.warn_bytes and not entry["warned"]
+            entry["warned"] = entry["warned"] or warn
+        if warn:
+            grown = _grown_keys(entry["first_keys"], keys, 3)
+            logger.warning(
+                "profiling: state of thread %s is %.0f KB after %d turns (grew most: %s)",
+                thread_id,
+                size / 1024.0,
+                entry["turns"],
+                ", ".join(f"{k} +{v / 1024.0:.1f} KB" for k, v in grown.items()) or "-",
+            )
+        return size
+
+    def stats(self, top: int = 10) -> Dict[str, Any]:
+        with self._lock:
+            threads = {
+                thread_id: (e["turns"], list(e["sizes"]), e["first_keys"], e["last_keys"])
+                for thread_id, e in self._threads.items()
+            }
+        rows = []
+        for thread_id, (turns, sizes, first_keys, last_keys) in threads.items():
+            (first_turn, first_size), (last_turn, last_size) = sizes[0], sizes[-1]
+            rows.append(
+                {
+                    "thread_id": thread_id,
+                    "turns": turns,
+                    "kb": round(last_size / 1024.0, 1),
+                    "growth_bytes_per_turn": (
+                        round((last_size - first_size) / (last_turn - first_turn), 1) if last_turn > first_turn else 0.0
+                    ),
+                    "grown_keys_bytes": _grown_keys(first_keys, last_keys, 3),
+                }
+            )
+        rows.sort(key=lambda r: r["kb"], reverse=True)
+        sizes_kb = [r["kb"] for r in rows]
+        return {
+            "threads": len(rows),
+            "mean_kb": round(sum(sizes_kb) / len(sizes_kb), 1) if sizes_kb else None,
+            "max_kb": max(sizes_kb) if sizes_kb else None,
+            "growing": sum(r["growth_bytes_per_turn"] > 0 for r in rows),
+            "largest": rows[:top],
+        }
+
+
+def _grown_keys(first: Dict[str, int], last: Dict[str, int], top: int) -> Dict[str, int]:
+    grown = {key: size - first.get(key, 0) for key, size in last.items() if size > first.get(key, 0)}
+    return dict(sorted(grown.items(), key=lambda kv: kv[1], reverse=True)[:top])
+
+
+# ---- turn profiler ----
+
+
+class _Turn:
+    __slots__ = ("turn_id", "thread_id", "sampled", "bucket", "baseline", "started")
+
+    def __init__(self, turn_id: str, thread_id: str, sampled: bool, bucket: Optional[int], baseline: Any) -> None:
+        self.turn_id = turn_id
+        self.thread_id = thread_id
+        self.sampled = sampled
+        self.bucket = bucket
+        self.baseline = baseline
+        self.started = time.perf_counter()
+
+
+class TurnProfiler:
+    """
+    Decides which turns to capture and writes their profiles (see the module
+    docstring). Summaries are written on a background thread, so a captured
+    turn only pays for its allocation snapshot.
+    """
+
+    def __init__(
+        self,
+        slow_ms: float = PROFILE_SLOW_MS,
+        sample_n: int = PROFILE_SAMPLE_N,
+        directory: str = PROFILE_DIR,
+        interval_ms: float = PROFILE_INTERVAL_MS,
+        allocations: bool = PROFILE_TRACEMALLOC,
+    ) -> None:
+        self.slow_ms = slow_ms
+        self.sample_n = sample_n
+        self.directory = directory
+        self.interval_ms = interval_ms
+        self.sampler = StackSampler(interval_ms / 1000.0) if slow_ms > 0 or sample_n > 0 else None
+        if allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._last_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profile-writer")
+        self._stats = {"turns": 0, "slow": 0, "sampled": 0}
+        self._recent: Deque[str] = deque(maxlen=10)
+
+    def begin(self, thread_id: str) -> Optional[_Turn]:
+        if self.sampler is None:
+            return None
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        sampled = self.sample_n > 0 and seq % self.sample_n == 0
+        safe_thread = re.sub(r"[^A-Za-z0-9_.-]+", "_", thread_id)[:64] or "thread"
+        turn_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{safe_thread}-{seq}"
+        baseline = take_snapshot() if sampled else None
+        return _Turn(turn_id, thread_id, sampled, self.sampler.begin(), baseline)
+
+    def end(self, turn: Optional[_Turn], trace_id: Optional[str] = None, error: Optional[str] = None) -> None:
+        if turn is None or self.sampler is None:
+            return
+        ms = (time.perf_counter() - turn.started) * 1000.0
+        samples = self.sampler.end(turn.bucket)
+        slow = self.slow_ms > 0 and ms >= self.slow_ms
+        with self._lock:
+            self._stats["turns"] += 1
+            if not (slow or turn.sampled):
+                return
+            self._stats["slow" if slow else "sampled"] += 1
+            baseline = turn.baseline or self._last_snapshot
+        snapshot = take_snapshot()
+        if snapshot is not None:
+            with self._lock:
+                self._last_snapshot = snapshot
+        meta = {
+            "turn_id": turn.turn_id,
+            "thread_id": turn.thread_id,
+            "trace_id": trace_id,
+            "reason": "slow" if slow else "sampled",
+            "ms": round(ms, 1),
+            "error": error,
+        }
+        self._writer.submit(self._write, meta, samples, snapshot, baseline)
+
+    def _write(
+        self,
+        meta: Dict[str, Any],
+        samples: "Counter[Tuple[Frame, ...]]",
+        snapshot: Optional[tracemalloc.Snapshot],
+        baseline: Optional[tracemalloc.Snapshot],
+    ) -> None:
+        try:
+            report = {**meta, "cpu": summarize_samples(samples, self.interval_ms)}
+            if snapshot is not None:
+                report["memory"] = summarize_allocations(snapshot, baseline)
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{meta['turn_id']}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            with open(os.path.join(self.directory, f"{meta['turn_id']}.folded"), "w", encoding="utf-8") as f:
+                f.write(folded_stacks(samples))
+        except Exception:
+            logger.exception("profiling: could not write the profile of %s", meta["turn_id"])
+            return
+        areas = ", ".join(f"{a} {v['pct']:.0f}%" for a, v in list(report["cpu"]["areas"].items())[:4])
+        logger.info("profiling: %s turn %.0f ms saved to %s (%s)", meta["reason"], meta["ms"], path, areas)
+        with self._lock:
+            self._recent.append(path)
+
+    def flush(self) -> None:
+        """Wait for profiles being written (benchmarks, tests)."""
+        self._writer.submit(lambda: None).result()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "slow_ms": self.slow_ms,
+                "sample_n": self.sample_n,
+                "directory": self.directory,
+                "tracemalloc": tracemalloc.is_tracing(),
+                "sampler_ticks": self.sampler.ticks if self.sampler is not None else 0,
+                **self._stats,
+                "recent": list(self._recent),
+            }
+
+
+# ---- app wrapper ----
+
+
+class ProfilingApp:
+    """
+    Thin proxy around a compiled graph (or another wrapper) that profiles
+    turns with `profiler` and records state sizes with `states`.
+    """
+
+    def __init__(self, app: Any, profiler: Optional[TurnProfiler], states: Optional[StateSizeTracker]) -> None:
+        self._app = app
+        self.profiler = profiler
+        self.states = states
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._app, name)
+
+    @staticmethod
+    def _thread_id(config: Optional[Dict[str, Any]]) -> str:
+        return str(((config or {}).get("configurable") or {}).get("thread_id") or "")
+
+    def _begin(self, thread_id: str) -> Optional[_Turn]:
+        return self.profiler.begin(thread_id) if self.profiler is not None else None
+
+    def _end(self, turn: Optional[_Turn], thread_id: str, final: Any, error: Optional[str]) -> None:
+        if self.profiler is not None:
+            from src.tracing import get_current_span  # the turn's root span, when tracing wraps this app
+
+            self.profiler.end(turn, getattr(get_current_span(), "trace_id", None), error)
+        if self.states is not None and final:
+            self.states.record(thread_id, final)
+
+    def invoke(self, input: Dict[str, Any], config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        thread_id = self._thread_id(config)
+        turn = self._begin(thread_id)
+        result, error = None, None
+        try:
+            result = self._app.invoke(input, config=config, **kwargs)
+            return result
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            self._end(turn, thread_id, result, error)
+
+    def stream(self, input: Dict[str, Any], config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Iterator[Any]:
+        thread_id = self._thread_id(config)
+        turn = self._begin(thread_id)
+        final: Dict[str, Any] = {}
+        error = None
+        try:
+            for chunk in self._app.stream(input, config=config, **kwargs):
+                if isinstance(chunk, tuple) and len(chunk) == 2 and chunk[0] == "values":
+                    final = chunk[1]
+                yield chunk
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            self._end(turn, thread_id, final, error)
+
+
+_profiler: Optional[TurnProfiler] = None
+_states: Optional[StateSizeTracker] = None
+
+
+def profile_from_env(app: Any) -> Any:
+    """
+    If PROFILE_SLOW_MS, PROFILE_SAMPLE_N or PROFILE_STATE_SIZES is set,
+    return the app wrapped in ProfilingApp; otherwise `app` unchanged. Call
+    after build_graph(), inside trace_from_env() so profiles carry trace ids.
+    """
+    global _profiler, _states
+    if PROFILE_SLOW_MS > 0 or PROFILE_SAMPLE_N > 0:
+        _profiler = _profiler or TurnProfiler()
+    if PROFILE_STATE_SIZES:
+        _states = _states or StateSizeTracker()
+    if _profiler is None and _states is None:
+        return app
+    logger.info(
+        "profile_from_env: slow_ms=%s sample_n=%s state_sizes=%s -> %s",
+        PROFILE_SLOW_MS,
+        PROFILE_SAMPLE_N,
+        PROFILE_STATE_SIZES,
+        PROFILE_DIR,
+    )
+    return ProfilingApp(app, _profiler, _states)
+
+
+def profiling_stats() -> Dict[str, Any]:
+    """Captured turns and state sizes (empty when profiling is off)."""
+    return {
+        "profiler": _profiler.stats() if _profiler is not None else None,
+        "state_sizes": _states.stats() if _states is not None else None,
+    }
@@ -14,17 +14,24 @@ You will RECEIVE a JSON object with:
   "user_query": string,
   "trip_info": object (may be partial),
   "preferences": object (may be partial),
-  "history_summary": string (may be empty)
+  "history_summary": string (may be empty),
+  "recent_exchanges": array of {"user", "assistant"}, NEWEST FIRST (may be missing)
 }
 
-You must RETURN ONLY a JSON object with this exact shape:
+recent_exchanges are the last few turns verbatim; use them to resolve
+references such as "the second one" or "that flight". history_summary
+covers everything before them.
+
+You must RETURN ONLY a JSON object with this exact shape, keys in this
+exact order (the system starts routing while you are still writing
+assistant_message):
 
 {
   "intent": "generic_chat" | "activities_q" | "logistics_q" | "plan_full",
   "needs_specialist": boolean,
-  "assistant_message": string,
   "trip_info_updates": { ...partial trip_info... },
-  "preferences_updates": { ...partial preferences... }
+  "preferences_updates": { ...partial preferences... },
+  "assistant_message": string
 }
 
 INTENT RULES (VERY IMPORTANT):
@@ -238,6 +245,24 @@ RULES:
   cannot be satisfied with current tool_results, you MAY set "needs_tools": true,
   but normally the tools are already available to you.
 
+EDIT MODE:
+If the input has "mode": "edit", you are updating the plan you made earlier.
+Its items carry an "index", "changes" lists the trip details or preferences
+that changed since then (may be absent), and trip_info / preferences are left
+out. Do NOT repeat the plan. Return ONLY the edits:
+
+{
+  "plan_edits": {
+    "remove": [2],
+    "update": [{"index": 1, "notes": "Updated note."}],
+    "add": [ { ...a new item in the format above... } ]
+  },
+  "needs_tools": false
+}
+
+Omit "remove" / "update" / "add" when you have none. Only list fields that
+change in "update".
+
 Your response MUST be valid JSON, no comments, no trailing commas, and no
 extra text outside the JSON object.
 """
@@ -301,6 +326,24 @@ RULES:
 - If you somehow require more retrieval and have not yet called the RAG tool,
   you MAY set "needs_tools": true, but usually the tools are already available.
 
+EDIT MODE:
+If the input has "mode": "edit", you are updating the plan you made earlier.
+Its legs carry an "index", "changes" lists the trip details or preferences
+that changed since then (may be absent), and trip_info / preferences are left
+out. Do NOT repeat the plan. Return ONLY the edits:
+
+{
+  "plan_edits": {
+    "remove": [2],
+    "update": [{"index": 1, "notes": "Updated note."}],
+    "add": [ { ...a new leg in the format above... } ]
+  },
+  "needs_tools": false
+}
+
+Omit "remove" / "update" / "add" when you have none. Only list fields that
+change in "update".
+
 Your response MUST be valid JSON, no comments, no trailing commas, and no
 extra text outside the JSON object.
 """
@@ -0,0 +1,425 @@
+# src/recording.py
+"""
+Record / replay of LLM and tool traffic.
+
+Recording wraps call_llm, activities_events_tool and logistics_rag_tool (and
+the graph app itself, for turn boundaries) and appends every request/response
+pair, with its timing, to a JSON-lines file. Replaying serves those responses
+back deterministically, optionally sleeping for the recorded latency, so a
+captured production session can be re-run offline against new graph or agent
+code and compared for both output and time (see benchmarks/replay_session.py).
+
+File format: one JSON object per line, append-only.
+
+    {"k": "prompt", "h": <sha1[:12]>, "text": <system prompt>}      once per prompt
+    {"k": "llm",  "th": thread_id, "sys": h, "user": ..., "opt": {...},
+     "key": <sha1[:16]>, "out": <raw text>, "ms": <latency>, "t": <epoch>}
+    {"k": "tool", "th": thread_id, "name": ..., "in": query, "key": ...,
+     "out": ..., "ms": ..., "t": ...}
+    {"k": "turn", "th": thread_id, "in": user_input, "out": reply,
+     "intent": ..., "ms": ..., "t": ...}
+
+Enable recording for the CLI or server with TRAFFIC_RECORD_PATH=<file>.
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRAFFIC_RECORD_PATH = os.getenv("TRAFFIC_RECORD_PATH", "")
+
+RECORDED_TOOLS = ("activities_events_tool", "logistics_rag_tool")
+
+# thread_id of the turn being executed, so LLM/tool calls can be attributed.
+current_thread_id: contextvars.ContextVar[str] = contextvars.ContextVar("current_thread_id", default="")
+
+
+def _digest(*parts: Any, size: int = 16) -> str:
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()[:size]
+
+
+def llm_key(system_prompt: str, user_prompt: str, max_tokens: int, temperature: float, tools: Any) -> str:
+    tool_names = [getattr(t, "name", str(t)) for t in (tools or [])]
+    return _digest(system_prompt, user_prompt, max_tokens, temperature, tool_names)
+
+
+# ---- patching helpers (shared with benchmarks.stubs) ----
+
+
+def swap_call_llm(replacement: Callable[..., str]) -> List[Callable[[], None]]:
+    """
+    Point every loaded module's `call_llm` (the Bedrock one) at `replacement`.
+
+    Agents import call_llm by name, and modules can be loaded under two names
+    in this tree (`agents.master` / `src.agents.master`), so all are patched.
+    Returns undo callbacks.
+    """
+    undo: List[Callable[[], None]] = []
+    for module in list(sys.modules.values()):
+        fn = getattr(module, "__dict__", {}).get("call_llm") if module is not None else None
+        if callable(fn) and fn is not replacement and getattr(fn, "__module__", "").endswith("bedrock_client"):
+            setattr(module, "call_llm", replacement)
+            undo.append(lambda m=module, f=fn: setattr(m, "call_llm", f))
+    return undo
+
+
+def swap_tool_func(name: str, wrap: Callable[[Callable[..., Any]], Callable[..., Any]]) -> List[Callable[[], None]]:
+    """
+    Replace the function behind every loaded StructuredTool called `name`
+    with wrap(original). Tools are mutated in place so the ACTIVITIES_TOOLS /
+    LOGISTICS_TOOLS lists bound to the LLM see the change. Returns undo callbacks.
+    """
+    undo: List[Callable[[], None]] = []
+    seen = set()
+    for module in list(sys.modules.values()):
+        tool = getattr(module, "__dict__", {}).get(name) if module is not None else None
+        if tool is None or not hasattr(tool, "func") or id(tool) in seen:
+            continue
+        seen.add(id(tool))
+        original = tool.func
+        # StructuredTool is a pydantic model; bypass validation on assignment.
+        object.__setattr__(tool, "func", wrap(original))
+        undo.append(lambda t=tool, f=original: object.__setattr__(t, "func", f))
+    return undo
+
+
+# ---- recording ----
+
+
+class TrafficRecorder:
+    """Appends traffic records to `path` (thread-safe, line-buffered)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", buffering=1, encoding="utf-8")
+        self._lock = threading.Lock()
+        self._prompts: set = set()
+        self._undo: List[Callable[[], None]] = []
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def _prompt_ref(self, text: str) -> str:
+        ref = _digest(text, size=12)
+        with self._lock:
+            new = ref not in self._prompts
+            self._prompts.add(ref)
+        if new:
+            self.write({"k": "prompt", "h": ref, "text": text})
+        return ref
+
+    def wrap_llm(self, call_llm: Callable[..., str]) -> Callable[..., str]:
+        def recorded_call_llm(
+            system_prompt: str,
+            user_prompt: str,
+            max_tokens: int = 4000,
+            temperature: float = 0.7,
+            tools: list | None = None,
+            **options: Any,
+        ) -> str:
+            started = time.time()
+            t0 = time.perf_counter()
+            out = call_llm(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                tools=tools,
+                **options,  # tool_budget_s / tool_log / timeout_s; tool calls are recorded as "tool"
+            )
+            self.write(
+                {
+                    "k": "llm",
+                    "th": current_thread_id.get(),
+                    "sys": self._prompt_ref(system_prompt),
+                    "user": user_prompt,
+                    "opt": {
+                        "max_tokens": max_tokens,
+                        "temperature": temperature,
+                        "tools": [getattr(t, "name", str(t)) for t in (tools or [])],
+                    },
+                    "key": llm_key(system_prompt, user_prompt, max_tokens, temperature, tools),
+                    "out": out,
+                    "ms": round((time.perf_counter() - t0) * 1000.0, 2),
+                    "t": round(started, 3),
+                }
+            )
+            return out
+
+        return recorded_call_llm
+
+    def wrap_tool(self, name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        def wrap(func: Callable[..., Any]) -> Callable[..., Any]:
+            def recorded_tool(query: str) -> Any:
+                started = time.time()
+                t0 = time.perf_counter()
+                out = func(query)
+                self.write(
+                    {
+                        "k": "tool",
+                        "th": current_thread_id.get(),
+                        "name": name,
+                        "in": query,
+                        "key": _digest(name, query),
+                        "out": out,
+                        "ms": round((time.perf_counter() - t0) * 1000.0, 2),
+                        "t": round(started, 3),
+                    }
+                )
+                return out
+
+            return recorded_tool
+
+        return wrap
+
+    def record_turn(self, thread_id: str, user_input: str, state: Dict[str, Any], ms: float, started: float) -> None:
+        self.write(
+            {
+                "k": "turn",
+                "th": thread_id,
+                "in": user_input,
+                "out": (state or {}).get("master_message") or "",
+                "intent": (state or {}).get("intent"),
+                "ms": round(ms, 2),
+                "t": round(started, 3),
+            }
+        )
+
+    def install(self) -> None:
+        """Wrap call_llm and the recorded tools in every loaded module."""
+        from src.llm import bedrock_client
+
+        self._undo += swap_call_llm(self.wrap_llm(bedrock_client.call_llm))
+        for name in RECORDED_TOOLS:
+            self._undo += swap_tool_func(name, self.wrap_tool(name))
+
+    def close(self) -> None:
+        for undo in reversed(self._undo):
+            undo()
+        self._undo.clear()
+        with self._lock:
+            self._file.close()
+
+
+class TurnTrackingApp:
+    """
+    Thin proxy around a compiled graph that sets current_thread_id for each
+    turn and, if a recorder is given, records the turn boundary.
+    """
+
+    def __init__(self, app: Any, recorder: Optional[TrafficRecorder] = None) -> None:
+        self._app = app
+        self._recorder = recorder
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._app, name)
+
+    @staticmethod
+    def _thread_id(config: Optional[Dict[str, Any]]) -> str:
+        return str(((config or {}).get("configurable") or {}).get("thread_id") or "")
+
+    def invoke(self, input: Dict[str, Any], config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        thread_id = self._thread_id(config)
+        token = current_thread_id.set(thread_id)
+        started, t0 = time.time(), time.perf_counter()
+        try:
+            result = self._app.invoke(input, config=config, **kwargs)
+        finally:
+            current_thread_id.reset(token)
+        if self._recorder is not None:
+            self._recorder.record_turn(
+                thread_id, input.get("user_input", ""), result, (time.perf_counter() - t0) * 1000.0, started
+            )
+        return result
+
+    def stream(self, input: Dict[str, Any], config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Iterator[Any]:
+        thread_id = self._thread_id(config)
+        started, t0 = time.time(), time.perf_counter()
+        final: Dict[str, Any] = {}
+        token = current_thread_id.set(thread_id)
+        try:
+            for chunk in self._app.stream(input, config=config, **kwargs):
+                if isinstance(chunk, tuple) and len(chunk) == 2 and chunk[0] == "values":
+                    final = chunk[1]
+                yield chunk
+        finally:
+            current_thread_id.reset(token)
+        if self._recorder is not None:
+            if not final:
+                final = self._app.get_state(config).values
+            self._recorder.record_turn(
+                thread_id, input.get("user_input", ""), final, (time.perf_counter() - t0) * 1000.0, started
+            )
+
+
+def record_from_env(app: Any) -> Any:
+    """
+    If TRAFFIC_RECORD_PATH is set, start recording and return the wrapped
+    app; otherwise return `app` unchanged. Call after build_graph().
+    """
+    if not TRAFFIC_RECORD_PATH:
+        return app
+    recorder = TrafficRecorder(TRAFFIC_RECORD_PATH)
+    recorder.install()
+    logger.info("record_from_env: recording LLM/tool traffic to %s", TRAFFIC_RECORD_PATH)
+    return TurnTrackingApp(app, recorder)
+
+
+# ---- replay ----
+
+
+def load_records(path: str) -> Tuple[Dict[str, str], List[Dict[str, Any]]]:
+    """Read a traffic file; returns (prompt texts by hash, other records in order)."""
+    prompts: Dict[str, str] = {}
+    records: List[Dict[str, Any]] = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write leaves at most one torn line at the end.
+                logger.warning("load_records: skipping malformed line %d of %s", line_no, path)
+                continue
+            if record.get("k") == "prompt":
+                prompts[record["h"]] = record["text"]
+            else:
+                records.append(record)
+    return prompts, records
+
+
+class TrafficReplayer:
+    """
+    Serves recorded responses instead of calling Bedrock or the tools.
+
+    Lookup order for each call:
+    1. exact match on the request key (same prompt, options and thread),
+    2. the next unused response recorded for the same thread and system
+       prompt / tool, in order (new code that changed the prompt),
+    3. a miss: "" for the LLM (what call_llm returns on error), or an
+       error string for tools; counted in stats().
+
+    Parameters
+    ----------
+    timing : str
+        "none" (answer at once) or "recorded" (sleep the recorded latency).
+    speed : float
+        Divides recorded latencies (2.0 = twice as fast).
+    """
+
+    def __init__(self, path: str, timing: str = "none", speed: float = 1.0) -> None:
+        if timing not in ("none", "recorded"):
+            raise ValueError(f"Unknown replay timing: {timing!r}")
+        self.timing = timing
+        self.speed = speed
+        self.prompts, records = load_records(path)
+        self.turns = [r for r in records if r.get("k") == "turn"]
+
+        self._lock = threading.Lock()
+        self._by_key: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._by_slot: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = defaultdict(deque)
+        for r in records:
+            if r.get("k") == "llm":
+                slot = r["sys"]
+            elif r.get("k") == "tool":
+                slot = r["name"]
+            else:
+                continue
+            self._by_key[(r.get("th", ""), r["key"])].append(r)
+            self._by_slot[(r.get("th", ""), slot)].append(r)
+        self._undo: List[Callable[[], None]] = []
+        self.hits = {"exact": 0, "sequential": 0, "miss": 0}
+
+    def _take(self, thread_id: str, key: str, slot: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            exact = self._by_key.get((thread_id, key))
+            if exact:
+                record = exact.popleft()
+                self._by_slot[(thread_id, slot)].remove(record)
+                self.hits["exact"] += 1
+                return record
+            ordered = self._by_slot.get((thread_id, slot))
+            if ordered:
+                record = ordered.popleft()
+                self._by_key[(thread_id, record["key"])].remove(record)
+                self.hits["sequential"] += 1
+                return record
+            self.hits["miss"] += 1
+            return None
+
+    def _sleep(self, record: Dict[str, Any]) -> None:
+        if self.timing == "recorded" and record.get("ms"):
+            time.sleep(record["ms"] / 1000.0 / self.speed)
+
+    def call_llm(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 4000,
+        temperature: float = 0.7,
+        tools: list | None = None,
+        **options: Any,
+    ) -> str:
+        # Tool calls made inside the recorded call are part of its output.
+        key = llm_key(system_prompt, user_prompt, max_tokens, temperature, tools)
+        record = self._take(current_thread_id.get(), key, _digest(system_prompt, size=12))
+        if record is None:
+            logger.warning("TrafficReplayer: no recorded LLM response for thread %r", current_thread_id.get())
+            return ""
+        self._sleep(record)
+        return record["out"]
+
+    def tool(self, name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        def wrap(_: Callable[..., Any]) -> Callable[..., Any]:
+            def replayed_tool(query: str) -> Any:
+                record = self._take(current_thread_id.get(), _digest(name, query), name)
+                if record is None:
+                    return json.dumps({"tool": name, "results": [], "error": "not recorded"})
+                self._sleep(record)
+                return record["out"]
+
+            return replayed_tool
+
+        return wrap
+
+    def install(self) -> None:
+        self._undo += swap_call_llm(self.call_llm)
+        for name in RECORDED_TOOLS:
+            self._undo += swap_tool_func(name, self.tool(name))
+
+    def uninstall(self) -> None:
+        for undo in reversed(self._undo):
+            undo()
+        self._undo.clear()
+
+    def sessions(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Recorded turns grouped by thread_id, in order."""
+        grouped: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for turn in self.turns:
+            grouped[turn.get("th", "")].append(turn)
+        return dict(grouped)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.hits)
+
@@ -0,0 +1,18 @@
+# src/serving/__init__.py
+"""
+Network entry points for the travel assistant.
+
+Exports:
+- ThreadTurnQueue
+- TurnRunner
+- create_app
+"""
+
+from .turn_queue import ThreadTurnQueue
+from .server import TurnRunner, create_app
+
+__all__ = [
+    "ThreadTurnQueue",
+    "TurnRunner",
+    "create_app",
+]
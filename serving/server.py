@@ -0,0 +1,488 @@
+# src/serving/server.py
+
+"""
+Multi-session HTTP / WebSocket server for the travel assistant.
+
+The graph is built once per process and shared by every client. Each client
+is identified by a session_id, which maps to its own LangGraph thread_id, so
+conversation state is kept per session by the configured checkpointer.
+
+Turns are synchronous (Bedrock, Ticketmaster, FAISS), so they run on a bounded
+thread pool; the event loop only does I/O. At most SERVER_MAX_WORKERS turns run
+at once, and at most SERVER_MAX_PENDING more may wait before new turns are
+rejected with 503. Turns of the same session are serialized (turn_queue.py),
+so two messages sent at once never race on the same checkpoint. Turns start
+in arrival order (their intent is not known before the master runs); their
+LLM requests are then admitted by priority class and fair share per session
+(llm/admission.py), and plan_full turns are shed to a shorter answer when
+those requests queue too long.
+
+Endpoints
+---------
+- GET  /healthz          liveness (the process is up)
+- GET  /readyz           readiness: graph built, embedding model and FAISS
+                         index loaded and warmed (503 until then)
+- GET  /metrics          turn counters and latency percentiles
+- POST /v1/chat          {"message": ..., "session_id": ...} -> full reply
+- POST /v1/chat/stream   same body, Server-Sent Events (node progress + reply)
+- WS   /v1/ws            {"message": ...} frames in, the same events out
+
+Configured via environment:
+
+- SERVER_HOST / SERVER_PORT:   bind address (default 0.0.0.0:8000)
+- SERVER_MAX_WORKERS:          concurrent turns (default 8)
+- SERVER_MAX_PENDING:          turns allowed to wait for a worker (default 64)
+- SERVER_MAX_MESSAGE_CHARS:    longest accepted user message (default 4000)
+- SERVER_COALESCE_TURNS:       "1" merges messages queued behind a running turn
+                               of the same session into one turn (default off)
+- SERVER_COALESCE_MAX:         most messages merged into one turn (default 5)
+- SERVER_COALESCE_WINDOW_MS:   wait this long for more messages before an idle
+                               session's turn starts (default 0)
+- TRAFFIC_RECORD_PATH:         record LLM/tool traffic for replay (recording.py)
+- TRACE_PATH:                  write per-turn traces as OTLP JSON (tracing.py)
+- PROFILE_SLOW_MS / PROFILE_SAMPLE_N / PROFILE_STATE_SIZES:
+                               profile slow or sampled turns, track state size
+                               per session (profiling.py)
+
+Run a single process (every process loads its own embedding model):
+
+    python -m src.serving.server --port 8000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from src.graph import build_graph
+from src.profiling import profile_from_env
+from src.recording import record_from_env
+from src.states import TravelChatBotState
+from src.tracing import trace_from_env
+
+from .turn_queue import ThreadTurnQueue, TurnBatch
+
+logger = logging.getLogger(__name__)
+
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_MAX_WORKERS = int(os.getenv("SERVER_MAX_WORKERS", "8"))
+SERVER_MAX_PENDING = int(os.getenv("SERVER_MAX_PENDING", "64"))
+SERVER_MAX_MESSAGE_CHARS = int(os.getenv("SERVER_MAX_MESSAGE_CHARS", "4000"))
+SERVER_COALESCE_TURNS = os.getenv("SERVER_COALESCE_TURNS", "0") == "1"
+SERVER_COALESCE_MAX = int(os.getenv("SERVER_COALESCE_MAX", "5"))
+SERVER_COALESCE_WINDOW_MS = float(os.getenv("SERVER_COALESCE_WINDOW_MS", "0"))
+
+# session_id becomes part of the thread_id, so keep it to a safe alphabet.
+SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+# Latency samples kept for /metrics percentiles.
+LATENCY_WINDOW = 1000
+
+
+class ServerBusy(Exception):
+    """Raised when SERVER_MAX_PENDING turns are already waiting for a worker."""
+
+
+class TurnRunner:
+    """
+    Owns the compiled graph and the worker pool, and runs one turn at a time
+    per call on behalf of a session.
+
+    Parameters
+    ----------
+    app : compiled LangGraph app | None
+        Built lazily by start() when None.
+    max_workers : int
+        Turns executed concurrently.
+    max_pending : int
+        Turns allowed to wait for a free worker before ServerBusy is raised.
+    turns : ThreadTurnQueue | None
+        Per-session ordering (built from SERVER_COALESCE_* when None).
+    """
+
+    def __init__(
+        self,
+        app: Any = None,
+        max_workers: int = SERVER_MAX_WORKERS,
+        max_pending: int = SERVER_MAX_PENDING,
+        turns: Optional[ThreadTurnQueue] = None,
+    ) -> None:
+        self.app = app
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.turns = turns or ThreadTurnQueue(
+            coalesce=SERVER_COALESCE_TURNS,
+            max_coalesce=SERVER_COALESCE_MAX,
+            coalesce_window=SERVER_COALESCE_WINDOW_MS / 1000.0,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="turn")
+        self._lock = threading.Lock()
+        self._admitted = 0  # running + waiting turns
+
+        self._ready = threading.Event()
+        self._status: Dict[str, Any] = {"graph": False, "retriever": False, "error": None}
+
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    # ---- startup / readiness ----
+
+    def start(self) -> None:
+        """
+        Build the graph and warm the RAG stack. Blocking; run it off the event loop.
+
+        Building the graph imports rag/, which loads the embedding model and the
+        FAISS index. One throwaway retrieval then pays for the model's first
+        forward pass, so the first real logistics turn does not.
+        """
+        started = time.perf_counter()
+        try:
+            if self.app is None:
+                self.app = trace_from_env(profile_from_env(record_from_env(build_graph())))
+            self._status["graph"] = True
+
+            from rag import flight_retriever  # same module instance the tools use
+
+            flight_retriever.invoke("warm-up: flight delays into Mumbai")
+            self._status["retriever"] = True
+        except Exception as exc:  # keep serving /healthz; /readyz reports it
+            logger.exception("TurnRunner.start: warm-up failed")
+            self._status["error"] = f"{type(exc).__name__}: {exc}"
+            return
+
+        self._status["warmup_seconds"] = round(time.perf_counter() - started, 3)
+        self._ready.set()
+        logger.info("TurnRunner.start: ready in %.2fs", self._status["warmup_seconds"])
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def readiness(self) -> Dict[str, Any]:
+        return {"ready": self.ready, **self._status}
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+
+        def pct(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1)
+
+        with self._lock:
+            admitted = self._admitted
+        from agents import (  # same module instances the graph uses
+            early_routing_stats,
+            plan_cache_stats,
+            response_stats,
+            speculation_stats,
+        )
+        from src.llm.admission import admission_stats
+        from src.llm.models import model_stats
+        from src.llm.payload import payload_stats  # the agents import it as src.llm.*
+        from src.profiling import profiling_stats
+        from src.tracing import tracing_stats
+
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "admitted": admitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "latency_ms_p50": pct(0.50),
+            "latency_ms_p95": pct(0.95),
+            "latency_ms_p99": pct(0.99),
+            "turn_queue": self.turns.stats(),
+            "speculation": speculation_stats(),
+            "responses": response_stats(),
+            "plan_cache": plan_cache_stats(),
+            "early_routing": early_routing_stats(),
+            "prompt_tokens": payload_stats(),
+            "models": model_stats(),
+            "llm_admission": admission_stats(),
+            "tracing": tracing_stats(),
+            "profiling": profiling_stats(),
+        }
+
+    # ---- turns ----
+
+    @staticmethod
+    def config_for(session_id: str) -> Dict[str, Any]:
+        return {"configurable": {"thread_id": f"web:{session_id}"}}
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._admitted >= self.max_workers + self.max_pending:
+                self._rejected += 1
+                raise ServerBusy()
+            self._admitted += 1
+
+    def _release(self, started: float, ok: bool) -> None:
+        with self._lock:
+            self._admitted -= 1
+        if ok:
+            self._completed += 1
+            self._latencies.append((time.perf_counter() - started) * 1000.0)
+        else:
+            self._failed += 1
+
+    @staticmethod
+    def _result(state: Dict[str, Any], batch: TurnBatch) -> Dict[str, Any]:
+        return {
+            "reply": state.get("master_message") or "",
+            "intent": state.get("intent"),
+            "coalesced": len(batch.messages),
+        }
+
+    def _run_batch(self, batch: TurnBatch, loop: asyncio.AbstractEventLoop) -> None:
+        """Worker thread: run the graph for one batch and publish its events."""
+
+        def emit(event: Dict[str, Any]) -> None:
+            loop.call_soon_threadsafe(batch.publish, event)
+
+        try:
+            state: TravelChatBotState = {"user_input": batch.text}
+            final: Dict[str, Any] = {}
+            for mode, chunk in self.app.stream(
+                state,
+                config={"configurable": {"thread_id": batch.thread_id}},
+                stream_mode=["updates", "values"],
+            ):
+                if mode == "updates":
+                    for node in chunk:
+                        emit({"event": "node", "node": node})
+                else:
+                    final = chunk
+            emit({"event": "reply", **self._result(final, batch)})
+        except Exception:
+            logger.exception("TurnRunner: turn failed for %s", batch.thread_id)
+            emit({"event": "error", "detail": "turn failed"})
+        finally:
+            # Lets the thread's next turn start, only after this one's writes.
+            loop.call_soon_threadsafe(self.turns.finish, batch)
+
+    async def stream_turn(self, session_id: str, message: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run one turn and yield events as it progresses:
+
+        {"event": "queued", "depth": ...} if an earlier turn of this session
+        is still running, {"event": "node", "node": ...} after every graph
+        node, then {"event": "reply", ...} or {"event": "error", ...}.
+
+        Turns of one session run in order (see turn_queue.py); with
+        coalescing on, the reply may cover several queued messages.
+        """
+        self._admit()
+        started = time.perf_counter()
+        ok = False
+        thread_id = self.config_for(session_id)["configurable"]["thread_id"]
+        try:
+            depth = self.turns.depth(thread_id)
+            if depth or self.turns.busy(thread_id):
+                yield {"event": "queued", "session_id": session_id, "depth": depth + 1}
+
+            slot = await self.turns.enter(thread_id, message)
+            if slot.leader:
+                self._executor.submit(self._run_batch, slot.batch, asyncio.get_running_loop())
+
+            async for event in slot.batch.events():
+                event = {**event, "session_id": session_id}
+                if event["event"] == "reply":
+                    event["latency_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+                    event["queue_wait_ms"] = round(slot.waited_ms, 1)
+                    ok = True
+                yield event
+        finally:
+            self._release(started, ok)
+
+    async def run_turn(self, session_id: str, message: str) -> Dict[str, Any]:
+        """Run one turn to completion and return the reply event's fields."""
+        async for event in self.stream_turn(session_id, message):
+            if event["event"] == "reply":
+                return {k: v for k, v in event.items() if k != "event"}
+            if event["event"] == "error":
+                raise RuntimeError(event.get("detail") or "turn failed")
+        raise RuntimeError("turn ended without a reply")
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+# ---- HTTP / WebSocket layer ----
+
+
+class ChatRequest(BaseModel):
+    message: str
+    session_id: Optional[str] = None
+
+
+class ChatResponse(BaseModel):
+    session_id: str
+    reply: str
+    intent: Optional[str] = None
+    latency_ms: float
+    queue_wait_ms: float = 0.0
+    coalesced: int = 1
+
+
+def _resolve_session(session_id: Optional[str]) -> str:
+    if not session_id:
+        return uuid.uuid4().hex
+    if not SESSION_ID_RE.match(session_id):
+        raise HTTPException(status_code=400, detail="invalid session_id")
+    return session_id
+
+
+def _check_message(message: str) -> str:
+    message = (message or "").strip()
+    if not message:
+        raise HTTPException(status_code=400, detail="empty message")
+    if len(message) > SERVER_MAX_MESSAGE_CHARS:
+        raise HTTPException(status_code=413, detail="message too long")
+    return message
+
+
+def create_app(runner: Optional[TurnRunner] = None) -> FastAPI:
+    """
+    Build the FastAPI application around a TurnRunner.
+
+    Warm-up runs in the background on startup, so /healthz answers at once and
+    /readyz flips to 200 when the graph and RAG stack are ready.
+    """
+    runner = runner or TurnRunner()
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI):
+        warmup = asyncio.create_task(asyncio.to_thread(runner.start))
+        try:
+            yield
+        finally:
+            await asyncio.shield(warmup)
+            await asyncio.to_thread(runner.shutdown)
+
+    api = FastAPI(title="Travel Assistant", lifespan=lifespan)
+    api.state.runner = runner
+
+    def require_ready() -> None:
+        if not runner.ready:
+            raise HTTPException(status_code=503, detail="warming up", headers={"Retry-After": "5"})
+
+    def busy() -> HTTPException:
+        return HTTPException(status_code=503, detail="server busy", headers={"Retry-After": "1"})
+
+    @api.get("/healthz")
+    async def healthz() -> Dict[str, str]:
+        return {"status": "ok"}
+
+    @api.get("/readyz")
+    async def readyz() -> JSONResponse:
+        return JSONResponse(runner.readiness(), status_code=200 if runner.ready else 503)
+
+    @api.get("/metrics")
+    async def metrics() -> Dict[str, Any]:
+        return runner.stats()
+
+    @api.post("/v1/chat", response_model=ChatResponse)
+    async def chat(req: ChatRequest) -> Dict[str, Any]:
+        require_ready()
+        session_id = _resolve_session(req.session_id)
+        message = _check_message(req.message)
+        try:
+            return await runner.run_turn(session_id, message)
+        except ServerBusy:
+            raise busy()
+        except Exception:
+            logger.exception("chat: turn failed for session %s", session_id)
+            raise HTTPException(status_code=500, detail="turn failed")
+
+    @api.post("/v1/chat/stream")
+    async def chat_stream(req: ChatRequest) -> StreamingResponse:
+        require_ready()
+        session_id = _resolve_session(req.session_id)
+        message = _check_message(req.message)
+        try:
+            events = runner.stream_turn(session_id, message)
+            first = await events.__anext__()  # admission errors surface before headers are sent
+        except ServerBusy:
+            raise busy()
+
+        async def sse() -> AsyncIterator[str]:
+            yield f"data: {json.dumps(first)}\n\n"
+            async for event in events:
+                yield f"data: {json.dumps(event)}\n\n"
+
+        return StreamingResponse(sse(), media_type="text/event-stream")
+
+    @api.websocket("/v1/ws")
+    async def ws(websocket: WebSocket) -> None:
+        await websocket.accept()
+        if not runner.ready:
+            await websocket.close(code=1013, reason="warming up")
+            return
+        try:
+            session_id = _resolve_session(websocket.query_params.get("session_id"))
+        except HTTPException:
+            await websocket.close(code=1008, reason="invalid session_id")
+            return
+
+        await websocket.send_json({"event": "session", "session_id": session_id})
+        try:
+            while True:
+                raw = await websocket.receive_text()
+                try:
+                    payload = json.loads(raw)
+                    message = payload.get("message", "") if isinstance(payload, dict) else str(payload)
+                except json.JSONDecodeError:
+                    message = raw
+                try:
+                    message = _check_message(message)
+                    async for event in runner.stream_turn(session_id, message):
+                        await websocket.send_json(event)
+                except HTTPException as exc:
+                    await websocket.send_json({"event": "error", "detail": exc.detail})
+                except ServerBusy:
+                    await websocket.send_json({"event": "error", "detail": "server busy"})
+        except WebSocketDisconnect:
+            logger.debug("ws: session %s disconnected", session_id)
+
+    return api
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the travel assistant over HTTP/WebSocket.")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--max-workers", type=int, default=SERVER_MAX_WORKERS)
+    parser.add_argument("--max-pending", type=int, default=SERVER_MAX_PENDING)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+
+    runner = TurnRunner(max_workers=args.max_workers, max_pending=args.max_pending)
+    uvicorn.run(create_app(runner), host=args.host, port=args.port, workers=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# src/serving/turn_queue.py
+
+"""
+Per-thread turn ordering for the server.
+
+Two turns of the same thread_id must not run at once: both would load the
+same checkpoint and the later write would silently drop the earlier one's
+trip_info / metadata / history_summary updates. ThreadTurnQueue keeps one
+FIFO per thread_id and lets a thread's next turn start only when the previous
+one has finished. Different threads never wait on each other.
+
+With coalescing on, messages that pile up behind a running turn (a user
+typing several short messages) are merged into a single turn: the first of
+them leads and runs the graph with all messages joined, the others follow and
+receive the same events.
+
+Everything here runs on the event loop; only the graph itself runs on worker
+threads, which report back with loop.call_soon_threadsafe.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Wait-time samples kept for percentiles.
+WAIT_WINDOW = 1000
+
+
+class TurnBatch:
+    """
+    One graph turn for a thread, possibly covering several coalesced messages.
+
+    The leader publishes events; every caller in the batch reads all of them
+    from the start through events().
+    """
+
+    def __init__(self, thread_id: str, messages: List[str]) -> None:
+        self.thread_id = thread_id
+        self.messages = messages
+        self.closed = False
+        self._events: List[Dict[str, Any]] = []
+        self._wake = asyncio.Event()
+
+    @property
+    def text(self) -> str:
+        """User input for the graph: the messages in arrival order."""
+        return "\n".join(self.messages)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        self._events.append(event)
+        self._wake.set()
+        self._wake = asyncio.Event()
+
+    def close(self) -> None:
+        self.closed = True
+        self._wake.set()
+
+    async def events(self) -> AsyncIterator[Dict[str, Any]]:
+        i = 0
+        while True:
+            while i < len(self._events):
+                yield self._events[i]
+                i += 1
+            if self.closed:
+                return
+            await self._wake.wait()
+
+
+@dataclass
+class TurnSlot:
+    """Handed to a caller when its message's turn starts."""
+
+    batch: TurnBatch
+    leader: bool
+    waited_ms: float
+
+
+@dataclass
+class _Pending:
+    message: str
+    enqueued: float
+    future: "asyncio.Future[TurnSlot]"
+
+
+@dataclass
+class _ThreadLane:
+    pending: Deque[_Pending] = field(default_factory=deque)
+    running: Optional[TurnBatch] = None
+    scheduled: bool = False
+
+
+class ThreadTurnQueue:
+    """
+    Keyed FIFO in front of graph invocation.
+
+    Parameters
+    ----------
+    coalesce : bool
+        Merge messages queued behind a running turn into one turn.
+    max_coalesce : int
+        Most messages merged into one turn.
+    coalesce_window : float
+        Seconds an idle thread waits for more messages before starting a
+        turn (0 = start at once; only messages that queue behind a running
+        turn are merged).
+    """
+
+    def __init__(
+        self,
+        coalesce: bool = False,
+        max_coalesce: int = 5,
+        coalesce_window: float = 0.0,
+    ) -> None:
+        self.coalesce = coalesce
+        self.max_coalesce = max(1, max_coalesce)
+        self.coalesce_window = coalesce_window if coalesce else 0.0
+        self._lanes: Dict[str, _ThreadLane] = {}
+
+        self._turns = 0
+        self._coalesced = 0
+        self._max_depth = 0
+        self._waits: Deque[float] = deque(maxlen=WAIT_WINDOW)
+
+    async def enter(self, thread_id: str, message: str) -> TurnSlot:
+        """Queue `message` for `thread_id` and wait until its turn starts."""
+        loop = asyncio.get_running_loop()
+        lane = self._lanes.setdefault(thread_id, _ThreadLane())
+        pending = _Pending(message, time.perf_counter(), loop.create_future())
+        lane.pending.append(pending)
+        self._max_depth = max(self._max_depth, len(lane.pending))
+
+        if lane.running is None and not lane.scheduled:
+            if self.coalesce_window > 0:
+                lane.scheduled = True
+                loop.call_later(self.coalesce_window, self._advance, thread_id)
+            else:
+                self._advance(thread_id)
+
+        try:
+            return await pending.future
+        except asyncio.CancelledError:
+            if pending.future.done() and not pending.future.cancelled():
+                slot = pending.future.result()
+                if slot.leader:  # nobody will run this batch now
+                    slot.batch.publish({"event": "error", "detail": "turn cancelled"})
+                    self.finish(slot.batch)
+            elif pending in lane.pending:
+                lane.pending.remove(pending)
+                self._drop_if_idle(thread_id)
+            raise
+
+    def finish(self, batch: TurnBatch) -> None:
+        """Mark the running turn of batch.thread_id done and start the next one."""
+        batch.close()
+        lane = self._lanes.get(batch.thread_id)
+        if lane is None or lane.running is not batch:
+            return
+        lane.running = None
+        if lane.pending:
+            self._advance(batch.thread_id)
+        else:
+            self._drop_if_idle(batch.thread_id)
+
+    def _advance(self, thread_id: str) -> None:
+        lane = self._lanes.get(thread_id)
+        if lane is None:
+            return
+        lane.scheduled = False
+        # Callers that went away before their turn started.
+        lane.pending = deque(p for p in lane.pending if not p.future.done())
+        if lane.running is not None or not lane.pending:
+            self._drop_if_idle(thread_id)
+            return
+
+        take = min(len(lane.pending), self.max_coalesce) if self.coalesce else 1
+        group = [lane.pending.popleft() for _ in range(take)]
+        batch = TurnBatch(thread_id, [p.message for p in group])
+        lane.running = batch
+
+        now = time.perf_counter()
+        self._turns += 1
+        self._coalesced += take - 1
+        for i, p in enumerate(group):
+            waited = (now - p.enqueued) * 1000.0
+            self._waits.append(waited)
+            p.future.set_result(TurnSlot(batch=batch, leader=i == 0, waited_ms=waited))
+        if take > 1:
+            logger.debug("ThreadTurnQueue: coalesced %d messages for %s", take, thread_id)
+
+    def _drop_if_idle(self, thread_id: str) -> None:
+        lane = self._lanes.get(thread_id)
+        if lane is not None and lane.running is None and not lane.pending and not lane.scheduled:
+            del self._lanes[thread_id]
+
+    def busy(self, thread_id: str) -> bool:
+        """True while a turn of `thread_id` is running."""
+        lane = self._lanes.get(thread_id)
+        return lane is not None and lane.running is not None
+
+    def depth(self, thread_id: str) -> int:
+        """Messages waiting behind the running turn of `thread_id`."""
+        lane = self._lanes.get(thread_id)
+        return len(lane.pending) if lane else 0
+
+    def stats(self, top: int = 5) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+
+        def pct(p: float) -> Optional[float]:
+            if not waits:
+                return None
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 1)
+
+        depths = {tid: len(lane.pending) for tid, lane in self._lanes.items() if lane.pending}
+        deepest = sorted(depths.items(), key=lambda kv: kv[1], reverse=True)[:top]
+        return {
+            "coalesce": self.coalesce,
+            "threads_active": len(self._lanes),
+            "threads_running": sum(1 for lane in self._lanes.values() if lane.running is not None),
+            "queued_messages": sum(depths.values()),
+            "max_queue_depth_seen": self._max_depth,
+            "deepest_threads": [{"thread_id": tid, "depth": d} for tid, d in deepest],
+            "turns_started": self._turns,
+            "coalesced_messages": self._coalesced,
+            "wait_ms_p50": pct(0.50),
+            "wait_ms_p95": pct(0.95),
+            "wait_ms_p99": pct(0.99),
+        }
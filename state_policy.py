@@ -0,0 +1,137 @@
+# src/state_policy.py
+"""
+Lifecycle policy for TravelChatBotState.
+
+Every key of the state is either:
+
+- turn-scoped: produced and consumed within one turn (routing, tool output,
+  the master's raw JSON). Cleared when a new turn starts, so stale values
+  never leak into the next turn and are not carried in every checkpoint.
+- conversation-scoped: what the assistant has learned so far (trip_info,
+  preferences, plans, history). Kept, but trimmed to size caps.
+
+begin_turn() is the graph's entry node and applies the policy. The cap_*
+helpers are also used wherever tool results or plans are written.
+"""
+
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from langchain_core.runnables import RunnableConfig
+
+from deadline import start_deadline
+from states import TravelChatBotState, ToolResult
+
+logger = logging.getLogger(__name__)
+
+# Cleared at the start of every turn.
+TURN_SCOPED_KEYS = (
+    "intent",
+    "master_message",
+    "master_plan",
+    "master_route",
+    "activities_tools_results",
+    "logistics_tools_results",
+)
+
+# metadata sub-keys that only make sense within one turn.
+TURN_SCOPED_METADATA_KEYS = (
+    "specialist_targets",
+    "specialist_index",
+    "activities_needs_tools",
+    "logistics_needs_tools",
+    "intent_source",
+    "speculation_id",
+    "tool_ms",
+    "response_source",
+    "deadline",
+    "turn_budget_s",
+    "degraded",
+    "plan_cache_hits",
+    "replan",
+    "early_dispatch_id",
+    "early_routing",
+)
+
+# ---- size caps (override via environment) ----
+
+MAX_TOOL_RESULTS = int(os.getenv("STATE_MAX_TOOL_RESULTS", "5"))
+MAX_TOOL_OUTPUT_CHARS = int(os.getenv("STATE_MAX_TOOL_OUTPUT_CHARS", "4000"))
+MAX_PLAN_ITEMS = int(os.getenv("STATE_MAX_PLAN_ITEMS", "30"))
+MAX_HISTORY_SUMMARIES = int(os.getenv("STATE_MAX_HISTORY_SUMMARIES", "5"))
+# Backstop for recent_exchanges when summarizing keeps being skipped or failing.
+MAX_RECENT_EXCHANGES = int(os.getenv("STATE_MAX_RECENT_EXCHANGES", "12"))
+
+
+def cap_tool_results(
+    results: Optional[List[ToolResult]],
+    max_results: int = MAX_TOOL_RESULTS,
+    max_chars: int = MAX_TOOL_OUTPUT_CHARS,
+) -> List[ToolResult]:
+    """
+    Keep the most recent `max_results` tool results and truncate each
+    raw_output to `max_chars`. Parsed payloads with a "results" list are cut
+    down proportionally.
+    """
+    capped: List[ToolResult] = []
+    for result in (results or [])[-max_results:]:
+        result = dict(result)  # type: ignore[assignment]
+        raw = result.get("raw_output")
+        if isinstance(raw, str) and len(raw) > max_chars:
+            result["raw_output"] = raw[:max_chars] + "…[truncated]"
+        parsed = result.get("parsed")
+        if isinstance(parsed, dict) and isinstance(parsed.get("results"), list):
+            parsed = dict(parsed)
+            parsed["results"] = parsed["results"][:max_results * 2]
+            result["parsed"] = parsed
+        capped.append(result)  # type: ignore[arg-type]
+    return capped
+
+
+def cap_plan(
+    plan: Optional[Dict[str, Any]],
+    list_key: str,
+    max_items: int = MAX_PLAN_ITEMS,
+) -> Optional[Dict[str, Any]]:
+    """Trim plan[list_key] (items / legs) to at most `max_items` entries."""
+    if not plan:
+        return plan
+    entries = plan.get(list_key)
+    if isinstance(entries, list) and len(entries) > max_items:
+        plan = dict(plan)
+        plan[list_key] = entries[:max_items]
+    return plan
+
+
+def begin_turn(state: TravelChatBotState, config: Optional[RunnableConfig] = None) -> TravelChatBotState:
+    """
+    Graph entry node: reset turn-scoped keys, enforce size caps on the
+    conversation-scoped ones and start the turn's deadline (see deadline.py;
+    config["configurable"]["turn_budget_s"] overrides TURN_DEADLINE_S)
+    before the master agent runs.
+    """
+    cleared = [k for k in TURN_SCOPED_KEYS if state.get(k) is not None]
+    for key in TURN_SCOPED_KEYS:
+        # LangGraph keeps channels around, so "delete" means overwrite with None.
+        state[key] = None  # type: ignore[literal-required]
+
+    metadata = dict(state.get("metadata") or {})
+    for key in TURN_SCOPED_METADATA_KEYS:
+        metadata.pop(key, None)
+    state["metadata"] = metadata
+    start_deadline(state, ((config or {}).get("configurable") or {}).get("turn_budget_s"))
+
+    state["activities_plan"] = cap_plan(state.get("activities_plan"), "items")  # type: ignore[typeddict-item]
+    state["logistics_plan"] = cap_plan(state.get("logistics_plan"), "legs")  # type: ignore[typeddict-item]
+
+    summaries = state.get("history_summaries")
+    if summaries and len(summaries) > MAX_HISTORY_SUMMARIES:
+        state["history_summaries"] = summaries[-MAX_HISTORY_SUMMARIES:]
+
+    exchanges = state.get("recent_exchanges")
+    if exchanges and len(exchanges) > MAX_RECENT_EXCHANGES:
+        state["recent_exchanges"] = exchanges[-MAX_RECENT_EXCHANGES:]
+
+    logger.debug("begin_turn: cleared turn-scoped keys %s", cleared)
+    return state
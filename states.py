@@ -100,13 +100,21 @@ class TravelChatBotState(TypedDict, total=False):
     activities_plan: Optional[ActivitiesPlan]
     logistics_plan: Optional[LogisticsPlan]
 
+    # Per specialist: the trip_info / preferences fields its current plan was
+    # made from, plus their fingerprint (see agents/replanning.py)
+    plan_inputs: Optional[Dict[str, Dict[str, Any]]]
+
     # Raw tool outputs if you ever want to store them
     activities_tools_results: Optional[List[ToolResult]]
     logistics_tools_results: Optional[List[ToolResult]]
 
-    # Short running summary of the conversation
+    # Short running summary of the conversation, up to recent_exchanges
     history_summary: Optional[str]
 
+    # Latest exchanges verbatim, oldest first: {"user", "assistant"}
+    # (folded into history_summary when the window overflows, see agents/history.py)
+    recent_exchanges: Optional[List[Dict[str, str]]]
+
     # Legacy / optional list form if you ever need it
     history_summaries: Optional[List[str]]
 
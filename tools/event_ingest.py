@@ -0,0 +1,186 @@
+# src/tools/event_ingest.py
+
+"""
+Bulk ingestion job for the local event store.
+
+Pulls every page of upcoming Ticketmaster events for a list of cities,
+simplifies them with the same `_simplify_ticketmaster_events` the live tool
+uses (through parse_ticketmaster_response), and upserts them into
+tools.event_store in batches. Re-running the job is idempotent.
+
+Examples
+--------
+    # Live ingestion (needs TICKETMASTER_API_KEY)
+    python -m src.tools.event_ingest --city Mumbai --city Delhi --country-code IN
+
+    # Offline ingestion from recorded Discovery API responses
+    python -m src.tools.event_ingest --city Mumbai --fixture data/fixtures/tm_mumbai.json
+"""
+
+import argparse
+import json
+import logging
+import time
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import requests
+
+from tools.event_store import EventStore, EVENT_STORE_PATH
+from tools.events import (
+    TICKETMASTER_API_KEY,
+    TICKETMASTER_BASE_URL,
+    _simplify_ticketmaster_events,
+    parse_ticketmaster_response,
+)
+
+logger = logging.getLogger(__name__)
+
+# Discovery API caps deep paging at size * page < 1000.
+PAGE_SIZE = 200
+MAX_PAGES = 5
+
+# Stay under the Discovery API's 5 requests/second limit.
+REQUEST_INTERVAL_SECONDS = 0.25
+
+
+def fetch_city_pages(
+    city: str,
+    country_code: Optional[str] = None,
+    max_pages: int = MAX_PAGES,
+    timeout: float = 15.0,
+    low_memory: bool = False,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield the simplified events of every Discovery API page for `city`."""
+    if not TICKETMASTER_API_KEY:
+        raise RuntimeError("TICKETMASTER_API_KEY not configured")
+
+    session = requests.Session()
+    for page in range(max_pages):
+        params: Dict[str, Any] = {
+            "apikey": TICKETMASTER_API_KEY,
+            "city": city,
+            "size": PAGE_SIZE,
+            "page": page,
+            "sort": "date,asc",
+            "locale": "*",
+        }
+        if country_code:
+            params["countryCode"] = country_code
+
+        resp = session.get(TICKETMASTER_BASE_URL, params=params, timeout=timeout)
+        resp.raise_for_status()
+        events, page_info = parse_ticketmaster_response(resp.content, low_memory=low_memory)
+        yield events
+
+        total_pages = int(page_info.get("totalPages") or 0)
+        if page + 1 >= total_pages:
+            break
+        time.sleep(REQUEST_INTERVAL_SECONDS)
+
+
+def load_fixture_pages(path: str) -> List[List[Dict[str, Any]]]:
+    """
+    Load recorded Discovery API responses from a JSON file and simplify them.
+
+    The file may hold a single response object or a list of page responses.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    stripped = raw.lstrip()
+    if stripped.startswith(b"["):
+        return [_simplify_ticketmaster_events(page) for page in json.loads(raw)]
+    events, _ = parse_ticketmaster_response(raw)
+    return [events]
+
+
+def ingest_pages(
+    store: EventStore,
+    city: str,
+    pages: Iterable[List[Dict[str, Any]]],
+    country: Optional[str] = None,
+    batch_size: int = 500,
+) -> int:
+    """
+    Upsert every page of simplified events, then mark the city's snapshot as fresh.
+
+    The snapshot is only marked after all pages are written, so a failed run
+    never makes a partial snapshot look fresh.
+    """
+    started = time.time()
+
+    def events() -> Iterator[Dict[str, Any]]:
+        for page_events in pages:
+            yield from page_events
+
+    count = store.upsert_events(events(), batch_size=batch_size)
+    store.mark_snapshot(city, country, count, fetched_at=started)
+    logger.info("ingest_pages: city=%s, events=%d", city, count)
+    return count
+
+
+def ingest_city(
+    store: EventStore,
+    city: str,
+    country_code: Optional[str] = None,
+    max_pages: int = MAX_PAGES,
+    low_memory: bool = False,
+) -> int:
+    """Live ingestion of all upcoming events for `city`."""
+    pages = fetch_city_pages(
+        city,
+        country_code=country_code,
+        max_pages=max_pages,
+        low_memory=low_memory,
+    )
+    return ingest_pages(store, city, pages, country=country_code)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingest Ticketmaster events into the local store.")
+    parser.add_argument("--city", action="append", required=True, help="City to ingest (repeatable).")
+    parser.add_argument("--country-code", default=None, help="ISO country code filter, e.g. IN.")
+    parser.add_argument(
+        "--fixture",
+        default=None,
+        help="Recorded JSON response(s) for the single --city, instead of the live API.",
+    )
+    parser.add_argument("--db", default=EVENT_STORE_PATH, help="SQLite path for the store.")
+    parser.add_argument("--max-pages", type=int, default=MAX_PAGES)
+    parser.add_argument(
+        "--low-memory",
+        action="store_true",
+        help="Prune unused response fields while decoding (lower peak memory, more CPU).",
+    )
+    parser.add_argument("--prune-past", action="store_true", help="Delete events dated before today.")
+    args = parser.parse_args()
+    if args.fixture and len(args.city) > 1:
+        # Every city would get the same recorded events and be marked fresh,
+        # so the tool would stop asking the API about the others.
+        parser.error("--fixture holds one city's responses; pass a single --city")
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+
+    store = EventStore(args.db)
+    for city in args.city:
+        if args.fixture:
+            ingest_pages(store, city, load_fixture_pages(args.fixture), country=args.country_code)
+        else:
+            ingest_city(
+                store,
+                city,
+                country_code=args.country_code,
+                max_pages=args.max_pages,
+                low_memory=args.low_memory,
+            )
+
+    if args.prune_past:
+        removed = store.prune_past_events(date.today().isoformat())
+        logger.info("event_ingest: pruned %d past events", removed)
+
+
+if __name__ == "__main__":
+    main()
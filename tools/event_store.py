@@ -0,0 +1,314 @@
+# src/tools/event_store.py
+
+"""
+Local SQLite snapshot of Ticketmaster events.
+
+For popular destinations a bulk job (tools/event_ingest.py) periodically
+stores simplified events here, so activities_events_tool can answer from
+disk in a few milliseconds instead of calling Ticketmaster on the hot path.
+
+Schema
+------
+- events:       one row per simplified event, keyed by a stable hash of
+                (name, venue, city, date, time) so re-ingestion is idempotent.
+                Indexed on city, country and date.
+- events_fts:   FTS5 index over name / venue (kept in sync by triggers).
+- snapshots:    last successful ingestion per city, used for freshness checks.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Where the snapshot database lives. The store is only used if this file exists.
+EVENT_STORE_PATH = os.getenv("EVENT_STORE_PATH", "data/events.sqlite3")
+
+# Snapshots older than this are ignored and the live API is used instead.
+EVENT_STORE_MAX_AGE_HOURS = float(os.getenv("EVENT_STORE_MAX_AGE_HOURS", "24"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    event_key    TEXT PRIMARY KEY,
+    name         TEXT,
+    venue        TEXT,
+    city         TEXT,
+    city_norm    TEXT,
+    country      TEXT,
+    country_norm TEXT,
+    date         TEXT,
+    time         TEXT,
+    lat          REAL,
+    lon          REAL,
+    ingested_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_city_date ON events (city_norm, date);
+CREATE INDEX IF NOT EXISTS idx_events_country_date ON events (country_norm, date);
+CREATE INDEX IF NOT EXISTS idx_events_date ON events (date);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+    name, venue, content='events', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS events_ai AFTER INSERT ON events BEGIN
+    INSERT INTO events_fts (rowid, name, venue) VALUES (new.rowid, new.name, new.venue);
+END;
+CREATE TRIGGER IF NOT EXISTS events_ad AFTER DELETE ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, name, venue)
+    VALUES ('delete', old.rowid, old.name, old.venue);
+END;
+CREATE TRIGGER IF NOT EXISTS events_au AFTER UPDATE ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, name, venue)
+    VALUES ('delete', old.rowid, old.name, old.venue);
+    INSERT INTO events_fts (rowid, name, venue) VALUES (new.rowid, new.name, new.venue);
+END;
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    city_norm   TEXT PRIMARY KEY,
+    city        TEXT,
+    country     TEXT,
+    fetched_at  REAL NOT NULL,
+    event_count INTEGER NOT NULL
+);
+"""
+
+_UPSERT_SQL = """
+INSERT INTO events (
+    event_key, name, venue, city, city_norm, country, country_norm,
+    date, time, lat, lon, ingested_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (event_key) DO UPDATE SET
+    name = excluded.name,
+    venue = excluded.venue,
+    country = excluded.country,
+    country_norm = excluded.country_norm,
+    lat = excluded.lat,
+    lon = excluded.lon,
+    ingested_at = excluded.ingested_at
+"""
+
+_SELECT_COLUMNS = "e.name, e.venue, e.city, e.country, e.date, e.time, e.lat, e.lon"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_place(value: Optional[str]) -> str:
+    """Lower-case, whitespace-collapsed place name used for index lookups."""
+    return " ".join(_TOKEN_RE.findall((value or "").lower()))
+
+
+def event_key(event: Dict[str, Any]) -> str:
+    """Stable identity for a simplified event (used to make ingestion idempotent)."""
+    parts = [
+        str(event.get(field) or "")
+        for field in ("name", "venue", "city", "date", "time")
+    ]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class EventStore:
+    """
+    Thin wrapper around the SQLite snapshot.
+
+    Connections are per-thread (sqlite3 objects cannot be shared across
+    threads), so one EventStore can be used from concurrent graph runs.
+    """
+
+    def __init__(self, path: str = EVENT_STORE_PATH) -> None:
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---- ingestion ----
+
+    def upsert_events(
+        self,
+        events: Iterable[Dict[str, Any]],
+        batch_size: int = 500,
+    ) -> int:
+        """
+        Insert or update simplified events in batches of `batch_size`.
+
+        Returns the number of events written. Re-ingesting the same events
+        updates them in place instead of duplicating rows.
+        """
+        conn = self._conn()
+        now = time.time()
+        written = 0
+        batch: List[tuple] = []
+
+        def flush() -> None:
+            with conn:
+                conn.executemany(_UPSERT_SQL, batch)
+            batch.clear()
+
+        for ev in events:
+            batch.append(
+                (
+                    event_key(ev),
+                    ev.get("name"),
+                    ev.get("venue"),
+                    ev.get("city"),
+                    normalize_place(ev.get("city")),
+                    ev.get("country"),
+                    normalize_place(ev.get("country")),
+                    ev.get("date"),
+                    ev.get("time"),
+                    ev.get("lat"),
+                    ev.get("lon"),
+                    now,
+                )
+            )
+            written += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+        logger.debug("EventStore.upsert_events: wrote %d events", written)
+        return written
+
+    def mark_snapshot(
+        self,
+        city: str,
+        country: Optional[str],
+        event_count: int,
+        fetched_at: Optional[float] = None,
+    ) -> None:
+        """Record a completed ingestion for `city`."""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO snapshots (city_norm, city, country, fetched_at, event_count)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (city_norm) DO UPDATE SET
+                    city = excluded.city,
+                    country = excluded.country,
+                    fetched_at = excluded.fetched_at,
+                    event_count = excluded.event_count
+                """,
+                (
+                    normalize_place(city),
+                    city,
+                    country,
+                    fetched_at if fetched_at is not None else time.time(),
+                    event_count,
+                ),
+            )
+
+    def prune_past_events(self, before_date: str) -> int:
+        """Delete events dated strictly before `before_date` (YYYY-MM-DD)."""
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "DELETE FROM events WHERE date IS NOT NULL AND date < ?",
+                (before_date,),
+            )
+        return cur.rowcount
+
+    # ---- queries ----
+
+    def fresh_cities(self, max_age_hours: float = EVENT_STORE_MAX_AGE_HOURS) -> List[str]:
+        """Normalized names of cities whose snapshot is younger than max_age_hours."""
+        cutoff = time.time() - max_age_hours * 3600
+        rows = self._conn().execute(
+            "SELECT city_norm FROM snapshots WHERE fetched_at >= ?",
+            (cutoff,),
+        ).fetchall()
+        return [r["city_norm"] for r in rows]
+
+    def search(
+        self,
+        city: Optional[str] = None,
+        country: Optional[str] = None,
+        keywords: Optional[List[str]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        limit: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return simplified events (same shape as _simplify_ticketmaster_events)
+        matching the filters: soonest first, or with `keywords`, best match
+        first (bm25) and then soonest.
+
+        `keywords` are OR-ed prefix matches against name/venue via FTS5.
+        """
+        where: List[str] = []
+        params: List[Any] = []
+
+        if city:
+            where.append("e.city_norm = ?")
+            params.append(normalize_place(city))
+        if country:
+            where.append("e.country_norm = ?")
+            params.append(normalize_place(country))
+        if start_date:
+            where.append("e.date >= ?")
+            params.append(start_date)
+        if end_date:
+            where.append("e.date <= ?")
+            params.append(end_date)
+
+        terms = [t for kw in (keywords or []) for t in _TOKEN_RE.findall(kw.lower())]
+        if terms:
+            sql = (
+                f"SELECT {_SELECT_COLUMNS} "
+                "FROM events_fts JOIN events e ON e.rowid = events_fts.rowid "
+                "WHERE events_fts MATCH ?"
+            )
+            params.insert(0, " OR ".join(f'"{t}"*' for t in terms))
+            if where:
+                sql += " AND " + " AND ".join(where)
+            sql += " ORDER BY bm25(events_fts), e.date, e.time LIMIT ?"
+        else:
+            sql = f"SELECT {_SELECT_COLUMNS} FROM events e"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            sql += " ORDER BY e.date, e.time LIMIT ?"
+        params.append(limit)
+
+        rows = self._conn().execute(sql, params).fetchall()
+        return [dict(r) for r in rows]
+
+
+_default_store: Optional[EventStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_event_store() -> Optional[EventStore]:
+    """
+    Shared EventStore for the tools, or None when no snapshot file exists.
+
+    We never create the database on the hot path; it is created by the
+    ingestion job.
+    """
+    global _default_store
+    if _default_store is not None:
+        return _default_store
+    if not os.path.exists(EVENT_STORE_PATH):
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = EventStore(EVENT_STORE_PATH)
+    return _default_store
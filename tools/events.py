@@ -3,11 +3,20 @@
 import json
 import logging
 import os
-from typing import Any, Dict, List
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 from langchain_core.tools import tool
 
+try:  # optional: faster decoding of large Discovery API pages
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+from src.tracing import get_current_span
+from tools.event_store import EVENT_STORE_MAX_AGE_HOURS, get_event_store, normalize_place
+
 logger = logging.getLogger(__name__)
 
 # Read Ticketmaster API key from environment.
@@ -88,6 +97,139 @@ def _simplify_ticketmaster_events(data: Dict[str, Any]) -> List[Dict[str, Any]]:
     return results
 
 
+# Every key _simplify_ticketmaster_events (or pagination) reads, at any depth.
+_TICKETMASTER_KEEP_KEYS = frozenset(
+    {
+        "_embedded", "events", "venues", "name", "dates", "start",
+        "localDate", "localTime", "city", "country", "location",
+        "latitude", "longitude", "page", "number", "totalPages",
+        "totalElements",
+    }
+)
+
+
+def _prune_ticketmaster_object(pairs: List[Tuple[str, Any]]) -> Dict[str, Any]:
+    # Drops images / classifications / sales / promoters etc. as soon as each
+    # object is decoded, so at most one event's full subtree is alive at once.
+    return {k: v for k, v in pairs if k in _TICKETMASTER_KEEP_KEYS}
+
+
+def parse_ticketmaster_response(
+    raw: bytes | str,
+    low_memory: bool = False,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Decode a raw Discovery API response into (simplified_events, page_info).
+
+    - Default: decode with orjson when installed (falls back to json) and
+      simplify; lowest CPU time.
+    - low_memory=True: stdlib decoder that keeps only the fields we read,
+      pruning heavy `_embedded` payloads while decoding; roughly a third of
+      the peak memory at some CPU cost. Useful for bulk ingestion of many
+      large pages.
+
+    See benchmarks/bench_ticketmaster_parse.py for numbers.
+    """
+    if low_memory:
+        data = json.loads(raw, object_pairs_hook=_prune_ticketmaster_object)
+    elif orjson is not None:
+        data = orjson.loads(raw)
+    else:
+        data = json.loads(raw)
+
+    if not isinstance(data, dict):
+        return [], {}
+    return _simplify_ticketmaster_events(data), data.get("page") or {}
+
+
+# Words that describe "events in general" rather than a specific event name.
+_QUERY_STOPWORDS = {
+    "a", "an", "and", "any", "are", "at", "big", "during", "event", "events",
+    "few", "for", "from", "happening", "in", "is", "me", "month", "months",
+    "near", "next", "of", "on", "or", "some", "the", "things", "this", "to",
+    "upcoming", "what", "whats", "week", "weeks", "with",
+}
+
+_MONTHS = {
+    name: idx
+    for idx, name in enumerate(
+        ["january", "february", "march", "april", "may", "june", "july",
+         "august", "september", "october", "november", "december"],
+        start=1,
+    )
+}
+
+
+def _month_range(month: int, today: date) -> tuple[str, str]:
+    """ISO date range for the next occurrence of `month` (this year or next)."""
+    year = today.year if month >= today.month else today.year + 1
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start.isoformat(), date.fromordinal(end.toordinal() - 1).isoformat()
+
+
+def _search_event_store(query: str) -> Optional[Dict[str, Any]]:
+    """
+    Answer the query from the local snapshot if it names a city with a fresh
+    snapshot. Returns the tool payload, or None to fall back to the live API.
+    """
+    store = get_event_store()
+    if store is None:
+        return None
+
+    try:
+        norm_query = f" {normalize_place(query)} "
+        city = next(
+            (
+                c for c in sorted(store.fresh_cities(EVENT_STORE_MAX_AGE_HOURS), key=len, reverse=True)
+                if f" {c} " in norm_query
+            ),
+            None,
+        )
+        if city is None:
+            return None
+
+        remaining = norm_query.replace(f" {city} ", " ").split()
+        month = next((_MONTHS[t] for t in remaining if t in _MONTHS), None)
+        keywords = [
+            t for t in remaining
+            if t not in _QUERY_STOPWORDS and t not in _MONTHS and not t.isdigit()
+        ]
+
+        today = date.today()
+        start_date, end_date = (
+            _month_range(month, today) if month else (today.isoformat(), None)
+        )
+        if start_date < today.isoformat():
+            start_date = today.isoformat()
+
+        results = store.search(
+            city=city,
+            keywords=keywords,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        if not results and keywords:
+            # Generic words ("concerts", "festivals") rarely appear in event
+            # names; show what is on in that city instead of nothing.
+            results = store.search(city=city, start_date=start_date, end_date=end_date)
+    except Exception as e:
+        logger.exception("activities_events_tool: event store lookup failed: %s", e)
+        return None
+
+    return {
+        "tool": "activities_events_tool",
+        "source": "event_store",
+        "params_used": {
+            "city": city,
+            "keywords": keywords,
+            "start_date": start_date,
+            "end_date": end_date,
+        },
+        "results": results,
+    }
+
+
 @tool
 def activities_events_tool(query: str) -> str:
     """
@@ -104,7 +246,9 @@ def activities_events_tool(query: str) -> str:
 
     Behavior
     --------
-    - Uses the Ticketmaster Discovery API to search for matching events.
+    - If the query names a city with a fresh local snapshot (see
+      tools/event_store.py), answers from the snapshot without any HTTP call.
+    - Otherwise uses the Ticketmaster Discovery API to search for matching events.
     - Currently biases to India (countryCode='IN') because most examples
       are Mumbai-focused; you can adjust as needed.
     - Returns a JSON string with:
@@ -132,6 +276,17 @@ def activities_events_tool(query: str) -> str:
 
     logger.info("activities_events_tool: query=%r", query)
 
+    stored = _search_event_store(query)
+    traced = get_current_span()
+    traced.set_attribute("tool.cache_hit", stored is not None)
+    if stored is not None:
+        logger.info(
+            "activities_events_tool: served from event store (city=%s, results=%d)",
+            stored["params_used"]["city"],
+            len(stored["results"]),
+        )
+        return json.dumps(stored)
+
     if not TICKETMASTER_API_KEY:
         logger.warning(
             "activities_events_tool: TICKETMASTER_API_KEY not set, returning empty results."
@@ -156,10 +311,12 @@ def activities_events_tool(query: str) -> str:
 
     try:
         resp = requests.get(TICKETMASTER_BASE_URL, params=params, timeout=8)
+        traced.set_attribute("http.response.status_code", resp.status_code)
         resp.raise_for_status()
-        data = resp.json()
+        simplified, _ = parse_ticketmaster_response(resp.content)
     except Exception as e:
         logger.exception("activities_events_tool: error calling Ticketmaster: %s", e)
+        traced.set_error(f"Ticketmaster API error: {e}")
         payload = {
             "tool": "activities_events_tool",
             "params_used": params,
@@ -168,8 +325,7 @@ def activities_events_tool(query: str) -> str:
         }
         return json.dumps(payload)
 
-    simplified = _simplify_ticketmaster_events(data)
-
+    traced.set_attribute("tool.results", len(simplified))
     payload = {
         "tool": "activities_events_tool",
         "params_used": {k: v for k, v in params.items() if k != "apikey"},
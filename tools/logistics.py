@@ -7,6 +7,7 @@ from langchain_core.tools import tool
 from langchain_core.documents import Document
 
 from rag import flight_retriever
+from src.tracing import get_current_span
 
 logger = logging.getLogger(__name__)
 
@@ -85,6 +86,7 @@ def logistics_rag_tool(query: str) -> str:
         logger.exception("logistics_rag_tool: error retrieving docs: %s", e)
         return "There was an error retrieving flight statistics for your query."
 
+    get_current_span().set_attribute("tool.results", len(docs))
     if not docs:
         return "No matching flight statistics were found for your query."
 
@@ -0,0 +1,443 @@
+# src/tracing.py
+"""
+Span tracing of turns: graph nodes, LLM calls and tool calls.
+
+Logs from the master, the specialists and the tools are separate lines with
+nothing tying them to a turn. With TRACE_PATH set, every turn run through
+trace_from_env(app) is a root span "turn" (thread_id, intent, response
+source, degradations) with child spans for
+
+- each graph node ("node.master", "node.activities", ...; traced_node() in
+  graph.py), and each specialist the early router starts in the background
+  ("specialist.activities", ...),
+- each call_llm ("llm.call": agent, profile, admission wait, timeout /
+  escalation) and each model request in it ("llm.request": model, input /
+  output / prompt cache tokens),
+- each tool call ("tool.activities_events_tool", ...: status, event store
+  hit, HTTP status), speculative prefetches included.
+
+Spans are written as OTLP JSON, the OpenTelemetry protocol's JSON encoding:
+one ExportTraceServiceRequest per line, which the Collector's otlpjsonfile
+receiver and trace viewers' importers read. A turn's spans are written
+together when its root span ends. Spans that end later (a prefetch or an
+early-routed specialist the turn did not wait for) are written on a line of
+their own with the same trace id.
+
+format_waterfall() renders a trace as an indented timeline; the CLI prints
+one after every turn with TRACE_WATERFALL=1.
+
+When tracing is off, span() and start_span() return a shared no-op span, so
+instrumented code pays a global lookup per span and nothing else.
+
+Configured via environment:
+
+- TRACE_PATH:      file traces are appended to (default "": tracing off)
+- TRACE_WATERFALL: "1" prints each turn's waterfall in the CLI
+- TRACE_SERVICE:   service.name of the exported resource (default "travel-agent")
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_PATH = os.getenv("TRACE_PATH", "")
+TRACE_WATERFALL = os.getenv("TRACE_WATERFALL", "0") == "1"
+TRACE_SERVICE = os.getenv("TRACE_SERVICE", "travel-agent")
+
+# OTLP span kinds.
+KIND_INTERNAL = 1
+KIND_CLIENT = 3
+
+MAX_ATTRIBUTE_CHARS = 256  # string attributes are cut to this length on export
+RECENT_TRACES = 32  # finished traces kept in memory for format_waterfall()
+
+
+class _NoopSpan:
+    """What span() / start_span() return when tracing is off."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def add(self, key: str, amount: float) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+# Span the running code is part of (copied into pool threads with copy_context).
+current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    One timed operation. Used as a context manager it is the current span
+    (the parent of spans started inside it) and ends on exit, recording an
+    exception as its error; otherwise call end().
+    """
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "kind",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+        "_token",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        parent: Optional["Span"],
+        attributes: Optional[Dict[str, Any]] = None,
+        kind: int = KIND_INTERNAL,
+    ) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self._token: Optional[contextvars.Token] = None
+        if attributes:
+            self.set_attributes(attributes)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def add(self, key: str, amount: float) -> None:
+        """Add `amount` to a numeric attribute (e.g. wait time summed over requests)."""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def set_error(self, message: str) -> None:
+        self.error = message
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer.finish(self)
+
+    def __enter__(self) -> "Span":
+        self._token = current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        if exc is not None and self.error is None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        if self._token is not None:
+            current_span.reset(self._token)
+            self._token = None
+        self.end()
+        return False
+
+    def to_otlp(self) -> Dict[str, Any]:
+        record: Dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error is not None else {},
+        }
+        if self.parent_id is not None:
+            record["parentSpanId"] = self.parent_id
+        return record
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)[:MAX_ATTRIBUTE_CHARS]}
+
+
+class Tracer:
+    """Collects finished spans per trace and appends each finished trace to `path` as OTLP JSON."""
+
+    def __init__(self, path: str, service: str = TRACE_SERVICE) -> None:
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", buffering=1, encoding="utf-8")
+        self._resource = {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]}
+        self._lock = threading.Lock()
+        self._open: Dict[str, List[Span]] = {}  # finished spans of traces whose root is still running
+        self._recent: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._stats = {"traces": 0, "spans": 0, "late_spans": 0}
+
+    def start(
+        self, name: str, attributes: Optional[Dict[str, Any]] = None, kind: int = KIND_INTERNAL
+    ) -> Span:
+        parent = current_span.get()
+        span = Span(self, name, parent if parent is not None and parent.tracer is self else None, attributes, kind)
+        if span.parent_id is None:
+            with self._lock:
+                self._open[span.trace_id] = []
+        return span
+
+    def finish(self, span: Span) -> None:
+        with self._lock:
+            spans = self._open.get(span.trace_id)
+            if span.parent_id is None:
+                spans = self._open.pop(span.trace_id, []) + [span]
+                self._recent[span.trace_id] = spans
+                while len(self._recent) > RECENT_TRACES:
+                    self._recent.popitem(last=False)
+                self._stats["traces"] += 1
+            elif spans is not None:
+                spans.append(span)
+                return
+            else:
+                # Its turn has been written already.
+                spans = [span]
+                self._recent.get(span.trace_id, []).append(span)
+                self._stats["late_spans"] += 1
+            self._stats["spans"] += len(spans)
+            self._write(spans)
+
+    def _write(self, spans: List[Span]) -> None:
+        # Called with the lock held.
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": self._resource,
+                    "scopeSpans": [{"scope": {"name": __name__}, "spans": [s.to_otlp() for s in spans]}],
+                }
+            ]
+        }
+        self._file.write(json.dumps(request, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def trace(self, trace_id: str) -> List[Span]:
+        """Spans of a recently finished trace (those ended so far), or []."""
+        with self._lock:
+            return list(self._recent.get(trace_id, []))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"path": self.path, "open_traces": len(self._open), **self._stats}
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+_tracer: Optional[Tracer] = None
+
+
+def configure(path: Optional[str] = None) -> Optional[Tracer]:
+    """Start tracing to `path` (default TRACE_PATH); "" stops it. Returns the tracer, if any."""
+    global _tracer
+    path = TRACE_PATH if path is None else path
+    previous, _tracer = _tracer, (Tracer(path) if path else None)
+    if previous is not None:
+        previous.close()
+    return _tracer
+
+
+def tracing_enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, attributes: Optional[Dict[str, Any]] = None, kind: int = KIND_INTERNAL) -> Any:
+    """New child of the current span, to be used as `with span(...) as s:` (the current span inside)."""
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    return tracer.start(name, attributes, kind)
+
+
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None, kind: int = KIND_INTERNAL) -> Any:
+    """Like span(), but never made current: for spans without children, ended with .end()."""
+    return span(name, attributes, kind)
+
+
+def get_current_span() -> Any:
+    """The current span, or the no-op span (tracing off, or outside any span)."""
+    if _tracer is None:
+        return NOOP_SPAN
+    return current_span.get() or NOOP_SPAN
+
+
+def traced_node(name: str, node: Callable[..., Any]) -> Callable[..., Any]:
+    """Graph node `node` wrapped in a "node.<name>" span (same signature, so LangGraph still passes config)."""
+    span_name = f"node.{name}"
+
+    @functools.wraps(node)
+    def traced(*args: Any, **kwargs: Any) -> Any:
+        if _tracer is None:
+            return node(*args, **kwargs)
+        with span(span_name, {"langgraph.node": name}):
+            return node(*args, **kwargs)
+
+    return traced
+
+
+def turn_attributes(state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Root span attributes from a turn's final state."""
+    state = state or {}
+    metadata = state.get("metadata") or {}
+    return {
+        "intent": state.get("intent"),
+        "response_source": metadata.get("response_source"),
+        "specialists": list(metadata.get("specialist_targets") or []) or None,
+        "degraded": list(metadata.get("degraded") or []) or None,
+    }
+
+
+# ---- waterfall ----
+
+
+def format_waterfall(spans: List[Span], width: int = 40) -> str:
+    """
+    One line per span, children indented under their parent, with start
+    offset and duration in ms and a bar on the turn's timeline. "!" marks
+    spans that ended with an error.
+    """
+    if not spans:
+        return ""
+    ids = {s.span_id for s in spans}
+    children: Dict[Optional[str], List[Span]] = defaultdict(list)
+    for s in spans:
+        children[s.parent_id if s.parent_id in ids else None].append(s)
+    t0 = min(s.start_ns for s in spans)
+    total = max(max((s.end_ns or s.start_ns) for s in spans) - t0, 1)
+    lines = [f"{'span':<52} {'start':>8} {'ms':>8}"]
+
+    def walk(parent: Optional[str], depth: int) -> None:
+        for s in sorted(children.get(parent, []), key=lambda s: s.start_ns):
+            end_ns = s.end_ns or s.start_ns
+            left = int(width * (s.start_ns - t0) / total)
+            right = max(left + 1, int(width * (end_ns - t0) / total))
+            bar = " " * left + "#" * (right - left) + " " * (width - right)
+            label = ("  " * depth + _label(s))[:52]
+            flag = " !" if s.error is not None else ""
+            lines.append(f"{label:<52} {(s.start_ns - t0) / 1e6:8.1f} {(end_ns - s.start_ns) / 1e6:8.1f} |{bar}|{flag}")
+            walk(s.span_id, depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+def _label(s: Span) -> str:
+    detail = s.attributes.get("llm.agent") or s.attributes.get("gen_ai.request.model") or s.attributes.get("tool.status")
+    return f"{s.name} ({detail})" if detail else s.name
+
+
+# ---- turn root spans ----
+
+
+class TracingApp:
+    """
+    Thin proxy around a compiled graph (or TurnTrackingApp) that runs each
+    turn in a root "turn" span. last_trace_id is the trace of the turn that
+    finished last (the CLI's waterfall reads it).
+    """
+
+    def __init__(self, app: Any) -> None:
+        self._app = app
+        self.last_trace_id: Optional[str] = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._app, name)
+
+    @staticmethod
+    def _root_attributes(input: Dict[str, Any], config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "thread_id": str(((config or {}).get("configurable") or {}).get("thread_id") or ""),
+            "user_input_chars": len(str((input or {}).get("user_input") or "")),
+        }
+
+    def invoke(self, input: Dict[str, Any], config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        with span("turn", self._root_attributes(input, config)) as root:
+            result = self._app.invoke(input, config=config, **kwargs)
+            root.set_attributes(turn_attributes(result))
+        self.last_trace_id = getattr(root, "trace_id", None)
+        return result
+
+    def stream(self, input: Dict[str, Any], config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Iterator[Any]:
+        final: Dict[str, Any] = {}
+        with span("turn", self._root_attributes(input, config)) as root:
+            for chunk in self._app.stream(input, config=config, **kwargs):
+                if isinstance(chunk, tuple) and len(chunk) == 2 and chunk[0] == "values":
+                    final = chunk[1]
+                yield chunk
+            root.set_attributes(turn_attributes(final))
+        self.last_trace_id = getattr(root, "trace_id", None)
+
+    def waterfall(self) -> str:
+        """format_waterfall() of the last finished turn ("" if none or tracing is off)."""
+        tracer = _tracer
+        if tracer is None or self.last_trace_id is None:
+            return ""
+        return format_waterfall(tracer.trace(self.last_trace_id))
+
+
+def trace_from_env(app: Any) -> Any:
+    """
+    If TRACE_PATH is set, start tracing and return the app wrapped in
+    TracingApp; otherwise return `app` unchanged. Call after build_graph()
+    (and record_from_env(), if used).
+    """
+    if not TRACE_PATH:
+        return app
+    if _tracer is None:
+        configure(TRACE_PATH)
+    logger.info("trace_from_env: writing OTLP JSON traces to %s", TRACE_PATH)
+    return TracingApp(app)
+
+
+def tracing_stats() -> Dict[str, Any]:
+    """Traces and spans written so far, and whether tracing is on."""
+    tracer = _tracer
+    return {"enabled": tracer is not None, **(tracer.stats() if tracer is not None else {})}